@@ -1,127 +1,66 @@
+import os
+import logging
+import threading
+import multiprocessing
 import dash
-from dash import dcc, html, callback, Input, Output
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
+import flask
 import numpy as np
+import pandas as pd
+from dash.exceptions import PreventUpdate
+from dash import dcc, html, callback, ctx, ClientsideFunction, Input, Output, State
 from datetime import datetime
-import requests
-from io import StringIO
 # Add these imports at the top of your app.py file
-from forecast_model import create_forecast_model, predict_next_hours
+from forecast_scheduler import ForecastStore, ForecastScheduler
 from health_recommendations import get_health_recommendations
 from geospatial_view import create_geospatial_view
+from data_loader import load_aqi_data, get_cache_dir, get_data_source
+from ingest import IngestionPipeline, DEFAULT_MAX_RECORDS
+from aggregates import AQICube
+from timeseries import TimeSeriesIndex
+from analytics import AQIAnalytics
+from figure_cache import FigureCache
+from compression import register_compression
+from instrumentation import registry, register_endpoints, timed
+from downsample import DEFAULT_POINTS, relayout_range
+from aqi_categories import category_label
+from figures import (
+    build_health_gauge, build_trend_figure, build_health_risk_figure, build_hourly_figure,
+    build_monthly_figure, build_day_of_week_figure, build_heatmap_figure,
+    build_forecast_figure, build_placeholder, build_interactive_figure,
+    build_rolling_figure, build_exceedance_figure, build_percentile_figure
+)
 
+logger = logging.getLogger(__name__)
 
-# Fetch data from URL
-url = "https://hebbkx1anhila5yf.public.blob.vercel-storage.com/cleaned_sohna_aqi-3nwYgozAaJsNtEZpDWKCLOJI1BJjFN.csv"
-response = requests.get(url)
-data = StringIO(response.text)
-df = pd.read_csv(data)
-
-# Convert Datetime to proper datetime format
-df['Datetime'] = pd.to_datetime(df['Datetime'])
-df['Date'] = df['Datetime'].dt.date
-df['Month'] = df['Datetime'].dt.month
-df['Month_Name'] = df['Datetime'].dt.strftime('%b')
-df['Day_of_Week'] = df['Datetime'].dt.day_name()
-df['Hour_Num'] = df['Datetime'].dt.hour
-
-# Convert AQI to numeric
-df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
-
-# Create a color mapping dictionary for consistency
-color_map = {
-    'Good': '#00e400',
-    'Moderate': '#ffff00',
-    'Unhealthy for Sensitive Groups': '#ff7e00',
-    'Unhealthy': '#ff0000',
-    'Very Unhealthy': '#99004c',
-    'Hazardous': '#7e0023'
-}
-
-# Futuristic color palette
-futuristic_colors = {
-    'primary': '#00f5d4',      # Bright teal
-    'secondary': '#9d4edd',    # Purple
-    'accent1': '#ff3864',      # Neon pink
-    'accent2': '#2de2e6',      # Cyan
-    'accent3': '#f6f740',      # Yellow
-    'accent4': '#ff6c11',      # Orange
-    'background': '#0f1020',   # Dark blue-black
-    'surface': '#1a1b3a',      # Slightly lighter blue
-    'text': '#ffffff',         # White
-    'textSecondary': '#b3b3cc' # Light purple-gray
-}
-
-# Calculate some statistics
-avg_aqi = df['AQI'].mean()
-max_aqi = df['AQI'].max()
-min_aqi = df['AQI'].min()
-
-# Count occurrences of each health risk category
-health_risk_counts = df['Health Risk'].value_counts().reset_index()
-health_risk_counts.columns = ['Health Risk', 'Count']
-
-# Calculate hourly averages
-hourly_avg = df.groupby('Hour_Num')['AQI'].mean().reset_index()
-
-# Calculate daily averages
-daily_avg = df.groupby('Date')['AQI'].mean().reset_index()
-daily_avg = daily_avg.sort_values('Date')
-
-# Calculate monthly averages
-monthly_avg = df.groupby('Month_Name')['AQI'].mean().reset_index()
-month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-monthly_avg['Month_Num'] = monthly_avg['Month_Name'].apply(lambda x: month_order.index(x) if x in month_order else -1)
-monthly_avg = monthly_avg.sort_values('Month_Num')
+# Load data through the local columnar cache (parsed from CSV only on first start).
+# Set AQI_DATA_SOURCE to point at another file or URL.
+df = load_aqi_data()
 
-# Calculate day of week averages
-day_of_week_avg = df.groupby('Day_of_Week')['AQI'].mean().reset_index()
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-day_of_week_avg['Day_Num'] = day_of_week_avg['Day_of_Week'].apply(lambda x: day_order.index(x) if x in day_order else -1)
-day_of_week_avg = day_of_week_avg.sort_values('Day_Num')
+# Build the date x hour aggregate cube once; every chart and callback reads from it
+cube = AQICube.from_frame(df)
 
-# Calculate health risk percentages for the gauge
-health_percentages = health_risk_counts.copy()
-health_percentages['Percentage'] = (health_percentages['Count'] / health_percentages['Count'].sum()) * 100
+# Hourly readings sorted by time, for range queries
+with timed('startup.series'):
+    series = TimeSeriesIndex.from_frame(df)
 
-# Calculate recent trend (last 7 days if available)
-if len(daily_avg) >= 7:
-    recent_trend = daily_avg.iloc[-7:].copy()
-else:
-    recent_trend = daily_avg.copy()
+# Hourly grid with running totals, for the rolling average and exceedance panels
+analytics = AQIAnalytics.from_frame(df)
 
-# Get current time and find the corresponding AQI from historical data
-current_hour = datetime.now().hour
-current_aqi = hourly_avg[hourly_avg['Hour_Num'] == current_hour]['AQI'].values[0] if current_hour in hourly_avg['Hour_Num'].values else avg_aqi
 
 # Determine health risk for current AQI
 def get_health_risk(aqi):
-    if aqi <= 50:
-        return 'Good'
-    elif aqi <= 100:
-        return 'Moderate'
-    elif aqi <= 150:
-        return 'Unhealthy for Sensitive Groups'
-    elif aqi <= 200:
-        return 'Unhealthy'
-    elif aqi <= 300:
-        return 'Very Unhealthy'
-    else:
-        return 'Hazardous'
-
-current_health_risk = get_health_risk(current_aqi)
-# Create forecast model
-forecast_model, scaler, features = create_forecast_model(df)
-forecast_data = predict_next_hours(df, forecast_model, scaler, features, hours=24)
-
-# Get health recommendations for current AQI
-health_recs = get_health_recommendations(current_aqi)
-
-# Create geospatial view
-geo_fig = create_geospatial_view(current_aqi)
+    return category_label(aqi)
+
+
+def get_current_aqi():
+    """Latest ingested reading, or the historical average AQI for the current hour of day"""
+    latest = ingestion.current()
+    if latest is not None:
+        return latest[1]
+    current_hour = datetime.now().hour
+    hourly_avg = cube.hourly_avg()
+    matches = hourly_avg.loc[hourly_avg['Hour_Num'] == current_hour, 'AQI']
+    return float(matches.iloc[0]) if len(matches) else cube.mean
 
 
 # Initialize the Dash app with custom CSS
@@ -137,1277 +76,1342 @@ app = dash.Dash(
 
 # Set the page title
 app.title = "Sohna AQI Monitoring System - 2023 Data"
+server = app.server
 
-# App layout
-app.layout = html.Div(
-    className="dashboard-container",
-    children=[
-        # Header
-        html.Div(
-            className="header",
-            children=[
-                html.Div(
-                    className="header-content",
-                    children=[
-                        html.Div(
-                            className="logo-container",
-                            children=[
-                                html.Div(className="logo-icon"),
-                                html.H1("AERO·PULSE", className="title")
-                            ]
-                        ),
-                        html.Div(
-                            className="header-right",
-                            children=[
-                                html.Div(
-                                    className="current-time",
-                                    id="live-clock"
-                                ),
-                                html.Div(
-                                    className="header-stats",
-                                    children=[
-                                        html.Div(
-                                            className="header-stat",
-                                            children=[
-                                                html.Span("Current Status:", className="stat-label"),
-                                                html.Div(
-                                                    className="status-container",
-                                                    children=[
-                                                        html.Span(
-                                                            f"{current_health_risk}", 
-                                                            className=f"stat-value status-{current_health_risk.replace(' ', '-').lower()}"
-                                                        ),
-                                                        html.Div(
-                                                            className="warning-icon",
-                                                            style={'display': 'inline-block' if current_health_risk in ['Very Unhealthy', 'Hazardous'] else 'none'}
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        )
-                    ]
-                ),
-                html.Div(
-                    className="dashboard-description",
-                    children=[
-                        html.P([
-                            "Advanced air quality monitoring system for Sohna, providing AQI analysis and health risk assessment based on 2023 data. ",
-                            "Track pollution patterns, identify health risks, and make data-driven decisions with our comprehensive metrics."
-                        ])
-                    ]
-                )
-            ]
-        ),
+# gzip/brotli for the layout, callback responses and scripts
+register_compression(server)
+
+# Serialized figures keyed on (chart, options..., data or forecast version)
+figure_cache = FigureCache(maxsize=64)
+
+
+# Liveness and readiness for `python App.py`; under gunicorn, wsgi.py answers them
+# before this module has finished importing
+@server.route('/healthz')
+def healthz():
+    return flask.jsonify({'status': 'ok'})
+
+
+@server.route('/readyz')
+def readyz():
+    return flask.jsonify({'status': 'ready'})
+
+
+@server.route('/metrics/figure-cache')
+def figure_cache_metrics():
+    return flask.jsonify(figure_cache.stats())
+
+
+# Timings of data loading, aggregations, forecasting, figures and callbacks as
+# Prometheus text on /metrics; AQI_PROFILING=1 allows ?profile=1 per request
+register_endpoints(server)
+registry.register_gauge('figure_cache_hits', 'Figure cache hits since start', lambda: figure_cache.hits)
+registry.register_gauge('figure_cache_misses', 'Figure cache misses since start', lambda: figure_cache.misses)
+registry.register_gauge('figure_cache_entries', 'Figures in the cache', lambda: figure_cache.stats()['size'])
+registry.register_gauge('data_readings', 'Readings in the aggregate cube', lambda: cube.count)
+
+
+@server.route('/api/readings')
+def readings_in_range():
+    """Hourly readings between ?start= and ?end= (inclusive; dates or timestamps)"""
+    try:
+        timestamps, values = series.window(flask.request.args.get('start'), flask.request.args.get('end'))
+    except ValueError as exc:
+        return flask.jsonify({'error': str(exc)}), 400
+    return flask.jsonify({
+        'Datetime': np.datetime_as_string(timestamps, unit='s').tolist(),
+        'AQI': values.tolist()
+    })
+
+
+def refresh_data():
+    """Reload the dataset and rebuild the cube, dropping figures of the old version"""
+    global df, cube, series, analytics
+    df = load_aqi_data()
+    cube = AQICube.from_frame(df)
+    series = TimeSeriesIndex.from_frame(df)
+    analytics = AQIAnalytics.from_frame(df)
+    ingestion.attach_cube(cube, series, analytics=analytics)
+    figure_cache.invalidate(cube.version)
+
+
+def _source_signature():
+    """(mtime, size) of a local data source file, None for a URL or a missing file"""
+    source = get_data_source()
+    if source.startswith(('http://', 'https://')):
+        return None
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch_data_source(interval_seconds):
+    """Call refresh_data whenever the source file changes, checking every interval_seconds"""
+    stop = threading.Event()
+
+    def run():
+        signature = _source_signature()
+        while not stop.wait(interval_seconds):
+            current = _source_signature()
+            if current is None or current == signature:
+                continue
+            signature = current
+            try:
+                refresh_data()
+                logger.info("Data source changed, reloaded (version %s)", cube.version)
+            except Exception:
+                logger.exception("Reloading the changed data source failed")
+
+    threading.Thread(target=run, name='data-source-watcher', daemon=True).start()
+    return stop
+
+
+def on_readings_applied():
+    # The cube is updated in place, so only its version changes
+    figure_cache.invalidate(cube.version)
+
+
+# Live readings (POST /ingest, optional file tail / socket) are appended to a
+# shared log; every process follows it and updates its cube incrementally.
+ingestion = IngestionPipeline(
+    os.environ.get('AQI_INGEST_LOG', os.path.join(get_cache_dir(), 'ingest.log')),
+    cube,
+    on_update=on_readings_applied,
+    series=series,
+    analytics=analytics
+)
+# POST /ingest rewrites the dashboard's data, so it is only served with a shared
+# token (AQI_INGEST_TOKEN, sent as "Authorization: Bearer <token>")
+if os.environ.get('AQI_INGEST_TOKEN'):
+    ingestion.register_endpoint(server, os.environ['AQI_INGEST_TOKEN'],
+                                max_records=int(os.environ.get('AQI_INGEST_MAX_RECORDS', DEFAULT_MAX_RECORDS)))
+
+# Under gunicorn each worker starts its follower after the fork, or on import when
+# not preloading (see gunicorn.conf.py), and the file tail / socket sources run in
+# their own process
+if multiprocessing.parent_process() is None and os.environ.get('AQI_INGEST_FOLLOW', '1') == '1':
+    ingestion.start()
+    if os.environ.get('AQI_INGEST_SOURCES', '1') == '1':
+        if os.environ.get('AQI_INGEST_TAIL'):
+            ingestion.tail_file(os.environ['AQI_INGEST_TAIL'])
+        if os.environ.get('AQI_INGEST_SOCKET'):
+            host, port = os.environ['AQI_INGEST_SOCKET'].rsplit(':', 1)
+            ingestion.serve_socket(host, int(port), os.environ.get('AQI_INGEST_TOKEN'))
+
+
+# A replaced or rewritten source CSV is reloaded without a restart, in every
+# process; AQI_DATA_WATCH_SECONDS=0 turns the check off
+# (under gunicorn with preloading, post_fork starts it in each worker)
+DATA_WATCH_SECONDS = float(os.environ.get('AQI_DATA_WATCH_SECONDS', 60))
+if (multiprocessing.parent_process() is None and DATA_WATCH_SECONDS > 0
+        and os.environ.get('AQI_DATA_WATCH', '1') == '1'):
+    watch_data_source(DATA_WATCH_SECONDS)
+
+
+# The forecast is refit in the background and published to the store,
+# so neither startup nor requests wait on model fitting.
+# Under gunicorn (see gunicorn.conf.py) a separate scheduler process writes
+# AQI_FORECAST_STORE and the workers only read it.
+forecast_store = ForecastStore(os.environ.get('AQI_FORECAST_STORE'))
+
+
+def forecast_data():
+    """The hourly readings, ingested ones included, as the forecast's Datetime / AQI frame"""
+    timestamps, values = series.window()
+    return pd.DataFrame({'Datetime': timestamps.copy(), 'AQI': values.copy()})
+
+
+forecast_scheduler = ForecastScheduler(
+    forecast_data,
+    forecast_store,
+    interval_seconds=int(os.environ.get('AQI_FORECAST_INTERVAL', 900))
+)
+
+# The forecast worker process re-imports this module when App.py is run directly;
+# only the parent process schedules refits
+if multiprocessing.parent_process() is None and os.environ.get('AQI_FORECAST_SCHEDULER', '1') == '1':
+    forecast_scheduler.start()
+
+
+# App layout: built per page load with empty graphs, each filled by its own callback
+@timed('callback.serve_layout')
+def serve_layout():
+    avg_aqi = cube.mean
+    max_aqi = cube.max
+    min_aqi = cube.min
+    current_aqi = get_current_aqi()
+    current_health_risk = get_health_risk(current_aqi)
+    health_recs = get_health_recommendations(current_aqi)
+
+    return html.Div(
+        className="dashboard-container",
+        children=[
+            # Header
+            html.Div(
+                className="header",
+                children=[
+                    html.Div(
+                        className="header-content",
+                        children=[
+                            html.Div(
+                                className="logo-container",
+                                children=[
+                                    html.Div(className="logo-icon"),
+                                    html.H1("AERO·PULSE", className="title")
+                                ]
+                            ),
+                            html.Div(
+                                className="header-right",
+                                children=[
+                                    html.Div(
+                                        className="current-time",
+                                        id="live-clock"
+                                    ),
+                                    html.Div(
+                                        className="header-stats",
+                                        children=[
+                                            html.Div(
+                                                className="header-stat",
+                                                children=[
+                                                    html.Span("Current Status:", className="stat-label"),
+                                                    html.Div(
+                                                        className="status-container",
+                                                        children=[
+                                                            html.Span(
+                                                                f"{current_health_risk}", 
+                                                                className=f"stat-value status-{current_health_risk.replace(' ', '-').lower()}"
+                                                            ),
+                                                            html.Div(
+                                                                className="warning-icon",
+                                                                style={'display': 'inline-block' if current_health_risk in ['Very Unhealthy', 'Hazardous'] else 'none'}
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className="dashboard-description",
+                        children=[
+                            html.P([
+                                "Advanced air quality monitoring system for Sohna, providing AQI analysis and health risk assessment based on 2023 data. ",
+                                "Track pollution patterns, identify health risks, and make data-driven decisions with our comprehensive metrics."
+                            ])
+                        ]
+                    )
+                ]
+            ),
         
-        # Main content
-        html.Div(
-            className="main-content",
-            children=[
-                # Left sidebar with key stats
-                html.Div(
-                    className="sidebar",
-                    children=[
-                        # Current AQI in Sohna section
-                        html.Div(
-                            className="sidebar-section current-aqi-section",
-                            children=[
-                                html.H3("Current AQI in Sohna", className="section-title"),
-                                html.Div(
-                                    className="current-aqi-display",
-                                    children=[
-                                        html.Div(
-                                            className="current-aqi-value",
-                                            children=[
-                                                html.Span(f"{current_aqi:.1f}", className="aqi-number"),
-                                                html.Span("AQI", className="aqi-unit")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="current-aqi-status",
-                                            children=[
-                                                html.Span(f"{current_health_risk}", 
-                                                    className=f"aqi-status-text status-{current_health_risk.replace(' ', '-').lower()}"
-                                                ),
-                                                html.Div(
-                                                    className="warning-icon large",
-                                                    style={'display': 'inline-block' if current_health_risk in ['Very Unhealthy', 'Hazardous'] else 'none'}
-                                                )
-                                            ]
-                                        ),
-                                        html.P(
-                                            className="current-aqi-note",
-                                            children=["Based on historical data from 2023 for this time of day"]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
-                        
-                        html.Div(
-                            className="sidebar-section",
-                            children=[
-                                html.H3("Air Quality Metrics", className="section-title"),
-                                html.Div(
-                                    className="stat-cards",
-                                    children=[
-                                        html.Div(
-                                            className="stat-card primary",
-                                            children=[
-                                                html.Div(
-                                                    className="stat-icon aqi-icon"
-                                                ),
-                                                html.Div(
-                                                    className="stat-content",
-                                                    children=[
-                                                        html.H4("Average AQI"),
-                                                        html.Div(
-                                                            className="stat-value-container",
-                                                            children=[
-                                                                html.Span(f"{avg_aqi:.1f}", className="stat-value"),
-                                                                html.Span("units", className="stat-unit")
-                                                            ]
-                                                        ),
-                                                        html.P("Overall air quality average")
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="stat-card danger",
-                                            children=[
-                                                html.Div(
-                                                    className="stat-icon max-icon"
-                                                ),
-                                                html.Div(
-                                                    className="stat-content",
-                                                    children=[
-                                                        html.H4("Maximum AQI"),
-                                                        html.Div(
-                                                            className="stat-value-container",
-                                                            children=[
-                                                                html.Span(f"{max_aqi:.1f}", className="stat-value"),
-                                                                html.Span("units", className="stat-unit")
-                                                            ]
-                                                        ),
-                                                        html.P("Highest recorded value")
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="stat-card success",
-                                            children=[
-                                                html.Div(
-                                                    className="stat-icon min-icon"
-                                                ),
-                                                html.Div(
-                                                    className="stat-content",
-                                                    children=[
-                                                        html.H4("Minimum AQI"),
-                                                        html.Div(
-                                                            className="stat-value-container",
-                                                            children=[
-                                                                html.Span(f"{min_aqi:.1f}", className="stat-value"),
-                                                                html.Span("units", className="stat-unit")
-                                                            ]
-                                                        ),
-                                                        html.P("Lowest recorded value")
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="stat-card info",
-                                            children=[
-                                                html.Div(
-                                                    className="stat-icon data-icon"
-                                                ),
-                                                html.Div(
-                                                    className="stat-content",
-                                                    children=[
-                                                        html.H4("Data Points"),
-                                                        html.Div(
-                                                            className="stat-value-container",
-                                                            children=[
-                                                                html.Span(f"{len(df):,}", className="stat-value"),
-                                                                html.Span("records", className="stat-unit")
-                                                            ]
-                                                        ),
-                                                        html.P("Total measurements in 2023")
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                    ]
-                                )
-                            ]
-                        ),
+            # Main content
+            html.Div(
+                className="main-content",
+                children=[
+                    # Left sidebar with key stats
+                    html.Div(
+                        className="sidebar",
+                        children=[
+                            # Current AQI in Sohna section
+                            html.Div(
+                                className="sidebar-section current-aqi-section",
+                                children=[
+                                    html.H3("Current AQI in Sohna", className="section-title"),
+                                    html.Div(
+                                        className="current-aqi-display",
+                                        children=[
+                                            html.Div(
+                                                className="current-aqi-value",
+                                                children=[
+                                                    html.Span(f"{current_aqi:.1f}", className="aqi-number"),
+                                                    html.Span("AQI", className="aqi-unit")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="current-aqi-status",
+                                                children=[
+                                                    html.Span(f"{current_health_risk}", 
+                                                        className=f"aqi-status-text status-{current_health_risk.replace(' ', '-').lower()}"
+                                                    ),
+                                                    html.Div(
+                                                        className="warning-icon large",
+                                                        style={'display': 'inline-block' if current_health_risk in ['Very Unhealthy', 'Hazardous'] else 'none'}
+                                                    )
+                                                ]
+                                            ),
+                                            html.P(
+                                                className="current-aqi-note",
+                                                children=["Based on historical data from 2023 for this time of day"]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
+
+                            # Date range applied to every chart
+                            html.Div(
+                                className="sidebar-section",
+                                children=[
+                                    html.H3("Date Range", className="section-title"),
+                                    dcc.DatePickerRange(
+                                        id='date-range',
+                                        min_date_allowed=str(cube.dates[0]),
+                                        max_date_allowed=str(cube.dates[-1]),
+                                        start_date=str(cube.dates[0]),
+                                        end_date=str(cube.dates[-1]),
+                                        display_format='YYYY-MM-DD',
+                                        className="date-range-picker"
+                                    )
+                                ]
+                            ),
                         
-                        html.Div(
-                            className="sidebar-section",
-                            children=[
-                                html.H3("Health Risk Assessment", className="section-title"),
-                                html.Div(
-                                    className="health-risk-container",
-                                    children=[
-                                        dcc.Graph(
-                                            id='health-risk-gauge',
-                                            figure=go.Figure(
-                                                data=[
-                                                    go.Pie(
-                                                        values=health_percentages['Percentage'],
-                                                        labels=health_percentages['Health Risk'],
-                                                        hole=0.7,
-                                                        textinfo='none',
-                                                        hoverinfo='label+percent',
-                                                        marker=dict(
-                                                            colors=[color_map.get(risk, '#CCCCCC') for risk in health_percentages['Health Risk']],
-                                                            line=dict(color=futuristic_colors['background'], width=1)
-                                                        ),
-                                                        direction='clockwise',
-                                                        sort=False
+                            html.Div(
+                                className="sidebar-section",
+                                children=[
+                                    html.H3("Air Quality Metrics", className="section-title"),
+                                    html.Div(
+                                        className="stat-cards",
+                                        children=[
+                                            html.Div(
+                                                className="stat-card primary",
+                                                children=[
+                                                    html.Div(
+                                                        className="stat-icon aqi-icon"
+                                                    ),
+                                                    html.Div(
+                                                        className="stat-content",
+                                                        children=[
+                                                            html.H4("Average AQI"),
+                                                            html.Div(
+                                                                className="stat-value-container",
+                                                                children=[
+                                                                    html.Span(f"{avg_aqi:.1f}", className="stat-value"),
+                                                                    html.Span("units", className="stat-unit")
+                                                                ]
+                                                            ),
+                                                            html.P("Overall air quality average")
+                                                        ]
                                                     )
-                                                ],
-                                                layout=go.Layout(
-                                                    showlegend=False,
-                                                    margin=dict(l=0, r=0, t=0, b=0),
-                                                    paper_bgcolor='rgba(0,0,0,0)',
-                                                    plot_bgcolor='rgba(0,0,0,0)',
-                                                    height=220,
-                                                    annotations=[
-                                                        dict(
-                                                            text=f"<b>{avg_aqi:.1f}</b><br>AQI",
-                                                            x=0.5, y=0.5,
-                                                            font=dict(size=20, color=futuristic_colors['primary']),
-                                                            showarrow=False
-                                                        )
-                                                    ]
-                                                )
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="stat-card danger",
+                                                children=[
+                                                    html.Div(
+                                                        className="stat-icon max-icon"
+                                                    ),
+                                                    html.Div(
+                                                        className="stat-content",
+                                                        children=[
+                                                            html.H4("Maximum AQI"),
+                                                            html.Div(
+                                                                className="stat-value-container",
+                                                                children=[
+                                                                    html.Span(f"{max_aqi:.1f}", className="stat-value"),
+                                                                    html.Span("units", className="stat-unit")
+                                                                ]
+                                                            ),
+                                                            html.P("Highest recorded value")
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="stat-card success",
+                                                children=[
+                                                    html.Div(
+                                                        className="stat-icon min-icon"
+                                                    ),
+                                                    html.Div(
+                                                        className="stat-content",
+                                                        children=[
+                                                            html.H4("Minimum AQI"),
+                                                            html.Div(
+                                                                className="stat-value-container",
+                                                                children=[
+                                                                    html.Span(f"{min_aqi:.1f}", className="stat-value"),
+                                                                    html.Span("units", className="stat-unit")
+                                                                ]
+                                                            ),
+                                                            html.P("Lowest recorded value")
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="stat-card info",
+                                                children=[
+                                                    html.Div(
+                                                        className="stat-icon data-icon"
+                                                    ),
+                                                    html.Div(
+                                                        className="stat-content",
+                                                        children=[
+                                                            html.H4("Data Points"),
+                                                            html.Div(
+                                                                className="stat-value-container",
+                                                                children=[
+                                                                    html.Span(f"{cube.count:,}", className="stat-value"),
+                                                                    html.Span("records", className="stat-unit")
+                                                                ]
+                                                            ),
+                                                            html.P("Total measurements in 2023")
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                        ]
+                                    )
+                                ]
+                            ),
+                        
+                            html.Div(
+                                className="sidebar-section",
+                                children=[
+                                    html.H3("Health Risk Assessment", className="section-title"),
+                                    html.Div(
+                                        className="health-risk-container",
+                                        children=[
+                                            dcc.Graph(
+                                                id='health-risk-gauge'
+                                            ),
+                                            html.Div(
+                                                className="health-risk-legend",
+                                                children=[
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color good"),
+                                                            html.Div("Good", className="legend-label")
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color moderate"),
+                                                            html.Div("Moderate", className="legend-label")
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color sensitive"),
+                                                            html.Div("Unhealthy for Sensitive", className="legend-label")
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color unhealthy"),
+                                                            html.Div("Unhealthy", className="legend-label")
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color very-unhealthy"),
+                                                            html.Div("Very Unhealthy", className="legend-label")
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="legend-item",
+                                                        children=[
+                                                            html.Div(className="legend-color hazardous"),
+                                                            html.Div("Hazardous", className="legend-label")
+                                                        ]
+                                                    ),
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="health-risk-legend",
-                                            children=[
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color good"),
-                                                        html.Div("Good", className="legend-label")
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color moderate"),
-                                                        html.Div("Moderate", className="legend-label")
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color sensitive"),
-                                                        html.Div("Unhealthy for Sensitive", className="legend-label")
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color unhealthy"),
-                                                        html.Div("Unhealthy", className="legend-label")
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color very-unhealthy"),
-                                                        html.Div("Very Unhealthy", className="legend-label")
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="legend-item",
-                                                    children=[
-                                                        html.Div(className="legend-color hazardous"),
-                                                        html.Div("Hazardous", className="legend-label")
-                                                    ]
-                                                ),
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
+                                        ]
+                                    )
+                                ]
+                            ),
                         
-                        html.Div(
-                            className="sidebar-section",
-                            children=[
-                                html.H3("Health Implications", className="section-title"),
-                                html.Div(
-                                    className="health-implications",
-                                    children=[
-                                        html.Div(
-                                            className="implication-item",
-                                            children=[
-                                                html.H4("Good (0-50)"),
-                                                html.P("Air quality is satisfactory, and air pollution poses little or no risk.")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="implication-item",
-                                            children=[
-                                                html.H4("Moderate (51-100)"),
-                                                html.P("Acceptable air quality, but some pollutants may be a concern for sensitive individuals.")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="implication-item",
-                                            children=[
-                                                html.H4("Unhealthy for Sensitive Groups (101-150)"),
-                                                html.P("Members of sensitive groups may experience health effects, but the general public is less likely to be affected.")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="implication-item",
-                                            children=[
-                                                html.H4("Unhealthy (151-200)"),
-                                                html.P("Everyone may begin to experience health effects; members of sensitive groups may experience more serious effects.")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="implication-item very-unhealthy-item",
-                                            children=[
-                                                html.H4("Very Unhealthy (201-300)"),
-                                                html.P("Health alert: everyone may experience more serious health effects.")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="implication-item",
-                                            children=[
-                                                html.H4("Hazardous (301+)"),
-                                                html.P("Health warning of emergency conditions: everyone is more likely to be affected.")
-                                            ]
-                                        ),
-                                    ]
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className="sidebar-section health-recommendations-section",
-                            children=[
-                                html.H3("Health Recommendations", className="section-title"),
-                                html.Div(
-                                    className="health-recommendation-container",
-                                    children=[
-                                        html.Div(
-                                            className="recommendation-header",
-                                            children=[
-                                                html.Span(health_recs["icon"], className="recommendation-icon"),
-                                                html.H4("Based on Current AQI")
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="recommendation-content",
-                                            children=[
-                                                html.P(health_recs["general"], className="recommendation-general"),
-                                                html.H5("For Sensitive Groups:"),
-                                                html.P(health_recs["sensitive_groups"]),
-                                                html.H5("Outdoor Activities:"),
-                                                html.P(health_recs["outdoor_activity"]),
-                                                html.H5("Ventilation:"),
-                                                html.P(health_recs["ventilation"]),
-                                                html.H5("Mask Recommendation:"),
-                                                html.P(health_recs["mask_recommendation"])
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
-                    ]
-                ),
+                            html.Div(
+                                className="sidebar-section",
+                                children=[
+                                    html.H3("Health Implications", className="section-title"),
+                                    html.Div(
+                                        className="health-implications",
+                                        children=[
+                                            html.Div(
+                                                className="implication-item",
+                                                children=[
+                                                    html.H4("Good (0-50)"),
+                                                    html.P("Air quality is satisfactory, and air pollution poses little or no risk.")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="implication-item",
+                                                children=[
+                                                    html.H4("Moderate (51-100)"),
+                                                    html.P("Acceptable air quality, but some pollutants may be a concern for sensitive individuals.")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="implication-item",
+                                                children=[
+                                                    html.H4("Unhealthy for Sensitive Groups (101-150)"),
+                                                    html.P("Members of sensitive groups may experience health effects, but the general public is less likely to be affected.")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="implication-item",
+                                                children=[
+                                                    html.H4("Unhealthy (151-200)"),
+                                                    html.P("Everyone may begin to experience health effects; members of sensitive groups may experience more serious effects.")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="implication-item very-unhealthy-item",
+                                                children=[
+                                                    html.H4("Very Unhealthy (201-300)"),
+                                                    html.P("Health alert: everyone may experience more serious health effects.")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="implication-item",
+                                                children=[
+                                                    html.H4("Hazardous (301+)"),
+                                                    html.P("Health warning of emergency conditions: everyone is more likely to be affected.")
+                                                ]
+                                            ),
+                                        ]
+                                    )
+                                ]
+                            ),
+                            html.Div(
+                                className="sidebar-section health-recommendations-section",
+                                children=[
+                                    html.H3("Health Recommendations", className="section-title"),
+                                    html.Div(
+                                        className="health-recommendation-container",
+                                        children=[
+                                            html.Div(
+                                                className="recommendation-header",
+                                                children=[
+                                                    html.Span(health_recs["icon"], className="recommendation-icon"),
+                                                    html.H4("Based on Current AQI")
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="recommendation-content",
+                                                children=[
+                                                    html.P(health_recs["general"], className="recommendation-general"),
+                                                    html.H5("For Sensitive Groups:"),
+                                                    html.P(health_recs["sensitive_groups"]),
+                                                    html.H5("Outdoor Activities:"),
+                                                    html.P(health_recs["outdoor_activity"]),
+                                                    html.H5("Ventilation:"),
+                                                    html.P(health_recs["ventilation"]),
+                                                    html.H5("Mask Recommendation:"),
+                                                    html.P(health_recs["mask_recommendation"])
+                                                ]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
+                        ]
+                    ),
                 
-                # Main dashboard area
-                html.Div(
-                    className="dashboard-main",
-                    children=[
-                        # First row - AQI Trend
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container large",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("AQI Trend Analysis (2023)", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='aqi-trend-chart',
-                                            className="animated-chart",
-                                            figure=px.line(
-                                                daily_avg, 
-                                                x='Date', 
-                                                y='AQI',
-                                                labels={'AQI': 'Air Quality Index', 'Date': 'Date'},
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                line=dict(width=3, color=futuristic_colors['primary'])
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                hovermode='x unified',
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    showgrid=True,
-                                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                )
+                    # Main dashboard area
+                    html.Div(
+                        className="dashboard-main",
+                        children=[
+                            # First row - AQI Trend
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container large",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("AQI Trend Analysis (2023)", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='aqi-trend-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Daily average AQI values showing the overall trend over 2023. Identifies pollution patterns and helps predict future air quality conditions.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Daily average AQI values showing the overall trend over 2023. Identifies pollution patterns and helps predict future air quality conditions.")
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("AQI Forecast (Next 24 Hours)", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                ),
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='forecast-chart',
-                                            className="animated-chart",
-                                            figure=px.line(
-                                                forecast_data, 
-                                                x='Datetime', 
-                                                y='Predicted_AQI',
-                                                labels={'Predicted_AQI': 'Predicted AQI', 'Datetime': 'Time'},
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                line=dict(width=3, color=futuristic_colors['accent3'])
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    showgrid=True,
-                                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                )
+                                        ]
+                                    )
+                                ]
+                            ),
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("AQI Forecast (Next 24 Hours)", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    ),
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='forecast-chart',
+                                                className="animated-chart"
+                                            ),
+                                            # Polls the forecast store; the chart only updates when a new forecast was published
+                                            dcc.Interval(id='forecast-interval', interval=15 * 1000),
+                                            dcc.Store(id='forecast-version'),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Predicted AQI values for the 24 hours after the latest reading, from lagged, rolling and time-of-day patterns. Plan your activities accordingly.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Predicted AQI values for the next 24 hours based on historical patterns. Plan your activities accordingly.")
-                                            ]
-                                        )
-                                    ]
-                                ),
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Sohna AQI Map", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='geospatial-chart',
-                                            className="animated-chart",
-                                            figure=geo_fig
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Geospatial view of Sohna showing current AQI levels. The color indicates the air quality category.")
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
+                                        ]
+                                    ),
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Sohna AQI Map", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='geospatial-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Geospatial view of Sohna showing current AQI levels. The color indicates the air quality category.")
+                                                ]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
                         
-                        # Second row - Health Risk and Hourly Pattern
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Health Risk Distribution", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='health-risk-chart',
-                                            className="animated-chart",
-                                            figure=px.pie(
-                                                health_risk_counts, 
-                                                values='Count', 
-                                                names='Health Risk',
-                                                color='Health Risk',
-                                                color_discrete_map=color_map,
-                                                hole=0.6,
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                textposition='inside',
-                                                textinfo='percent+label',
-                                                hoverinfo='label+percent+value',
-                                                marker=dict(line=dict(color=futuristic_colors['background'], width=2))
-                                            ).update_layout(
-                                                margin=dict(l=20, r=20, t=20, b=20),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(0,0,0,0)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                legend=dict(
-                                                    orientation="h",
-                                                    yanchor="bottom",
-                                                    y=-0.2,
-                                                    xanchor="center",
-                                                    x=0.5,
-                                                    font=dict(
-                                                        family="Rajdhani, sans-serif",
-                                                        color='#ffffff'
+                            # Second row - Health Risk and Hourly Pattern
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Health Risk Distribution", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
                                                     )
-                                                )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='health-risk-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Distribution of health risk categories based on AQI measurements in 2023. Shows the proportion of time spent in each air quality category.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Distribution of health risk categories based on AQI measurements in 2023. Shows the proportion of time spent in each air quality category.")
-                                            ]
-                                        )
-                                    ]
-                                ),
+                                        ]
+                                    ),
                                 
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Hourly AQI Pattern", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='hourly-pattern-chart',
-                                            className="animated-chart",
-                                            figure=px.bar(
-                                                hourly_avg, 
-                                                x='Hour_Num', 
-                                                y='AQI',
-                                                labels={'AQI': 'Average AQI', 'Hour_Num': 'Hour of Day'},
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                marker_color=futuristic_colors['accent2'],
-                                                marker=dict(
-                                                    line=dict(width=0),
-                                                    opacity=0.8
-                                                )
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    tickmode='array',
-                                                    tickvals=list(range(0, 24)),
-                                                    ticktext=[f"{i}:00" for i in range(0, 24)],
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    showgrid=True,
-                                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                )
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Hourly AQI Pattern", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='hourly-pattern-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Average AQI values by hour of the day, showing daily patterns. Helps identify peak pollution hours for better planning.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Average AQI values by hour of the day, showing daily patterns. Helps identify peak pollution hours for better planning.")
-                                            ]
-                                        )
-                                    ]
-                                ),
-                            ]
-                        ),
+                                        ]
+                                    ),
+                                ]
+                            ),
                         
-                        # Third row - Monthly and Day of Week
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Monthly AQI Pattern (2023)", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='monthly-pattern-chart',
-                                            className="animated-chart",
-                                            figure=px.line(
-                                                monthly_avg, 
-                                                x='Month_Name', 
-                                                y='AQI',
-                                                markers=True,
-                                                labels={'AQI': 'Average AQI', 'Month_Name': 'Month'},
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                line=dict(width=3, color=futuristic_colors['accent1']),
-                                                marker=dict(size=10, color=futuristic_colors['accent1'])
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    categoryorder='array',
-                                                    categoryarray=month_order,
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    showgrid=True,
-                                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                )
+                            # Third row - Monthly and Day of Week
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Monthly AQI Pattern (2023)", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='monthly-pattern-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Average AQI values by month in 2023, showing seasonal patterns. Reveals how weather and seasonal activities impact air quality.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Average AQI values by month in 2023, showing seasonal patterns. Reveals how weather and seasonal activities impact air quality.")
-                                            ]
-                                        )
-                                    ]
-                                ),
+                                        ]
+                                    ),
                                 
-                                html.Div(
-                                    className="chart-container",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Day of Week AQI Pattern", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='day-of-week-chart',
-                                            className="animated-chart",
-                                            figure=px.bar(
-                                                day_of_week_avg, 
-                                                x='Day_of_Week', 
-                                                y='AQI',
-                                                labels={'AQI': 'Average AQI', 'Day_of_Week': 'Day'},
-                                                template='plotly_dark'
-                                            ).update_traces(
-                                                marker_color=futuristic_colors['secondary'],
-                                                marker=dict(
-                                                    line=dict(width=0),
-                                                    opacity=0.8
-                                                )
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    categoryorder='array',
-                                                    categoryarray=day_order,
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    showgrid=True,
-                                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                )
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Day of Week AQI Pattern", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='day-of-week-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Average AQI values by day of the week, showing weekly patterns. Helps identify how human activities affect air quality.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Average AQI values by day of the week, showing weekly patterns. Helps identify how human activities affect air quality.")
-                                            ]
-                                        )
-                                    ]
-                                ),
-                            ]
-                        ),
+                                        ]
+                                    ),
+                                ]
+                            ),
                         
-                        # Fourth row - AQI Heatmap
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container large",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("AQI Heatmap by Hour and Day", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='heatmap-chart',
-                                            className="animated-chart",
-                                            figure=px.density_heatmap(
-                                                df, 
-                                                x='Hour_Num', 
-                                                y='Day_of_Week',
-                                                z='AQI',
-                                                histfunc='avg',
-                                                labels={'AQI': 'Average AQI', 'Hour_Num': 'Hour of Day', 'Day_of_Week': 'Day of Week'},
-                                                color_continuous_scale=[
-                                                    [0, '#00e400'],  # Good
-                                                    [0.2, '#ffff00'],  # Moderate
-                                                    [0.4, '#ff7e00'],  # Unhealthy for Sensitive Groups
-                                                    [0.6, '#ff0000'],  # Unhealthy
-                                                    [0.8, '#99004c'],  # Very Unhealthy
-                                                    [1, '#7e0023']    # Hazardous
-                                                ],
-                                                template='plotly_dark'
-                                            ).update_layout(
-                                                margin=dict(l=40, r=40, t=20, b=40),
-                                                paper_bgcolor='rgba(0,0,0,0)',
-                                                plot_bgcolor='rgba(15,16,32,0.3)',
-                                                font=dict(
-                                                    family="Rajdhani, sans-serif",
-                                                    color='#ffffff'
-                                                ),
-                                                xaxis=dict(
-                                                    tickmode='array',
-                                                    tickvals=list(range(0, 24)),
-                                                    ticktext=[f"{i}:00" for i in range(0, 24)],
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                yaxis=dict(
-                                                    categoryorder='array',
-                                                    categoryarray=day_order,
-                                                    showgrid=False,
-                                                    zeroline=False,
-                                                    showline=True,
-                                                    linecolor='rgba(255, 255, 255, 0.2)'
-                                                ),
-                                                coloraxis=dict(
-                                                    colorbar=dict(
-                                                        title='AQI',
-                                                        title_font=dict(
-                                                            family="Rajdhani, sans-serif",
-                                                            color='#ffffff'
-                                                        ),
-                                                        tickfont=dict(
-                                                            family="Rajdhani, sans-serif",
-                                                            color='#ffffff'
-                                                        ),
-                                                        tickvals=[50, 100, 150, 200, 300, 400],
-                                                        ticktext=['Good', 'Moderate', 'Unhealthy for Sensitive', 'Unhealthy', 'Very Unhealthy', 'Hazardous']
+                            # Fourth row - AQI Heatmap
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container large",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("AQI Heatmap by Hour and Day", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
                                                     )
-                                                )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='heatmap-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Heatmap showing average AQI values by hour of day and day of week. Identifies specific time periods with the worst air quality.")
+                                                ]
                                             )
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Heatmap showing average AQI values by hour of day and day of week. Identifies specific time periods with the worst air quality.")
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        ),
+                                        ]
+                                    )
+                                ]
+                            ),
                         
-                        # Fifth row - Interactive Explorer
-                        html.Div(
-                            className="chart-row",
-                            children=[
-                                html.Div(
-                                    className="chart-container large",
-                                    children=[
-                                        html.Div(
-                                            className="chart-header",
-                                            children=[
-                                                html.H3("Interactive AQI Explorer", className="chart-title"),
-                                                html.Div(
-                                                    className="chart-actions",
-                                                    children=[
-                                                        html.Div(
-                                                            className="chart-action refresh",
-                                                            title="Refresh Data"
-                                                        ),
-                                                        html.Div(
-                                                            className="chart-action expand",
-                                                            title="Expand"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        html.Div(
-                                            className="filter-container",
-                                            children=[
-                                                html.Div(
-                                                    className="filter-item",
-                                                    children=[
-                                                        html.Label("Select View Type:"),
-                                                        dcc.RadioItems(
-                                                            id='view-type',
-                                                            options=[
-                                                                {'label': 'Daily', 'value': 'daily'},
-                                                                {'label': 'Hourly', 'value': 'hourly'},
-                                                                {'label': 'Health Risk', 'value': 'health'}
-                                                            ],
-                                                            value='daily',
-                                                            className="radio-items"
-                                                        )
-                                                    ]
-                                                ),
-                                                html.Div(
-                                                    className="filter-item",
-                                                    children=[
-                                                        html.Label("Select Chart Type:"),
-                                                        dcc.Dropdown(
-                                                            id='chart-type',
-                                                            options=[
-                                                                {'label': 'Line Chart', 'value': 'line'},
-                                                                {'label': 'Bar Chart', 'value': 'bar'},
-                                                                {'label': 'Scatter Plot', 'value': 'scatter'}
-                                                            ],
-                                                            value='line',
-                                                            clearable=False,
-                                                            className="dropdown"
-                                                        )
-                                                    ]
-                                                )
-                                            ]
-                                        ),
-                                        dcc.Graph(
-                                            id='interactive-chart',
-                                            className="animated-chart"
-                                        ),
-                                        html.Div(
-                                            className="chart-description",
-                                            children=[
-                                                html.P("Explore AQI data with different views and chart types. Customize your analysis to focus on specific aspects of air quality.")
-                                            ]
-                                        )
-                                    ]
-                                )
-                            ]
-                        )
-                    ]
-                )
-            ]
-        ),
+                            # Fifth row - Rolling averages
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container large",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Rolling 8h / 24h Average AQI", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='rolling-average-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Trailing 8-hour and 24-hour averages of the hourly AQI, as used for regulatory reporting. An average is shown only when at least 75% of its hours have readings; dotted lines mark the exceedance thresholds.")
+                                                ]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            ),
+
+                            # Sixth row - Exceedances and percentiles
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Daily Exceedance Hours", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='exceedance-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Hours per day with an hourly AQI above 100 (unhealthy for sensitive groups) and above 200 (very unhealthy), with the longest unbroken run above 100 in the selected range.")
+                                                ]
+                                            )
+                                        ]
+                                    ),
+
+                                    html.Div(
+                                        className="chart-container",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Monthly AQI Percentiles", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='percentile-chart',
+                                                className="animated-chart"
+                                            ),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Median, 90th and 98th percentile of the hourly AQI in each month. High percentiles show how bad the worst hours get, beyond what the monthly average reveals.")
+                                                ]
+                                            )
+                                        ]
+                                    ),
+                                ]
+                            ),
+
+                            # Seventh row - Interactive Explorer
+                            html.Div(
+                                className="chart-row",
+                                children=[
+                                    html.Div(
+                                        className="chart-container large",
+                                        children=[
+                                            html.Div(
+                                                className="chart-header",
+                                                children=[
+                                                    html.H3("Interactive AQI Explorer", className="chart-title"),
+                                                    html.Div(
+                                                        className="chart-actions",
+                                                        children=[
+                                                            html.Div(
+                                                                className="chart-action refresh",
+                                                                title="Refresh Data"
+                                                            ),
+                                                            html.Div(
+                                                                className="chart-action expand",
+                                                                title="Expand"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            html.Div(
+                                                className="filter-container",
+                                                children=[
+                                                    html.Div(
+                                                        className="filter-item",
+                                                        children=[
+                                                            html.Label("Select View Type:"),
+                                                            dcc.RadioItems(
+                                                                id='view-type',
+                                                                options=[
+                                                                    {'label': 'Daily', 'value': 'daily'},
+                                                                    {'label': 'Hourly', 'value': 'hourly'},
+                                                                    {'label': 'Health Risk', 'value': 'health'}
+                                                                ],
+                                                                value='daily',
+                                                                className="radio-items"
+                                                            )
+                                                        ]
+                                                    ),
+                                                    html.Div(
+                                                        className="filter-item",
+                                                        children=[
+                                                            html.Label("Select Chart Type:"),
+                                                            dcc.Dropdown(
+                                                                id='chart-type',
+                                                                options=[
+                                                                    {'label': 'Line Chart', 'value': 'line'},
+                                                                    {'label': 'Bar Chart', 'value': 'bar'},
+                                                                    {'label': 'Scatter Plot', 'value': 'scatter'}
+                                                                ],
+                                                                value='line',
+                                                                clearable=False,
+                                                                className="dropdown"
+                                                            )
+                                                        ]
+                                                    )
+                                                ]
+                                            ),
+                                            dcc.Graph(
+                                                id='interactive-chart',
+                                                className="animated-chart"
+                                            ),
+                                            dcc.Store(id='interactive-base'),
+                                            html.Div(
+                                                className="chart-description",
+                                                children=[
+                                                    html.P("Explore AQI data with different views and chart types. Customize your analysis to focus on specific aspects of air quality.")
+                                                ]
+                                            )
+                                        ]
+                                    )
+                                ]
+                            )
+                        ]
+                    )
+                ]
+            ),
         
-        # Footer
-        html.Div(
-            className="footer",
-            children=[
-                html.Div(
-                    className="footer-content",
-                    children=[
-                        html.Div(
-                            className="footer-section",
-                            children=[
-                                html.H4("About This Dashboard"),
-                                html.P("This AQI monitoring dashboard provides comprehensive air quality analysis for Sohna based on 2023 data. It helps users understand pollution patterns, health risks, and make informed decisions based on air quality data.")
-                            ]
-                        ),
-                        html.Div(
-                            className="footer-section",
-                            children=[
-                                html.H4("Dashboard Features"),
-                                html.Ul([
-                                    html.Li("Historical AQI monitoring"),
-                                    html.Li("Health risk assessment"),
-                                    html.Li("Temporal pattern analysis"),
-                                    html.Li("Interactive data exploration")
-                                ])
-                            ]
-                        ),
-                        html.Div(
-                            className="footer-section",
-                            children=[
-                                html.H4("Created For"),
-                                html.P("Hackathon 2025"),
-                                html.P("Data Source: Sohna AQI Measurements 2023"),
-                                html.P("Built with Dash and Plotly")
-                            ]
-                        )
-                    ]
-                ),
-                html.Div(
-                    className="footer-bottom",
-                    children=[
-                        html.P("© 2025 AERO·PULSE. All rights reserved.")
-                    ]
-                )
-            ]
-        ),
+            # Footer
+            html.Div(
+                className="footer",
+                children=[
+                    html.Div(
+                        className="footer-content",
+                        children=[
+                            html.Div(
+                                className="footer-section",
+                                children=[
+                                    html.H4("About This Dashboard"),
+                                    html.P("This AQI monitoring dashboard provides comprehensive air quality analysis for Sohna based on 2023 data. It helps users understand pollution patterns, health risks, and make informed decisions based on air quality data.")
+                                ]
+                            ),
+                            html.Div(
+                                className="footer-section",
+                                children=[
+                                    html.H4("Dashboard Features"),
+                                    html.Ul([
+                                        html.Li("Historical AQI monitoring"),
+                                        html.Li("Health risk assessment"),
+                                        html.Li("Temporal pattern analysis"),
+                                        html.Li("Interactive data exploration")
+                                    ])
+                                ]
+                            ),
+                            html.Div(
+                                className="footer-section",
+                                children=[
+                                    html.H4("Created For"),
+                                    html.P("Hackathon 2025"),
+                                    html.P("Data Source: Sohna AQI Measurements 2023"),
+                                    html.P("Built with Dash and Plotly")
+                                ]
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className="footer-bottom",
+                        children=[
+                            html.P("© 2025 AERO·PULSE. All rights reserved.")
+                        ]
+                    )
+                ]
+            ),
         
-        # JavaScript for updating the clock
-        html.Script("""
-            function updateClock() {
-                const now = new Date();
-                const timeString = now.toLocaleTimeString();
-                const dateString = now.toLocaleDateString();
-                document.getElementById('live-clock').textContent = dateString + ' ' + timeString;
-            }
+            # Data version the chart callbacks are built for, polled for live readings
+            dcc.Store(id='data-version', data=cube.version),
+            dcc.Store(id='trend-width'),
+            dcc.Interval(id='data-interval', interval=10 * 1000),
+
+            # JavaScript for updating the clock
+            html.Script("""
+                function updateClock() {
+                    const now = new Date();
+                    const timeString = now.toLocaleTimeString();
+                    const dateString = now.toLocaleDateString();
+                    document.getElementById('live-clock').textContent = dateString + ' ' + timeString;
+                }
             
-            // Update the clock every second
-            setInterval(updateClock, 1000);
+                // Update the clock every second
+                setInterval(updateClock, 1000);
             
-            // Initial update
-            updateClock();
-        """)
-    ]
+                // Initial update
+                updateClock();
+            """)
+        ]
+    )
+
+
+app.layout = serve_layout
+
+# Figures that only depend on the cube, keyed by graph id
+CHART_BUILDERS = {
+    'health-risk-gauge': build_health_gauge,
+    'health-risk-chart': build_health_risk_figure,
+    'hourly-pattern-chart': build_hourly_figure,
+    'monthly-pattern-chart': build_monthly_figure,
+    'day-of-week-chart': build_day_of_week_figure,
+    'heatmap-chart': build_heatmap_figure
+}
+
+
+def build_for_range(builder, start_date, end_date):
+    """Run a figure builder on the part of the cube inside the selected dates"""
+    selected = cube.window(start_date, end_date)
+    if not selected.count:
+        return build_placeholder("No readings in the selected date range")
+    return builder(selected)
+
+
+def register_chart_callback(chart_id, builder):
+    # Each chart has its own callback, so the browser requests them in parallel
+    @callback(
+        Output(chart_id, 'figure'),
+        [Input('data-version', 'data'),
+         Input('date-range', 'start_date'),
+         Input('date-range', 'end_date')]
+    )
+    @timed(f'callback.{chart_id}')
+    def update_chart(version, start_date, end_date):
+        return figure_cache.get_or_build(
+            (chart_id, start_date, end_date, cube.version),
+            lambda: build_for_range(builder, start_date, end_date),
+            data_version=cube.version
+        )
+    return update_chart
+
+
+for chart_id, builder in CHART_BUILDERS.items():
+    register_chart_callback(chart_id, builder)
+
+# Figures built from the hourly analytics grid, keyed by graph id
+ANALYTICS_BUILDERS = {
+    'rolling-average-chart': build_rolling_figure,
+    'exceedance-chart': build_exceedance_figure,
+    'percentile-chart': build_percentile_figure
+}
+
+
+def register_analytics_callback(chart_id, builder):
+    @callback(
+        Output(chart_id, 'figure'),
+        [Input('data-version', 'data'),
+         Input('date-range', 'start_date'),
+         Input('date-range', 'end_date')]
+    )
+    @timed(f'callback.{chart_id}')
+    def update_chart(version, start_date, end_date):
+        def build():
+            if not cube.window(start_date, end_date).count:
+                return build_placeholder("No readings in the selected date range")
+            return builder(analytics, *_range_bounds(start_date, end_date))
+
+        # The analytics grid is updated with the cube, so the cube version covers both
+        return figure_cache.get_or_build((chart_id, start_date, end_date, cube.version), build,
+                                         data_version=cube.version)
+    return update_chart
+
+
+for chart_id, builder in ANALYTICS_BUILDERS.items():
+    register_analytics_callback(chart_id, builder)
+
+
+def _range_bounds(start_date, end_date):
+    """Picked dates as inclusive timestamps; the end date covers its whole day"""
+    start = pd.Timestamp(start_date) if start_date else None
+    end = pd.Timestamp(end_date) if end_date else None
+    if end is not None and len(str(end_date)) <= 10:
+        end += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return start, end
+
+
+# The trend chart shows the hourly readings downsampled to its pixel width;
+# zooming re-queries the visible range so detail appears as the user zooms in
+app.clientside_callback(
+    """
+    function(version) {
+        const graph = document.getElementById('aqi-trend-chart');
+        return graph ? Math.round(graph.getBoundingClientRect().width) : null;
+    }
+    """,
+    Output('trend-width', 'data'),
+    Input('data-version', 'data')
 )
 
-# Callback for interactive chart
+
 @callback(
-    Output('interactive-chart', 'figure'),
+    Output('aqi-trend-chart', 'figure'),
+    [Input('trend-width', 'data'),
+     Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('aqi-trend-chart', 'relayoutData')]
+)
+@timed('callback.update_trend_chart')
+def update_trend_chart(width, start_date, end_date, relayout_data):
+    zoom_start, zoom_end = relayout_range(relayout_data)
+    if ctx.triggered_id == 'aqi-trend-chart' and zoom_start is None and not (relayout_data or {}).get('xaxis.autorange'):
+        # Layout events other than zoom/pan/reset (e.g. autosize) need no new data
+        raise PreventUpdate
+
+    start, end = _range_bounds(start_date, end_date)
+    if zoom_start is not None and ctx.triggered_id != 'date-range':
+        # Zoomed range, kept inside the picked dates
+        start = max(filter(None, [start, pd.Timestamp(zoom_start)]))
+        end = min(filter(None, [end, pd.Timestamp(zoom_end)]))
+    n_points = int(width) if width else DEFAULT_POINTS
+
+    def build():
+        timestamps, values = series.window(start, end)
+        if not len(timestamps):
+            return build_placeholder("No readings in the selected date range")
+        return build_trend_figure(timestamps, values, n_points)
+
+    return figure_cache.get_or_build(('aqi-trend-chart', str(start), str(end), n_points, cube.version), build,
+                                     data_version=cube.version)
+
+
+# Charts only re-render when ingested readings changed the cube
+@callback(
+    Output('data-version', 'data'),
+    [Input('data-interval', 'n_intervals')],
+    [State('data-version', 'data')]
+)
+@timed('callback.update_data_version')
+def update_data_version(n_intervals, shown_version):
+    if cube.version == shown_version:
+        raise PreventUpdate
+    return cube.version
+
+
+# Callback for the map, which follows the current hour
+@callback(
+    Output('geospatial-chart', 'figure'),
+    [Input('data-version', 'data')]
+)
+@timed('callback.update_geospatial_chart')
+def update_geospatial_chart(version):
+    current_hour = datetime.now().hour
+    return figure_cache.get_or_build(
+        ('geospatial-chart', current_hour, cube.version),
+        lambda: create_geospatial_view(get_current_aqi()),
+        data_version=cube.version
+    )
+
+
+# Callback for interactive chart data: only the view type and range need the server
+@callback(
+    Output('interactive-base', 'data'),
     [Input('view-type', 'value'),
-     Input('chart-type', 'value')]
+     Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('data-version', 'data')]
 )
-def update_interactive_chart(view_type, chart_type):
-    if view_type == 'daily':
-        data_df = daily_avg
-        x_col = 'Date'
-        title = 'Daily AQI Values'
-        color = futuristic_colors['primary']
-    elif view_type == 'hourly':
-        data_df = hourly_avg
-        x_col = 'Hour_Num'
-        title = 'Hourly AQI Pattern'
-        color = futuristic_colors['accent2']
-    else:  # health risk
-        # Create a dataframe with average AQI for each health risk category
-        data_df = df.groupby('Health Risk')['AQI'].mean().reset_index()
-        data_df = data_df.sort_values('AQI')
-        x_col = 'Health Risk'
-        title = 'Average AQI by Health Risk Category'
-        color = None  # Will use color mapping
-
-    # Create the appropriate chart type
-    if chart_type == 'line':
-        if view_type == 'hourly':
-            fig = px.line(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                markers=True,
-                labels={'AQI': 'Air Quality Index'},
-                title=title,
-                template='plotly_dark'
-            )
-            fig.update_layout(
-                xaxis=dict(
-                    tickmode='array',
-                    tickvals=list(range(0, 24)),
-                    ticktext=[f"{i}:00" for i in range(0, 24)]
-                )
-            )
-        elif view_type == 'health':
-            fig = px.bar(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                color=x_col,
-                color_discrete_map=color_map,
-                labels={'AQI': 'Average AQI'},
-                title=title,
-                template='plotly_dark'
-            )
-        else:
-            fig = px.line(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                labels={'AQI': 'Air Quality Index', 'Date': 'Date'},
-                title=title,
-                template='plotly_dark'
-            )
-    elif chart_type == 'bar':
-        if view_type == 'health':
-            fig = px.bar(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                color=x_col,
-                color_discrete_map=color_map,
-                labels={'AQI': 'Average AQI'},
-                title=title,
-                template='plotly_dark'
-            )
-        else:
-            fig = px.bar(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                labels={'AQI': 'Air Quality Index'},
-                title=title,
-                template='plotly_dark'
-            )
-            if view_type == 'hourly':
-                fig.update_layout(
-                    xaxis=dict(
-                        tickmode='array',
-                        tickvals=list(range(0, 24)),
-                        ticktext=[f"{i}:00" for i in range(0, 24)]
-                    )
-                )
-    else:  # scatter
-        if view_type == 'health':
-            fig = px.scatter(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                color=x_col,
-                color_discrete_map=color_map,
-                size='AQI',
-                labels={'AQI': 'Average AQI'},
-                title=title,
-                template='plotly_dark'
-            )
-        else:
-            fig = px.scatter(
-                data_df, 
-                x=x_col, 
-                y='AQI',
-                labels={'AQI': 'Air Quality Index'},
-                title=title,
-                template='plotly_dark'
-            )
-            if view_type == 'hourly':
-                fig.update_layout(
-                    xaxis=dict(
-                        tickmode='array',
-                        tickvals=list(range(0, 24)),
-                        ticktext=[f"{i}:00" for i in range(0, 24)]
-                    )
-                )
-
-    # Common layout updates for dark theme
-    fig.update_layout(
-        margin=dict(l=40, r=40, t=40, b=40),
-        hovermode='closest',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(15,16,32,0.3)',
-        font=dict(
-            family="Rajdhani, sans-serif",
-            color='#ffffff'
-        ),
-        xaxis=dict(
-            showgrid=False,
-            zeroline=False,
-            showline=True,
-            linecolor='rgba(255, 255, 255, 0.2)'
+@timed('callback.update_interactive_chart')
+def update_interactive_chart(view_type, start_date, end_date, version):
+    # Only 3 figures exist per data version and range, so serve them from the cache
+    figure = figure_cache.get_or_build(
+        ('interactive', view_type, start_date, end_date, cube.version),
+        lambda: build_for_range(
+            lambda selected: build_interactive_figure(selected, view_type), start_date, end_date
         ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(255, 255, 255, 0.1)',
-            zeroline=False,
-            showline=True,
-            linecolor='rgba(255, 255, 255, 0.2)'
-        ),
-        title=dict(
-            font=dict(
-                family="Orbitron, sans-serif",
-                color='#ffffff'
-            )
-        )
+        data_version=cube.version
     )
+    return {'figure': figure, 'view_type': view_type}
 
-    # Update trace colors if not health risk view
-    if view_type != 'health' and color is not None:
-        fig.update_traces(marker_color=color)
-        if chart_type == 'line':
-            fig.update_traces(line=dict(width=3, color=color))
 
-    return fig
+# Switching between line, bar and scatter restyles that figure in the browser
+# (assets/clientside.js), without a request to the server
+app.clientside_callback(
+    ClientsideFunction(namespace='charts', function_name='setChartType'),
+    Output('interactive-chart', 'figure'),
+    [Input('interactive-base', 'data'),
+     Input('chart-type', 'value')]
+)
+
+
+# Callback for the forecast chart, fed by the background scheduler
+@callback(
+    [Output('forecast-chart', 'figure'),
+     Output('forecast-version', 'data')],
+    [Input('forecast-interval', 'n_intervals')],
+    [State('forecast-version', 'data')]
+)
+@timed('callback.update_forecast_chart')
+def update_forecast_chart(n_intervals, shown_version):
+    latest = forecast_store.latest()
+    if latest is None:
+        # Version 0 marks the placeholder so it is only sent once
+        if shown_version == 0:
+            raise PreventUpdate
+        return build_placeholder("Forecast is being prepared..."), 0
+    if latest[0] == shown_version:
+        raise PreventUpdate
+    version, _, forecast_data = latest
+    figure = figure_cache.get_or_build(('forecast', version), lambda: build_forecast_figure(forecast_data))
+    return figure, version
 
 # Run the app
 if __name__ == '__main__':
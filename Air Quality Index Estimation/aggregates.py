@@ -0,0 +1,326 @@
+import hashlib
+import threading
+import pandas as pd
+import numpy as np
+from aqi_categories import LABELS, categorize
+from instrumentation import timed
+
+MONTH_ORDER = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS = 24
+
+
+def _to_day(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[D]')
+
+
+class AQICube:
+    """
+    Date x hour aggregate of AQI readings
+
+    Holds sum, count, min and max for every (date, hour) cell. All the
+    dashboard views are reductions over these cells, so their cost depends
+    on the number of days covered rather than on the number of readings.
+    """
+
+    def __init__(self, dates, sums, counts, mins, maxs, version=None):
+        # Rows are stored with spare capacity so new days can be appended in amortized O(1)
+        self._dates = dates
+        self._sums = sums
+        self._counts = counts
+        self._mins = mins
+        self._maxs = maxs
+        self._n = len(dates)
+        self._row_index = None
+        self._lock = threading.RLock()
+        self._base_version = version or self._compute_version()
+        self._updates = 0
+
+    @property
+    def dates(self):
+        return self._dates[:self._n]
+
+    @property
+    def sums(self):
+        return self._sums[:self._n]
+
+    @property
+    def counts(self):
+        return self._counts[:self._n]
+
+    @property
+    def mins(self):
+        return self._mins[:self._n]
+
+    @property
+    def maxs(self):
+        return self._maxs[:self._n]
+
+    @property
+    def version(self):
+        """Changes whenever the data changes; used to key cached figures"""
+        if self._updates:
+            return f'{self._base_version}+{self._updates}'
+        return self._base_version
+
+    @classmethod
+    @timed('aggregate.from_frame')
+    def from_frame(cls, df, time_col='Datetime', value_col='AQI'):
+        """
+        Build the cube from raw readings in a single vectorized pass
+
+        Parameters:
+        df (pandas.DataFrame): Readings with a datetime column and an AQI column
+        time_col (str): Name of the datetime column
+        value_col (str): Name of the AQI column
+
+        Returns:
+        AQICube: Aggregates for every (date, hour) cell present in the data
+        """
+        timestamps = df[time_col].to_numpy(dtype='datetime64[ns]')
+        values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=float)
+        return cls.from_arrays(timestamps, values)
+
+    @classmethod
+    def from_arrays(cls, timestamps, values):
+        valid = ~np.isnan(values)
+        timestamps = timestamps[valid]
+        values = values[valid]
+
+        days = timestamps.astype('datetime64[D]')
+        hours = ((timestamps - days) // np.timedelta64(1, 'h')).astype(np.intp)
+        dates, date_idx = np.unique(days, return_inverse=True)
+
+        n_cells = len(dates) * HOURS
+        cell = date_idx * HOURS + hours
+        sums = np.bincount(cell, weights=values, minlength=n_cells)
+        counts = np.bincount(cell, minlength=n_cells)
+        mins = np.full(n_cells, np.inf)
+        maxs = np.full(n_cells, -np.inf)
+        np.minimum.at(mins, cell, values)
+        np.maximum.at(maxs, cell, values)
+
+        shape = (len(dates), HOURS)
+        return cls(dates, sums.reshape(shape), counts.reshape(shape), mins.reshape(shape), maxs.reshape(shape))
+
+    def _compute_version(self):
+        digest = hashlib.sha1()
+        for array in (self.dates, self.sums, self.counts):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:16]
+
+    def _snapshot(self):
+        """Consistent (dates, sums, counts) even while readings are being added"""
+        with self._lock:
+            return self.dates.copy(), self.sums.copy(), self.counts.copy()
+
+    def _row_for(self, day):
+        """Row of a date, appending (or, for an earlier unseen date, inserting) it if needed"""
+        if self._row_index is None:
+            self._row_index = {d: i for i, d in enumerate(self.dates.astype(np.int64).tolist())}
+        row = self._row_index.get(int(day.astype(np.int64)))
+        if row is not None:
+            return row
+
+        if self._n and day < self._dates[self._n - 1]:
+            # Out-of-order day: rebuild with the row inserted, O(days) but rare
+            position = int(np.searchsorted(self.dates, day))
+            self._dates = np.insert(self.dates, position, day)
+            self._sums = np.insert(self.sums, position, 0.0, axis=0)
+            self._counts = np.insert(self.counts, position, 0, axis=0)
+            self._mins = np.insert(self.mins, position, np.inf, axis=0)
+            self._maxs = np.insert(self.maxs, position, -np.inf, axis=0)
+            self._n += 1
+            self._row_index = None
+            return self._row_for(day)
+
+        if self._n == len(self._dates):
+            capacity = max(2 * self._n, 1)
+            self._dates = self._grow(self._dates, capacity, np.datetime64('NaT', 'D'))
+            self._sums = self._grow(self._sums, capacity, 0.0)
+            self._counts = self._grow(self._counts, capacity, 0)
+            self._mins = self._grow(self._mins, capacity, np.inf)
+            self._maxs = self._grow(self._maxs, capacity, -np.inf)
+        self._dates[self._n] = day
+        self._row_index[int(day.astype(np.int64))] = self._n
+        self._n += 1
+        return self._n - 1
+
+    @staticmethod
+    def _grow(array, capacity, fill):
+        grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def add_reading(self, timestamp, value):
+        """
+        Add one reading to its (date, hour) cell in amortized O(1)
+
+        Parameters:
+        timestamp (numpy.datetime64 or str): Time of the reading
+        value (float): AQI value; NaN is ignored
+        """
+        if np.isnan(value):
+            return
+        timestamp = np.datetime64(timestamp, 'ns')
+        day = timestamp.astype('datetime64[D]')
+        hour = int((timestamp - day) // np.timedelta64(1, 'h'))
+        with self._lock:
+            row = self._row_for(day)
+            self._sums[row, hour] += value
+            self._counts[row, hour] += 1
+            self._mins[row, hour] = min(self._mins[row, hour], value)
+            self._maxs[row, hour] = max(self._maxs[row, hour], value)
+            self._updates += 1
+
+    @timed('aggregate.add_readings')
+    def add_readings(self, timestamps, values):
+        """Add several readings, see add_reading"""
+        with self._lock:
+            for timestamp, value in zip(timestamps, values):
+                self.add_reading(timestamp, float(value))
+
+    @timed('aggregate.window')
+    def window(self, start=None, end=None):
+        """
+        Cube restricted to the dates from start to end (both inclusive)
+
+        The dates are located with binary searches and the new cube shares
+        this cube's arrays, so the cost is O(log days) whatever the range.
+        Treat the result as read-only.
+
+        Parameters:
+        start: First date to include (str, datetime or datetime64), None for the beginning
+        end: Last date to include, None for the end
+
+        Returns:
+        AQICube: Whose version identifies both this cube's data and the range
+        """
+        if start is None and end is None:
+            return self
+        with self._lock:
+            dates = self.dates
+            i = 0 if start is None else int(np.searchsorted(dates, _to_day(start), side='left'))
+            j = len(dates) if end is None else int(np.searchsorted(dates, _to_day(end), side='right'))
+            return AQICube(
+                dates[i:j], self.sums[i:j], self.counts[i:j], self.mins[i:j], self.maxs[i:j],
+                version=f'{self.version}[{start}:{end}]'
+            )
+
+    @staticmethod
+    def _mean(sums, counts):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+
+    # Overall statistics
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if self._n else None
+
+    @property
+    def mean(self):
+        _, sums, counts = self._snapshot()
+        return float(sums.sum() / counts.sum())
+
+    @property
+    def max(self):
+        return float(self.maxs.max())
+
+    @property
+    def min(self):
+        return float(self.mins.min())
+
+    def cell_means(self):
+        """Mean AQI of every (date, hour) cell, NaN where there are no readings"""
+        _, sums, counts = self._snapshot()
+        return self._mean(sums, counts)
+
+    # Views used by the dashboard
+
+    @timed('aggregate.hourly_avg')
+    def hourly_avg(self):
+        _, sums, counts = self._snapshot()
+        means = self._mean(sums.sum(axis=0), counts.sum(axis=0))
+        hourly = pd.DataFrame({'Hour_Num': np.arange(HOURS), 'AQI': means})
+        return hourly[counts.sum(axis=0) > 0].reset_index(drop=True)
+
+    @timed('aggregate.daily_avg')
+    def daily_avg(self):
+        dates, sums, counts = self._snapshot()
+        day_counts = counts.sum(axis=1)
+        means = self._mean(sums.sum(axis=1), day_counts)
+        daily = pd.DataFrame({'Date': dates.astype('datetime64[ns]'), 'AQI': means})
+        return daily[day_counts > 0].reset_index(drop=True)
+
+    @staticmethod
+    def _group_days(groups, sums, counts, n_groups):
+        """Mean AQI per group, where groups assigns each date to a group index"""
+        group_sums = np.bincount(groups, weights=sums.sum(axis=1), minlength=n_groups)
+        group_counts = np.bincount(groups, weights=counts.sum(axis=1), minlength=n_groups)
+        return AQICube._mean(group_sums, group_counts), group_counts
+
+    @staticmethod
+    def month_index(dates):
+        """Month of every date as 0 (Jan) .. 11 (Dec)"""
+        months = dates.astype('datetime64[M]').astype(np.int64)
+        return months % 12
+
+    @staticmethod
+    def weekday_index(dates):
+        """Day of week of every date as 0 (Monday) .. 6 (Sunday)"""
+        # 1970-01-01 was a Thursday
+        return (dates.astype(np.int64) + 3) % 7
+
+    @timed('aggregate.monthly_avg')
+    def monthly_avg(self):
+        dates, sums, counts = self._snapshot()
+        means, month_counts = self._group_days(self.month_index(dates), sums, counts, 12)
+        monthly = pd.DataFrame({'Month_Name': MONTH_ORDER, 'AQI': means, 'Month_Num': np.arange(12)})
+        return monthly[month_counts > 0].reset_index(drop=True)
+
+    @timed('aggregate.day_of_week_avg')
+    def day_of_week_avg(self):
+        dates, sums, counts = self._snapshot()
+        means, day_counts = self._group_days(self.weekday_index(dates), sums, counts, 7)
+        weekly = pd.DataFrame({'Day_of_Week': DAY_ORDER, 'AQI': means, 'Day_Num': np.arange(7)})
+        return weekly[day_counts > 0].reset_index(drop=True)
+
+    @timed('aggregate.weekday_hour_matrix')
+    def weekday_hour_matrix(self):
+        """7 x 24 matrix of mean AQI by day of week (rows) and hour (columns)"""
+        dates, sums, counts = self._snapshot()
+        groups = np.repeat(self.weekday_index(dates), HOURS) * HOURS + np.tile(np.arange(HOURS), len(dates))
+        cell_sums = np.bincount(groups, weights=sums.ravel(), minlength=7 * HOURS)
+        cell_counts = np.bincount(groups, weights=counts.ravel(), minlength=7 * HOURS)
+        return self._mean(cell_sums, cell_counts).reshape(7, HOURS)
+
+    def _risk_totals(self):
+        # Each cell is assigned the category of its mean, weighted by its reading count
+        _, sums, counts = self._snapshot()
+        sums, counts = sums.ravel(), counts.ravel()
+        occupied = counts > 0
+        codes = categorize(sums[occupied] / counts[occupied])
+        risk_counts = np.bincount(codes, weights=counts[occupied], minlength=len(LABELS))
+        risk_sums = np.bincount(codes, weights=sums[occupied], minlength=len(LABELS))
+        return risk_sums, risk_counts
+
+    @timed('aggregate.health_risk_counts')
+    def health_risk_counts(self):
+        """Readings per health risk category, most frequent first"""
+        _, counts = self._risk_totals()
+        risk = pd.DataFrame({'Health Risk': LABELS, 'Count': counts.astype(np.int64)})
+        risk = risk[risk['Count'] > 0]
+        return risk.sort_values('Count', ascending=False, kind='stable').reset_index(drop=True)
+
+    @timed('aggregate.health_risk_avg')
+    def health_risk_avg(self):
+        """Mean AQI per health risk category, lowest first"""
+        sums, counts = self._risk_totals()
+        risk = pd.DataFrame({'Health Risk': LABELS, 'AQI': self._mean(sums, counts)})
+        risk = risk[counts > 0]
+        return risk.sort_values('AQI').reset_index(drop=True)
@@ -0,0 +1,530 @@
+"""
+Rolling-window and exceedance analytics over the hourly AQI series
+
+Readings of every station are binned onto one hourly grid, stations x hours
+starting at midnight of the first day. Hours without a reading are NaN, and
+several readings in one hour are averaged. The grid always covers whole days,
+so a day-shaped view (stations x days x 24) is a reshape rather than a copy.
+
+Running totals of the hourly values and of the hours with data are kept
+along time. A trailing average over any window is then the difference of
+two totals, whatever the window length. Every statistic below is a handful
+of vectorized passes over the grid, linear in its size, with no Python loop
+per window, day or station:
+
+- rolling_mean:        trailing averages (8h and 24h for reporting). A window
+                       counts only when at least 75% of its hours have data.
+- exceedance_hours:    hours per day above each threshold
+- longest_exceedances: longest run of consecutive hours above a threshold
+- period_percentiles:  percentiles per day, week, month or year
+
+All of them take window= to work on the rolling averages instead of the
+hourly values (e.g. hours per day with the 8h average above 100).
+
+New readings are added in place. The latest hours only rewrite the running
+totals of the current day, so live ingestion costs O(stations) per batch.
+A late reading rewrites the totals from its hour on.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+
+HOURS_PER_DAY = 24
+
+# Name of the only station when the readings do not have a Station column
+DEFAULT_STATION = 'Sohna'
+
+# Averaging windows shown on the dashboard, in hours
+ROLLING_WINDOWS = (8, 24)
+
+# Share of a window's hours that need a reading for its average to be valid
+MIN_COVERAGE = 0.75
+
+# Category boundaries above which hours count as exceedances (see aqi_categories):
+# above 100 is unhealthy for sensitive groups, above 200 very unhealthy
+DEFAULT_THRESHOLDS = (100, 200)
+
+DEFAULT_PERCENTILES = (50, 90, 98)
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+# Averages are rounded so the rounding error of the running totals (well
+# below 1e-6 AQI for centuries of hourly data) cannot decide a threshold tie
+ROUND_DECIMALS = 6
+
+
+def _to_hour(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[h]')
+
+
+def _grow(array, capacity, fill):
+    grown = np.full(array.shape[:-1] + (capacity,), fill, dtype=array.dtype)
+    grown[..., :array.shape[-1]] = array
+    return grown
+
+
+def period_starts(days, period):
+    """
+    First day of the period each date belongs to
+
+    Parameters:
+    days (numpy.ndarray): datetime64[D] dates
+    period (str): 'day', 'week' (starting on Monday), 'month' or 'year'
+
+    Returns:
+    numpy.ndarray: datetime64[D] period starts
+    """
+    if period == 'day':
+        return days
+    if period == 'week':
+        # 1970-01-01 was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'year':
+        return days.astype('datetime64[Y]').astype('datetime64[D]')
+    raise ValueError(f"Unknown period: {period}, expected one of {', '.join(PERIODS)}")
+
+
+def longest_runs(mask):
+    """
+    Longest run of True in every row of a 2-d boolean array
+
+    Runs are found from the edges of the flattened array, padded with a
+    False column on each side so runs never continue into the next row.
+
+    Returns:
+    tuple: (lengths, first columns) per row; the first column is -1 for a
+        row without any True, and the earliest run wins ties
+    """
+    n_rows, n_cols = mask.shape
+    padded = np.zeros((n_rows, n_cols + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded.ravel())
+    starts = np.flatnonzero(edges == 1) + 1
+    lengths = np.flatnonzero(edges == -1) + 1 - starts
+    rows, columns = np.divmod(starts, n_cols + 2)
+
+    best = np.zeros(n_rows, dtype=np.int64)
+    first = np.full(n_rows, -1, dtype=np.int64)
+    if len(starts):
+        # Runs come out row by row, so each row's runs form one segment
+        segments = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        best[rows[segments]] = np.maximum.reduceat(lengths, segments)
+        is_best = lengths == best[rows]
+        best_rows, best_columns = rows[is_best], columns[is_best]
+        head = np.r_[True, best_rows[1:] != best_rows[:-1]]
+        first[best_rows[head]] = best_columns[head] - 1
+    return best, first
+
+
+def sorted_percentiles(values, counts, percentiles):
+    """
+    Percentiles along the last axis of an array sorted with NaNs last
+
+    Same linear interpolation as numpy.percentile, on the first counts
+    values of every row.
+
+    Returns:
+    numpy.ndarray: One more leading axis than counts, one entry per percentile
+    """
+    results = []
+    last = np.maximum(counts - 1, 0)
+    for q in percentiles:
+        position = last * (q / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, last)
+        low = np.take_along_axis(values, below[..., None], axis=-1)[..., 0]
+        high = np.take_along_axis(values, above[..., None], axis=-1)[..., 0]
+        result = low + (high - low) * (position - below)
+        result[counts == 0] = np.nan
+        results.append(result)
+    return np.stack(results)
+
+
+class AQIAnalytics:
+    """
+    Hourly grid of AQI readings per station, with running totals along time
+
+    Parameters:
+    origin (numpy.datetime64): Hour of the first column, a midnight; None when empty
+    hourly (numpy.ndarray): stations x hours mean AQI, NaN where there is no reading;
+        the number of hours is a multiple of 24
+    counts (numpy.ndarray): stations x hours number of readings averaged
+    stations (list): Station names, one per row
+    """
+
+    def __init__(self, origin, hourly, counts, stations):
+        self.origin = origin
+        self.stations = list(stations)
+        self._station_index = {station: i for i, station in enumerate(self.stations)}
+        self._n = hourly.shape[1]
+        self._hourly = np.asarray(hourly, dtype=float)
+        self._counts = np.asarray(counts, dtype=np.int32)
+        # Column t holds the total of hours [0, t): a window [a, b) is totals[b] - totals[a]
+        self._totals = np.zeros((len(self.stations), self._n + 1))
+        self._valid = np.zeros((len(self.stations), self._n + 1), dtype=np.int32)
+        self._lock = threading.RLock()
+        self.updates = 0
+        self._refresh_totals(0)
+
+    @classmethod
+    @timed('analytics.from_frame')
+    def from_frame(cls, df, time_col='Datetime', value_col='AQI', station_col='Station'):
+        """
+        Build the grid from raw readings in a single vectorized pass
+
+        Parameters:
+        df (pandas.DataFrame): Readings with a datetime column, an AQI column and,
+            for several stations, a station column
+        time_col (str): Name of the datetime column
+        value_col (str): Name of the AQI column
+        station_col (str): Name of the station column, used when present
+
+        Returns:
+        AQIAnalytics
+        """
+        timestamps = df[time_col].to_numpy(dtype='datetime64[ns]')
+        values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=float)
+        if station_col in df.columns:
+            codes, stations = pd.factorize(df[station_col], sort=True)
+            return cls.from_arrays(timestamps, values, codes, list(stations))
+        return cls.from_arrays(timestamps, values)
+
+    @classmethod
+    def from_arrays(cls, timestamps, values, codes=None, stations=None):
+        """
+        Parameters:
+        timestamps (numpy.ndarray): datetime64 times of the readings
+        values (numpy.ndarray): AQI values; NaN readings are dropped
+        codes (numpy.ndarray): Station row of every reading, None for one station
+        stations (list): Station names indexed by code
+        """
+        if codes is None:
+            codes = np.zeros(len(values), dtype=np.intp)
+            stations = [DEFAULT_STATION]
+        valid = ~np.isnan(values) & (codes >= 0)
+        hours = np.asarray(timestamps, dtype='datetime64[ns]')[valid].astype('datetime64[h]')
+        codes, values = codes[valid], values[valid]
+        if not len(hours):
+            empty = np.empty((len(stations), 0))
+            return cls(None, empty, empty.astype(np.int32), stations)
+
+        origin = hours.min().astype('datetime64[D]').astype('datetime64[h]')
+        index = (hours - origin).astype(np.int64)
+        n = -(-(int(index.max()) + 1) // HOURS_PER_DAY) * HOURS_PER_DAY
+        cells = codes.astype(np.int64) * n + index
+        shape = (len(stations), n)
+        counts = np.bincount(cells, minlength=shape[0] * n).reshape(shape)
+        sums = np.bincount(cells, weights=values, minlength=shape[0] * n).reshape(shape)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hourly = sums / counts
+        return cls(origin, hourly, counts, stations)
+
+    @property
+    def n_hours(self):
+        return self._n
+
+    @property
+    def end(self):
+        """First hour after the grid"""
+        return None if self.origin is None else self.origin + np.timedelta64(self._n, 'h')
+
+    # Updates
+
+    def _refresh_totals(self, start):
+        """Recompute the running totals of hours [start, n)"""
+        n = self._n
+        if start >= n:
+            return
+        values = self._hourly[:, start:n]
+        valid = ~np.isnan(values)
+        totals = self._totals[:, start + 1:n + 1]
+        np.cumsum(np.where(valid, values, 0.0), axis=1, out=totals)
+        totals += self._totals[:, start:start + 1]
+        counts = self._valid[:, start + 1:n + 1]
+        np.cumsum(valid, axis=1, dtype=np.int32, out=counts)
+        counts += self._valid[:, start:start + 1]
+
+    def _reserve(self, n_hours):
+        """Make room for n_hours columns, doubling the capacity as it runs out"""
+        capacity = self._hourly.shape[1]
+        if n_hours <= capacity:
+            return
+        capacity = max(n_hours, 2 * capacity, 7 * HOURS_PER_DAY)
+        self._hourly = _grow(self._hourly, capacity, np.nan)
+        self._counts = _grow(self._counts, capacity, 0)
+        self._totals = _grow(self._totals, capacity + 1, 0.0)
+        self._valid = _grow(self._valid, capacity + 1, 0)
+
+    def _extend_to(self, n_hours):
+        """Cover the first n_hours hours (rounded up to whole days)"""
+        n_hours = -(-n_hours // HOURS_PER_DAY) * HOURS_PER_DAY
+        if n_hours > self._n:
+            self._reserve(n_hours)
+            old = self._n
+            self._n = n_hours
+            # The new hours are empty: their totals stay at the last total
+            self._totals[:, old + 1:n_hours + 1] = self._totals[:, old:old + 1]
+            self._valid[:, old + 1:n_hours + 1] = self._valid[:, old:old + 1]
+
+    def _prepend_days(self, days):
+        """Move the origin back by whole days, O(grid) but only for readings older than the grid"""
+        hours = days * HOURS_PER_DAY
+        pad = ((0, 0), (hours, 0))
+        self._hourly = np.pad(self._hourly[:, :self._n], pad, constant_values=np.nan)
+        self._counts = np.pad(self._counts[:, :self._n], pad)
+        self._n += hours
+        self.origin = self.origin - np.timedelta64(hours, 'h')
+        self._totals = np.zeros((len(self.stations), self._n + 1))
+        self._valid = np.zeros((len(self.stations), self._n + 1), dtype=np.int32)
+        self._refresh_totals(0)
+
+    def _station_code(self, station):
+        code = self._station_index.get(station)
+        if code is None:
+            code = len(self.stations)
+            self.stations.append(station)
+            self._station_index[station] = code
+            self._hourly = np.vstack([self._hourly, np.full((1, self._hourly.shape[1]), np.nan)])
+            self._counts = np.vstack([self._counts, np.zeros((1, self._counts.shape[1]), dtype=np.int32)])
+            self._totals = np.vstack([self._totals, np.zeros((1, self._totals.shape[1]))])
+            self._valid = np.vstack([self._valid, np.zeros((1, self._valid.shape[1]), dtype=np.int32)])
+        return code
+
+    @timed('analytics.add_readings')
+    def add_readings(self, timestamps, values, stations=None):
+        """
+        Add readings to their hours, averaging with readings already there
+
+        Parameters:
+        timestamps (array-like): Times of the readings
+        values (array-like): AQI values; NaN is ignored
+        stations (array-like): Station of every reading, None when there is one station
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]').reshape(-1)
+        values = np.asarray(values, dtype=float).reshape(-1)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        hours = timestamps[valid].astype('datetime64[h]')
+        values = values[valid]
+
+        with self._lock:
+            if stations is None:
+                if len(self.stations) > 1:
+                    raise ValueError("Readings must name their station when there are several stations")
+                codes = np.zeros(len(values), dtype=np.int64)
+            else:
+                names, inverse = np.unique(np.asarray(stations, dtype=object).reshape(-1)[valid], return_inverse=True)
+                codes = np.array([self._station_code(name) for name in names], dtype=np.int64)[inverse]
+
+            first = hours.min()
+            if self.origin is None:
+                self.origin = first.astype('datetime64[D]').astype('datetime64[h]')
+            elif first < self.origin:
+                self._prepend_days(-(-int((self.origin - first).astype(np.int64)) // HOURS_PER_DAY))
+            index = (hours - self.origin).astype(np.int64)
+            old_n = self._n
+            self._extend_to(int(index.max()) + 1)
+
+            # Readings sharing an hour are summed first, then merged with that hour's mean
+            width = self._hourly.shape[1]
+            cells, inverse = np.unique(codes * width + index, return_inverse=True)
+            added_sums = np.bincount(inverse, weights=values)
+            added_counts = np.bincount(inverse)
+            rows, columns = np.divmod(cells, width)
+            counts = self._counts[rows, columns]
+            sums = np.where(counts > 0, self._hourly[rows, columns] * counts, 0.0)
+            self._counts[rows, columns] = counts + added_counts
+            self._hourly[rows, columns] = (sums + added_sums) / (counts + added_counts)
+
+            self._refresh_totals(min(int(columns.min()), old_n))
+            self.updates += len(values)
+
+    def add_reading(self, timestamp, value, station=None):
+        """Add one reading, see add_readings"""
+        self.add_readings([timestamp], [value], None if station is None else [station])
+
+    # Queries
+
+    def _bounds(self, start=None, end=None, whole_days=False):
+        """
+        Columns [i, j) of the hours from start to end (both inclusive)
+
+        A date without a time as end ('2023-03-31') includes that whole day.
+        With whole_days, the range is widened to whole days.
+        """
+        if self.origin is None:
+            return 0, 0
+        i = 0 if start is None else int((_to_hour(start) - self.origin).astype(np.int64))
+        if end is None:
+            j = self._n
+        else:
+            j = int((_to_hour(end) - self.origin).astype(np.int64)) + 1
+            if isinstance(end, str) and len(end) <= 10:
+                j += HOURS_PER_DAY - 1
+        i, j = min(max(i, 0), self._n), min(max(j, 0), self._n)
+        if whole_days:
+            i = i // HOURS_PER_DAY * HOURS_PER_DAY
+            j = -(-j // HOURS_PER_DAY) * HOURS_PER_DAY
+        return i, max(i, j)
+
+    def _hours(self, i, j):
+        if self.origin is None:
+            return np.empty(0, dtype='datetime64[h]')
+        return self.origin + np.arange(i, j).astype('timedelta64[h]')
+
+    def _days(self, i, j):
+        if self.origin is None:
+            return np.empty(0, dtype='datetime64[D]')
+        first_day = self.origin.astype('datetime64[D]')
+        return first_day + np.arange(i // HOURS_PER_DAY, j // HOURS_PER_DAY).astype('timedelta64[D]')
+
+    def _rolling(self, window, i, j, min_hours=None):
+        """Trailing window-hour means of hours [i, j); windows reach back before i"""
+        if min_hours is None:
+            min_hours = int(np.ceil(MIN_COVERAGE * window))
+        begin = np.maximum(np.arange(i + 1 - window, j + 1 - window), 0)
+        totals = self._totals[:, i + 1:j + 1] - self._totals[:, begin]
+        hours = self._valid[:, i + 1:j + 1] - self._valid[:, begin]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.round(totals / hours, ROUND_DECIMALS)
+        means[hours < max(min_hours, 1)] = np.nan
+        return means
+
+    def _series(self, window, i, j):
+        """Hourly values, or their rolling means when window is set, of hours [i, j)"""
+        if window is None:
+            return self._hourly[:, i:j].copy()
+        return self._rolling(window, i, j)
+
+    @timed('analytics.hourly')
+    def hourly(self, start=None, end=None):
+        """
+        Hourly mean AQI per station
+
+        Returns:
+        tuple: (datetime64[h] hours, stations x hours values with NaN where there is no reading)
+        """
+        with self._lock:
+            i, j = self._bounds(start, end)
+            return self._hours(i, j), self._hourly[:, i:j].copy()
+
+    @timed('analytics.rolling_mean')
+    def rolling_mean(self, window, start=None, end=None, min_hours=None):
+        """
+        Trailing average over the last `window` hours, at every hour
+
+        Parameters:
+        window (int): Window length in hours, e.g. 8 or 24
+        start, end: Hours to report (inclusive); windows at the start include earlier hours
+        min_hours (int): Hours with data a window needs, 75% of window by default
+
+        Returns:
+        tuple: (datetime64[h] hours, stations x hours averages, NaN where not enough data)
+        """
+        with self._lock:
+            i, j = self._bounds(start, end)
+            return self._hours(i, j), self._rolling(window, i, j, min_hours)
+
+    @timed('analytics.exceedance_hours')
+    def exceedance_hours(self, thresholds=DEFAULT_THRESHOLDS, window=None, start=None, end=None):
+        """
+        Hours above each threshold per station and day
+
+        Parameters:
+        thresholds (sequence): AQI levels; an hour counts when strictly above
+        window (int): Count hours whose `window`-hour average is above, None for hourly values
+        start, end: Dates to report (inclusive)
+
+        Returns:
+        pandas.DataFrame: Station, Date, Valid Hours and one 'Hours > t' column per threshold
+        """
+        with self._lock:
+            i, j = self._bounds(start, end, whole_days=True)
+            values = self._series(window, i, j)
+            days = self._days(i, j)
+        by_day = values.reshape(len(self.stations), len(days), HOURS_PER_DAY)
+        frame = pd.DataFrame({
+            'Station': np.repeat(np.asarray(self.stations, dtype=object), len(days)),
+            'Date': np.tile(days, len(self.stations)).astype('datetime64[ns]'),
+            'Valid Hours': (~np.isnan(by_day)).sum(axis=2).ravel()
+        })
+        for threshold in thresholds:
+            frame[f'Hours > {threshold:g}'] = (by_day > threshold).sum(axis=2).ravel()
+        return frame
+
+    @timed('analytics.longest_exceedances')
+    def longest_exceedances(self, threshold, window=None, start=None, end=None):
+        """
+        Longest run of consecutive hours above threshold, per station
+
+        An hour without data (or, with window, without enough data) ends a run.
+
+        Returns:
+        pandas.DataFrame: Station, Hours, Start and End (last hour of the run,
+            NaT where no hour is above)
+        """
+        with self._lock:
+            i, j = self._bounds(start, end)
+            values = self._series(window, i, j)
+            times = self._hours(i, j)
+        hours, first = longest_runs(values > threshold)
+        found = first >= 0
+        starts = np.full(len(first), np.datetime64('NaT'), dtype='datetime64[h]')
+        starts[found] = times[first[found]]
+        return pd.DataFrame({
+            'Station': self.stations,
+            'Hours': hours,
+            'Start': starts.astype('datetime64[ns]'),
+            'End': (starts + np.maximum(hours - 1, 0).astype('timedelta64[h]')).astype('datetime64[ns]')
+        })
+
+    @timed('analytics.period_percentiles')
+    def period_percentiles(self, period='month', percentiles=DEFAULT_PERCENTILES, window=None, start=None, end=None):
+        """
+        Percentiles of the hourly values (or rolling averages) per station and period
+
+        The hours of each period are laid out in a stations x periods x
+        (longest period) array padded with NaN and sorted along the last
+        axis; periods are at most a year long, so this is linear in the
+        number of hours.
+
+        Parameters:
+        period (str): 'day', 'week', 'month' or 'year'
+        percentiles (sequence): Percentiles between 0 and 100
+        window (int): Use the `window`-hour rolling averages, None for hourly values
+        start, end: Dates to report (inclusive); partial periods at either end are cut
+
+        Returns:
+        pandas.DataFrame: Station, Period (first day), Hours with data and one 'P<q>' column per percentile
+        """
+        with self._lock:
+            i, j = self._bounds(start, end, whole_days=True)
+            values = self._series(window, i, j)
+            days = self._days(i, j)
+        keys = period_starts(days, period)
+        new_period = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+        first_days = np.flatnonzero(new_period)
+        n_periods = len(first_days)
+        day_period = np.cumsum(new_period) - 1
+        longest = int(np.diff(np.r_[first_days, len(days)]).max()) * HOURS_PER_DAY if n_periods else 0
+
+        hour_period = np.repeat(day_period, HOURS_PER_DAY)
+        offset = np.arange(len(hour_period)) - np.repeat(first_days[day_period], HOURS_PER_DAY) * HOURS_PER_DAY
+        laid_out = np.full((len(self.stations), n_periods, longest), np.nan)
+        laid_out[:, hour_period, offset] = values
+        laid_out.sort(axis=2)
+        counts = longest - np.isnan(laid_out).sum(axis=2)
+        results = sorted_percentiles(laid_out, counts, percentiles)
+
+        frame = pd.DataFrame({
+            'Station': np.repeat(np.asarray(self.stations, dtype=object), n_periods),
+            'Period': np.tile(keys[first_days], len(self.stations)).astype('datetime64[ns]'),
+            'Hours': counts.ravel()
+        })
+        for q, result in zip(percentiles, results):
+            frame[f'P{q:g}'] = result.ravel()
+        return frame
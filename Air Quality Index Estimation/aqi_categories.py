@@ -0,0 +1,152 @@
+import numpy as np
+
+# Breakpoint table: category i covers BREAKPOINTS[i-1] < AQI <= BREAKPOINTS[i],
+# the last category covers everything above the final breakpoint
+BREAKPOINTS = np.array([50, 100, 150, 200, 300])
+
+LABELS = np.array([
+    'Good',
+    'Moderate',
+    'Unhealthy for Sensitive Groups',
+    'Unhealthy',
+    'Very Unhealthy',
+    'Hazardous'
+], dtype=object)
+
+# Hex colors used by the dashboard charts and map
+COLORS = np.array(['#00e400', '#ffff00', '#ff7e00', '#ff0000', '#99004c', '#7e0023'], dtype=object)
+
+# Color names used in the Color column of cleaned_sohna_aqi.csv
+COLOR_NAMES = np.array(['green', 'yellow', 'orange', 'red', 'purple', 'maroon'], dtype=object)
+
+COLOR_MAP = dict(zip(LABELS, COLORS))
+
+# A missing (NaN) AQI has no category: code MISSING, shown as Unknown in a
+# neutral color and left out of the category counts
+MISSING = -1
+MISSING_LABEL = 'Unknown'
+MISSING_COLOR = '#cccccc'
+MISSING_COLOR_NAME = 'gray'
+
+RECOMMENDATIONS = np.array([
+    {
+        "icon": "✅",
+        "general": "Air quality is good. Enjoy outdoor activities.",
+        "sensitive_groups": "No special precautions needed.",
+        "outdoor_activity": "All outdoor activities are safe.",
+        "ventilation": "Open windows to get fresh air.",
+        "mask_recommendation": "No masks needed for air quality reasons."
+    },
+    {
+        "icon": "🟢",
+        "general": "Air quality is acceptable but may be a concern for those sensitive to air pollution.",
+        "sensitive_groups": "Unusually sensitive people should consider reducing prolonged outdoor exertion.",
+        "outdoor_activity": "Most outdoor activities are safe.",
+        "ventilation": "Open windows to get fresh air.",
+        "mask_recommendation": "Generally not needed, but sensitive individuals may consider basic masks."
+    },
+    {
+        "icon": "🟡",
+        "general": "Members of sensitive groups may experience health effects.",
+        "sensitive_groups": "People with respiratory or heart disease, the elderly and children should limit prolonged outdoor exertion.",
+        "outdoor_activity": "Consider reducing or rescheduling strenuous outdoor activities.",
+        "ventilation": "Consider keeping windows closed during peak pollution hours.",
+        "mask_recommendation": "N95 or KN95 masks recommended for sensitive groups when outdoors."
+    },
+    {
+        "icon": "🟠",
+        "general": "Everyone may begin to experience health effects; members of sensitive groups may experience more serious health effects.",
+        "sensitive_groups": "People with respiratory or heart disease, the elderly and children should avoid prolonged outdoor exertion.",
+        "outdoor_activity": "Reduce or reschedule strenuous outdoor activities for everyone.",
+        "ventilation": "Keep windows closed and use air purifiers if available.",
+        "mask_recommendation": "N95 or KN95 masks recommended for everyone when outdoors."
+    },
+    {
+        "icon": "🔴",
+        "general": "Health alert: everyone may experience more serious health effects.",
+        "sensitive_groups": "People with respiratory or heart disease, the elderly and children should avoid all outdoor activity.",
+        "outdoor_activity": "Avoid all outdoor physical activity.",
+        "ventilation": "Keep windows closed, use air purifiers, and minimize indoor activities that can cause pollution.",
+        "mask_recommendation": "N95 or KN95 masks essential when outdoors, even for short periods."
+    },
+    {
+        "icon": "⚠️",
+        "general": "Health warning of emergency conditions: everyone is more likely to be affected.",
+        "sensitive_groups": "Everyone should avoid all outdoor activity.",
+        "outdoor_activity": "Avoid all outdoor physical activity and stay indoors.",
+        "ventilation": "Keep windows closed, use air purifiers, and avoid activities that can cause indoor pollution.",
+        "mask_recommendation": "N95 or KN95 masks essential when outdoors, even for short periods. Consider double masking."
+    }
+], dtype=object)
+
+MISSING_RECOMMENDATION = {
+    "icon": "❔",
+    "general": "No AQI reading is available.",
+    "sensitive_groups": "Check a nearby station or an official air quality service.",
+    "outdoor_activity": "No recommendation without a reading.",
+    "ventilation": "No recommendation without a reading.",
+    "mask_recommendation": "No recommendation without a reading."
+}
+
+
+# Bulk API
+
+def categorize(aqi):
+    """
+    Map AQI values to category codes with a single binary search per value
+
+    Parameters:
+    aqi (array-like): AQI values of any shape
+
+    Returns:
+    numpy.ndarray: int8 codes (0 = Good ... 5 = Hazardous), same shape as aqi;
+        MISSING (-1) for NaN. pd.Categorical.from_codes reads -1 as missing.
+    """
+    aqi = np.asarray(aqi, dtype=float)
+    codes = np.searchsorted(BREAKPOINTS, aqi, side='left').astype(np.int8)
+    # Past the last breakpoint NaN would otherwise be Hazardous
+    return np.where(np.isnan(aqi), np.int8(MISSING), codes)
+
+
+def lookup(table, codes, missing):
+    """table[codes], with missing where a code is MISSING (which would index the last entry)"""
+    codes = np.asarray(codes)
+    if codes.ndim == 0:
+        return missing if codes == MISSING else table[codes]
+    values = table[codes]
+    values[codes == MISSING] = missing
+    return values
+
+
+def category_labels(aqi):
+    """Category label for every AQI value, MISSING_LABEL for NaN"""
+    return lookup(LABELS, categorize(aqi), MISSING_LABEL)
+
+
+def category_colors(aqi):
+    """Hex color for every AQI value, MISSING_COLOR for NaN"""
+    return lookup(COLORS, categorize(aqi), MISSING_COLOR)
+
+
+def category_color_names(aqi):
+    """Color name (as stored in the cleaned CSV) for every AQI value"""
+    return lookup(COLOR_NAMES, categorize(aqi), MISSING_COLOR_NAME)
+
+
+def category_recommendations(aqi):
+    """Health recommendation record for every AQI value (shared, do not mutate)"""
+    return lookup(RECOMMENDATIONS, categorize(aqi), MISSING_RECOMMENDATION)
+
+
+# Scalar helpers
+
+def category_label(aqi):
+    return category_labels(aqi)
+
+
+def category_color(aqi):
+    return category_colors(aqi)
+
+
+def category_recommendation(aqi):
+    return dict(category_recommendations(aqi))
@@ -0,0 +1,66 @@
+// Browser-side callbacks: presentation changes that need no new data
+
+// Typed array constructors for the dtypes the server sends as {dtype, bdata}
+const TYPED_ARRAYS = {
+    u1: Uint8Array, i1: Int8Array, u2: Uint16Array, i2: Int16Array,
+    u4: Uint32Array, i4: Int32Array, f4: Float32Array, f8: Float64Array
+};
+
+// Plain array or base64 typed array spec as something Math.max can read
+function toArray(values) {
+    if (!values || !values.bdata) {
+        return values || [];
+    }
+    const binary = atob(values.bdata);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return Array.from(new TYPED_ARRAYS[values.dtype](bytes.buffer));
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    charts: {
+        // Restyle the explorer figure sent by the server (line traces, or bars for
+        // the health view) as a line, bar or scatter chart
+        setChartType: function(base, chartType) {
+            if (!base) {
+                return window.dash_clientside.no_update;
+            }
+            const figure = JSON.parse(JSON.stringify(base.figure));
+            const view = base.view_type;
+            const maxY = Math.max.apply(null, figure.data.map(function(trace) {
+                return Math.max.apply(null, toArray(trace.y).concat([0]));
+            }));
+
+            figure.data = figure.data.map(function(trace) {
+                const color = (trace.line && trace.line.color) || (trace.marker && trace.marker.color);
+                const styled = Object.assign({}, trace);
+                delete styled.mode;
+                delete styled.line;
+
+                if (chartType === 'bar' || (chartType === 'line' && view === 'health')) {
+                    styled.type = 'bar';
+                    styled.marker = {color: color};
+                } else if (chartType === 'scatter') {
+                    styled.type = 'scatter';
+                    styled.mode = 'markers';
+                    styled.marker = {color: color, symbol: 'circle'};
+                    if (view === 'health') {
+                        // Bubble size follows AQI, as plotly express does with size='AQI'
+                        styled.marker.size = trace.y;
+                        styled.marker.sizemode = 'area';
+                        styled.marker.sizeref = maxY / 400;
+                    }
+                } else {
+                    styled.type = 'scatter';
+                    styled.mode = view === 'hourly' ? 'lines+markers' : 'lines';
+                    styled.line = {width: 3, color: color};
+                    styled.marker = {color: color, symbol: 'circle'};
+                }
+                return styled;
+            });
+            return figure;
+        }
+    }
+});
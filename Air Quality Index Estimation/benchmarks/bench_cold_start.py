@@ -0,0 +1,76 @@
+"""
+Cold start of the production (gunicorn) serving mode
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:server` on a free localhost port,
+with and without preloading (AQI_PRELOAD), and reports the time from
+launching the process to the first 200 from:
+
+- /healthz: the port answers (what a liveness probe or an autoscaler waits for)
+- /readyz:  the dashboard is loaded and serves pages
+- /:        the first page, as a user would see it
+
+Run from the project directory:
+    python benchmarks/bench_cold_start.py --repeat 5 --workers 2
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import http.client
+
+from loadtest import BASE_DIR, free_port, stop_server
+
+PATHS = ['/healthz', '/readyz', '/']
+
+
+def get_status(port, path):
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', path)
+        status = conn.getresponse().status
+        conn.close()
+        return status
+    except OSError:
+        return None
+
+
+def cold_start(preload, workers, timeout=120):
+    """Seconds from launch to the first 200 of every path in PATHS"""
+    port = free_port()
+    env = dict(os.environ, AQI_PRELOAD='1' if preload else '0',
+               AQI_WORKERS=str(workers), AQI_BIND=f'127.0.0.1:{port}')
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    timings = {}
+    try:
+        for path in PATHS:
+            while get_status(port, path) != 200:
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"gunicorn did not answer {path} in time")
+                time.sleep(0.005)
+            timings[path] = time.perf_counter() - start
+    finally:
+        stop_server(process)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Starts per mode')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}" + ''.join(f'{path + " ms":>14}' for path in PATHS))
+    for preload in (True, False):
+        runs = [cold_start(preload, args.workers) for _ in range(args.repeat)]
+        medians = [statistics.median(run[path] for run in runs) * 1e3 for path in PATHS]
+        print(f"{'preload' if preload else 'background':<12}" + ''.join(f'{m:>14.0f}' for m in medians))
+
+
+if __name__ == '__main__':
+    main()
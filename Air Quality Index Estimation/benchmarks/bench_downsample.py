@@ -0,0 +1,62 @@
+"""
+Payload and build time of the trend chart with and without downsampling
+
+For synthetic hourly series of several lengths, builds the trend figure
+from every point, from an LTTB reduction and from a min/max envelope at the
+target width, and reports the reduction time, the figure JSON size and the
+build+serialize time. JSON size is also a fair proxy for browser render
+time, which grows with the number of points Plotly has to draw.
+
+Run from the project directory:
+    python benchmarks/bench_downsample.py --years 1 10 50 --width 1000
+"""
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+from downsample import downsample
+from figures import build_trend_figure
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--width', type=int, default=1000, help='Target points (chart width in pixels)')
+    args = parser.parse_args()
+
+    # Warm up plotly express so the first timing does not include its setup
+    build_trend_figure(pd.date_range('2000-01-01', periods=10, freq='h').to_numpy(), np.arange(10.0)).to_json()
+
+    print(f"{'years':>6}{'points':>10}{'variant':>9}{'kept':>8}{'reduce ms':>11}{'figure ms':>11}{'JSON KB':>10}")
+    for years in args.years:
+        n = years * 8760
+        timestamps = pd.date_range('2000-01-01', periods=n, freq='h').to_numpy()
+        hours = np.arange(n)
+        rng = np.random.default_rng(0)
+        values = np.clip(200 + 80 * np.sin(hours * 2 * np.pi / 24) + np.cumsum(rng.normal(0, 5, n)) % 200, 0, None)
+
+        for variant in ('full', 'lttb', 'minmax'):
+            if variant == 'full':
+                (x, y), reduce_seconds = (timestamps, values), 0.0
+            else:
+                (x, y), reduce_seconds = timed(lambda: downsample(timestamps, values, args.width, variant))
+            # n_points = len(x) turns off the figure's own downsampling
+            payload, figure_seconds = timed(lambda: build_trend_figure(x, y, n_points=len(x)).to_json())
+            print(f"{years:>6}{n:>10,d}{variant:>9}{len(x):>8,d}{reduce_seconds * 1e3:>11.1f}"
+                  f"{figure_seconds * 1e3:>11.1f}{len(payload) / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
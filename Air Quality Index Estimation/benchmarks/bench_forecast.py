@@ -0,0 +1,93 @@
+"""
+Forecast model benchmark: training time, prediction latency and accuracy
+
+The last --test-days of the series are held out. Every hour in that span
+is used as a forecast origin and scored against the actual next 24 hours,
+alongside persistence (repeat the last value) and a seasonal naive
+baseline (repeat the value from 24 hours earlier).
+
+Run from the project directory:
+    python benchmarks/bench_forecast.py
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from data_loader import DEFAULT_SOURCE, load_aqi_data
+from forecast_model import (
+    HISTORY, FeatureScaler, DirectRidgeForecaster, hourly_series, build_features,
+    build_training_set, create_forecast_model, predict_next_hours
+)
+
+
+def score(actual, predicted):
+    errors = predicted - actual
+    return np.abs(errors).mean(), np.sqrt((errors ** 2).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DEFAULT_SOURCE)
+    parser.add_argument('--horizon', type=int, default=24)
+    parser.add_argument('--test-days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    df = load_aqi_data(args.source)
+    timestamps, values = hourly_series(df)
+    split = len(values) - args.test_days * 24
+
+    # Accuracy on the held-out tail
+    start = time.perf_counter()
+    X, Y = build_training_set(timestamps[:split], values[:split], args.horizon)
+    scaler = FeatureScaler().fit(X)
+    model = DirectRidgeForecaster(horizon=args.horizon).fit(scaler.transform(X), Y)
+    train_seconds = time.perf_counter() - start
+
+    origins = np.arange(max(split - 1, HISTORY - 1), len(values) - args.horizon)
+    actual = values[origins[:, None] + np.arange(1, args.horizon + 1)[None, :]]
+    predicted = model.predict(scaler.transform(build_features(timestamps, values, origins)))
+    persistence = np.repeat(values[origins][:, None], args.horizon, axis=1)
+    seasonal = values[origins[:, None] + np.arange(1, args.horizon + 1)[None, :] - 24]
+
+    print(f"rows: {len(values)}, train origins: {len(X)}, test origins: {len(origins)}")
+    print(f"{'model':<22}{'MAE':>10}{'RMSE':>10}")
+    for name, pred in [('ridge (direct)', predicted), ('persistence', persistence), ('seasonal naive 24h', seasonal)]:
+        mae, rmse = score(actual, pred)
+        print(f"{name:<22}{mae:>10.2f}{rmse:>10.2f}")
+
+    # Timings through the public API, with and without the disk cache
+    cache_dir = tempfile.mkdtemp(prefix='aqi-bench-forecast-')
+    start = time.perf_counter()
+    model, scaler, features = create_forecast_model(df, horizon=args.horizon, cache_dir=cache_dir)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    create_forecast_model(df, horizon=args.horizon, cache_dir=cache_dir)
+    cached_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        predict_next_hours(df, model, scaler, features, hours=args.horizon)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict(scaler.transform(build_features(timestamps, values, origins)))
+    batch_seconds = time.perf_counter() - start
+
+    print()
+    print(f"train (held-out split):      {train_seconds * 1e3:8.2f} ms")
+    print(f"create_forecast_model fit:   {fit_seconds * 1e3:8.2f} ms")
+    print(f"create_forecast_model cache: {cached_seconds * 1e3:8.2f} ms")
+    print(f"predict_next_hours median:   {statistics.median(latencies) * 1e3:8.2f} ms")
+    print(f"batch predict {len(origins)} origins: {batch_seconds * 1e3:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
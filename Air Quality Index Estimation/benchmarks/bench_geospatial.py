@@ -0,0 +1,92 @@
+"""
+Map build time and figure size vs number of stations
+
+Compares the vectorized create_geospatial_view (one marker trace, circles
+computed as arrays and grouped per AQI category) with the previous
+approach of a Python loop per circle and one marker + circle trace per
+station.
+
+Run from the project directory:
+    python benchmarks/bench_geospatial.py --stations 1 100 5000
+"""
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from aqi_categories import category_color, category_label
+from geospatial_view import create_geospatial_view, SOHNA_LAT, SOHNA_LON
+
+
+def random_stations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Station': [f'Station {i}' for i in range(n)],
+        'lat': SOHNA_LAT + rng.uniform(-2, 2, n),
+        'lon': SOHNA_LON + rng.uniform(-2, 2, n),
+        'AQI': rng.uniform(0, 500, n)
+    })
+
+
+def per_station_view(stations, radius_km=5, points=100):
+    """The previous approach applied to many stations: Python loops and two traces per station"""
+    fig = go.Figure()
+    for row in stations.itertuples():
+        color = category_color(row.AQI)
+        fig.add_trace(go.Scattermapbox(
+            lat=[row.lat], lon=[row.lon], mode='markers',
+            marker=dict(size=20, color=color, opacity=0.8),
+            text=[f"{row.Station}: AQI {row.AQI:.1f} ({category_label(row.AQI)})"], hoverinfo='text'
+        ))
+        radius_lat = radius_km / 111
+        radius_long = radius_km / (111 * np.cos(np.radians(row.lat)))
+        circle_lats, circle_longs = [], []
+        for i in range(points + 1):
+            angle = (i / points) * 2 * np.pi
+            circle_lats.append(row.lat + radius_lat * np.sin(angle))
+            circle_longs.append(row.lon + radius_long * np.cos(angle))
+        fig.add_trace(go.Scattermapbox(
+            lat=circle_lats, lon=circle_longs, mode='lines',
+            line=dict(width=2, color=color), hoverinfo='none'
+        ))
+    fig.update_layout(mapbox=dict(style="dark", zoom=10), showlegend=False)
+    return fig
+
+
+def measure(build, stations, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build(stations)
+        payload = fig.to_json()
+        best = min(best, time.perf_counter() - start)
+    return best, len(payload), len(fig.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stations', type=int, nargs='+', default=[1, 100, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline-limit', type=int, default=1000,
+                        help='Skip the per-station baseline above this many stations (it is very slow)')
+    args = parser.parse_args()
+
+    print(f"{'stations':>9}{'variant':>14}{'build+json ms':>15}{'JSON KB':>10}{'traces':>8}{'bytes/station':>15}")
+    for n in args.stations:
+        stations = random_stations(n)
+        variants = [('vectorized', lambda s: create_geospatial_view(stations=s))]
+        if n <= args.baseline_limit:
+            variants.append(('per-station', per_station_view))
+        for name, build in variants:
+            seconds, size, traces = measure(build, stations, args.repeat)
+            print(f"{n:>9}{name:>14}{seconds * 1e3:>15.1f}{size / 1024:>10.1f}{traces:>8}{size / n:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
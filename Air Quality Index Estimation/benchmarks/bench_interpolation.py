@@ -0,0 +1,66 @@
+"""
+IDW grid build time vs grid size and number of stations
+
+For each station count and grid resolution, reports the time to
+interpolate with all stations (chunked dense distance matrices) and with
+the k nearest stations from a KD-tree, the time to serve the same
+(timestamp, resolution) again from the grid cache, and the size of the
+density mapbox layer.
+
+Run from the project directory:
+    python benchmarks/bench_interpolation.py --stations 100 5000 --resolutions 0.05 0.02 0.01
+"""
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import plotly.graph_objects as go
+from interpolation import GridCache, interpolated_grid, interpolation_trace
+from bench_geospatial import random_stations
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stations', type=int, nargs='+', default=[100, 5000])
+    parser.add_argument('--resolutions', type=float, nargs='+', default=[0.05, 0.02, 0.01])
+    parser.add_argument('--k', type=int, default=8, help='Neighbours for the KD-tree variant')
+    parser.add_argument('--dense-limit', type=int, default=20_000_000,
+                        help='Skip the all-stations variant above this many grid points x stations')
+    args = parser.parse_args()
+
+    # Load scipy's KD-tree before timing anything
+    interpolated_grid(random_stations(16), 0.5, k=2, cache=None)
+
+    print(f"{'stations':>9}{'resolution':>11}{'grid':>12}{'all ms':>10}{f'k={args.k} ms':>10}"
+          f"{'cached ms':>11}{'layer KB':>10}")
+    for n in args.stations:
+        stations = random_stations(n)
+        for resolution in args.resolutions:
+            cache = GridCache()
+            grid, knn_seconds = timed(lambda: interpolated_grid(stations, resolution, timestamp='t0',
+                                                                k=args.k, cache=cache))
+            _, cached_seconds = timed(lambda: interpolated_grid(stations, resolution, timestamp='t0',
+                                                                k=args.k, cache=cache))
+            if grid.values.size * n <= args.dense_limit:
+                _, dense_seconds = timed(lambda: interpolated_grid(stations, resolution, k=None, cache=None))
+                dense_text = f"{dense_seconds * 1e3:.1f}"
+            else:
+                dense_text = 'skipped'
+            layer = go.Figure(interpolation_trace(grid, resolution)).to_json()
+            shape = f"{grid.shape[0]}x{grid.shape[1]}"
+            print(f"{n:>9}{resolution:>11}{shape:>12}{dense_text:>10}{knn_seconds * 1e3:>10.1f}"
+                  f"{cached_seconds * 1e3:>11.3f}{len(layer) / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+First-paint benchmark: eager (figures inlined in the layout) vs lazy layout
+
+- import:   wall time of `import App` in a fresh interpreter
+- layout:   bytes of the /_dash-layout response
+- first chart: time until the browser can draw the first chart. Eager has
+  to build every figure and ship the whole layout first; lazy ships the
+  light layout and then the first chart callback.
+
+The eager numbers are reproduced by building every figure and inlining it
+into the layout tree, which is what App.py did before the layout became a
+function.
+
+Run from the project directory:
+    python benchmarks/bench_layout.py
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('AQI_FORECAST_SCHEDULER', '0')
+
+import plotly
+from dash import dcc
+
+
+def import_seconds():
+    code = "import time; t = time.perf_counter(); import App; print(time.perf_counter() - t)"
+    env = dict(os.environ, AQI_FORECAST_SCHEDULER='0')
+    out = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def walk(component):
+    yield component
+    children = getattr(component, 'children', None)
+    if children is None:
+        return
+    if not isinstance(children, (list, tuple)):
+        children = [children]
+    for child in children:
+        if hasattr(child, 'to_plotly_json'):
+            yield from walk(child)
+
+
+def chart_request(chart_id, version):
+    return {
+        'output': f'{chart_id}.figure',
+        'outputs': {'id': chart_id, 'property': 'figure'},
+        'inputs': [
+            {'id': 'data-version', 'property': 'data', 'value': version},
+            {'id': 'date-range', 'property': 'start_date', 'value': None},
+            {'id': 'date-range', 'property': 'end_date', 'value': None}
+        ],
+        'changedPropIds': ['data-version.data'],
+        'state': []
+    }
+
+
+def main():
+    seconds = import_seconds()
+
+    import App
+    client = App.server.test_client()
+    builders = dict(App.CHART_BUILDERS)
+    builders['geospatial-chart'] = lambda cube: App.create_geospatial_view(App.get_current_aqi())
+    builders['aqi-trend-chart'] = lambda cube: App.build_trend_figure(*App.series.window())
+
+    # Eager: build every figure, inline it, serialize the whole layout
+    App.figure_cache.invalidate()
+    start = time.perf_counter()
+    layout = App.serve_layout()
+    for component in walk(layout):
+        if isinstance(component, dcc.Graph) and component.id in builders:
+            component.figure = builders[component.id](App.cube)
+    eager_payload = json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder)
+    eager_first_chart = time.perf_counter() - start
+
+    # Lazy: light layout, then the first chart's own callback (cold figure cache)
+    App.figure_cache.invalidate()
+    start = time.perf_counter()
+    lazy_payload = client.get('/_dash-layout').data
+    layout_seconds = time.perf_counter() - start
+    response = client.post('/_dash-update-component', json=chart_request('health-risk-gauge', App.cube.version))
+    lazy_first_chart = time.perf_counter() - start
+    assert response.status_code == 200
+
+    # Remaining charts, cold and then served from the figure cache
+    start = time.perf_counter()
+    for chart_id in App.CHART_BUILDERS:
+        client.post('/_dash-update-component', json=chart_request(chart_id, App.cube.version))
+    all_cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for chart_id in App.CHART_BUILDERS:
+        client.post('/_dash-update-component', json=chart_request(chart_id, App.cube.version))
+    all_warm = time.perf_counter() - start
+
+    print(f"import App:                    {seconds * 1e3:9.1f} ms")
+    print(f"eager layout payload:          {len(eager_payload):9,d} bytes")
+    print(f"lazy layout payload:           {len(lazy_payload):9,d} bytes")
+    print(f"eager time to first chart:     {eager_first_chart * 1e3:9.1f} ms")
+    print(f"lazy layout response:          {layout_seconds * 1e3:9.1f} ms")
+    print(f"lazy time to first chart:      {lazy_first_chart * 1e3:9.1f} ms")
+    print(f"lazy chart callbacks (cold):   {all_cold * 1e3:9.1f} ms total, sequential")
+    print(f"lazy chart callbacks (cached): {all_warm * 1e3:9.1f} ms total, sequential")
+
+
+if __name__ == '__main__':
+    main()
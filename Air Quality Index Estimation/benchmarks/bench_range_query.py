@@ -0,0 +1,67 @@
+"""
+Window query time: boolean mask over a DataFrame vs binary search on TimeSeriesIndex
+
+Builds a synthetic hourly series of the requested number of years and
+times a "last 7 days" and a one-month window both ways.
+
+Run from the project directory:
+    python benchmarks/bench_range_query.py --years 1 10 50
+"""
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+from timeseries import TimeSeriesIndex
+
+
+def best_of(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'years':>6}{'rows':>12}{'window':>10}{'rows out':>10}{'mask ms':>10}{'index ms':>10}{'speedup':>9}")
+    for years in args.years:
+        hours = years * 8760
+        df = pd.DataFrame({
+            'Datetime': pd.date_range('2000-01-01', periods=hours, freq='h'),
+            'AQI': np.random.default_rng(0).uniform(0, 500, hours)
+        })
+        index = TimeSeriesIndex.from_frame(df)
+        last = df['Datetime'].iloc[-1]
+        windows = {
+            'last 7d': (last - pd.Timedelta('7D'), last),
+            'month': (pd.Timestamp('2000-06-01'), pd.Timestamp('2000-06-30 23:00'))
+        }
+        for name, (start, end) in windows.items():
+            def mask():
+                return df[(df['Datetime'] >= start) & (df['Datetime'] <= end)]
+
+            def binary_search():
+                return index.window(start, end)
+
+            rows_out = len(binary_search()[0])
+            assert rows_out == len(mask())
+            mask_seconds = best_of(mask, args.repeat)
+            index_seconds = best_of(binary_search, args.repeat)
+            print(f"{years:>6}{hours:>12,d}{name:>10}{rows_out:>10,d}{mask_seconds * 1e3:>10.3f}"
+                  f"{index_seconds * 1e3:>10.3f}{mask_seconds / index_seconds:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
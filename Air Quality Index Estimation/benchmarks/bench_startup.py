@@ -0,0 +1,86 @@
+"""
+Startup-time benchmark for the AQI data loading paths
+
+Compares three ways of getting the dashboard DataFrame:
+- url:   the old path, requests.get against a local stand-in HTTP server + read_csv
+- cold:  parsing the bundled CSV and building the columnar cache
+- warm:  memory-mapping the already built cache
+
+Run from the project directory:
+    python benchmarks/bench_startup.py --repeat 20
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import functools
+from io import StringIO
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from data_loader import DEFAULT_SOURCE, load_aqi_data, read_csv_frame
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_local_server(directory):
+    """Serve a directory over HTTP on a free localhost port"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def load_from_url(url):
+    """The loading code App.py used before the cache existed"""
+    response = requests.get(url)
+    return read_csv_frame(StringIO(response.text))
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help='CSV file to benchmark')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='aqi-bench-cache-')
+    server = start_local_server(os.path.dirname(os.path.abspath(args.source)))
+    url = f'http://127.0.0.1:{server.server_port}/{os.path.basename(args.source)}'
+
+    try:
+        cases = {
+            'url (old path)': lambda: load_from_url(url),
+            'cold csv + cache build': lambda: load_aqi_data(args.source, cache_dir, refresh=True),
+            'warm cache (mmap)': lambda: load_aqi_data(args.source, cache_dir),
+            'warm cache (in memory)': lambda: load_aqi_data(args.source, cache_dir, mmap=False),
+        }
+        print(f"{'case':<26}{'median ms':>12}{'min ms':>12}")
+        for name, func in cases.items():
+            timings = time_call(func, args.repeat)
+            print(f"{name:<26}{statistics.median(timings) * 1e3:>12.2f}{min(timings) * 1e3:>12.2f}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Bytes on the wire and client parse time of the full dashboard
+
+Requests everything a browser fetches to show the dashboard: the layout and
+every chart callback (gauge, trend, map, heatmap, the analytics panels and the
+other charts, the explorer's default view). Each request is repeated for:
+
+- arrays:   numeric trace arrays as JSON lists (plain) or base64 typed arrays
+- encoding: identity, gzip and, when the brotli package is installed, br
+
+and reports the total response bytes and the time to parse the bodies:
+JSON parsing in Python, and in node (JSON.parse plus decoding the typed
+arrays, as plotly.js does) when node is on the PATH. The size of the theme
+template embedded in every figure is reported against plotly_dark.
+
+The forecast chart is left out: it depends on the background scheduler.
+
+Run from the project directory:
+    python benchmarks/bench_transport.py --repeat 20
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('AQI_FORECAST_SCHEDULER', '0')
+
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+from bench_layout import chart_request
+from compression import brotli
+
+# Parses every body `repeat` times; typed arrays are decoded the way plotly.js does
+NODE_PARSE = r"""
+const fs = require('fs');
+const [bodiesPath, repeat] = [process.argv[2], Number(process.argv[3])];
+const bodies = JSON.parse(fs.readFileSync(bodiesPath, 'utf8'));
+const TYPES = {u1: Uint8Array, i1: Int8Array, u2: Uint16Array, i2: Int16Array,
+               u4: Uint32Array, i4: Int32Array, f4: Float32Array, f8: Float64Array};
+function decode(value) {
+    if (value && typeof value === 'object') {
+        if (value.bdata !== undefined) {
+            const bytes = Buffer.from(value.bdata, 'base64');
+            return new TYPES[value.dtype](bytes.buffer, bytes.byteOffset, bytes.length / TYPES[value.dtype].BYTES_PER_ELEMENT);
+        }
+        for (const key in value) {
+            value[key] = decode(value[key]);
+        }
+    }
+    return value;
+}
+const start = process.hrtime.bigint();
+for (let i = 0; i < repeat; i++) {
+    bodies.forEach(body => decode(JSON.parse(body)));
+}
+console.log(Number(process.hrtime.bigint() - start) / 1e6 / repeat);
+"""
+
+
+def dashboard_requests(App):
+    """(name, method, json body) of every request the dashboard makes on first load"""
+    version = App.cube.version
+    requests = [('layout', 'GET', None)]
+    for chart_id in list(App.CHART_BUILDERS) + list(App.ANALYTICS_BUILDERS):
+        requests.append((chart_id, 'POST', chart_request(chart_id, version)))
+    requests.append(('geospatial-chart', 'POST', {
+        'output': 'geospatial-chart.figure',
+        'outputs': {'id': 'geospatial-chart', 'property': 'figure'},
+        'inputs': [{'id': 'data-version', 'property': 'data', 'value': version}],
+        'changedPropIds': ['data-version.data'],
+        'state': []
+    }))
+    requests.append(('aqi-trend-chart', 'POST', {
+        'output': 'aqi-trend-chart.figure',
+        'outputs': {'id': 'aqi-trend-chart', 'property': 'figure'},
+        'inputs': [
+            {'id': 'trend-width', 'property': 'data', 'value': 1000},
+            {'id': 'date-range', 'property': 'start_date', 'value': None},
+            {'id': 'date-range', 'property': 'end_date', 'value': None},
+            {'id': 'aqi-trend-chart', 'property': 'relayoutData', 'value': None}
+        ],
+        'changedPropIds': ['trend-width.data'],
+        'state': []
+    }))
+    requests.append(('interactive-base', 'POST', {
+        'output': 'interactive-base.data',
+        'outputs': {'id': 'interactive-base', 'property': 'data'},
+        'inputs': [
+            {'id': 'view-type', 'property': 'value', 'value': 'daily'},
+            {'id': 'date-range', 'property': 'start_date', 'value': None},
+            {'id': 'date-range', 'property': 'end_date', 'value': None},
+            {'id': 'data-version', 'property': 'data', 'value': version}
+        ],
+        'changedPropIds': ['view-type.value'],
+        'state': []
+    }))
+    return requests
+
+
+def fetch(client, method, body, encoding):
+    headers = {'Accept-Encoding': encoding}
+    if method == 'GET':
+        response = client.get('/_dash-layout', headers=headers)
+    else:
+        response = client.post('/_dash-update-component', json=body, headers=headers)
+    assert response.status_code == 200, response.status_code
+    return response.get_data()
+
+
+def decompress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'br':
+        return brotli.decompress(data)
+    return data
+
+
+def python_parse_ms(bodies, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies:
+            json.loads(body)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def node_parse_ms(bodies, repeat):
+    node = shutil.which('node')
+    if node is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'parse.js')
+        data = os.path.join(tmp, 'bodies.json')
+        with open(script, 'w') as f:
+            f.write(NODE_PARSE)
+        with open(data, 'w') as f:
+            json.dump([body.decode('utf-8') for body in bodies], f)
+        out = subprocess.run([node, script, data, str(repeat)], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Parse repetitions per measurement')
+    args = parser.parse_args()
+
+    import App
+    from figures import TEMPLATE
+    client = App.server.test_client()
+    requests = dashboard_requests(App)
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+    template_bytes = {
+        name: len(json.dumps(pio.templates[name].to_plotly_json(), cls=PlotlyJSONEncoder, separators=(',', ':')))
+        for name in ('plotly_dark', TEMPLATE)
+    }
+    print(f"template per figure: plotly_dark {template_bytes['plotly_dark']:,d} bytes, "
+          f"{TEMPLATE} {template_bytes[TEMPLATE]:,d} bytes")
+    if brotli is None:
+        print("brotli not installed: br is skipped")
+    print()
+
+    header = f"{'arrays':<7} {'encoding':<9} {'wire bytes':>11} {'raw bytes':>11} {'py parse ms':>12} {'node parse ms':>14}"
+    print(header)
+    print('-' * len(header))
+    for typed_arrays in (False, True):
+        App.figure_cache.typed_arrays = typed_arrays
+        App.figure_cache.invalidate()
+        for encoding in encodings:
+            wire = [fetch(client, method, body, encoding) for _, method, body in requests]
+            bodies = [decompress(data, encoding) for data in wire]
+            node_ms = node_parse_ms(bodies, args.repeat)
+            print(f"{'typed' if typed_arrays else 'plain':<7} {encoding:<9} "
+                  f"{sum(map(len, wire)):>11,d} {sum(map(len, bodies)):>11,d} "
+                  f"{python_parse_ms(bodies, args.repeat):>12.2f} "
+                  f"{'n/a' if node_ms is None else f'{node_ms:.2f}':>14}")
+
+    # Per request breakdown for the default configuration
+    App.figure_cache.typed_arrays = True
+    App.figure_cache.invalidate()
+    print()
+    print(f"{'request':<22} {'identity':>10} {'gzip':>10}")
+    for name, method, body in requests:
+        print(f"{name:<22} {len(fetch(client, method, body, 'identity')):>10,d} "
+              f"{len(fetch(client, method, body, 'gzip')):>10,d}")
+
+
+if __name__ == '__main__':
+    main()
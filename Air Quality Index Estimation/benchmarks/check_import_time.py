@@ -0,0 +1,110 @@
+"""
+Import-time budget of the dashboard's entry points
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each checked module and fails (exit status 1) when:
+
+- importing it takes longer than its budget (cumulative microseconds as
+  reported by -X importtime, the median of --repeat runs), or
+- it imports a module it must leave for later (e.g. wsgi must not import
+  Dash or pandas, or /healthz would wait for them).
+
+The slowest imports are listed, so a regression points at its cause.
+
+The test suite runs the same checks (tests/test_import_time.py, with
+AQI_IMPORT_BUDGET_SCALE in place of --scale); to run them alone, from the
+project directory:
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --scale 2 --top 25
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> (budget in ms, modules it must not import)
+BUDGETS = {
+    # Serves /healthz: the standard library only
+    'wsgi': (50, ['dash', 'flask', 'pandas', 'plotly', 'numpy']),
+    # Builds the figures on demand: plotly.express is imported by the first figure
+    'figures': (600, ['plotly.express', 'dash', 'scipy']),
+    # The whole dashboard, data and layout included
+    'App': (1500, ['plotly.express', 'scipy', 'sklearn', 'requests', 'plotly.subplots']),
+}
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_times(module):
+    """
+    Import `module` in a fresh interpreter under -X importtime
+
+    Returns:
+    tuple: (total microseconds, {module: (self us, cumulative us)})
+    """
+    # The dashboard must not start its background threads and processes just to be timed
+    env = dict(os.environ, AQI_FORECAST_SCHEDULER='0', AQI_INGEST_FOLLOW='0', AQI_DATA_WATCH='0')
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{out.stderr[-2000:]}")
+    modules = {}
+    total = 0
+    for line in out.stderr.splitlines():
+        match = LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        modules[name] = (self_us, cumulative_us)
+        if len(indent) == 1:
+            # Top-level imports of the -c statement (site is imported before it)
+            if name != 'site' and not name.startswith('encodings'):
+                total += cumulative_us
+    return total, modules
+
+
+def check(module, budget_ms, forbidden, repeat, top):
+    runs = [import_times(module) for _ in range(repeat)]
+    total_ms = statistics.median(total for total, _ in runs) / 1e3
+    modules = runs[-1][1]
+
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"took {total_ms:.0f} ms, budget {budget_ms:.0f} ms")
+    for name in forbidden:
+        if name in modules:
+            failures.append(f"imports {name}")
+
+    print(f"{module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms) {'FAIL' if failures else 'ok'}")
+    for failure in failures:
+        print(f"  - {failure}")
+    if failures and top:
+        slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        print("  slowest imports (self / cumulative ms):")
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"    {self_us / 1e3:8.1f} {cumulative_us / 1e3:8.1f}  {name}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS), help='Modules to check')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per module; the median is compared')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply every budget, for slower machines')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports listed on failure')
+    args = parser.parse_args()
+
+    ok = True
+    for module in args.modules:
+        budget_ms, forbidden = BUDGETS.get(module, (float('inf'), []))
+        ok &= check(module, budget_ms * args.scale, forbidden, args.repeat, args.top)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
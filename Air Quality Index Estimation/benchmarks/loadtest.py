@@ -0,0 +1,193 @@
+"""
+Local load test for the production (gunicorn) serving mode
+
+For each worker count, starts `gunicorn -c gunicorn.conf.py wsgi:server` on
+a free localhost port, drives it with concurrent keep-alive clients and
+reports requests/sec and p50/p99 latency for the page (GET /) and for the
+interactive explorer data callback. Total PSS of the gunicorn processes is also
+reported, to show how memory grows with the number of workers.
+
+Run from the project directory (no network needed):
+    python benchmarks/loadtest.py --workers 1 2 4 --duration 10 --concurrency 16
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import argparse
+import threading
+import subprocess
+import http.client
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VIEW_TYPES = ['daily', 'hourly', 'health']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def callback_payload(view_type):
+    # Chart type switching happens in the browser; only view changes reach the server
+    return json.dumps({
+        'output': 'interactive-base.data',
+        'outputs': {'id': 'interactive-base', 'property': 'data'},
+        'inputs': [
+            {'id': 'view-type', 'property': 'value', 'value': view_type},
+            {'id': 'date-range', 'property': 'start_date', 'value': None},
+            {'id': 'date-range', 'property': 'end_date', 'value': None},
+            {'id': 'data-version', 'property': 'data', 'value': None}
+        ],
+        'changedPropIds': ['view-type.value'],
+        'state': []
+    })
+
+
+def start_server(workers, port):
+    env = dict(os.environ, AQI_WORKERS=str(workers), AQI_BIND=f'127.0.0.1:{port}')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become ready in time")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def process_tree_pss(pid):
+    """Sum of PSS (kB) for a process and its children, Linux only"""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        return None
+    total = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def client(port, deadline, callback_share, results, lock):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local = defaultdict(list)
+    headers = {'Content-Type': 'application/json'}
+    while time.time() < deadline:
+        if random.random() < callback_share:
+            kind = 'callback'
+            body = callback_payload(random.choice(VIEW_TYPES))
+            start = time.perf_counter()
+            conn.request('POST', '/_dash-update-component', body=body, headers=headers)
+        else:
+            kind = 'page'
+            start = time.perf_counter()
+            conn.request('GET', '/')
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        if response.status == 200:
+            local[kind].append(elapsed)
+        else:
+            local[f'{kind} errors'].append(elapsed)
+    conn.close()
+    with lock:
+        for kind, timings in local.items():
+            results[kind].extend(timings)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(workers, duration, concurrency, callback_share):
+    port = free_port()
+    process = start_server(workers, port)
+    try:
+        # Warm every figure cache entry in every worker before measuring
+        warm_deadline = time.time() + 2
+        warm_threads = [
+            threading.Thread(target=client, args=(port, warm_deadline, 0.5, defaultdict(list), threading.Lock()))
+            for _ in range(concurrency)
+        ]
+        for t in warm_threads:
+            t.start()
+        for t in warm_threads:
+            t.join()
+
+        results = defaultdict(list)
+        lock = threading.Lock()
+        deadline = time.time() + duration
+        threads = [
+            threading.Thread(target=client, args=(port, deadline, callback_share, results, lock))
+            for _ in range(concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        pss = process_tree_pss(process.pid)
+    finally:
+        stop_server(process)
+
+    rows = []
+    for kind in ('page', 'callback'):
+        timings = sorted(results.get(kind, []))
+        rows.append((
+            workers, kind, len(timings) / duration,
+            percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3,
+            len(results.get(f'{kind} errors', []))
+        ))
+    return rows, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per worker count')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--callback-share', type=float, default=0.8,
+                        help='Fraction of requests that hit the interactive explorer data callback')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'endpoint':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'PSS MB':>10}")
+    for workers in args.workers:
+        rows, pss = run(workers, args.duration, args.concurrency, args.callback_share)
+        for i, (w, kind, rps, p50, p99, errors) in enumerate(rows):
+            pss_text = f"{pss / 1024:.1f}" if (pss is not None and i == 0) else ''
+            print(f"{w:>8}{kind:>10}{rps:>10.1f}{p50:>10.2f}{p99:>10.2f}{errors:>8}{pss_text:>10}")
+
+
+if __name__ == '__main__':
+    main()
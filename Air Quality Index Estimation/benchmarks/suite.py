@@ -0,0 +1,422 @@
+"""
+Benchmark suite of the dashboard pipeline on synthetic scale-up data
+
+Every case is timed on datasets scaled from cleaned_sohna_aqi.csv (see
+synthetic.py) for each requested scale and station count:
+
+- load.*:        CSV parse, columnar cache build (cold) and memory-mapped load (warm)
+- derive.*:      derived calendar and category columns
+- aggregate.*:   the cube and every aggregate App.py builds from it, and the series index
+- analytics.*:   the hourly grid, 8h/24h rolling means, exceedances, percentiles
+                 and appending the next hour
+- interactive.*: build_interactive_figure for all 3 views (the chart type is set in the browser)
+- geospatial.*:  create_geospatial_view with one marker per station
+- forecast.*:    create_forecast_model (fit and cached) and predict_next_hours
+
+Results are written as JSON (one file per run, named after the current
+commit by default) so runs can be compared on the same machine:
+
+    python benchmarks/suite.py run --scales 1 10 100 --stations 1 10
+    python benchmarks/suite.py run --scales 1000 --stations 100 --filter aggregate
+    python benchmarks/suite.py compare results/a1b2c3d.json results/e4f5a6b.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('AQI_INSTRUMENTATION', '0')
+
+import numpy as np
+import pandas as pd
+from synthetic import synthetic_csv, station_table
+from data_loader import read_csv_frame, add_derived_columns, load_aqi_data
+from aggregates import AQICube
+from timeseries import TimeSeriesIndex
+from analytics import AQIAnalytics
+from figures import build_interactive_figure
+from geospatial_view import create_geospatial_view
+from forecast_model import create_forecast_model, predict_next_hours
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+VIEW_TYPES = ['daily', 'hourly', 'health']
+
+# name -> function(dataset) returning the zero-argument callable to time
+CASES = {}
+
+
+def case(name):
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+class Dataset:
+    """A synthetic dataset and the objects the cases need, built on first use"""
+
+    def __init__(self, scale, stations, workdir):
+        self.scale = scale
+        self.stations = stations
+        self.workdir = workdir
+        self.csv_path = synthetic_csv(scale, stations, workdir=os.path.join(workdir, 'data'))
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def raw(self):
+        """The CSV as read, before any derived column"""
+        return self._get('raw', lambda: pd.read_csv(self.csv_path))
+
+    @property
+    def df(self):
+        return self._get('df', lambda: read_csv_frame(self.csv_path))
+
+    @property
+    def cube(self):
+        return self._get('cube', lambda: AQICube.from_frame(self.df))
+
+    @property
+    def analytics(self):
+        return self._get('analytics', lambda: AQIAnalytics.from_frame(self.df))
+
+    @property
+    def rows(self):
+        return len(self.raw)
+
+    @property
+    def latest_by_station(self):
+        """One row per station with its coordinates and last AQI"""
+        def build():
+            table = station_table(self.stations)
+            if 'Station' in self.df.columns:
+                last = self.df.groupby('Station', observed=True)['AQI'].last()
+                table['AQI'] = table['Station'].map(last).to_numpy(dtype=float)
+            else:
+                table['AQI'] = float(self.df['AQI'].iloc[-1])
+            return table
+        return self._get('latest', build)
+
+    def cache_dir(self, name):
+        return os.path.join(self.workdir, f'cache-{self.scale}x-{self.stations}st-{name}')
+
+
+# Loading
+
+@case('load.read_csv')
+def bench_read_csv(data):
+    return lambda: read_csv_frame(data.csv_path)
+
+
+@case('load.cache_cold')
+def bench_cache_cold(data):
+    cache_dir = data.cache_dir('cold')
+    return lambda: load_aqi_data(source=data.csv_path, cache_dir=cache_dir, refresh=True)
+
+
+@case('load.cache_warm')
+def bench_cache_warm(data):
+    cache_dir = data.cache_dir('warm')
+    load_aqi_data(source=data.csv_path, cache_dir=cache_dir)
+    return lambda: load_aqi_data(source=data.csv_path, cache_dir=cache_dir)
+
+
+@case('derive.columns')
+def bench_derive_columns(data):
+    raw = data.raw
+    # Includes a copy of the raw frame, since the columns are added in place
+    return lambda: add_derived_columns(raw.copy())
+
+
+# Aggregates
+
+@case('aggregate.from_frame')
+def bench_cube(data):
+    df = data.df
+    return lambda: AQICube.from_frame(df)
+
+
+@case('aggregate.series_index')
+def bench_series_index(data):
+    df = data.df
+    return lambda: TimeSeriesIndex.from_frame(df)
+
+
+def register_aggregate(method):
+    @case(f'aggregate.{method}')
+    def bench(data):
+        return getattr(data.cube, method)
+
+
+for method in ['hourly_avg', 'daily_avg', 'monthly_avg', 'day_of_week_avg',
+               'weekday_hour_matrix', 'health_risk_counts', 'health_risk_avg']:
+    register_aggregate(method)
+
+
+# Rolling and exceedance analytics
+
+@case('analytics.from_frame')
+def bench_analytics(data):
+    df = data.df
+    return lambda: AQIAnalytics.from_frame(df)
+
+
+@case('analytics.rolling_mean_8h')
+def bench_rolling_8h(data):
+    return lambda: data.analytics.rolling_mean(8)
+
+
+@case('analytics.rolling_mean_24h')
+def bench_rolling_24h(data):
+    return lambda: data.analytics.rolling_mean(24)
+
+
+@case('analytics.exceedance_hours')
+def bench_exceedance_hours(data):
+    return lambda: data.analytics.exceedance_hours(window=8)
+
+
+@case('analytics.longest_exceedances')
+def bench_longest_exceedances(data):
+    return lambda: data.analytics.longest_exceedances(100)
+
+
+@case('analytics.period_percentiles')
+def bench_period_percentiles(data):
+    return lambda: data.analytics.period_percentiles('month')
+
+
+@case('analytics.add_readings')
+def bench_analytics_add(data):
+    # Its own grid, since every call appends the next hour of every station
+    analytics = AQIAnalytics.from_frame(data.df)
+    stations = analytics.stations if len(analytics.stations) > 1 else None
+    next_hour = [analytics.end]
+
+    def add():
+        timestamps = [next_hour[0]] * len(analytics.stations)
+        analytics.add_readings(timestamps, [120.0] * len(timestamps), stations)
+        next_hour[0] += np.timedelta64(1, 'h')
+    return add
+
+
+# Interactive explorer: the base figure of every view
+
+def register_interactive(view_type):
+    @case(f'interactive.{view_type}')
+    def bench(data):
+        cube = data.cube
+        return lambda: build_interactive_figure(cube, view_type).to_json()
+
+
+for view_type in VIEW_TYPES:
+    register_interactive(view_type)
+
+
+# Map
+
+@case('geospatial.create_geospatial_view')
+def bench_geospatial(data):
+    stations = data.latest_by_station
+    return lambda: create_geospatial_view(stations=stations).to_json()
+
+
+# Forecast
+
+@case('forecast.create_forecast_model')
+def bench_forecast_fit(data):
+    df = data.df
+
+    def fit():
+        # A fresh cache directory every time, so the model is really fitted
+        cache_dir = tempfile.mkdtemp(dir=data.workdir)
+        try:
+            return create_forecast_model(df, cache_dir=cache_dir)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return fit
+
+
+@case('forecast.create_forecast_model_cached')
+def bench_forecast_cached(data):
+    df = data.df
+    cache_dir = data.cache_dir('forecast')
+    create_forecast_model(df, cache_dir=cache_dir)
+    return lambda: create_forecast_model(df, cache_dir=cache_dir)
+
+
+@case('forecast.predict_next_hours')
+def bench_forecast_predict(data):
+    df = data.df
+    model, scaler, features = create_forecast_model(df, cache_dir=data.cache_dir('forecast'))
+    return lambda: predict_next_hours(df, model, scaler, features)
+
+
+def measure(function, repeat, min_seconds):
+    """
+    Time function repeat times after one warm-up call
+
+    Fast functions are called in a loop of several calls per sample so
+    each sample lasts at least min_seconds.
+
+    Returns:
+    dict: min, median, mean and stdev in seconds per call, and the loop size
+    """
+    start = time.perf_counter()
+    function()
+    once = time.perf_counter() - start
+    number = max(1, int(min_seconds / once)) if once > 0 else 1
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'repeat': repeat,
+        'number': number
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def run(args):
+    names = [name for name in CASES if not args.filter or any(fnmatch.fnmatch(name, f'*{p}*') for p in args.filter)]
+    commit = git_commit()
+    results = []
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), 'aqi-bench')
+    os.makedirs(workdir, exist_ok=True)
+
+    for stations in args.stations:
+        for scale in args.scales:
+            try:
+                data = Dataset(scale, stations, workdir)
+            except ValueError as exc:
+                print(f"skipping {scale}x / {stations} station(s): {exc}")
+                continue
+            print(f"\n{scale}x, {stations} station(s), {data.rows:,d} rows")
+            for name in names:
+                if name.startswith('forecast.') and scale > args.max_forecast_scale:
+                    continue
+                timing = measure(CASES[name](data), args.repeat, args.min_time)
+                results.append(dict(name=name, scale=scale, stations=stations, rows=data.rows, **timing))
+                print(f"  {name:<42} {timing['median'] * 1e3:10.3f} ms  (min {timing['min'] * 1e3:.3f})")
+
+    report = {
+        'commit': commit,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'results': results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{re.sub(r'[^0-9A-Za-z_-]', '_', commit)}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nresults written to {output}")
+
+
+def compare(args):
+    """Print the median ratio new/old of every case present in both runs; exit 1 on a regression"""
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old['machine'] != new['machine']:
+        print("warning: the runs come from different machines or library versions")
+
+    def key(result):
+        return result['name'], result['scale'], result['stations']
+
+    old_results = {key(r): r for r in old['results']}
+    regressions = 0
+    print(f"{'case':<42} {'scale':>6} {'st':>4} {old['commit']:>14} {new['commit']:>14} {'ratio':>7}")
+    for result in new['results']:
+        before = old_results.get(key(result))
+        if before is None:
+            continue
+        ratio = result['median'] / before['median'] if before['median'] else float('inf')
+        flag = ''
+        if ratio > args.threshold:
+            flag, regressions = '  slower', regressions + 1
+        elif ratio < 1 / args.threshold:
+            flag = '  faster'
+        print(f"{result['name']:<42} {result['scale']:>5}x {result['stations']:>4} "
+              f"{before['median'] * 1e3:>11.3f} ms {result['median'] * 1e3:>11.3f} ms {ratio:>7.2f}{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the suite and store the results as JSON')
+    run_parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                            help='Row count multipliers of the bundled dataset')
+    run_parser.add_argument('--stations', type=int, nargs='+', default=[1],
+                            help='Station counts the rows are split over')
+    run_parser.add_argument('--filter', nargs='+', help='Only cases whose name contains one of these')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Samples per case')
+    run_parser.add_argument('--min-time', type=float, default=0.05,
+                            help='Fast cases are looped until a sample takes this many seconds')
+    run_parser.add_argument('--max-forecast-scale', type=int, default=100,
+                            help='Skip the forecast cases above this scale')
+    run_parser.add_argument('--workdir', help='Synthetic data and caches, defaults to a temp directory')
+    run_parser.add_argument('--output', help='Results file, defaults to results/<commit>.json')
+
+    compare_parser = commands.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=1.10,
+                                help='Median ratio above which a case counts as slower')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
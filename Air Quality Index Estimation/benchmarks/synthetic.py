@@ -0,0 +1,125 @@
+"""
+Synthetic AQI datasets scaled up from cleaned_sohna_aqi.csv
+
+The bundled year of hourly readings is repeated to reach `scale` times its
+row count, split over `stations` stations that share the same hours. Each
+station gets its own level (a lognormal factor) and noise, so aggregates
+and forecasts do not see the same year over and over. Generated CSVs are
+kept in a work directory and reused by later runs.
+
+    python benchmarks/synthetic.py --scale 100 --stations 10
+"""
+import os
+import sys
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+from aqi_categories import LABELS, COLOR_NAMES, categorize
+from data_loader import DEFAULT_SOURCE, get_cache_dir
+from geospatial_view import SOHNA_LAT, SOHNA_LON
+
+# datetime64[ns] ends in 2262, so each station can span at most this many years
+MAX_YEARS_PER_STATION = 300
+
+
+def base_readings(source=DEFAULT_SOURCE):
+    """Timestamps and AQI of the bundled year, with gaps interpolated"""
+    df = pd.read_csv(source, usecols=['Datetime', 'AQI'], parse_dates=['Datetime'])
+    df = df.sort_values('Datetime', kind='stable')
+    values = pd.to_numeric(df['AQI'], errors='coerce').interpolate(limit_direction='both')
+    return df['Datetime'].to_numpy(dtype='datetime64[ns]'), values.to_numpy(dtype=float)
+
+
+def station_table(stations, seed=0):
+    """Station names and coordinates spread around Sohna"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Station': [f'Station {i:04d}' for i in range(stations)],
+        'lat': SOHNA_LAT + rng.uniform(-2, 2, stations).round(5),
+        'lon': SOHNA_LON + rng.uniform(-2, 2, stations).round(5),
+    })
+
+
+def scale_frame(scale, stations=1, seed=0, source=DEFAULT_SOURCE):
+    """
+    Readings `scale` times the size of the bundled dataset
+
+    Parameters:
+    scale (int): Row count multiplier (1 reproduces the bundled row count)
+    stations (int): Stations sharing the rows
+    seed (int): Random seed of the levels and noise
+    source (str): CSV the hourly profile is taken from
+
+    Returns:
+    pandas.DataFrame: Days, Hour, AQI, Datetime, Health Risk, Color in the
+        cleaned CSV layout, plus Station when there is more than one
+    """
+    timestamps, values = base_readings(source)
+    hours = len(values) * scale // stations
+    if hours // len(values) > MAX_YEARS_PER_STATION:
+        raise ValueError(f"{scale}x over {stations} station(s) needs more than "
+                         f"{MAX_YEARS_PER_STATION} years per station; use more stations")
+
+    rng = np.random.default_rng(seed)
+    station_hours = timestamps[0] + np.arange(hours).astype('timedelta64[h]')
+    profile = np.resize(values, hours)
+    levels = rng.lognormal(0, 0.15, stations)
+    aqi = (np.tile(profile, stations) * np.repeat(levels, hours)
+           + rng.normal(0, 10, hours * stations))
+    aqi = np.clip(aqi, 0, 500).round(1)
+
+    datetimes = np.tile(station_hours, stations)
+    days = (datetimes.astype('datetime64[D]') - timestamps[0].astype('datetime64[D]')).astype(np.int64) + 1
+    codes = categorize(aqi)
+    frame = pd.DataFrame({
+        'Days': days,
+        'Hour': (datetimes.astype('datetime64[h]').astype(np.int64) % 24),
+        'AQI': aqi,
+        'Datetime': datetimes,
+        'Health Risk': LABELS[codes],
+        'Color': np.asarray(COLOR_NAMES)[codes]
+    })
+    if stations > 1:
+        frame['Station'] = np.repeat(station_table(stations, seed)['Station'].to_numpy(), hours)
+    return frame
+
+
+def synthetic_csv(scale, stations=1, seed=0, workdir=None):
+    """
+    Path of a synthetic CSV, generated on first use
+
+    Parameters:
+    scale (int): Row count multiplier
+    stations (int): Number of stations
+    seed (int): Random seed
+    workdir (str): Where CSVs are kept, defaults to <data cache>/synthetic
+
+    Returns:
+    str: Path of the CSV file
+    """
+    workdir = workdir or os.path.join(get_cache_dir(), 'synthetic')
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f'aqi-{scale}x-{stations}st-seed{seed}.csv')
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        scale_frame(scale, stations, seed).to_csv(tmp_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a scaled-up synthetic AQI CSV")
+    parser.add_argument('--scale', type=int, default=10, help='Row count multiplier')
+    parser.add_argument('--stations', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='Output directory, defaults to <data cache>/synthetic')
+    args = parser.parse_args()
+    print(synthetic_csv(args.scale, args.stations, args.seed, args.workdir))
+
+
+if __name__ == '__main__':
+    main()
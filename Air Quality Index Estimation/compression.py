@@ -0,0 +1,115 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent as they are; compressing them saves
+# less than the Content-Encoding overhead costs
+DEFAULT_MIN_SIZE = 500
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'text/plain',
+)
+
+
+def _quality(params):
+    """q value of an Accept-Encoding entry's parameters: 1 when absent, None when invalid"""
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                q = float(value.strip())
+            except ValueError:
+                return None
+            return q if 0 <= q <= 1 else None
+    return 1.0
+
+
+def choose_encoding(accept_encoding):
+    """
+    Best encoding the client accepts: 'br' when brotli is installed, then 'gzip'
+
+    Each entry's q is parsed as a number, so "gzip;q=0", "gzip; q=0.0" and
+    "gzip;q=0.000" all refuse gzip; "*" stands for every coding not listed.
+    A higher q wins, br before gzip on a tie.
+
+    Parameters:
+    accept_encoding (str): Value of the request's Accept-Encoding header
+
+    Returns:
+    str: 'br', 'gzip' or None
+    """
+    qualities = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = part.split(';')
+        coding = coding.strip().lower()
+        quality = _quality(params)
+        # Entries with an invalid q are ignored
+        if coding and quality is not None:
+            qualities[coding] = quality
+
+    def quality_of(encoding):
+        return qualities.get(encoding, qualities.get('*', 0.0))
+
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best = max(candidates, key=quality_of)
+    return best if quality_of(best) > 0 else None
+
+
+def compress(data, encoding, level=None):
+    """Compress bytes with 'br' or 'gzip' at the given level (None for the default)"""
+    if encoding == 'br':
+        # Quality 5 is close to the best ratio on JSON at a fraction of the cost of 11
+        return brotli.compress(data, quality=5 if level is None else level)
+    return gzip.compress(data, compresslevel=6 if level is None else level)
+
+
+def register_compression(server, min_size=DEFAULT_MIN_SIZE, level=None):
+    """
+    Compress Flask responses (Dash layout, callback payloads, assets) on the fly
+
+    Parameters:
+    server (flask.Flask): Server of the Dash app
+    min_size (int): Smallest body in bytes that is compressed
+    level (int): Compression level, None for the per-encoding default
+    """
+    from flask import request
+
+    # Component bundles (plotly.js alone is several MB) are fingerprinted and never
+    # change, so they are compressed once per encoding
+    static_cache = {}
+
+    @server.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        static = request.path.startswith('/_dash-component-suites/')
+        key = (request.path, encoding)
+        if static and key in static_cache:
+            body = static_cache[key]
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            body = compress(data, encoding, level)
+            if static:
+                static_cache[key] = body
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return compress_response
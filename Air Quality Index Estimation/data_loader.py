@@ -0,0 +1,239 @@
+import os
+import json
+import shutil
+import hashlib
+import urllib.request
+import pandas as pd
+import numpy as np
+from aqi_categories import LABELS, COLOR_NAMES, categorize
+from etl import HOUR_COLUMNS, fill_gaps, melt
+from instrumentation import timed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bundled dataset used when no other source is configured
+DEFAULT_SOURCE = os.path.join(BASE_DIR, 'cleaned_sohna_aqi.csv')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.aqi_cache')
+
+# Bump when the stored layout or the derived columns change
+CACHE_FORMAT = 2
+
+# Columns stored as integer codes plus a list of labels
+CATEGORICAL_COLUMNS = ['Health Risk', 'Color', 'Month_Name', 'Day_of_Week', 'Station']
+
+
+def get_data_source():
+    """Return the configured data source (file path or URL)"""
+    return os.environ.get('AQI_DATA_SOURCE', DEFAULT_SOURCE)
+
+
+def get_cache_dir():
+    """Return the directory holding the columnar cache"""
+    return os.environ.get('AQI_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+def read_csv_frame(path_or_buffer):
+    """
+    Parse the long-form AQI CSV and add the derived columns used by the dashboard
+
+    Parameters:
+    path_or_buffer (str or file-like): CSV with Days, Hour, AQI, Datetime, Health Risk, Color,
+        or a wide daily-hour file like sohna_aqi.csv (converted with etl.py)
+
+    Returns:
+    pandas.DataFrame: Parsed data with Date, Month, Month_Name, Day_of_Week, Hour_Num
+        and Health Risk / Color derived from AQI
+    """
+    df = pd.read_csv(path_or_buffer, encoding='utf-8-sig')
+    if 'Datetime' not in df.columns and set(HOUR_COLUMNS) <= set(df.columns):
+        df = melt(*fill_gaps(df['Days'].to_numpy(dtype=np.int64), df[HOUR_COLUMNS].to_numpy(dtype=float)))
+    return add_derived_columns(df)
+
+
+def add_derived_columns(df):
+    """
+    Parse Datetime and AQI and add the calendar and category columns, in place
+
+    Parameters:
+    df (pandas.DataFrame): Raw readings with Datetime and AQI columns
+
+    Returns:
+    pandas.DataFrame: The same frame
+    """
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    df['Date'] = df['Datetime'].dt.normalize()
+    df['Month'] = df['Datetime'].dt.month
+    df['Month_Name'] = df['Datetime'].dt.strftime('%b')
+    df['Day_of_Week'] = df['Datetime'].dt.day_name()
+    df['Hour_Num'] = df['Datetime'].dt.hour
+
+    df['AQI'] = pd.to_numeric(df['AQI'], errors='coerce')
+
+    # Re-derive the categories from AQI instead of trusting the precomputed columns;
+    # a missing AQI gets a missing category, left out of the category counts
+    codes = categorize(df['AQI'].to_numpy())
+    df['Health Risk'] = pd.Categorical.from_codes(codes, LABELS)
+    df['Color'] = pd.Categorical.from_codes(codes, COLOR_NAMES)
+    return df
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_url(source):
+    return source.startswith('http://') or source.startswith('https://')
+
+
+def _download(url, cache_dir, refresh=False):
+    """Download a remote CSV once into the cache directory"""
+    name = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(cache_dir, f'download-{name}.csv')
+    if refresh or not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with urllib.request.urlopen(url) as response, open(tmp_path, 'wb') as out:
+            shutil.copyfileobj(response, out)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    path = os.path.join(cache_dir, 'meta.json')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _cache_is_valid(meta, path, stat):
+    """
+    Check a cache entry against the source file
+
+    Size and mtime are compared first; only when the mtime changed is the
+    checksum recomputed, so touching the file does not force a rebuild.
+    Returns (valid, checksum_or_None).
+    """
+    if meta is None or meta.get('format') != CACHE_FORMAT:
+        return False, None
+    if meta.get('source') != os.path.abspath(path) or meta.get('size') != stat.st_size:
+        return False, None
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True, meta.get('sha256')
+    checksum = file_checksum(path)
+    return checksum == meta.get('sha256'), checksum
+
+
+def _write_store(df, cache_dir, path, stat, checksum):
+    """Write every column as a .npy file under a checksum-named directory"""
+    store_name = f'store-{checksum[:16]}'
+    store_dir = os.path.join(cache_dir, store_name)
+    tmp_dir = f'{store_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        file_name = f'col{i}.npy'
+        entry = {'name': col, 'file': file_name}
+        series = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            codes, labels = pd.factorize(series, sort=True)
+            values = codes.astype(np.int8 if len(labels) < 128 else np.int32)
+            entry['categories'] = [str(label) for label in labels]
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            values = series.to_numpy(dtype='datetime64[ns]')
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(tmp_dir, file_name), values)
+        columns.append(entry)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+
+    old_meta = _read_meta(cache_dir)
+    _write_meta(cache_dir, {
+        'format': CACHE_FORMAT,
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': checksum,
+        'store': store_name,
+        'rows': len(df),
+        'columns': columns
+    })
+
+    # Drop the previous store once the new meta points elsewhere
+    if old_meta and old_meta.get('store') not in (None, store_name):
+        shutil.rmtree(os.path.join(cache_dir, old_meta['store']), ignore_errors=True)
+
+
+def _load_store(cache_dir, meta, mmap=True):
+    """Rebuild the DataFrame from the memory-mapped column files"""
+    store_dir = os.path.join(cache_dir, meta['store'])
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for entry in meta['columns']:
+        values = np.load(os.path.join(store_dir, entry['file']), mmap_mode=mmap_mode)
+        if 'categories' in entry:
+            data[entry['name']] = pd.Categorical.from_codes(np.asarray(values), entry['categories'])
+        else:
+            data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+@timed('data.load')
+def load_aqi_data(source=None, cache_dir=None, refresh=False, mmap=True):
+    """
+    Load the AQI dataset through the local columnar cache
+
+    The first call parses the CSV, derives the calendar columns and stores
+    each column as a typed .npy file. Later calls memory-map those files
+    instead of parsing text, as long as the source file is unchanged.
+
+    Parameters:
+    source (str): CSV path or URL, defaults to AQI_DATA_SOURCE or the bundled CSV
+    cache_dir (str): Cache directory, defaults to AQI_CACHE_DIR or .aqi_cache
+    refresh (bool): Ignore any existing cache and rebuild it
+    mmap (bool): Memory-map the cached columns instead of reading them into RAM
+
+    Returns:
+    pandas.DataFrame: AQI data including the derived columns
+    """
+    source = source or get_data_source()
+    cache_dir = cache_dir or get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = _download(source, cache_dir, refresh) if _is_url(source) else source
+    stat = os.stat(path)
+
+    meta = _read_meta(cache_dir)
+    valid, checksum = (False, None) if refresh else _cache_is_valid(meta, path, stat)
+    if valid:
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            meta['mtime_ns'] = stat.st_mtime_ns
+            _write_meta(cache_dir, meta)
+        return _load_store(cache_dir, meta, mmap=mmap)
+
+    df = read_csv_frame(path)
+    _write_store(df, cache_dir, path, stat, checksum or file_checksum(path))
+    # Reload from the store so cold and warm starts return identical dtypes
+    return _load_store(cache_dir, _read_meta(cache_dir), mmap=mmap)
+
+
+def get_data_version(cache_dir=None):
+    """Return the checksum of the currently cached dataset, or None"""
+    meta = _read_meta(cache_dir or get_cache_dir())
+    return meta.get('sha256') if meta else None
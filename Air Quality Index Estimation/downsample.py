@@ -0,0 +1,144 @@
+"""
+Downsampling of long time series before they are sent to the browser
+
+A line chart cannot show more points than it has horizontal pixels, so
+series are reduced to about one point per pixel while keeping their visual
+shape:
+
+- lttb: Largest-Triangle-Three-Buckets keeps, in every bucket, the point
+  forming the largest triangle with the point kept in the previous bucket
+  and the mean of the next bucket. Peaks and dips survive, flat stretches
+  are thinned.
+- minmax: keeps the minimum and maximum of every bucket, an exact envelope
+  of the series at the cost of two points per bucket.
+"""
+import numpy as np
+
+# Used when the chart width is not known
+DEFAULT_POINTS = 1000
+
+
+def _bucket_edges(n, n_buckets):
+    # The first and last point form their own buckets, the rest is split evenly
+    return np.linspace(1, n - 1, n_buckets - 1).astype(np.int64)
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Parameters:
+    x (numpy.ndarray): Increasing x values (numbers or datetime64)
+    y (numpy.ndarray): Values, NaN-free
+    n_out (int): Number of points to keep, at least 3
+
+    Returns:
+    numpy.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf = np.asarray(x).astype(np.float64) if np.issubdtype(np.asarray(x).dtype, np.number) \
+        else np.asarray(x).astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+
+    edges = _bucket_edges(n, n_out)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of every bucket, all at once with cumulative sums
+    cx = np.concatenate(([0.0], np.cumsum(xf)))
+    cy = np.concatenate(([0.0], np.cumsum(yf)))
+    sizes = ends - starts
+    mean_x = (cx[ends] - cx[starts]) / sizes
+    mean_y = (cy[ends] - cy[starts]) / sizes
+    # The bucket after the last one is the final point
+    next_x = np.append(mean_x[1:], xf[-1])
+    next_y = np.append(mean_y[1:], yf[-1])
+
+    # The anchor of each bucket depends on the point picked in the previous one,
+    # so buckets are visited in order; the work inside a bucket is vectorized
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    anchor = 0
+    for b in range(len(starts)):
+        lo, hi = starts[b], ends[b]
+        ax, ay = xf[anchor], yf[anchor]
+        areas = np.abs((ax - next_x[b]) * (yf[lo:hi] - ay) - (ax - xf[lo:hi]) * (next_y[b] - ay))
+        anchor = lo + int(np.argmax(areas))
+        keep[b + 1] = anchor
+    return keep
+
+
+def minmax(x, y, n_out):
+    """
+    Min/max envelope downsampling
+
+    Parameters:
+    x (numpy.ndarray): Increasing x values
+    y (numpy.ndarray): Values, NaN-free
+    n_out (int): Approximate number of points to keep (two per bucket)
+
+    Returns:
+    numpy.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    n_buckets = n_out // 2
+    if n_buckets < 1 or n <= n_out:
+        return np.arange(n)
+
+    # Pad to a whole number of equal buckets so one reshape covers the whole series
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    valid = ~np.all(np.isnan(blocks), axis=1)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.nanargmin(np.where(valid[:, None], blocks, 0), axis=1)
+    highs = offsets + np.nanargmax(np.where(valid[:, None], blocks, 0), axis=1)
+    keep = np.unique(np.concatenate([lows[valid], highs[valid], [0, n - 1]]))
+    return keep
+
+
+def downsample(x, y, n_out=DEFAULT_POINTS, method='lttb'):
+    """
+    Reduce a series to about n_out points with the given method
+
+    Parameters:
+    x (numpy.ndarray): Increasing x values
+    y (numpy.ndarray): Values; NaN points are dropped first
+    n_out (int): Target number of points, usually the chart width in pixels
+    method (str): 'lttb' or 'minmax'
+
+    Returns:
+    tuple: (x, y) of the kept points
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    if method == 'lttb':
+        keep = lttb(x, y, n_out)
+    elif method == 'minmax':
+        keep = minmax(x, y, n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[keep], y[keep]
+
+
+def relayout_range(relayout_data):
+    """
+    Visible x range from a graph's relayoutData
+
+    Returns:
+    tuple: (start, end) strings after a zoom or pan, (None, None) after a reset
+        or when the range did not change
+    """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'][:2])
+    return None, None
@@ -0,0 +1,229 @@
+"""
+Wide-to-long conversion of daily AQI matrices
+
+Raw exports such as sohna_aqi.csv have one row per day (a "Days" counter
+from 1) and one "HH:00:00" column per hour. The dashboard reads the long
+form with one row per reading:
+
+    Days,Hour,AQI,Datetime,Health Risk,Color
+
+Missing hours are filled by linear interpolation between the same hour of
+the neighbouring days, which is how cleaned_sohna_aqi.csv was produced.
+Inputs are read in chunks of days, so files of any length stream through in
+constant memory; only the rows whose gaps are still open are carried over
+to the next chunk, and at most --max-gap-days of them: a gap that stays
+open longer (a dead sensor) is forward-filled from its last reading.
+
+Regenerate the bundled file (rows come out in time order):
+    python etl.py sohna_aqi.csv -o cleaned_sohna_aqi.csv
+
+Several stations or years at once:
+    python etl.py station_a_2024.csv station_b_2024.csv --year 2024 -o long.csv
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from aqi_categories import LABELS, COLOR_NAMES, categorize
+
+HOUR_COLUMNS = [f'{hour:02d}:00:00' for hour in range(24)]
+LONG_COLUMNS = ['Days', 'Hour', 'AQI', 'Datetime', 'Health Risk', 'Color']
+
+# Day 1 of the bundled file is 1900-01-01
+DEFAULT_YEAR = 1900
+
+# Days a gap may stay open before the held rows are forward-filled and released
+DEFAULT_MAX_GAP_DAYS = 31
+
+
+def read_wide_chunks(path, chunksize=10000):
+    """
+    Yield (days, values) blocks of a wide daily-hour file
+
+    Parameters:
+    path (str): CSV with a Days column and the 24 HH:00:00 columns; a BOM on the header is fine
+    chunksize (int): Days per block
+
+    Yields:
+    tuple: (int64 array of day numbers, float (n_days, 24) array with NaN for missing hours)
+    """
+    reader = pd.read_csv(
+        path, encoding='utf-8-sig', usecols=['Days'] + HOUR_COLUMNS,
+        dtype={column: 'float64' for column in HOUR_COLUMNS}, chunksize=chunksize
+    )
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk['Days'].to_numpy(dtype=np.int64), chunk[HOUR_COLUMNS].to_numpy()
+
+
+class GapFiller:
+    """
+    Fills missing hours by interpolating between days, one block at a time
+
+    A block is released up to the first day with a gap that is not yet
+    closed by a later day; the remaining days wait for the next block. The
+    last complete day is kept as the left edge of the next interpolation.
+
+    Parameters:
+    max_hold_days (int): Most days held back; older ones are released with
+        their open gaps forward-filled. None holds until the gap closes
+    """
+
+    def __init__(self, max_hold_days=DEFAULT_MAX_GAP_DAYS):
+        self.max_hold_days = max_hold_days
+        self._days = np.empty(0, dtype=np.int64)
+        self._values = np.empty((0, 24))
+        self._context = None
+
+    def push(self, days, values):
+        """Add a block and return the (days, values) that can now be released"""
+        days = np.concatenate([self._days, days])
+        values = np.vstack([self._values, values])
+
+        # First day of the trailing run of NaNs in each hour column
+        valid = ~np.isnan(values)
+        last_valid = np.where(valid.any(axis=0), len(values) - 1 - np.argmax(valid[::-1], axis=0), -1)
+        release = int(min(len(values), (last_valid + 1).min()))
+        if self.max_hold_days is not None:
+            # Past the cap, the open gaps have nothing to their right yet and
+            # take the last known value
+            release = max(release, len(values) - self.max_hold_days)
+
+        filled = self._fill(values[:release], values[release:])
+        self._days, self._values = days[release:], values[release:]
+        if release:
+            self._context = filled[-1]
+        return days[:release], filled
+
+    def flush(self):
+        """Release the held days; trailing gaps take the last known value"""
+        filled = self._fill(self._values, None)
+        days = self._days
+        self._days, self._values, self._context = self._days[:0], self._values[:0], None
+        return days, filled
+
+    def _fill(self, values, lookahead):
+        if not len(values):
+            return values
+        frame = [values]
+        if self._context is not None:
+            frame.insert(0, self._context[None, :])
+        if lookahead is not None and len(lookahead):
+            frame.append(lookahead)
+        frame = pd.DataFrame(np.vstack(frame)).interpolate(limit_direction='both').to_numpy()
+        start = 0 if self._context is None else 1
+        return frame[start:start + len(values)]
+
+
+def fill_gaps(days, values):
+    """Interpolate the missing hours of a whole (n_days, 24) matrix at once"""
+    filler = GapFiller(max_hold_days=None)
+    released_days, released = filler.push(days, values)
+    held_days, held = filler.flush()
+    return np.concatenate([released_days, held_days]), np.vstack([released, held])
+
+
+def melt(days, values, year=DEFAULT_YEAR, station=None):
+    """
+    Reshape a (n_days, 24) block into the long schema
+
+    Parameters:
+    days (numpy.ndarray): Day number of every row, 1 for January 1st
+    values (numpy.ndarray): AQI per day (rows) and hour (columns)
+    year (int): Year the day numbers count from
+    station (str): Adds a Station column when given
+
+    Returns:
+    pandas.DataFrame: One row per (day, hour), in time order
+    """
+    n_days = len(days)
+    day_col = np.repeat(days, 24)
+    hour_col = np.tile(np.arange(24), n_days)
+    aqi = values.ravel()
+
+    start = np.datetime64(f'{year:04d}-01-01', 'h')
+    datetimes = start + (day_col - 1) * 24 + hour_col
+    codes = categorize(aqi)
+
+    long = pd.DataFrame({
+        'Days': day_col,
+        'Hour': hour_col,
+        'AQI': aqi,
+        'Datetime': datetimes.astype('datetime64[ns]'),
+        'Health Risk': pd.Categorical.from_codes(codes, LABELS),
+        'Color': pd.Categorical.from_codes(codes, COLOR_NAMES)
+    })
+    if station is not None:
+        long.insert(0, 'Station', station)
+    return long
+
+
+def convert(inputs, output, chunksize=10000, year=DEFAULT_YEAR, stations=None,
+            max_gap_days=DEFAULT_MAX_GAP_DAYS):
+    """
+    Convert wide files into one long CSV, streaming chunk by chunk
+
+    Parameters:
+    inputs (list): Wide CSV paths
+    output (str or file-like): Destination CSV
+    chunksize (int): Days read per chunk
+    year (int): Year day 1 of every input falls on
+    stations (list): Station name per input, or None to leave out the Station column
+    max_gap_days (int): Days a gap may stay open before it is forward-filled
+
+    Returns:
+    dict: rows, seconds and rows_per_second
+    """
+    started = time.perf_counter()
+    rows = 0
+    header = True
+    for i, path in enumerate(inputs):
+        station = stations[i] if stations else None
+        filler = GapFiller(max_gap_days)
+        blocks = (filler.push(days, values) for days, values in read_wide_chunks(path, chunksize))
+        for days, values in _chain(blocks, filler.flush):
+            if not len(days):
+                continue
+            long = melt(days, values, year=year, station=station)
+            long.to_csv(output, mode='w' if header else 'a', header=header, index=False,
+                        date_format='%Y-%m-%d %H:%M:%S')
+            header = False
+            rows += len(long)
+    seconds = time.perf_counter() - started
+    return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else float('inf')}
+
+
+def _chain(blocks, flush):
+    yield from blocks
+    yield flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert wide daily-hour AQI files to the long schema")
+    parser.add_argument('inputs', nargs='+', help='Wide CSV files (Days plus 00:00:00 .. 23:00:00)')
+    parser.add_argument('-o', '--output', required=True, help="Long CSV to write, '-' for stdout")
+    parser.add_argument('--chunksize', type=int, default=10000, help='Days per chunk')
+    parser.add_argument('--max-gap-days', type=int, default=DEFAULT_MAX_GAP_DAYS,
+                        help='Days a gap may stay open before it is forward-filled from the last reading')
+    parser.add_argument('--year', type=int, default=DEFAULT_YEAR, help='Year of day 1')
+    parser.add_argument('--station', action='append', default=None,
+                        help='Station name per input (repeat for each); '
+                             'defaults to the file name when there are several inputs')
+    args = parser.parse_args(argv)
+
+    stations = args.station
+    if stations is None and len(args.inputs) > 1:
+        stations = [os.path.splitext(os.path.basename(path))[0] for path in args.inputs]
+    if stations is not None and len(stations) != len(args.inputs):
+        parser.error('give one --station per input')
+
+    output = sys.stdout if args.output == '-' else args.output
+    stats = convert(args.inputs, output, args.chunksize, args.year, stations, args.max_gap_days)
+    print(f"{stats['rows']:,d} rows in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/sec)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import json
+import time
+import zlib
+import base64
+import threading
+from collections import OrderedDict
+import numpy as np
+import plotly.io as pio
+from instrumentation import timed
+
+# Shorter numeric arrays stay plain JSON lists; the base64 envelope is not worth it
+TYPED_ARRAY_MIN_LENGTH = 16
+
+# Integer types plotly.js reads, narrowest first; it has no 64-bit integers
+_INT_TYPES = [('u1', np.uint8), ('i2', np.int16), ('i4', np.int32)]
+
+
+def _typed_array(values):
+    """{dtype, bdata[, shape]} spec for a numeric array, or None when it does not apply"""
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iuf' or array.size < TYPED_ARRAY_MIN_LENGTH or array.ndim > 2:
+        return None
+    # Use the narrowest type that holds every value exactly: whole numbers (AQI
+    # readings, hours, counts) fit a 1-2 byte integer and half-point readings a
+    # float32, both smaller than their decimal text; float64 is the fallback
+    dtype = 'f8'
+    if array.dtype.kind == 'f' and np.array_equal(array.astype(np.float32), array, equal_nan=True):
+        dtype = 'f4'
+    if array.dtype.kind in 'iu' or np.all(np.isfinite(array)) and np.all(array == np.round(array)):
+        low, high = array.min(), array.max()
+        for name, int_type in _INT_TYPES:
+            info = np.iinfo(int_type)
+            if info.min <= low and high <= info.max:
+                dtype = name
+                break
+    bdata = base64.b64encode(np.ascontiguousarray(array.astype('<' + dtype)).tobytes())
+    # Regular or rounded values (hourly timestamps, coordinates to 5 decimals) can
+    # compress better as text than as base64; keep whichever is smaller once gzipped
+    text = json.dumps(array.tolist()).encode('utf-8')
+    if len(zlib.compress(bdata, 6)) > len(zlib.compress(text, 6)):
+        return None
+    spec = {'dtype': dtype, 'bdata': bdata.decode('ascii')}
+    if array.ndim == 2:
+        spec['shape'] = f'{array.shape[0]},{array.shape[1]}'
+    return spec
+
+
+def _encode_value(value):
+    if isinstance(value, dict):
+        return {key: _encode_value(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray) or (isinstance(value, (list, tuple)) and len(value) >= TYPED_ARRAY_MIN_LENGTH
+                                         and all(isinstance(item, (int, float)) and not isinstance(item, bool)
+                                                 for item in value)):
+        spec = _typed_array(value)
+        if spec is not None:
+            return spec
+    return value
+
+
+def encode_typed_arrays(figure):
+    """
+    Replace the numeric arrays of a figure's traces with base64 typed arrays
+
+    plotly.js (2.28 and later) reads {'dtype': 'f8', 'bdata': ...} wherever
+    it accepts a data array, which is parsed without converting every number
+    from a string and is usually smaller than decimal text. Arrays that
+    compress better as text stay lists; dates, strings and layout values are
+    left as they are.
+
+    Parameters:
+    figure (plotly.graph_objects.Figure or dict): Figure to encode
+
+    Returns:
+    dict: Figure dict with 'data' and 'layout'
+    """
+    figure = figure if isinstance(figure, dict) else figure.to_plotly_json()
+    encoded = dict(figure)
+    encoded['data'] = [_encode_value(trace) for trace in figure.get('data', [])]
+    return encoded
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of serialized Plotly figures
+
+    Figures are stored as JSON strings, keyed by a tuple that should include
+    the version of whatever the figure is built from, so a refresh never
+    serves a stale figure. Figures built from the dashboard data are also
+    tagged with its data version, which invalidate() compares; figures of
+    other sources (the forecast) carry no tag and are left alone.
+
+    Numeric trace arrays are stored as base64 typed arrays unless
+    typed_arrays is False. Safe to share between request threads.
+    """
+
+    def __init__(self, maxsize=64, typed_arrays=True):
+        self.maxsize = maxsize
+        self.typed_arrays = typed_arrays
+        self._entries = OrderedDict()
+        # Data version of each tagged entry
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+        self.last_build_seconds = 0.0
+
+    def get_or_build(self, key, builder, data_version=None):
+        """
+        Return the cached figure for key, building and storing it on a miss
+
+        Parameters:
+        key (tuple): Cache key, e.g. (view_type, chart_type, data_version)
+        builder (callable): Returns a plotly Figure when called with no arguments
+        data_version (str): Version of the dashboard data the figure is built
+            from, for invalidate(); None for figures of other sources
+
+        Returns:
+        dict: Figure as a plain dict, ready to be returned from a Dash callback
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            return json.loads(cached)
+
+        # Build outside the lock so a slow figure does not block other keys
+        start = time.perf_counter()
+        with timed(f'figure.{key[0]}'):
+            figure = builder()
+        if self.typed_arrays:
+            figure = encode_typed_arrays(figure)
+        serialized = pio.to_json(figure, validate=False)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.build_seconds += elapsed
+            self.last_build_seconds = elapsed
+            self._entries[key] = serialized
+            self._entries.move_to_end(key)
+            if data_version is not None:
+                self._versions[key] = data_version
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._versions.pop(evicted, None)
+                self.evictions += 1
+        return json.loads(serialized)
+
+    def invalidate(self, version=None):
+        """
+        Drop cached figures
+
+        Parameters:
+        version (str): When given, drop only the figures tagged with another
+            data version; otherwise clear everything.
+        """
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                self._versions.clear()
+            else:
+                for key in [k for k, v in self._versions.items() if v != version]:
+                    del self._entries[key]
+                    del self._versions[key]
+
+    def stats(self):
+        """Hit/miss counters and build timings as a dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'build_seconds_total': self.build_seconds,
+                'build_seconds_avg': self.build_seconds / self.misses if self.misses else 0.0,
+                'build_seconds_last': self.last_build_seconds
+            }
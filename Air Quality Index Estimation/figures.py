@@ -0,0 +1,484 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from aggregates import MONTH_ORDER, DAY_ORDER
+from downsample import DEFAULT_POINTS, downsample
+from aqi_categories import COLOR_MAP, COLORS, categorize
+from analytics import ROLLING_WINDOWS, DEFAULT_THRESHOLDS, DEFAULT_PERCENTILES
+
+# plotly.express is imported inside the builders that use it: it is the slowest
+# import of the dashboard and is not needed until the first figure is built
+
+# Dark theme shared by every dashboard figure, registered once as a Plotly template.
+# Based on plotly_dark, keeping only the parts the dashboard's trace types use so the
+# template embedded in each figure stays small.
+TEMPLATE = 'aqi_dark'
+
+_plotly_dark = pio.templates['plotly_dark']
+pio.templates[TEMPLATE] = go.layout.Template(
+    layout=dict(
+        colorway=_plotly_dark.layout.colorway,
+        autotypenumbers='strict',
+        hovermode='closest',
+        hoverlabel=dict(align='left'),
+        margin=dict(l=40, r=40, t=20, b=40),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(15,16,32,0.3)',
+        font=dict(
+            family="Rajdhani, sans-serif",
+            color='#ffffff'
+        ),
+        title=dict(
+            x=0.05,
+            font=dict(
+                family="Orbitron, sans-serif",
+                color='#ffffff'
+            )
+        ),
+        xaxis=dict(
+            showgrid=False,
+            zeroline=False,
+            showline=True,
+            linecolor='rgba(255, 255, 255, 0.2)',
+            ticks='',
+            title=dict(standoff=15),
+            automargin=True
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(255, 255, 255, 0.1)',
+            zeroline=False,
+            showline=True,
+            linecolor='rgba(255, 255, 255, 0.2)',
+            ticks='',
+            title=dict(standoff=15),
+            automargin=True
+        ),
+        coloraxis=dict(colorbar=dict(outlinewidth=0, ticks='')),
+        annotationdefaults=dict(arrowcolor='#f2f5fa', arrowhead=0, arrowwidth=1),
+        mapbox=dict(style='dark')
+    ),
+    data=dict(
+        bar=[go.Bar(marker=dict(line=dict(color='rgb(17,17,17)', width=0.5)))],
+        pie=[go.Pie(automargin=True)],
+        scatter=[go.Scatter(marker=dict(line=dict(color='#283442')))]
+    )
+)
+
+# Create a color mapping dictionary for consistency
+color_map = COLOR_MAP
+
+# Futuristic color palette
+futuristic_colors = {
+    'primary': '#00f5d4',      # Bright teal
+    'secondary': '#9d4edd',    # Purple
+    'accent1': '#ff3864',      # Neon pink
+    'accent2': '#2de2e6',      # Cyan
+    'accent3': '#f6f740',      # Yellow
+    'accent4': '#ff6c11',      # Orange
+    'background': '#0f1020',   # Dark blue-black
+    'surface': '#1a1b3a',      # Slightly lighter blue
+    'text': '#ffffff',         # White
+    'textSecondary': '#b3b3cc' # Light purple-gray
+}
+
+
+def build_health_gauge(cube):
+    """Donut of the share of readings in each health risk category"""
+    health_percentages = cube.health_risk_counts()
+    health_percentages['Percentage'] = (health_percentages['Count'] / health_percentages['Count'].sum()) * 100
+    return go.Figure(
+        data=[
+            go.Pie(
+                values=health_percentages['Percentage'],
+                labels=health_percentages['Health Risk'],
+                hole=0.7,
+                textinfo='none',
+                hoverinfo='label+percent',
+                marker=dict(
+                    colors=[color_map.get(risk, '#CCCCCC') for risk in health_percentages['Health Risk']],
+                    line=dict(color=futuristic_colors['background'], width=1)
+                ),
+                direction='clockwise',
+                sort=False
+            )
+        ],
+        layout=go.Layout(
+            template=TEMPLATE,
+            showlegend=False,
+            margin=dict(l=0, r=0, t=0, b=0),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            height=220,
+            annotations=[
+                dict(
+                    text=f"<b>{cube.mean:.1f}</b><br>AQI",
+                    x=0.5, y=0.5,
+                    font=dict(size=20, color=futuristic_colors['primary']),
+                    showarrow=False
+                )
+            ]
+        )
+    )
+
+
+def _epoch_ms(times):
+    return np.asarray(times, dtype='datetime64[ms]').astype(np.int64)
+
+
+def build_trend_figure(timestamps, values, n_points=DEFAULT_POINTS):
+    """Hourly AQI readings, downsampled to about one point per pixel of chart width"""
+    import plotly.express as px
+    x, y = downsample(timestamps, values, n_points)
+    # Milliseconds since the epoch on a date axis: plotly.js shows them as dates,
+    # and as numbers they travel as a typed array instead of ISO strings
+    x = _epoch_ms(x)
+    return px.line(
+        pd.DataFrame({'Date': x, 'AQI': y}),
+        x='Date',
+        y='AQI',
+        labels={'AQI': 'Air Quality Index', 'Date': 'Date'},
+        template=TEMPLATE
+    ).update_traces(
+        line=dict(width=2, color=futuristic_colors['primary'])
+    ).update_layout(
+        hovermode='x unified',
+        xaxis=dict(type='date'),
+        # Keep the user's zoom when the zoomed range is re-queried at full detail
+        uirevision='trend'
+    )
+
+
+def build_health_risk_figure(cube):
+    """Distribution of readings over the health risk categories"""
+    import plotly.express as px
+    return px.pie(
+        cube.health_risk_counts(),
+        values='Count',
+        names='Health Risk',
+        color='Health Risk',
+        color_discrete_map=color_map,
+        hole=0.6,
+        template=TEMPLATE
+    ).update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hoverinfo='label+percent+value',
+        marker=dict(line=dict(color=futuristic_colors['background'], width=2))
+    ).update_layout(
+        margin=dict(l=20, r=20, t=20, b=20),
+        plot_bgcolor='rgba(0,0,0,0)',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.2,
+            xanchor="center",
+            x=0.5,
+            font=dict(
+                family="Rajdhani, sans-serif",
+                color='#ffffff'
+            )
+        )
+    )
+
+
+def build_hourly_figure(cube):
+    """Average AQI by hour of day"""
+    import plotly.express as px
+    return px.bar(
+        cube.hourly_avg(),
+        x='Hour_Num',
+        y='AQI',
+        labels={'AQI': 'Average AQI', 'Hour_Num': 'Hour of Day'},
+        template=TEMPLATE
+    ).update_traces(
+        marker_color=futuristic_colors['accent2'],
+        marker=dict(
+            line=dict(width=0),
+            opacity=0.8
+        )
+    ).update_layout(
+        xaxis=dict(
+            tickmode='array',
+            tickvals=list(range(0, 24)),
+            ticktext=[f"{i}:00" for i in range(0, 24)]
+        )
+    )
+
+
+def build_monthly_figure(cube):
+    """Average AQI by month"""
+    import plotly.express as px
+    return px.line(
+        cube.monthly_avg(),
+        x='Month_Name',
+        y='AQI',
+        markers=True,
+        labels={'AQI': 'Average AQI', 'Month_Name': 'Month'},
+        template=TEMPLATE
+    ).update_traces(
+        line=dict(width=3, color=futuristic_colors['accent1']),
+        marker=dict(size=10, color=futuristic_colors['accent1'])
+    ).update_layout(
+        xaxis=dict(
+            categoryorder='array',
+            categoryarray=MONTH_ORDER
+        )
+    )
+
+
+def build_day_of_week_figure(cube):
+    """Average AQI by day of week"""
+    import plotly.express as px
+    return px.bar(
+        cube.day_of_week_avg(),
+        x='Day_of_Week',
+        y='AQI',
+        labels={'AQI': 'Average AQI', 'Day_of_Week': 'Day'},
+        template=TEMPLATE
+    ).update_traces(
+        marker_color=futuristic_colors['secondary'],
+        marker=dict(
+            line=dict(width=0),
+            opacity=0.8
+        )
+    ).update_layout(
+        xaxis=dict(
+            categoryorder='array',
+            categoryarray=DAY_ORDER
+        )
+    )
+
+
+def build_heatmap_figure(cube):
+    """Average AQI by day of week and hour of day"""
+    return go.Figure(
+        data=go.Heatmap(
+            z=cube.weekday_hour_matrix(),
+            x=list(range(0, 24)),
+            y=DAY_ORDER,
+            coloraxis='coloraxis',
+            hovertemplate='Hour of Day=%{x}<br>Day of Week=%{y}<br>Average AQI=%{z:.1f}<extra></extra>'
+        ),
+        layout=go.Layout(
+            template=TEMPLATE,
+            xaxis=dict(title='Hour of Day'),
+            yaxis=dict(title='Day of Week'),
+            coloraxis=dict(
+                colorscale=[
+                    [0, '#00e400'],  # Good
+                    [0.2, '#ffff00'],  # Moderate
+                    [0.4, '#ff7e00'],  # Unhealthy for Sensitive Groups
+                    [0.6, '#ff0000'],  # Unhealthy
+                    [0.8, '#99004c'],  # Very Unhealthy
+                    [1, '#7e0023']    # Hazardous
+                ]
+            )
+        )
+    ).update_layout(
+        xaxis=dict(
+            tickmode='array',
+            tickvals=list(range(0, 24)),
+            ticktext=[f"{i}:00" for i in range(0, 24)]
+        ),
+        yaxis=dict(
+            categoryorder='array',
+            categoryarray=DAY_ORDER,
+            showgrid=False
+        ),
+        coloraxis=dict(
+            colorbar=dict(
+                title='AQI',
+                title_font=dict(
+                    family="Rajdhani, sans-serif",
+                    color='#ffffff'
+                ),
+                tickfont=dict(
+                    family="Rajdhani, sans-serif",
+                    color='#ffffff'
+                ),
+                tickvals=[50, 100, 150, 200, 300, 400],
+                ticktext=['Good', 'Moderate', 'Unhealthy for Sensitive', 'Unhealthy', 'Very Unhealthy', 'Hazardous']
+            )
+        )
+    )
+
+
+def build_rolling_figure(analytics, start=None, end=None, n_points=DEFAULT_POINTS):
+    """Hourly AQI with its trailing 8h and 24h averages, each downsampled to the chart width"""
+    # The dashboard shows the first (for Sohna, the only) station
+    hours, hourly = analytics.hourly(start, end)
+    lines = [('Hourly', hourly[0], dict(width=1, color='rgba(179,179,204,0.35)'))]
+    for window, color in zip(ROLLING_WINDOWS, (futuristic_colors['primary'], futuristic_colors['accent1'])):
+        _, means = analytics.rolling_mean(window, start, end)
+        lines.append((f'{window}h average', means[0], dict(width=2, color=color)))
+
+    fig = go.Figure(layout=go.Layout(
+        template=TEMPLATE,
+        xaxis=dict(type='date', title='Date'),
+        yaxis=dict(title='AQI'),
+        legend=dict(orientation='h', y=1.12, x=0)
+    ))
+    for name, values, line in lines:
+        x, y = downsample(hours, values, n_points)
+        # Epoch milliseconds on a date axis, as for the trend chart
+        fig.add_trace(go.Scatter(x=_epoch_ms(x), y=y, name=name, mode='lines', line=line))
+    for threshold in DEFAULT_THRESHOLDS:
+        fig.add_hline(y=threshold, line=dict(color=COLORS[categorize(threshold) + 1], width=1, dash='dot'))
+    return fig
+
+
+def build_exceedance_figure(analytics, start=None, end=None):
+    """Hours per day above each threshold, with the longest run above the lowest one"""
+    daily = analytics.exceedance_hours(DEFAULT_THRESHOLDS, start=start, end=end)
+    daily = daily[daily['Station'] == analytics.stations[0]]
+    above = [daily[f'Hours > {threshold:g}'].to_numpy() for threshold in DEFAULT_THRESHOLDS] + [0]
+
+    fig = go.Figure(layout=go.Layout(
+        template=TEMPLATE,
+        barmode='stack',
+        bargap=0.1,
+        xaxis=dict(title='Date'),
+        yaxis=dict(title='Hours', range=[0, 24]),
+        legend=dict(orientation='h', y=1.12, x=0)
+    ))
+    # One band per pair of thresholds, so each bar adds up to the hours above the lowest
+    for k, threshold in enumerate(DEFAULT_THRESHOLDS):
+        upper = DEFAULT_THRESHOLDS[k + 1] if k + 1 < len(DEFAULT_THRESHOLDS) else None
+        fig.add_trace(go.Bar(
+            x=daily['Date'],
+            y=above[k] - above[k + 1],
+            name=f'AQI {threshold}-{upper}' if upper else f'AQI > {threshold}',
+            marker=dict(color=COLORS[categorize(threshold) + 1])
+        ))
+
+    streak = analytics.longest_exceedances(DEFAULT_THRESHOLDS[0], start=start, end=end).iloc[0]
+    if streak['Hours']:
+        text = f"Longest run above {DEFAULT_THRESHOLDS[0]}: {streak['Hours']} h from {streak['Start']:%Y-%m-%d %H:00}"
+    else:
+        text = f"No hour above {DEFAULT_THRESHOLDS[0]}"
+    fig.add_annotation(
+        text=text, x=1, y=1.12, xref='paper', yref='paper', xanchor='right', showarrow=False,
+        font=dict(family="Rajdhani, sans-serif", size=13, color=futuristic_colors['textSecondary'])
+    )
+    return fig
+
+
+def build_percentile_figure(analytics, start=None, end=None, period='month'):
+    """Median and high percentiles of the hourly AQI per period"""
+    table = analytics.period_percentiles(period, DEFAULT_PERCENTILES, start=start, end=end)
+    table = table[(table['Station'] == analytics.stations[0]) & (table['Hours'] > 0)]
+    colors = [futuristic_colors['accent2'], futuristic_colors['accent4'], futuristic_colors['accent1']]
+
+    fig = go.Figure(layout=go.Layout(
+        template=TEMPLATE,
+        xaxis=dict(title=period.capitalize()),
+        yaxis=dict(title='AQI'),
+        legend=dict(orientation='h', y=1.12, x=0)
+    ))
+    for q, color in zip(DEFAULT_PERCENTILES, colors):
+        fig.add_trace(go.Scatter(
+            x=table['Period'],
+            y=table[f'P{q:g}'],
+            name='Median' if q == 50 else f'{q:g}th percentile',
+            mode='lines+markers',
+            line=dict(width=2, color=color)
+        ))
+    return fig
+
+
+def build_forecast_figure(forecast_data):
+    """Line chart of the published forecast"""
+    import plotly.express as px
+    return px.line(
+        forecast_data,
+        x='Datetime',
+        y='Predicted_AQI',
+        labels={'Predicted_AQI': 'Predicted AQI', 'Datetime': 'Time'},
+        template=TEMPLATE
+    ).update_traces(
+        line=dict(width=3, color=futuristic_colors['accent3'])
+    )
+
+
+def build_placeholder(text):
+    """Empty dark figure with a centered message, shown until real data is available"""
+    fig = go.Figure(layout=go.Layout(template=TEMPLATE))
+    fig.update_layout(
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[
+            dict(
+                text=text,
+                x=0.5, y=0.5, xref='paper', yref='paper',
+                font=dict(family="Rajdhani, sans-serif", size=16, color='#b3b3cc'),
+                showarrow=False
+            )
+        ]
+    )
+    return fig
+
+
+def build_interactive_figure(cube, view_type, n_points=DEFAULT_POINTS):
+    """
+    Base figure of the interactive explorer for one view type
+
+    Line traces, or bars colored by category for the health view; the
+    browser restyles it as a line, bar or scatter chart (setChartType in
+    assets/clientside.js), so the chart types are not built here.
+    """
+    import plotly.express as px
+    if view_type == 'daily':
+        data_df = cube.daily_avg()
+        if len(data_df) > n_points:
+            dates, aqi = downsample(data_df['Date'].to_numpy(), data_df['AQI'].to_numpy(), n_points)
+            data_df = pd.DataFrame({'Date': dates, 'AQI': aqi})
+        fig = px.line(
+            data_df,
+            x='Date',
+            y='AQI',
+            labels={'AQI': 'Air Quality Index', 'Date': 'Date'},
+            title='Daily AQI Values',
+            template=TEMPLATE
+        )
+        color = futuristic_colors['primary']
+    elif view_type == 'hourly':
+        fig = px.line(
+            cube.hourly_avg(),
+            x='Hour_Num',
+            y='AQI',
+            markers=True,
+            labels={'AQI': 'Air Quality Index'},
+            title='Hourly AQI Pattern',
+            template=TEMPLATE
+        )
+        fig.update_layout(
+            xaxis=dict(
+                tickmode='array',
+                tickvals=list(range(0, 24)),
+                ticktext=[f"{i}:00" for i in range(0, 24)]
+            )
+        )
+        color = futuristic_colors['accent2']
+    else:  # health risk
+        # Average AQI for each health risk category, derived from the cube
+        fig = px.bar(
+            cube.health_risk_avg(),
+            x='Health Risk',
+            y='AQI',
+            color='Health Risk',
+            color_discrete_map=color_map,
+            labels={'AQI': 'Average AQI'},
+            title='Average AQI by Health Risk Category',
+            template=TEMPLATE
+        )
+        color = None  # The category colors
+
+    # Explorer figures have a title, so they need more room at the top
+    fig.update_layout(margin=dict(t=40))
+
+    if color is not None:
+        fig.update_traces(marker_color=color, line=dict(width=3, color=color))
+
+    return fig
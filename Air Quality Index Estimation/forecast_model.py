@@ -1,22 +1,245 @@
+import os
+import glob
+import hashlib
 import pandas as pd
 import numpy as np
+from data_loader import get_cache_dir
+from instrumentation import timed
 
-def create_forecast_model(df):
-    """Simple test function"""
-    print("Creating forecast model...")
-    # Return dummy values for testing
-    model = "dummy_model"
-    scaler = "dummy_scaler"
-    features = ["dummy_feature"]
-    return model, scaler, features
+# Bump when features or the model change so old cached models are ignored
+MODEL_FORMAT = 1
 
+LAGS = 24
+ROLLING_WINDOWS = [6, 24, 168]
+HISTORY = max(LAGS, max(ROLLING_WINDOWS))
+
+# Fitted models kept in the cache directory; every data version writes a new
+# one, so older ones are deleted once there are more
+MAX_CACHED_MODELS = 4
+
+
+class FeatureScaler:
+    """Standardizes feature columns with the mean/std seen during fitting"""
+
+    def __init__(self, mean=None, scale=None):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def fit(self, X):
+        self.mean_ = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        return self
+
+    def transform(self, X):
+        return (X - self.mean_) / self.scale_
+
+
+class DirectRidgeForecaster:
+    """
+    Ridge regression predicting every horizon at once
+
+    Each output column is one horizon (t+1 ... t+H). All horizons share the
+    same closed-form solve, and prediction is a single matrix product, so
+    there is no recursive feeding of predictions back into the model.
+    """
+
+    def __init__(self, horizon=24, alpha=1.0, coef=None, intercept=None):
+        self.horizon = horizon
+        self.alpha = alpha
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def fit(self, X, Y):
+        y_mean = Y.mean(axis=0)
+        gram = X.T @ X + self.alpha * np.eye(X.shape[1])
+        self.coef_ = np.linalg.solve(gram, X.T @ (Y - y_mean))
+        self.intercept_ = y_mean
+        return self
+
+    def predict(self, X):
+        return X @ self.coef_ + self.intercept_
+
+
+def hourly_series(df):
+    """
+    Turn the readings into a regular hourly series
+
+    Parameters:
+    df (pandas.DataFrame): Readings with Datetime and AQI columns
+
+    Returns:
+    tuple: (timestamps as datetime64[ns] array, AQI float array) with every
+        hour between the first and last reading; gaps are interpolated.
+    """
+    series = (
+        pd.Series(pd.to_numeric(df['AQI'], errors='coerce').to_numpy(dtype=float),
+                  index=pd.DatetimeIndex(df['Datetime']))
+        .groupby(level=0).mean()
+        .sort_index()
+    )
+    series = series.asfreq('h').interpolate(limit_direction='both')
+    return series.index.to_numpy(), series.to_numpy()
+
+
+def feature_names():
+    names = [f'lag_{k}' for k in range(LAGS)]
+    names += [f'rolling_mean_{w}' for w in ROLLING_WINDOWS]
+    names += [f'hour_{h}' for h in range(24)]
+    names += [f'dow_{d}' for d in range(7)]
+    return names
+
+
+def build_features(timestamps, values, origins):
+    """
+    Build the feature matrix for many forecast origins at once
+
+    Parameters:
+    timestamps (numpy.ndarray): Hourly datetime64 timestamps
+    values (numpy.ndarray): AQI value for each timestamp
+    origins (numpy.ndarray): Indices of the last observed hour for each row,
+        each at least HISTORY - 1
+
+    Returns:
+    numpy.ndarray: (len(origins), n_features) matrix, columns as in feature_names()
+    """
+    origins = np.asarray(origins)
+    lags = values[origins[:, None] - np.arange(LAGS)[None, :]]
+
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    rolling = np.stack(
+        [(cumsum[origins + 1] - cumsum[origins + 1 - w]) / w for w in ROLLING_WINDOWS],
+        axis=1
+    )
+
+    origin_times = timestamps[origins]
+    hours = ((origin_times - origin_times.astype('datetime64[D]')) // np.timedelta64(1, 'h')).astype(np.intp)
+    weekdays = (origin_times.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    hour_onehot = np.eye(24)[hours]
+    dow_onehot = np.eye(7)[weekdays]
+
+    return np.hstack([lags, rolling, hour_onehot, dow_onehot])
+
+
+def build_training_set(timestamps, values, horizon):
+    """Feature matrix and (n, horizon) target matrix for every usable origin"""
+    origins = np.arange(HISTORY - 1, len(values) - horizon)
+    X = build_features(timestamps, values, origins)
+    Y = values[origins[:, None] + np.arange(1, horizon + 1)[None, :]]
+    return X, Y
+
+
+def _data_hash(timestamps, values, horizon, alpha):
+    digest = hashlib.sha256()
+    digest.update(f'{MODEL_FORMAT}:{horizon}:{alpha}'.encode('utf-8'))
+    digest.update(np.ascontiguousarray(timestamps).view(np.int64).tobytes())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _load_cached(path):
+    with np.load(path) as data:
+        model = DirectRidgeForecaster(
+            horizon=int(data['horizon']), alpha=float(data['alpha']),
+            coef=data['coef'], intercept=data['intercept']
+        )
+        scaler = FeatureScaler(data['mean'], data['scale'])
+    return model, scaler
+
+
+def _save_cached(path, model, scaler):
+    tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(
+        tmp_path, horizon=model.horizon, alpha=model.alpha, coef=model.coef_,
+        intercept=model.intercept_, mean=scaler.mean_, scale=scaler.scale_
+    )
+    os.replace(tmp_path, path)
+
+
+def _prune_cache(cache_dir, keep=MAX_CACHED_MODELS):
+    """Delete all but the keep most recently used cached models"""
+    paths = glob.glob(os.path.join(cache_dir, 'forecast-*.npz'))
+    used = {}
+    for path in paths:
+        try:
+            used[path] = os.path.getmtime(path)
+        except OSError:
+            pass
+    for path in sorted(used, key=used.get, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # already removed by another process
+
+
+@timed('forecast.create_forecast_model')
+def create_forecast_model(df, horizon=24, alpha=1.0, cache_dir=None):
+    """
+    Fit (or load from the disk cache) the direct multi-horizon forecaster
+
+    Parameters:
+    df (pandas.DataFrame): Readings with Datetime and AQI columns
+    horizon (int): Number of hours predicted per origin
+    alpha (float): Ridge regularization strength
+    cache_dir (str): Where fitted models are stored, defaults to the data cache
+
+    Returns:
+    tuple: (model, scaler, features)
+    """
+    timestamps, values = hourly_series(df)
+    if len(values) < HISTORY + horizon:
+        raise ValueError(f"Need at least {HISTORY + horizon} hours of data, got {len(values)}")
+
+    cache_dir = cache_dir or get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'forecast-{_data_hash(timestamps, values, horizon, alpha)}.npz')
+    if os.path.exists(path):
+        model, scaler = _load_cached(path)
+        # Mark it as recently used, so pruning keeps it
+        os.utime(path)
+        return model, scaler, feature_names()
+
+    X, Y = build_training_set(timestamps, values, horizon)
+    scaler = FeatureScaler().fit(X)
+    model = DirectRidgeForecaster(horizon=horizon, alpha=alpha).fit(scaler.transform(X), Y)
+    _save_cached(path, model, scaler)
+    _prune_cache(cache_dir)
+    return model, scaler, feature_names()
+
+
+@timed('forecast.predict_next_hours')
 def predict_next_hours(df, model, scaler, features, hours=24):
-    """Simple test function"""
-    print(f"Predicting AQI for next {hours} hours...")
-    # Return dummy forecast data
-    dates = pd.date_range(start=pd.Timestamp.now(), periods=hours, freq='H')
+    """
+    Predict the AQI for the hours following the last reading
+
+    Parameters:
+    df (pandas.DataFrame): Readings with Datetime and AQI columns
+    model (DirectRidgeForecaster): Model from create_forecast_model
+    scaler (FeatureScaler): Scaler from create_forecast_model
+    features (list): Feature names from create_forecast_model
+    hours (int): Number of hours to predict, at most the model horizon
+
+    Returns:
+    pandas.DataFrame: Datetime and Predicted_AQI for each of the next hours
+
+    Raises:
+    ValueError: When df holds fewer than HISTORY hours
+    """
+    if list(features) != feature_names():
+        raise ValueError("Model was built with a different feature set; refit it with create_forecast_model")
+    if hours > model.horizon:
+        raise ValueError(f"Model predicts at most {model.horizon} hours ahead, asked for {hours}")
+
+    timestamps, values = hourly_series(df)
+    # With fewer hours the lag and rolling windows would wrap around to the end of the series
+    if len(values) < HISTORY:
+        raise ValueError(f"Need at least {HISTORY} hours of data to forecast, got {len(values)}")
+    X = build_features(timestamps, values, np.array([len(values) - 1]))
+    predictions = model.predict(scaler.transform(X))[0, :hours]
+
+    dates = pd.date_range(start=timestamps[-1] + np.timedelta64(1, 'h'), periods=hours, freq='h')
     forecast_data = pd.DataFrame({
         'Datetime': dates,
-        'Predicted_AQI': np.random.randint(50, 200, size=hours)
+        'Predicted_AQI': np.clip(predictions, 0, None)
     })
-    return forecast_data
\ No newline at end of file
+    return forecast_data
@@ -0,0 +1,177 @@
+import os
+import time
+import pickle
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from forecast_model import create_forecast_model, predict_next_hours
+from data_loader import load_aqi_data, get_cache_dir
+from ingest import read_log
+from instrumentation import registry, timed
+
+logger = logging.getLogger(__name__)
+
+
+def compute_forecast(df, hours=24):
+    """Fit (or load) the forecast model and predict the next hours"""
+    model, scaler, features = create_forecast_model(df)
+    return predict_next_hours(df, model, scaler, features, hours=hours)
+
+
+def compute_forecast_measured(df, hours=24):
+    """compute_forecast for a worker process: also returns the timings recorded there"""
+    return compute_forecast(df, hours), registry.drain()
+
+
+class ForecastStore:
+    """
+    Holds the most recently published forecast
+
+    publish() swaps a single immutable tuple, so readers always see a
+    complete (version, published_at, forecast) snapshot without locking.
+
+    With a path, the snapshot is also written to that file with an atomic
+    rename, and latest() picks up snapshots published by other processes.
+    This lets every web worker read forecasts from one scheduler process.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._latest = None
+        self._file_signature = None
+        self._lock = threading.Lock()
+
+    def publish(self, forecast):
+        with self._lock:
+            previous = self.latest()
+            version = previous[0] + 1 if previous else 1
+            snapshot = (version, time.time(), forecast)
+            if self.path:
+                tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path)
+            self._latest = snapshot
+        return version
+
+    def latest(self):
+        """Return (version, published_at, forecast DataFrame), or None before the first publish"""
+        if self.path:
+            self._reload_if_changed()
+        return self._latest
+
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._file_signature:
+            return
+        with open(self.path, 'rb') as f:
+            self._latest = pickle.load(f)
+        self._file_signature = signature
+
+
+class ForecastScheduler:
+    """
+    Periodically refits the forecast off the request path
+
+    Each run pulls the current data from get_data, computes the forecast in
+    a separate process (so a long fit never holds the GIL of the web
+    process) and publishes the result to the store.
+    """
+
+    def __init__(self, get_data, store, interval_seconds=900, hours=24, use_process=True):
+        self.get_data = get_data
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.hours = hours
+        self.use_process = use_process
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        """Start the background thread; returns immediately"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='forecast-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def run_forever(self):
+        """Refit and publish every interval_seconds until stop() is called"""
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_seconds)
+
+    def run_once(self):
+        """Compute and publish one forecast; errors are logged and the last forecast kept"""
+        try:
+            df = self.get_data()
+            if self.use_process:
+                if self._executor is None:
+                    # spawn avoids forking a process that has web server threads running
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context('spawn')
+                    )
+                with timed('forecast.refresh'):
+                    forecast, samples = self._executor.submit(compute_forecast_measured, df, self.hours).result()
+                # Fit and predict ran in the worker; bring their timings to this process
+                registry.merge(samples)
+            else:
+                with timed('forecast.refresh'):
+                    forecast = compute_forecast(df, self.hours)
+        except Exception as exc:
+            self.last_error = exc
+            logger.exception("Forecast refresh failed")
+            return None
+        self.last_error = None
+        return self.store.publish(forecast)
+
+
+def load_with_ingested(log_path):
+    """The dataset plus the readings ingested into log_path, for a scheduler outside the web processes"""
+    df = load_aqi_data()
+    ingested = read_log(log_path)
+    if not len(ingested):
+        return df
+    return pd.concat([df[['Datetime', 'AQI']], ingested[['Datetime', 'AQI']]], ignore_index=True)
+
+
+def main():
+    """Run the scheduler as a standalone process publishing to a shared store file"""
+    parser = argparse.ArgumentParser(description="Periodically refit and publish the AQI forecast")
+    parser.add_argument('--store', required=True, help='Forecast store file shared with the web workers')
+    parser.add_argument('--interval', type=int, default=900, help='Seconds between refits')
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--ingest-log', default=os.environ.get('AQI_INGEST_LOG'),
+                        help='Ingest log whose readings extend the dataset, defaults to the one App.py follows')
+    args = parser.parse_args()
+    log_path = args.ingest_log or os.path.join(get_cache_dir(), 'ingest.log')
+
+    logging.basicConfig(level=logging.INFO)
+    # Already off the request path, so fit in this process
+    scheduler = ForecastScheduler(
+        lambda: load_with_ingested(log_path), ForecastStore(args.store),
+        interval_seconds=args.interval, hours=args.hours, use_process=False
+    )
+    scheduler.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,102 +1,138 @@
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from aqi_categories import LABELS, COLORS, MISSING_COLOR, MISSING_LABEL, categorize, lookup
+from interpolation import interpolated_grid, interpolation_trace
+from figures import TEMPLATE
+from instrumentation import timed
 
-def create_geospatial_view(current_aqi):
+# Sohna coordinates (approximate)
+SOHNA_LAT = 28.2500
+SOHNA_LON = 77.0700
+
+KM_PER_DEGREE_LAT = 111
+
+# Above this many stations the area circles are left out; the markers alone
+# keep the figure size proportional to the number of stations
+MAX_CIRCLE_STATIONS = 500
+
+
+def sohna_station(current_aqi):
+    """The single bundled station as a stations frame"""
+    return pd.DataFrame({'Station': ['Sohna'], 'lat': [SOHNA_LAT], 'lon': [SOHNA_LON], 'AQI': [current_aqi]})
+
+
+def circle_coordinates(lats, lons, radius_km=5, points=100):
+    """
+    Circle outlines around many stations at once
+
+    Parameters:
+    lats (numpy.ndarray): Station latitudes
+    lons (numpy.ndarray): Station longitudes
+    radius_km (float): Circle radius
+    points (int): Segments per circle
+
+    Returns:
+    tuple: (lat, lon) arrays of shape (n_stations, points + 1), each row a closed circle
+    """
+    lats = np.asarray(lats, dtype=float)[:, None]
+    lons = np.asarray(lons, dtype=float)[:, None]
+    angles = np.linspace(0, 2 * np.pi, points + 1)[None, :]
+
+    # Convert radius from km to degrees (approximate), adjusting longitude for latitude
+    radius_lat = radius_km / KM_PER_DEGREE_LAT
+    radius_lon = radius_km / (KM_PER_DEGREE_LAT * np.cos(np.radians(lats)))
+    return lats + radius_lat * np.sin(angles), lons + radius_lon * np.cos(angles)
+
+
+def _join_paths(paths):
+    # NaN breaks the line between circles, so many circles fit in one trace
+    breaks = np.full((paths.shape[0], 1), np.nan)
+    return np.hstack([paths, breaks]).ravel()
+
+
+@timed('figure.create_geospatial_view')
+def create_geospatial_view(current_aqi=None, stations=None, radius_km=5, points=100,
+                           interpolation_resolution=None, timestamp=None):
     """
-    Create a geospatial view of Sohna showing the current AQI level
-    
+    Create a geospatial view showing the current AQI level of one or many stations
+
     Parameters:
-    current_aqi (float): Current AQI value
-    
+    current_aqi (float): Current AQI value of Sohna, used when stations is not given
+    stations (pandas.DataFrame): Station, lat, lon and AQI columns, one row per station
+    radius_km (float): Radius of the area circle drawn around each station
+    points (int): Segments per circle
+    interpolation_resolution (float): Grid spacing in degrees of an IDW layer drawn
+        under the stations; None leaves the layer out
+    timestamp: Time of the readings, used to cache the interpolated grid
+
     Returns:
     plotly.graph_objects.Figure: Plotly figure with geospatial view
     """
-    
-    # Sohna coordinates (approximate)
-    sohna_lat = 28.2500
-    sohna_center_long = 77.0700
-    
-    # Create color based on AQI
-    if current_aqi <= 50:
-        color = '#00e400'  # Good
-        category = 'Good'
-    elif current_aqi <= 100:
-        color = '#ffff00'  # Moderate
-        category = 'Moderate'
-    elif current_aqi <= 150:
-        color = '#ff7e00'  # Unhealthy for Sensitive Groups
-        category = 'Unhealthy for Sensitive Groups'
-    elif current_aqi <= 200:
-        color = '#ff0000'  # Unhealthy
-        category = 'Unhealthy'
-    elif current_aqi <= 300:
-        color = '#99004c'  # Very Unhealthy
-        category = 'Very Unhealthy'
-    else:
-        color = '#7e0023'  # Hazardous
-        category = 'Hazardous'
-    
-    # Create a simple map centered on Sohna
-    fig = go.Figure()
-    
-    # Add a marker for Sohna
+    if stations is None:
+        stations = sohna_station(current_aqi)
+
+    lats = stations['lat'].to_numpy(dtype=float)
+    lons = stations['lon'].to_numpy(dtype=float)
+    aqi = stations['AQI'].to_numpy(dtype=float)
+    codes = categorize(aqi)
+    # Stations without a reading are drawn in the neutral missing color
+    colors = lookup(COLORS, codes, MISSING_COLOR)
+
+    fig = go.Figure(layout=go.Layout(template=TEMPLATE))
+
+    # Interpolated AQI between the stations, drawn first so it stays underneath
+    if interpolation_resolution is not None:
+        grid = interpolated_grid(stations, interpolation_resolution, timestamp=timestamp)
+        fig.add_trace(interpolation_trace(grid, interpolation_resolution))
+
+    # Circles: one line trace per AQI category present, however many stations there are
+    if len(stations) <= MAX_CIRCLE_STATIONS:
+        circle_lats, circle_lons = circle_coordinates(lats, lons, radius_km, points)
+        for code in np.unique(codes):
+            selected = codes == code
+            fig.add_trace(go.Scattermapbox(
+                lat=_join_paths(circle_lats[selected]).round(5),
+                lon=_join_paths(circle_lons[selected]).round(5),
+                mode='lines',
+                line=dict(
+                    width=2,
+                    color=lookup(COLORS, code, MISSING_COLOR)
+                ),
+                hoverinfo='none'
+            ))
+
+    # Markers: all stations in a single trace with per-point colors
     fig.add_trace(go.Scattermapbox(
-        lat=[sohna_lat],
-        lon=[sohna_center_long],
+        lat=lats,
+        lon=lons,
         mode='markers',
         marker=dict(
-            size=20,
-            color=color,
+            size=20 if len(stations) == 1 else 10,
+            color=colors,
             opacity=0.8
         ),
-        text=[f"Sohna: AQI {current_aqi:.1f} ({category})"],
-        hoverinfo='text'
-    ))
-    
-    # Add a circle to represent the area affected
-    # Create a circle of points around Sohna
-    radius_km = 5  # 5 km radius
-    points = 100  # number of points to create a smooth circle
-    
-    # Convert radius from km to degrees (approximate)
-    radius_lat = radius_km / 111  # 1 degree latitude is approximately 111 km
-    radius_long = radius_km / (111 * np.cos(np.radians(sohna_lat)))  # Adjust for longitude
-    
-    # Generate circle points
-    circle_lats = []
-    circle_longs = []
-    for i in range(points + 1):
-        angle = (i / points) * 2 * np.pi
-        circle_lats.append(sohna_lat + radius_lat * np.sin(angle))
-        circle_longs.append(sohna_center_long + radius_long * np.cos(angle))
-    
-    # Add the circle to the map
-    fig.add_trace(go.Scattermapbox(
-        lat=circle_lats,
-        lon=circle_longs,
-        mode='lines',
-        line=dict(
-            width=2,
-            color=color
-        ),
-        hoverinfo='none'
+        customdata=np.column_stack([stations['Station'].astype(str).to_numpy(), lookup(LABELS, codes, MISSING_LABEL)]),
+        hovertemplate='%{customdata[0]}: AQI %{text} (%{customdata[1]})<extra></extra>',
+        text=np.char.mod('%.1f', aqi)
     ))
-    
+
     # Set up the map layout
+    if len(stations) == 1:
+        center, zoom = dict(lat=float(lats[0]), lon=float(lons[0])), 10
+    else:
+        center = dict(lat=float(np.mean(lats)), lon=float(np.mean(lons)))
+        span = max(np.ptp(lats), np.ptp(lons), 1e-3)
+        zoom = float(np.clip(np.log2(360 / span) - 1, 1, 10))
+
     fig.update_layout(
         mapbox=dict(
-            style="dark",
-            zoom=10,
-            center=dict(
-                lat=sohna_lat,
-                lon=sohna_center_long
-            )
+            zoom=zoom,
+            center=center
         ),
         margin=dict(l=0, r=0, t=0, b=0),
-        paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)',
         showlegend=False
     )
-    
-    return fig
\ No newline at end of file
+
+    return fig
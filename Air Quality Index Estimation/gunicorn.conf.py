@@ -0,0 +1,83 @@
+import gc
+import os
+import sys
+import tempfile
+import subprocess
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('AQI_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('AQI_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('AQI_THREADS', 1))
+timeout = 60
+
+# Import App.py once in the master: the dataset (memory-mapped from the cache),
+# the cube and the layout are then shared with the workers copy-on-write.
+# AQI_PRELOAD=0 starts listening at once instead and each worker imports App.py
+# in the background, answering /healthz and /readyz meanwhile (see wsgi.py):
+# faster cold starts when autoscaling, more memory per worker.
+preload_app = os.environ.setdefault('AQI_PRELOAD', '1') == '1'
+
+# Workers only read forecasts; one scheduler process writes them
+os.environ['AQI_FORECAST_SCHEDULER'] = '0'
+os.environ.setdefault('AQI_FORECAST_STORE', os.path.join(tempfile.gettempdir(), f'aqi-forecast-{os.getpid()}.pkl'))
+
+# Threads do not survive the fork, so when preloading each worker starts its own
+# log follower and data source watcher; otherwise App.py starts it in the worker that imports it
+if preload_app:
+    os.environ['AQI_INGEST_FOLLOW'] = '0'
+    os.environ['AQI_DATA_WATCH'] = '0'
+# The file tail / socket sources run once, in the process started by when_ready
+os.environ['AQI_INGEST_SOURCES'] = '0'
+
+_scheduler = None
+_sources = None
+
+
+def when_ready(server):
+    global _scheduler, _sources
+    # Move everything allocated while preloading into the permanent GC generation,
+    # so collections in the workers do not touch (and copy) those pages
+    gc.freeze()
+
+    from data_loader import get_cache_dir
+    log_path = os.environ.get('AQI_INGEST_LOG', os.path.join(get_cache_dir(), 'ingest.log'))
+
+    # The scheduler forecasts from the dataset plus the readings ingested into the log
+    _scheduler = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, 'forecast_scheduler.py'),
+         '--store', os.environ['AQI_FORECAST_STORE'],
+         '--interval', os.environ.get('AQI_FORECAST_INTERVAL', '900'),
+         '--ingest-log', log_path],
+        cwd=BASE_DIR,
+        # Background work: yield the CPU to workers that are still starting or serving
+        preexec_fn=lambda: os.nice(10)
+    )
+    server.log.info("Forecast scheduler started (pid %s)", _scheduler.pid)
+
+    # One process feeds the file tail / socket sources into the shared ingest log
+    tail, socket_address = os.environ.get('AQI_INGEST_TAIL'), os.environ.get('AQI_INGEST_SOCKET')
+    if tail or socket_address:
+        command = [sys.executable, os.path.join(BASE_DIR, 'ingest.py'), 'sources', '--log', log_path]
+        if tail:
+            command += ['--tail', tail]
+        if socket_address:
+            command += ['--socket', socket_address]
+        _sources = subprocess.Popen(command, cwd=BASE_DIR)
+        server.log.info("Ingestion sources started (pid %s)", _sources.pid)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import App
+        App.ingestion.start()
+        if App.DATA_WATCH_SECONDS > 0:
+            App.watch_data_source(App.DATA_WATCH_SECONDS)
+
+
+def on_exit(server):
+    for process in (_scheduler, _sources):
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
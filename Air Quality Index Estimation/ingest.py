@@ -0,0 +1,577 @@
+"""
+Streaming ingestion of live AQI readings
+
+Readings arrive from a tailed file, a TCP socket or an HTTP POST endpoint.
+Every reading is first appended to an on-disk log, which is the source of
+truth: a follower thread in each web process reads the log and applies new
+readings to an in-memory ring buffer and to the AQI cube, one O(1) cell
+update per reading. Because all processes follow the same log, every
+gunicorn worker ends up with the same aggregates no matter which worker
+received the reading.
+
+The HTTP endpoint rewrites the dashboard's data, so the app only serves it
+when AQI_INGEST_TOKEN is set, to requests carrying that token as
+"Authorization: Bearer <token>", and with at most AQI_INGEST_MAX_RECORDS
+readings per request. The TCP source takes the same token as the first
+line of a connection ("Bearer <token>"); without one it only listens on
+loopback.
+
+A replay generator feeds an existing long-form CSV at accelerated speed:
+    AQI_INGEST_TOKEN=... python ingest.py replay --target http://127.0.0.1:8050/ingest --speedup 3600
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import logging
+import argparse
+import threading
+import socketserver
+import urllib.request
+import numpy as np
+import pandas as pd
+from data_loader import DEFAULT_SOURCE
+
+logger = logging.getLogger(__name__)
+
+# Readings accepted by one POST /ingest, and the request size allowed per reading
+DEFAULT_MAX_RECORDS = 1000
+MAX_RECORD_BYTES = 256
+
+# Addresses the TCP source may listen on without a token
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+
+def parse_reading(record):
+    """
+    Normalize one reading into (datetime64[ns], float, station)
+
+    Parameters:
+    record (dict, str or tuple): {"Datetime": ..., "AQI": ..., "Station": ...}, a
+        "timestamp,aqi[,station]" line or a (timestamp, aqi[, station]) tuple;
+        the station is optional
+
+    Returns:
+    tuple: (numpy.datetime64, float, str or None)
+
+    Raises:
+    ValueError: A field is missing, the time does not parse, or the AQI is
+        not a finite number of at least 0
+    """
+    if isinstance(record, dict):
+        for field in ('Datetime', 'AQI'):
+            if record.get(field) is None:
+                raise ValueError(f"missing field {field}")
+        timestamp, value, station = record['Datetime'], record['AQI'], record.get('Station')
+    elif isinstance(record, str):
+        fields = record.strip().split(',')
+        if len(fields) not in (2, 3):
+            raise ValueError(f"expected 'timestamp,aqi[,station]', got {record.strip()!r}")
+        timestamp, value, station = (fields + [None])[:3]
+    else:
+        fields = tuple(record) if isinstance(record, (tuple, list)) else (record,)
+        if len(fields) not in (2, 3):
+            raise ValueError(f"expected a (timestamp, aqi[, station]) tuple, got {record!r}")
+        timestamp, value, station = (fields + (None,))[:3]
+
+    try:
+        timestamp = pd.Timestamp(timestamp)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"invalid Datetime {timestamp!r}") from None
+    if pd.isna(timestamp):
+        raise ValueError("missing field Datetime")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid AQI {value!r}") from None
+    # NaN would show as the current reading and inf would poison every aggregate
+    if not np.isfinite(value) or value < 0:
+        raise ValueError(f"AQI must be a finite number of at least 0, got {value!r}")
+    if station is not None:
+        station = str(station).strip()
+        # The log stores one comma-separated line per reading
+        if not station or ',' in station or '\n' in station:
+            raise ValueError(f"invalid Station {station!r}")
+    return np.datetime64(timestamp.tz_localize(None), 'ns'), value, station
+
+
+def _format_line(timestamp, value, station=None):
+    """A reading as a "timestamp,aqi[,station]" log line"""
+    line = f'{np.datetime_as_string(timestamp, unit="s")},{float(value)!r}'
+    return f'{line},{station}\n' if station is not None else line + '\n'
+
+
+def _add_to_analytics(analytics, timestamps, values, stations):
+    """
+    Add readings to the per-station grid
+
+    Readings without a station belong to the grid's only station; with
+    several stations they are left out, as there is no telling whose they are.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=float)
+    stations = np.asarray(stations, dtype=object)
+    unnamed = np.array([station is None for station in stations], dtype=bool)
+    if unnamed.all() and len(analytics.stations) == 1:
+        analytics.add_readings(timestamps, values)
+        return
+    if unnamed.any():
+        if len(analytics.stations) == 1:
+            stations = np.where(unnamed, analytics.stations[0], stations)
+        else:
+            logger.warning("%d readings without a Station left out of the analytics of %d stations",
+                           int(unnamed.sum()), len(analytics.stations))
+            timestamps, values, stations = timestamps[~unnamed], values[~unnamed], stations[~unnamed]
+    if len(values):
+        analytics.add_readings(timestamps, values, stations)
+
+
+class ReadingRingBuffer:
+    """Fixed-size buffer of the most recent readings, oldest overwritten first"""
+
+    def __init__(self, capacity=24 * 30):
+        self.capacity = capacity
+        self._timestamps = np.empty(capacity, dtype='datetime64[ns]')
+        self._values = np.empty(capacity, dtype=float)
+        self._stations = np.empty(capacity, dtype=object)
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, value, station=None):
+        with self._lock:
+            self._timestamps[self._next] = timestamp
+            self._values[self._next] = value
+            self._stations[self._next] = station
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def latest(self):
+        """Most recently appended (timestamp, value), or None when empty"""
+        with self._lock:
+            if not self._size:
+                return None
+            i = (self._next - 1) % self.capacity
+            return self._timestamps[i], float(self._values[i])
+
+    def snapshot(self):
+        """Copy of the buffered readings in arrival order, as (timestamps, values, stations)"""
+        with self._lock:
+            order = (np.arange(self._size) + self._next - self._size) % self.capacity
+            return self._timestamps[order], self._values[order], self._stations[order]
+
+
+class AppendLog:
+    """
+    On-disk log of readings, one "timestamp,aqi[,station]" line each
+
+    Writers from any process append whole lines with O_APPEND, so lines
+    never interleave. follow() reads lines as they are written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, readings):
+        lines = ''.join(_format_line(*reading) for reading in readings)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, lines.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def read(self, end=None):
+        """Readings of the complete lines before byte offset end (None for the whole log)"""
+        return _read_readings(self.path, end)
+
+    def follow(self, callback, stop_event, poll_interval=0.5, offset=0):
+        """
+        Call callback(readings, offset) for every batch of complete lines written to the log
+
+        offset is the byte offset just past the batch's last line. Starts
+        reading at offset (0 replays the whole log) and starts over if the
+        log is truncated or replaced. A batch the callback fails on is
+        logged and skipped, so one bad batch does not stop the follower.
+        """
+        inode = None
+        partial = b''
+        while not stop_event.is_set():
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stop_event.wait(poll_interval)
+                continue
+            if inode is None:
+                inode = stat.st_ino
+            if stat.st_ino != inode or stat.st_size < offset:
+                inode, offset, partial = stat.st_ino, 0, b''
+            if stat.st_size > offset:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read(stat.st_size - offset)
+                offset += len(chunk)
+                *lines, partial = (partial + chunk).split(b'\n')
+                readings = []
+                for line in lines:
+                    try:
+                        readings.append(parse_reading(line.decode('utf-8')))
+                    except (ValueError, KeyError):
+                        logger.warning("Skipping malformed log line: %r", line)
+                if readings:
+                    try:
+                        callback(readings, offset - len(partial))
+                    except Exception:
+                        logger.exception("Failed to apply %d readings from %s", len(readings), self.path)
+            else:
+                stop_event.wait(poll_interval)
+
+
+def _read_readings(path, end=None):
+    """Parsed complete lines of a log before byte offset end, skipping malformed ones"""
+    readings = []
+    try:
+        with open(path, 'rb') as f:
+            data = f.read() if end is None else f.read(end)
+    except FileNotFoundError:
+        return readings
+    # A partly written last line is left for later
+    for line in data.split(b'\n')[:-1]:
+        try:
+            readings.append(parse_reading(line.decode('utf-8')))
+        except (ValueError, UnicodeDecodeError):
+            logger.warning("Skipping malformed log line: %r", line)
+    return readings
+
+
+def read_log(path):
+    """
+    Every reading in an append log, as a DataFrame with Datetime, AQI and Station
+
+    A partly written last line and malformed lines are skipped; a missing
+    log gives an empty frame.
+    """
+    readings = _read_readings(path)
+    df = pd.DataFrame(readings, columns=['Datetime', 'AQI', 'Station'])
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    return df
+
+
+class IngestionPipeline:
+    """
+    Accepts readings, logs them and keeps the in-memory state current
+
+    Parameters:
+    log_path (str): Append log shared by every process serving the dashboard
+    cube (AQICube): Aggregates updated in place as readings are applied, None for
+        a process that only feeds sources into the log
+    capacity (int): Number of recent readings kept in the ring buffer, for current()
+    on_update (callable): Called after each applied batch, e.g. to drop cached figures
+    series (TimeSeriesIndex): Time index the readings are also appended to
+    analytics (AQIAnalytics): Hourly grid the readings are also added to, once per batch
+    """
+
+    def __init__(self, log_path, cube, capacity=24 * 30, on_update=None, series=None, analytics=None):
+        self.log = AppendLog(log_path)
+        self.cube = cube
+        self.series = series
+        self.analytics = analytics
+        self.buffer = ReadingRingBuffer(capacity)
+        self.on_update = on_update
+        self.applied = 0
+        # Byte offset in the log up to which readings have been applied
+        self.offset = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, readings):
+        """Validate and log readings; they are applied by the follower thread"""
+        parsed = [parse_reading(r) for r in readings]
+        if parsed:
+            self.log.append(parsed)
+        return len(parsed)
+
+    def apply(self, readings, offset=None):
+        """Apply readings read from the log; offset is where in the log they end"""
+        with self._lock:
+            for timestamp, value, station in readings:
+                self.buffer.append(timestamp, value, station)
+                if self.cube is not None:
+                    self.cube.add_reading(timestamp, value)
+                if self.series is not None:
+                    self.series.append(timestamp, value)
+            if self.analytics is not None and readings:
+                _add_to_analytics(self.analytics, *zip(*readings))
+            self.applied += len(readings)
+            if offset is not None:
+                self.offset = offset
+        if self.on_update is not None:
+            self.on_update()
+
+    def attach_cube(self, cube, series=None, replay=True, analytics=None):
+        """
+        Switch to a rebuilt cube (and time index and analytics)
+
+        With replay, every reading applied so far is read back from the log
+        and added to them: the log, not the ring buffer, holds all of them.
+        """
+        with self._lock:
+            if replay:
+                readings = self.log.read(self.offset)
+                timestamps = np.array([r[0] for r in readings], dtype='datetime64[ns]')
+                values = np.array([r[1] for r in readings], dtype=float)
+                stations = np.array([r[2] for r in readings], dtype=object)
+                cube.add_readings(timestamps, values)
+                if series is not None:
+                    for timestamp, value in zip(timestamps, values):
+                        series.append(timestamp, float(value))
+                if analytics is not None and len(values):
+                    _add_to_analytics(analytics, timestamps, values, stations)
+            self.cube = cube
+            self.series = series
+            self.analytics = analytics
+
+    def current(self):
+        """Latest ingested (timestamp, AQI), or None if nothing arrived yet"""
+        return self.buffer.latest()
+
+    def start(self, poll_interval=0.5):
+        self._stop.clear()
+        self._spawn(self.log.follow, self.apply, self._stop, poll_interval, name='ingest-log-follower')
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            if isinstance(thread, socketserver.BaseServer):
+                thread.shutdown()
+                thread.server_close()
+            else:
+                thread.join(timeout=5)
+        self._threads = []
+
+    def _spawn(self, target, *args, name=None):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    # Sources
+
+    def tail_file(self, path, poll_interval=1.0, from_start=False):
+        """Ingest "timestamp,aqi[,station]" lines appended to another file (e.g. a sensor export)"""
+        offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+        source = AppendLog(path)
+        return self._spawn(source.follow, lambda readings, _: self.submit(readings), self._stop, poll_interval,
+                           offset, name='ingest-tail')
+
+    def serve_socket(self, host='127.0.0.1', port=8765, token=None):
+        """
+        Accept "timestamp,aqi[,station]" lines (or JSON objects) over TCP
+
+        Parameters:
+        host (str): Address to listen on; anything but loopback needs a token
+        port (int): Port to listen on
+        token (str): Shared secret every connection starts with, as a
+            "Bearer <token>" line; None accepts any local client
+        """
+        if not token and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"The ingest socket needs a token to listen on {host}")
+        expected = f'Bearer {token}'.encode('utf-8') if token else None
+        pipeline = self
+
+        class LineHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                if expected is not None:
+                    provided = self.rfile.readline(4096).strip()
+                    if not hmac.compare_digest(provided, expected):
+                        self.wfile.write(b'error missing or wrong token\n')
+                        return
+                for raw in self.rfile:
+                    line = raw.decode('utf-8').strip()
+                    if not line:
+                        continue
+                    try:
+                        pipeline.submit([json.loads(line) if line.startswith('{') else line])
+                    except (ValueError, KeyError, TypeError) as exc:
+                        self.wfile.write(f'error {exc}\n'.encode('utf-8'))
+
+        server = socketserver.ThreadingTCPServer((host, port), LineHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='ingest-socket', daemon=True).start()
+        self._threads.append(server)
+        return server
+
+    def register_endpoint(self, server, token, rule='/ingest', max_records=DEFAULT_MAX_RECORDS):
+        """
+        Add a POST endpoint taking one {"Datetime", "AQI"[, "Station"]} object or a list of them
+
+        Parameters:
+        server (flask.Flask): Server to add the route to
+        token (str): Shared secret, sent as "Authorization: Bearer <token>"
+        rule (str): URL of the endpoint
+        max_records (int): Most readings accepted per request
+        """
+        import flask
+
+        if not token:
+            raise ValueError("The ingest endpoint needs a token")
+        expected = f'Bearer {token}'.encode('utf-8')
+        # Werkzeug reads no more than MAX_CONTENT_LENGTH of any body, chunked ones
+        # included; it applies to the whole app, whose other requests are far smaller
+        limit = min(max_records * MAX_RECORD_BYTES, server.config.get('MAX_CONTENT_LENGTH') or float('inf'))
+        server.config['MAX_CONTENT_LENGTH'] = limit
+
+        def ingest():
+            provided = flask.request.headers.get('Authorization', '').encode('utf-8')
+            if not hmac.compare_digest(provided, expected):
+                return flask.jsonify({'error': 'missing or wrong token'}), 401, {'WWW-Authenticate': 'Bearer'}
+            length = flask.request.content_length
+            if length is None:
+                # Werkzeug cuts a chunked body off at the limit: reaching it means there was more
+                too_large = len(flask.request.get_data()) >= limit
+            else:
+                too_large = length > limit
+            if too_large:
+                return flask.jsonify({'error': f'request body over {limit} bytes'}), 413
+            payload = flask.request.get_json(silent=True)
+            if payload is None:
+                return flask.jsonify({'error': 'expected a JSON body'}), 400
+            records = payload if isinstance(payload, list) else [payload]
+            if len(records) > max_records:
+                return flask.jsonify({'error': f'at most {max_records} readings per request'}), 413
+            try:
+                accepted = self.submit(records)
+            except (ValueError, KeyError, TypeError) as exc:
+                return flask.jsonify({'error': str(exc)}), 400
+            return flask.jsonify({'accepted': accepted}), 202
+
+        server.add_url_rule(rule, 'ingest', ingest, methods=['POST'])
+
+
+def replay_readings(path=DEFAULT_SOURCE, speedup=3600.0, shift_to_now=False, limit=None):
+    """
+    Yield readings from a long-form CSV, sleeping so they arrive at speedup x real time
+
+    Parameters:
+    path (str): CSV with Datetime and AQI columns, and optionally Station
+    speedup (float): 3600 replays one hour of data per second; 0 disables sleeping
+    shift_to_now (bool): Shift timestamps so the first reading is the current hour
+    limit (int): Stop after this many readings
+
+    Yields:
+    tuple: (numpy.datetime64, float, station or None)
+    """
+    df = pd.read_csv(path, usecols=lambda c: c in ('Datetime', 'AQI', 'Station'), parse_dates=['Datetime'])
+    df = df.dropna(subset=['AQI']).sort_values('Datetime', kind='stable')
+    if limit:
+        df = df.head(limit)
+    timestamps = df['Datetime'].to_numpy(dtype='datetime64[ns]')
+    values = df['AQI'].to_numpy(dtype=float)
+    stations = df['Station'].astype(str).to_numpy() if 'Station' in df.columns else [None] * len(df)
+    if shift_to_now and len(timestamps):
+        now = np.datetime64(pd.Timestamp.now().floor('h'), 'ns')
+        timestamps = timestamps - timestamps[0] + now
+
+    started = time.monotonic()
+    for timestamp, value, station in zip(timestamps, values, stations):
+        if speedup:
+            due = (timestamp - timestamps[0]) / np.timedelta64(1, 's') / speedup
+            delay = due - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        yield timestamp, value, station
+
+
+def _send(target, batch, token=None):
+    if target.startswith('http'):
+        body = json.dumps([
+            {'Datetime': np.datetime_as_string(ts, unit='s'), 'AQI': float(value),
+             **({'Station': station} if station is not None else {})}
+            for ts, value, station in batch
+        ]).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        request = urllib.request.Request(target, data=body, headers=headers)
+        urllib.request.urlopen(request, timeout=10).read()
+    elif target.startswith('tcp://'):
+        host, port = target[len('tcp://'):].rsplit(':', 1)
+        import socket
+        lines = ''.join(_format_line(*reading) for reading in batch)
+        with socket.create_connection((host, int(port)), timeout=10) as conn:
+            conn.sendall(((f'Bearer {token}\n' if token else '') + lines).encode('utf-8'))
+    else:
+        AppendLog(target).append(batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AQI ingestion tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replay = subparsers.add_parser('replay', help='Feed a CSV to a running pipeline at accelerated speed')
+    replay.add_argument('--source', default=DEFAULT_SOURCE, help='Long-form CSV with Datetime and AQI')
+    replay.add_argument('--target', required=True,
+                        help='http://host:port/ingest, tcp://host:port or a file path to append to')
+    replay.add_argument('--speedup', type=float, default=3600.0, help='0 sends as fast as possible')
+    replay.add_argument('--shift-to-now', action='store_true', help='Start the replay at the current hour')
+    replay.add_argument('--limit', type=int, default=None)
+    replay.add_argument('--batch', type=int, default=1, help='Readings per request')
+    replay.add_argument('--token', default=os.environ.get('AQI_INGEST_TOKEN'),
+                        help='Token of the HTTP endpoint or socket, defaults to AQI_INGEST_TOKEN')
+    sources = subparsers.add_parser('sources', help='Run the file tail / socket sources, writing to the log')
+    sources.add_argument('--log', required=True, help='Append log followed by the web workers')
+    sources.add_argument('--tail', default=None, help='File of "timestamp,aqi" lines to tail')
+    sources.add_argument('--socket', default=None, help='host:port to accept readings on')
+    sources.add_argument('--token', default=os.environ.get('AQI_INGEST_TOKEN'),
+                         help='Token socket clients must send first, defaults to AQI_INGEST_TOKEN; '
+                              'without one the socket only listens on loopback')
+    args = parser.parse_args(argv)
+
+    if args.command == 'sources':
+        run_sources(args.log, args.tail, args.socket, args.token)
+    else:
+        run_replay(args)
+
+
+def run_sources(log_path, tail=None, socket_address=None, token=None):
+    """Feed the configured sources into the log until interrupted"""
+    logging.basicConfig(level=logging.INFO)
+    pipeline = IngestionPipeline(log_path, cube=None)
+    if tail:
+        pipeline.tail_file(tail)
+    if socket_address:
+        host, port = socket_address.rsplit(':', 1)
+        pipeline.serve_socket(host, int(port), token)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pipeline.stop()
+
+
+def run_replay(args):
+    sent = 0
+    batch = []
+    started = time.perf_counter()
+    for reading in replay_readings(args.source, args.speedup, args.shift_to_now, args.limit):
+        batch.append(reading)
+        if len(batch) >= args.batch:
+            _send(args.target, batch, args.token)
+            sent += len(batch)
+            batch = []
+    if batch:
+        _send(args.target, batch, args.token)
+        sent += len(batch)
+    elapsed = time.perf_counter() - started
+    print(f"sent {sent} readings in {elapsed:.1f}s ({sent / max(elapsed, 1e-9):.0f} readings/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
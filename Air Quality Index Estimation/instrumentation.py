@@ -0,0 +1,361 @@
+"""
+Timing and memory instrumentation of the dashboard's hot paths
+
+Operations are measured with `timed`, as a decorator or a context manager:
+
+    @timed('data.load')
+    def load_aqi_data(...): ...
+
+    with timed('startup.cube'):
+        cube = AQICube.from_frame(df)
+
+Every operation keeps its call count, total time and a window of recent
+samples, from which p50/p95/p99 are computed, along with the change in
+memory across the call. Memory is the process RSS, or the traced Python
+heap when tracemalloc is running (PYTHONTRACEMALLOC=1), which is more
+precise but slower. Both are process-wide, so concurrent requests show up
+in each other's deltas.
+
+register_endpoints() exposes everything as Prometheus text on /metrics and
+adds an optional sampling profiler, switched on per request. Each gunicorn
+worker keeps its own numbers; a scrape sees the worker that answered it.
+
+Set AQI_INSTRUMENTATION=0 to turn measuring off.
+"""
+import os
+import sys
+import time
+import uuid
+import threading
+import functools
+import tracemalloc
+from collections import Counter, OrderedDict
+import numpy as np
+
+ENABLED = os.environ.get('AQI_INSTRUMENTATION', '1') != '0'
+
+# Recent samples kept per operation for the quantiles
+DEFAULT_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """Resident memory of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No procfs (macOS): peak RSS is the closest cheap figure
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def memory_bytes():
+    """Traced Python memory when tracemalloc is running, else the process RSS"""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return rss_bytes()
+
+
+class Metric:
+    """Durations and memory deltas of one instrumented operation"""
+
+    def __init__(self, name, window=DEFAULT_WINDOW):
+        self.name = name
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.total_memory = 0
+        self.max_memory = 0
+        self._seconds = np.zeros(window)
+        self._memory = np.zeros(window, dtype=np.int64)
+
+    def observe(self, seconds, memory_delta=0):
+        position = self.count % len(self._seconds)
+        self._seconds[position] = seconds
+        self._memory[position] = memory_delta
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.total_memory += memory_delta
+        self.max_memory = max(self.max_memory, memory_delta)
+
+    def _recent(self, samples):
+        return samples[:min(self.count, len(samples))]
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Duration quantiles in seconds over the recent window, as a dict"""
+        recent = self._recent(self._seconds)
+        if not len(recent):
+            return {q: 0.0 for q in quantiles}
+        return dict(zip(quantiles, np.quantile(recent, quantiles)))
+
+    def memory_quantiles(self, quantiles=QUANTILES):
+        """Memory delta quantiles in bytes over the recent window, as a dict"""
+        recent = self._recent(self._memory)
+        if not len(recent):
+            return {q: 0.0 for q in quantiles}
+        return dict(zip(quantiles, np.quantile(recent, quantiles)))
+
+    def samples(self):
+        """Recent (seconds, memory delta) samples, oldest first"""
+        n = min(self.count, len(self._seconds))
+        order = (np.arange(n) + (self.count - n)) % len(self._seconds)
+        return list(zip(self._seconds[order].tolist(), self._memory[order].tolist()))
+
+
+class Registry:
+    """Thread-safe collection of metrics and gauges"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._metrics = OrderedDict()
+        self._gauges = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, memory_delta=0):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric(name, self.window)
+            metric.observe(seconds, memory_delta)
+
+    def metric(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def register_gauge(self, name, help_text, function):
+        """
+        Report the value of function() on every scrape
+
+        Parameters:
+        name (str): Prometheus metric name
+        help_text (str): HELP line
+        function (callable): Returns the current value as a number
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, function)
+
+    def drain(self):
+        """Samples recorded so far, as {name: [(seconds, memory delta), ...]}, and reset"""
+        with self._lock:
+            samples = {name: metric.samples() for name, metric in self._metrics.items()}
+            self._metrics.clear()
+        return samples
+
+    def merge(self, samples):
+        """Add samples drained from another process's registry"""
+        for name, observations in samples.items():
+            for seconds, memory_delta in observations:
+                self.observe(name, seconds, memory_delta)
+
+    def stats(self):
+        """Per operation count, total, max and quantiles, as a dict"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                'count': metric.count,
+                'total_seconds': metric.total_seconds,
+                'max_seconds': metric.max_seconds,
+                'quantiles': {str(q): v for q, v in metric.quantiles().items()},
+                'memory_delta_bytes_total': metric.total_memory,
+                'memory_delta_bytes_max': metric.max_memory
+            }
+            for metric in metrics
+        }
+
+    def render_prometheus(self, prefix='aqi'):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = list(self._gauges.items())
+
+        lines = []
+
+        def summary(name, help_text, values):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} summary')
+            for metric, quantiles, total in values:
+                label = f'operation="{metric.name}"'
+                for q, value in quantiles.items():
+                    lines.append(f'{prefix}_{name}{{{label},quantile="{q}"}} {value:.9g}')
+                lines.append(f'{prefix}_{name}_sum{{{label}}} {total:.9g}')
+                lines.append(f'{prefix}_{name}_count{{{label}}} {metric.count}')
+
+        def gauge(name, help_text, values):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            for labels, value in values:
+                lines.append(f'{prefix}_{name}{labels} {value:.9g}')
+
+        summary('operation_duration_seconds', 'Duration of instrumented operations',
+                [(m, m.quantiles(), m.total_seconds) for m in metrics])
+        gauge('operation_duration_seconds_max', 'Longest duration seen per operation',
+              [(f'{{operation="{m.name}"}}', m.max_seconds) for m in metrics])
+        summary('operation_memory_delta_bytes', 'Memory change across instrumented operations',
+                [(m, m.memory_quantiles(), m.total_memory) for m in metrics])
+        gauge('operation_memory_delta_bytes_max', 'Largest memory increase seen per operation',
+              [(f'{{operation="{m.name}"}}', m.max_memory) for m in metrics])
+        gauge('process_resident_memory_bytes', 'Resident memory of this process', [('', rss_bytes())])
+        for name, (help_text, function) in gauges:
+            gauge(name, help_text, [('', float(function()))])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class timed:
+    """
+    Record the duration and memory delta of a function or block under name
+
+    Parameters:
+    name (str): Operation name, e.g. 'aggregate.hourly_avg'
+    registry (Registry): Where samples go, the module registry by default
+    """
+
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry
+
+    def __enter__(self):
+        if ENABLED:
+            self._memory = memory_bytes()
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            seconds = time.perf_counter() - self._start
+            (self.registry or registry).observe(self.name, seconds, memory_bytes() - self._memory)
+        return False
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # A fresh context per call, so concurrent calls do not share start times
+            with timed(self.name, self.registry):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of one thread
+
+    A background thread reads the target thread's stack every interval
+    seconds and counts how often each call stack was seen. The cost is
+    paid by the sampling thread, so the profiled code runs at close to
+    normal speed; very short functions may not be seen at all.
+    """
+
+    def __init__(self, thread_id=None, interval=0.001, max_depth=64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def folded(self):
+        """Stacks in the folded format read by flamegraph tools, most frequent first"""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+    def top(self, n=20):
+        """(function, samples) pairs of the functions most often on top of the stack"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+def register_endpoints(server, registry=registry, path='/metrics', profiling=None, max_profiles=32):
+    """
+    Add /metrics, per-route request timing and the per-request profiler to a Flask server
+
+    A request is profiled when profiling is on (AQI_PROFILING=1 by default)
+    and it carries ?profile=1 or an X-Profile: 1 header. The response then
+    has an X-Profile-Id header; GET /debug/profiles/<id> returns the
+    profile's stacks in folded format.
+
+    Parameters:
+    server (flask.Flask): Server of the Dash app
+    registry (Registry): Metrics to expose
+    path (str): URL of the Prometheus endpoint
+    profiling (bool): Allow profiling, defaults to AQI_PROFILING=1
+    max_profiles (int): Number of recent profiles kept
+    """
+    from flask import Response, abort, g, request
+
+    if profiling is None:
+        profiling = os.environ.get('AQI_PROFILING') == '1'
+    profiles = OrderedDict()
+    profiles_lock = threading.Lock()
+
+    @server.route(path)
+    def prometheus_metrics():
+        return Response(registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/debug/profiles/<profile_id>')
+    def profile_stacks(profile_id):
+        with profiles_lock:
+            profiler = profiles.get(profile_id)
+        if profiler is None:
+            abort(404)
+        return Response(profiler.folded() + '\n', mimetype='text/plain')
+
+    @server.before_request
+    def start_request_timer():
+        g.instrumentation_start = time.perf_counter()
+        if profiling and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+            g.profiler = SamplingProfiler().start()
+
+    @server.after_request
+    def record_request(response):
+        start = g.pop('instrumentation_start', None)
+        if ENABLED and start is not None:
+            # The route rule, not the path, so fingerprinted asset URLs share one metric
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            registry.observe(f'http {rule}', time.perf_counter() - start)
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            profile_id = uuid.uuid4().hex[:12]
+            with profiles_lock:
+                profiles[profile_id] = profiler
+                while len(profiles) > max_profiles:
+                    profiles.popitem(last=False)
+            response.headers['X-Profile-Id'] = profile_id
+            response.headers['X-Profile-Samples'] = str(profiler.samples)
+        return response
@@ -0,0 +1,239 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import plotly.graph_objects as go
+from aqi_categories import BREAKPOINTS, COLORS
+
+KM_PER_DEGREE_LAT = 111
+
+# Grid cells processed per batch; bounds the distance matrix to chunk_size x n_stations
+DEFAULT_CHUNK_SIZE = 16384
+
+
+class InterpolatedGrid:
+    """AQI interpolated over a regular lat/lon grid"""
+
+    def __init__(self, lats, lons, values):
+        self.lats = lats
+        self.lons = lons
+        self.values = values
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+
+def grid_axes(lats, lons, resolution, padding=0.05):
+    """
+    Latitude and longitude axes of a grid covering all stations
+
+    Parameters:
+    lats (numpy.ndarray): Station latitudes
+    lons (numpy.ndarray): Station longitudes
+    resolution (float): Grid spacing in degrees
+    padding (float): Extra degrees around the stations on every side
+
+    Returns:
+    tuple: (grid latitudes, grid longitudes) as 1-D arrays
+    """
+    grid_lats = np.arange(np.min(lats) - padding, np.max(lats) + padding + resolution / 2, resolution)
+    grid_lons = np.arange(np.min(lons) - padding, np.max(lons) + padding + resolution / 2, resolution)
+    return grid_lats, grid_lons
+
+
+def _project(lats, lons, origin_lat):
+    # Equirectangular projection to km, accurate enough at city/region scale
+    x = lons * KM_PER_DEGREE_LAT * np.cos(np.radians(origin_lat))
+    y = lats * KM_PER_DEGREE_LAT
+    return np.column_stack([x, y])
+
+
+def _weighted(distances, neighbour_values, power):
+    """IDW estimate per row of a (points x neighbours) distance matrix"""
+    exact = distances < 1e-9
+    # Rows whose only neighbours are exact hits have no weight; they are set below
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(exact, 0.0, 1.0 / distances ** power)
+        result = (weights * neighbour_values).sum(axis=1) / weights.sum(axis=1)
+    # A grid point on top of a station takes that station's value
+    hit = exact.any(axis=1)
+    if hit.any():
+        result[hit] = neighbour_values[hit, np.argmax(exact[hit], axis=1)]
+    return result
+
+
+def idw(station_lats, station_lons, station_values, grid_lats, grid_lons,
+        power=2, k=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Inverse-distance weighted interpolation of station values onto a grid
+
+    Parameters:
+    station_lats, station_lons (numpy.ndarray): Station coordinates
+    station_values (numpy.ndarray): AQI per station; stations with NaN are ignored
+    grid_lats, grid_lons (numpy.ndarray): 1-D grid axes
+    power (float): Distance exponent, 2 is the usual choice
+    k (int): Use only the k nearest stations (found with a KD-tree); None uses all
+    chunk_size (int): Grid points per batch
+
+    Returns:
+    InterpolatedGrid: values has shape (len(grid_lats), len(grid_lons))
+    """
+    station_lats = np.asarray(station_lats, dtype=float)
+    station_lons = np.asarray(station_lons, dtype=float)
+    station_values = np.asarray(station_values, dtype=float)
+    valid = ~np.isnan(station_values)
+    station_lats, station_lons, station_values = station_lats[valid], station_lons[valid], station_values[valid]
+    if not len(station_values):
+        raise ValueError("Need at least one station with an AQI value")
+    if k is not None and k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+
+    origin_lat = float(np.mean(station_lats))
+    stations = _project(station_lats, station_lons, origin_lat)
+    mesh_lats, mesh_lons = np.meshgrid(grid_lats, grid_lons, indexing='ij')
+    points = _project(mesh_lats.ravel(), mesh_lons.ravel(), origin_lat)
+
+    if k is not None and k < len(station_values):
+        from scipy.spatial import cKDTree
+        tree = cKDTree(stations)
+    else:
+        tree = None
+
+    out = np.empty(len(points))
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+        if tree is not None:
+            # The neighbour ranks as a list keep the (points x k) shape, for k=1 as well
+            distances, neighbours = tree.query(chunk, k=list(range(1, k + 1)))
+            out[start:start + len(chunk)] = _weighted(distances, station_values[neighbours], power)
+        else:
+            # Dense (chunk x stations) distance matrix in one broadcast
+            deltas = chunk[:, None, :] - stations[None, :, :]
+            distances = np.sqrt((deltas ** 2).sum(axis=2))
+            neighbour_values = np.broadcast_to(station_values, distances.shape)
+            out[start:start + len(chunk)] = _weighted(distances, neighbour_values, power)
+    return InterpolatedGrid(np.asarray(grid_lats), np.asarray(grid_lons), out.reshape(mesh_lats.shape))
+
+
+def stations_fingerprint(lats, lons, values, power, k):
+    """Short hash of the station coordinates and values and the IDW parameters"""
+    digest = hashlib.sha1(repr((float(power), k)).encode('ascii'))
+    for array in (lats, lons, values):
+        digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class GridCache:
+    """
+    Bounded LRU cache of interpolated grids keyed on (timestamp, resolution, fingerprint)
+
+    Scrubbing back and forth through time reuses grids that were already
+    computed. The fingerprint (stations_fingerprint) covers the station
+    coordinates and values and the IDW parameters, so a late reading or a
+    different power or k at the same timestamp computes a new grid.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+
+    def get_or_compute(self, timestamp, resolution, compute, fingerprint=None):
+        key = (str(timestamp), float(resolution), fingerprint)
+        with self._lock:
+            grid = self._entries.get(key)
+            if grid is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return grid
+
+        start = time.perf_counter()
+        grid = compute()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.build_seconds += elapsed
+            self._entries[key] = grid
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return grid
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+grid_cache = GridCache()
+
+
+def interpolated_grid(stations, resolution=0.02, timestamp=None, power=2, k=8, cache=grid_cache):
+    """
+    Interpolated grid for a stations frame, served from the cache when a timestamp is given
+
+    Parameters:
+    stations (pandas.DataFrame): lat, lon and AQI columns
+    resolution (float): Grid spacing in degrees
+    timestamp: Time the readings belong to; None skips the cache
+    power (float): IDW distance exponent
+    k (int): Nearest stations per grid point, None for all
+
+    Returns:
+    InterpolatedGrid
+    """
+    lats = stations['lat'].to_numpy(dtype=float)
+    lons = stations['lon'].to_numpy(dtype=float)
+    values = stations['AQI'].to_numpy(dtype=float)
+
+    def compute():
+        grid_lats, grid_lons = grid_axes(lats, lons, resolution)
+        return idw(lats, lons, values, grid_lats, grid_lons, power=power, k=k)
+
+    if timestamp is None or cache is None:
+        return compute()
+    fingerprint = stations_fingerprint(lats, lons, values, power, k)
+    return cache.get_or_compute(timestamp, resolution, compute, fingerprint)
+
+
+def aqi_colorscale(zmax=500):
+    """Plotly colorscale following the AQI category colors up to zmax"""
+    edges = np.concatenate([[0], BREAKPOINTS, [zmax]]) / zmax
+    scale = []
+    for i, color in enumerate(COLORS):
+        scale.append([float(edges[i]), color])
+        scale.append([float(edges[i + 1]), color])
+    return scale
+
+
+def interpolation_trace(grid, resolution, opacity=0.5):
+    """
+    Density mapbox layer drawing the grid, one weighted point per cell
+
+    Parameters:
+    grid (InterpolatedGrid): Grid from idw or interpolated_grid
+    resolution (float): Grid spacing in degrees, sets the point radius
+    opacity (float): Layer opacity
+
+    Returns:
+    plotly.graph_objects.Densitymapbox
+    """
+    mesh_lats, mesh_lons = np.meshgrid(grid.lats, grid.lons, indexing='ij')
+    # Radius in pixels roughly matching the cell size at the map zoom used for regions
+    radius = int(np.clip(resolution * 400, 4, 40))
+    return go.Densitymapbox(
+        lat=mesh_lats.ravel().round(5),
+        lon=mesh_lons.ravel().round(5),
+        z=grid.values.ravel().round(1),
+        radius=radius,
+        colorscale=aqi_colorscale(),
+        zmin=0,
+        zmax=500,
+        opacity=opacity,
+        showscale=False,
+        hoverinfo='skip'
+    )
@@ -0,0 +1,115 @@
+"""
+Health checks that answer before the dashboard has finished starting
+
+Importing App.py takes around a second (Dash, pandas, loading the data,
+building the cube and the layout). BackgroundApp is a small WSGI app that
+imports nothing heavy itself: it answers
+
+    GET /healthz  200 as soon as the process serves requests (liveness)
+    GET /readyz   200 once the dashboard is loaded, 503 before (readiness)
+
+at once, loads the dashboard with `loader` in a background thread and
+hands every other request to it when it is ready. Requests that arrive
+while it is still loading wait up to `wait_seconds`, then get a 503 with
+Retry-After.
+
+This module must stay cheap to import: only the standard library.
+"""
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = '/healthz'
+READY_PATH = '/readyz'
+
+# How long a request that arrives during startup waits for the dashboard
+DEFAULT_WAIT_SECONDS = 30.0
+
+
+class BackgroundApp:
+    """
+    WSGI app answering health checks itself and delegating everything else
+
+    Parameters:
+    loader (callable): Returns the real WSGI app (e.g. imports App and returns App.server)
+    wait_seconds (float): Longest wait of a request for the app to finish loading
+    """
+
+    def __init__(self, loader, wait_seconds=DEFAULT_WAIT_SECONDS):
+        self.loader = loader
+        self.wait_seconds = wait_seconds
+        self.app = None
+        self.error = None
+        self.started = time.time()
+        self.load_seconds = None
+        self._loaded = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """Load the app in the calling thread; errors are kept and reported on /readyz"""
+        start = time.perf_counter()
+        try:
+            self.app = self.loader()
+        except Exception as exc:
+            logger.exception("Dashboard failed to load")
+            self.error = f'{type(exc).__name__}: {exc}'
+        self.load_seconds = time.perf_counter() - start
+        self._loaded.set()
+        return self
+
+    def start(self):
+        """Load the app in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.load, name='app-loader', daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until loading has finished (or failed); True when the app is ready"""
+        self._loaded.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        return self.app is not None
+
+    def status(self):
+        if self.ready:
+            state = 'ready'
+        elif self.error is not None:
+            state = 'failed'
+        else:
+            state = 'starting'
+        status = {'status': state, 'uptime_seconds': round(time.time() - self.started, 3)}
+        if self.load_seconds is not None:
+            status['load_seconds'] = round(self.load_seconds, 3)
+        if self.error is not None:
+            status['error'] = self.error
+        return status
+
+    def _respond(self, start_response, code, body, headers=()):
+        data = json.dumps(body).encode('utf-8')
+        reason = {200: 'OK', 503: 'Service Unavailable'}[code]
+        start_response(f'{code} {reason}', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(data))),
+            ('Cache-Control', 'no-store'),
+            *headers
+        ])
+        return [data]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == HEALTH_PATH:
+            return self._respond(start_response, 200, {'status': 'ok'})
+        if path == READY_PATH:
+            return self._respond(start_response, 200 if self.ready else 503, self.status())
+
+        if not self.ready and self.error is None:
+            self._loaded.wait(self.wait_seconds)
+        if not self.ready:
+            return self._respond(start_response, 503, self.status(), [('Retry-After', '1')])
+        return self.app(environ, start_response)
@@ -0,0 +1,13 @@
+import os
+import sys
+
+# The dashboard's modules are imported from the project directory, as App.py does
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'benchmarks'))
+
+# No background threads or processes from modules imported by the tests
+os.environ.setdefault('AQI_FORECAST_SCHEDULER', '0')
+os.environ.setdefault('AQI_INGEST_FOLLOW', '0')
+os.environ.setdefault('AQI_DATA_WATCH', '0')
+os.environ.setdefault('AQI_INSTRUMENTATION', '0')
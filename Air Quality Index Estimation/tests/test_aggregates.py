@@ -0,0 +1,107 @@
+"""
+AQICube aggregates against the same reductions done with pandas groupby
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from aggregates import AQICube, DAY_ORDER, MONTH_ORDER
+from aqi_categories import category_labels
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2023-01-01T00:00', 'ns')
+    minutes = np.sort(rng.integers(0, 400 * 24 * 60, 5000))
+    timestamps = start + minutes.astype('timedelta64[m]')
+    values = rng.uniform(0, 450, len(timestamps)).round(1)
+    values[rng.random(len(values)) < 0.05] = np.nan
+    return pd.DataFrame({'Datetime': timestamps, 'AQI': values})
+
+
+@pytest.fixture
+def cube(readings):
+    return AQICube.from_frame(readings)
+
+
+def _valid(readings):
+    return readings.dropna(subset=['AQI'])
+
+
+def test_overall_statistics(cube, readings):
+    valid = _valid(readings)
+    assert cube.count == len(valid)
+    assert cube.mean == pytest.approx(valid['AQI'].mean())
+    assert cube.min == valid['AQI'].min()
+    assert cube.max == valid['AQI'].max()
+
+
+def test_hourly_avg(cube, readings):
+    valid = _valid(readings)
+    expected = valid.groupby(valid['Datetime'].dt.hour)['AQI'].mean()
+    hourly = cube.hourly_avg()
+    np.testing.assert_array_equal(hourly['Hour_Num'], expected.index)
+    np.testing.assert_allclose(hourly['AQI'], expected.to_numpy())
+
+
+def test_daily_avg(cube, readings):
+    valid = _valid(readings)
+    expected = valid.groupby(valid['Datetime'].dt.normalize())['AQI'].mean()
+    daily = cube.daily_avg()
+    np.testing.assert_array_equal(daily['Date'].to_numpy(), expected.index.to_numpy())
+    np.testing.assert_allclose(daily['AQI'], expected.to_numpy())
+
+
+def test_monthly_and_day_of_week_avg(cube, readings):
+    valid = _valid(readings)
+    by_month = valid.groupby(valid['Datetime'].dt.month - 1)['AQI'].mean()
+    monthly = cube.monthly_avg()
+    np.testing.assert_array_equal(monthly['Month_Name'], [MONTH_ORDER[m] for m in by_month.index])
+    np.testing.assert_allclose(monthly['AQI'], by_month.to_numpy())
+
+    by_weekday = valid.groupby(valid['Datetime'].dt.dayofweek)['AQI'].mean()
+    weekly = cube.day_of_week_avg()
+    np.testing.assert_array_equal(weekly['Day_of_Week'], [DAY_ORDER[d] for d in by_weekday.index])
+    np.testing.assert_allclose(weekly['AQI'], by_weekday.to_numpy())
+
+
+def test_health_risk_counts_use_cell_means(cube, readings):
+    # Every reading counts towards the category of its (date, hour) cell's mean
+    valid = _valid(readings)
+    cells = valid['Datetime'].dt.floor('h')
+    cell_mean = valid.groupby(cells)['AQI'].transform('mean')
+    expected = pd.Series(category_labels(cell_mean.to_numpy())).value_counts()
+    counts = cube.health_risk_counts().set_index('Health Risk')['Count']
+    assert counts.to_dict() == expected.to_dict()
+
+
+def test_add_readings_matches_rebuild(readings):
+    valid = _valid(readings)
+    head, tail = valid.iloc[:3000], valid.iloc[3000:]
+    cube = AQICube.from_frame(head)
+    version = cube.version
+    # Out of order, including a day before the first one
+    shuffled = tail.sample(frac=1, random_state=1)
+    cube.add_readings(shuffled['Datetime'].to_numpy(), shuffled['AQI'].to_numpy())
+    cube.add_reading(np.datetime64('2022-12-31T05:30'), 100.0)
+    cube.add_reading(np.datetime64('2023-03-01T05:30'), np.nan)
+
+    extra = pd.DataFrame({'Datetime': [pd.Timestamp('2022-12-31 05:30')], 'AQI': [100.0]})
+    rebuilt = AQICube.from_frame(pd.concat([extra, valid]))
+    assert cube.version != version
+    np.testing.assert_array_equal(cube.dates, rebuilt.dates)
+    np.testing.assert_array_equal(cube.counts, rebuilt.counts)
+    np.testing.assert_allclose(cube.sums, rebuilt.sums)
+    np.testing.assert_array_equal(cube.mins, rebuilt.mins)
+    np.testing.assert_array_equal(cube.maxs, rebuilt.maxs)
+
+
+def test_window(cube, readings):
+    valid = _valid(readings)
+    window = cube.window('2023-03-10', '2023-04-02')
+    days = valid['Datetime'].dt.normalize()
+    selected = valid[(days >= '2023-03-10') & (days <= '2023-04-02')]
+    assert window.count == len(selected)
+    assert window.mean == pytest.approx(selected['AQI'].mean())
+    assert window.version != cube.version
+    assert cube.window() is cube
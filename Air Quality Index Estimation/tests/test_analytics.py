@@ -0,0 +1,147 @@
+"""
+AQIAnalytics against the same statistics computed with pandas on the hourly series
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import AQIAnalytics, longest_runs, period_starts
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(0)
+    frames = []
+    for station, offset in (('A', 0), ('B', 36)):
+        hours = pd.date_range('2023-01-01 00:00', periods=24 * 75, freq='h') + pd.Timedelta(hours=offset)
+        # Hours without a reading, and hours with several
+        hours = hours[rng.random(len(hours)) > 0.15]
+        hours = hours.append(hours[::9])
+        minutes = pd.to_timedelta(rng.integers(0, 60, len(hours)), unit='min')
+        values = np.round(150 + 80 * np.sin(np.arange(len(hours)) / 20) + rng.normal(0, 30, len(hours)), 1)
+        frames.append(pd.DataFrame({'Station': station, 'Datetime': hours + minutes, 'AQI': np.abs(values)}))
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+
+
+def _hourly(readings, analytics):
+    """stations x hours frame of hourly means over the analytics grid"""
+    grid = pd.date_range(analytics.origin, periods=analytics.n_hours, freq='h')
+    hourly = readings.groupby(['Station', readings['Datetime'].dt.floor('h')])['AQI'].mean().unstack('Station')
+    return hourly.reindex(grid)[analytics.stations]
+
+
+def test_hourly_grid(readings):
+    analytics = AQIAnalytics.from_frame(readings)
+    expected = _hourly(readings, analytics)
+    hours, values = analytics.hourly()
+    assert analytics.stations == ['A', 'B']
+    assert analytics.n_hours % 24 == 0
+    np.testing.assert_array_equal(hours.astype('datetime64[ns]'), expected.index.to_numpy())
+    np.testing.assert_allclose(values, expected.to_numpy().T)
+
+
+@pytest.mark.parametrize('window', [8, 24])
+def test_rolling_mean(readings, window):
+    analytics = AQIAnalytics.from_frame(readings)
+    expected = _hourly(readings, analytics).rolling(window, min_periods=int(np.ceil(0.75 * window))).mean()
+    _, values = analytics.rolling_mean(window)
+    np.testing.assert_allclose(values, expected.to_numpy().T, atol=1e-6)
+
+    # A range still averages over the hours before it
+    hours, part = analytics.rolling_mean(window, '2023-02-01', '2023-02-03')
+    assert hours[0] == np.datetime64('2023-02-01T00', 'h') and len(hours) == 72
+    np.testing.assert_allclose(part, expected.loc['2023-02-01':'2023-02-03'].to_numpy().T, atol=1e-6)
+
+
+@pytest.mark.parametrize('window', [None, 8])
+def test_exceedance_hours(readings, window):
+    analytics = AQIAnalytics.from_frame(readings)
+    hourly = _hourly(readings, analytics)
+    if window is not None:
+        hourly = hourly.rolling(window, min_periods=6).mean().round(6)
+    frame = analytics.exceedance_hours(thresholds=(100, 200), window=window)
+
+    by_day = hourly.groupby(hourly.index.normalize())
+    for station in analytics.stations:
+        rows = frame[frame['Station'] == station].set_index('Date')
+        np.testing.assert_array_equal(rows['Valid Hours'], by_day[station].count())
+        np.testing.assert_array_equal(rows['Hours > 100'], by_day[station].agg(lambda s: (s > 100).sum()))
+        np.testing.assert_array_equal(rows['Hours > 200'], by_day[station].agg(lambda s: (s > 200).sum()))
+
+
+def _reference_longest(row):
+    best, best_start, run = 0, -1, 0
+    for i, above in enumerate(row):
+        run = run + 1 if above else 0
+        if run > best:
+            best, best_start = run, i - run + 1
+    return best, best_start
+
+
+def test_longest_runs():
+    rng = np.random.default_rng(1)
+    mask = rng.random((50, 40)) > 0.4
+    mask[3] = False
+    mask[4] = True
+    lengths, first = longest_runs(mask)
+    for row, length, start in zip(mask, lengths, first):
+        assert (length, start) == _reference_longest(row)
+
+
+def test_longest_exceedances(readings):
+    analytics = AQIAnalytics.from_frame(readings)
+    hourly = _hourly(readings, analytics)
+    frame = analytics.longest_exceedances(200).set_index('Station')
+    for station in analytics.stations:
+        length, start = _reference_longest((hourly[station] > 200).to_numpy())
+        assert frame.loc[station, 'Hours'] == length
+        assert frame.loc[station, 'Start'] == hourly.index[start]
+        assert frame.loc[station, 'End'] == hourly.index[start + length - 1]
+
+
+@pytest.mark.parametrize('period, freq', [('day', 'D'), ('week', 'W-SUN'), ('month', 'MS')])
+def test_period_percentiles(readings, period, freq):
+    analytics = AQIAnalytics.from_frame(readings)
+    hourly = _hourly(readings, analytics)
+    frame = analytics.period_percentiles(period, percentiles=(50, 90))
+    for station in analytics.stations:
+        rows = frame[frame['Station'] == station].set_index('Period')
+        grouped = hourly[station].groupby(pd.Series(period_starts(
+            hourly.index.to_numpy().astype('datetime64[D]'), period), index=hourly.index))
+        np.testing.assert_array_equal(rows['Hours'], grouped.count())
+        np.testing.assert_allclose(rows['P50'], grouped.quantile(0.5))
+        np.testing.assert_allclose(rows['P90'], grouped.quantile(0.9))
+
+
+def test_period_starts():
+    days = np.array(['2024-02-29', '2024-03-03', '2024-03-04'], dtype='datetime64[D]')
+    np.testing.assert_array_equal(period_starts(days, 'week'), np.array(['2024-02-26', '2024-02-26', '2024-03-04'],
+                                                                        dtype='datetime64[D]'))
+    np.testing.assert_array_equal(period_starts(days, 'year'), np.array(['2024-01-01'] * 3, dtype='datetime64[D]'))
+    with pytest.raises(ValueError):
+        period_starts(days, 'fortnight')
+
+
+def test_added_readings_match_a_rebuild(readings):
+    ordered = readings.sort_values('Datetime')
+    # A late chunk, older than everything else
+    late = ordered.iloc[:300]
+    head, tail = ordered.iloc[300:2000], ordered.iloc[2000:]
+    analytics = AQIAnalytics.from_frame(head)
+    for start in range(0, len(tail), 500):
+        batch = tail.iloc[start:start + 500]
+        analytics.add_readings(batch['Datetime'].to_numpy(), batch['AQI'].to_numpy(), batch['Station'].to_numpy())
+    analytics.add_readings(late['Datetime'].to_numpy(), late['AQI'].to_numpy(), late['Station'].to_numpy())
+
+    rebuilt = AQIAnalytics.from_frame(readings)
+    assert analytics.origin == rebuilt.origin
+    np.testing.assert_allclose(analytics.hourly()[1], rebuilt.hourly()[1])
+    np.testing.assert_allclose(analytics.rolling_mean(24)[1], rebuilt.rolling_mean(24)[1], atol=1e-6)
+    pd.testing.assert_frame_equal(analytics.exceedance_hours(), rebuilt.exceedance_hours())
+
+
+def test_station_is_required_with_several_stations(readings):
+    analytics = AQIAnalytics.from_frame(readings)
+    with pytest.raises(ValueError):
+        analytics.add_reading('2023-01-05 10:00', 100.0)
+    analytics.add_reading('2023-01-05 10:00', 100.0, station='C')
+    assert analytics.stations == ['A', 'B', 'C']
@@ -0,0 +1,55 @@
+"""
+Vectorized AQI categories against the cleaned CSV and the breakpoint edges
+"""
+import io
+import os
+import numpy as np
+import pandas as pd
+from aqi_categories import (
+    LABELS, MISSING, MISSING_COLOR, MISSING_LABEL, MISSING_RECOMMENDATION,
+    categorize, category_colors, category_color_names, category_label, category_labels,
+    category_recommendation
+)
+from data_loader import BASE_DIR, read_csv_frame
+
+
+def test_matches_cleaned_csv():
+    df = pd.read_csv(os.path.join(BASE_DIR, 'cleaned_sohna_aqi.csv'))
+    aqi = df['AQI'].to_numpy()
+    np.testing.assert_array_equal(category_labels(aqi), df['Health Risk'].to_numpy())
+    np.testing.assert_array_equal(category_color_names(aqi), df['Color'].to_numpy())
+
+
+def test_breakpoint_edges():
+    aqi = np.array([0, 50, 50.5, 100, 101, 150, 151, 200, 201, 300, 301, 1000])
+    np.testing.assert_array_equal(categorize(aqi), [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+    assert categorize(aqi.reshape(3, 4)).shape == (3, 4)
+
+
+def test_nan_is_missing():
+    aqi = np.array([np.nan, 42.0, np.nan, 400.0])
+    np.testing.assert_array_equal(categorize(aqi), [MISSING, 0, MISSING, 5])
+    labels = category_labels(aqi)
+    assert list(labels) == [MISSING_LABEL, 'Good', MISSING_LABEL, 'Hazardous']
+    assert category_colors(aqi)[0] == MISSING_COLOR
+    assert category_label(np.nan) == MISSING_LABEL
+    assert category_label(75) == 'Moderate'
+    assert category_recommendation(np.nan) == MISSING_RECOMMENDATION
+    # The shared tables are not modified by the lookup
+    assert MISSING_LABEL not in LABELS
+
+
+def test_missing_aqi_is_left_out_of_the_counts():
+    csv = io.StringIO(
+        'Datetime,AQI\n'
+        '2023-01-01 00:00:00,40\n'
+        '2023-01-01 01:00:00,\n'
+        '2023-01-01 02:00:00,not a number\n'
+        '2023-01-01 03:00:00,250\n'
+    )
+    df = read_csv_frame(csv)
+    counts = df['Health Risk'].value_counts()
+    assert counts['Good'] == 1
+    assert counts['Very Unhealthy'] == 1
+    assert counts.sum() == 2
+    assert df['Health Risk'].isna().sum() == 2
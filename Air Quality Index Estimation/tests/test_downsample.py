@@ -0,0 +1,88 @@
+"""
+LTTB against a point-by-point reference, the min/max envelope and the relayout ranges
+"""
+import numpy as np
+import pytest
+from downsample import downsample, lttb, minmax, relayout_range
+
+
+def _reference_lttb(x, y, n_out):
+    # Straightforward LTTB over the same buckets: first and last point on their own
+    n = len(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = [0]
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            nlo, nhi = edges[b + 1], edges[b + 2]
+            next_x, next_y = np.mean(x[nlo:nhi]), np.mean(y[nlo:nhi])
+        else:
+            next_x, next_y = x[-1], y[-1]
+        ax, ay = x[keep[-1]], y[keep[-1]]
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((ax - next_x) * (y[i] - ay) - (ax - x[i]) * (next_y - ay))
+            if area > best_area:
+                best, best_area = i, area
+        keep.append(best)
+    keep.append(n - 1)
+    return np.array(keep)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=float)
+    y = np.cumsum(rng.normal(size=len(x))) + 50 * np.sin(x / 300)
+    return x, y
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 997])
+def test_lttb_matches_reference(series, n_out):
+    x, y = series
+    np.testing.assert_array_equal(lttb(x, y, n_out), _reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_short_series_and_datetimes(series):
+    x, y = series
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 100), np.arange(50))
+    times = np.datetime64('2024-01-01T00', 'h') + x.astype(np.int64)
+    np.testing.assert_array_equal(lttb(times, y, 200), lttb(x * 3600e9, y, 200))
+
+
+def test_minmax_keeps_the_envelope(series):
+    x, y = series
+    keep = minmax(x, y, 100)
+    assert len(keep) <= 102
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert y.argmax() in keep and y.argmin() in keep
+    # Every bucket's extremes are kept
+    size = -(-len(x) // 50)
+    for start in range(0, len(x), size):
+        block = y[start:start + size]
+        assert start + block.argmin() in keep and start + block.argmax() in keep
+
+
+def test_downsample_drops_nan_and_checks_the_method(series):
+    x, y = series
+    y = y.copy()
+    y[::7] = np.nan
+    dx, dy = downsample(x, y, 500)
+    assert len(dx) == 500 and not np.isnan(dy).any()
+    assert dx[0] == 1.0 and dx[-1] == x[-1]
+    dx, dy = downsample(x, y, 500, method='minmax')
+    assert not np.isnan(dy).any()
+    with pytest.raises(ValueError):
+        downsample(x, y, method='every-other')
+
+
+@pytest.mark.parametrize('relayout, expected', [
+    (None, (None, None)),
+    ({'xaxis.autorange': True}, (None, None)),
+    ({'xaxis.range[0]': '2023-01-01', 'xaxis.range[1]': '2023-02-01'}, ('2023-01-01', '2023-02-01')),
+    ({'xaxis.range': ['2023-01-01', '2023-02-01']}, ('2023-01-01', '2023-02-01')),
+    ({'dragmode': 'pan'}, (None, None)),
+])
+def test_relayout_range(relayout, expected):
+    assert relayout_range(relayout) == expected
@@ -0,0 +1,85 @@
+"""
+Wide-to-long conversion against the bundled cleaned CSV, and the chunked gap filling
+"""
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data_loader import BASE_DIR
+from etl import HOUR_COLUMNS, GapFiller, convert, fill_gaps, melt
+
+
+def _random_matrix(n_days, missing, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(20, 400, (n_days, 24)).round()
+    values[rng.random(values.shape) < missing] = np.nan
+    return np.arange(1, n_days + 1), values
+
+
+def _stream(filler, days, values, chunksize):
+    blocks = [filler.push(days[i:i + chunksize], values[i:i + chunksize]) for i in range(0, len(days), chunksize)]
+    blocks.append(filler.flush())
+    return np.concatenate([b[0] for b in blocks]), np.vstack([b[1] for b in blocks])
+
+
+@pytest.mark.parametrize('chunksize', [7, 10000])
+def test_convert_reproduces_the_cleaned_csv(chunksize):
+    output = io.StringIO()
+    stats = convert([os.path.join(BASE_DIR, 'sohna_aqi.csv')], output, chunksize=chunksize)
+    output.seek(0)
+    converted = pd.read_csv(output)
+    cleaned = pd.read_csv(os.path.join(BASE_DIR, 'cleaned_sohna_aqi.csv'))
+    cleaned = cleaned.sort_values(['Days', 'Hour']).reset_index(drop=True)
+    assert stats['rows'] == len(cleaned)
+    pd.testing.assert_frame_equal(converted, cleaned)
+
+
+def test_convert_adds_stations(tmp_path):
+    days, values = _random_matrix(3, 0.0)
+    wide = pd.DataFrame(values, columns=HOUR_COLUMNS)
+    wide.insert(0, 'Days', days)
+    paths = []
+    for name in ('a', 'b'):
+        paths.append(str(tmp_path / f'{name}.csv'))
+        wide.to_csv(paths[-1], index=False)
+    output = str(tmp_path / 'long.csv')
+    convert(paths, output, year=2024, stations=['A', 'B'])
+    long = pd.read_csv(output)
+    assert long['Station'].value_counts().to_dict() == {'A': 72, 'B': 72}
+    assert long['Datetime'].iloc[0] == '2024-01-01 00:00:00'
+    assert long['Datetime'].iloc[71] == '2024-01-03 23:00:00'
+
+
+def test_streamed_fill_matches_whole_matrix():
+    days, values = _random_matrix(200, 0.1)
+    # A gap running over several chunks
+    values[50:80, 5] = np.nan
+    expected_days, expected = fill_gaps(days, values)
+    streamed_days, streamed = _stream(GapFiller(max_hold_days=None), days, values, 16)
+    np.testing.assert_array_equal(streamed_days, expected_days)
+    np.testing.assert_allclose(streamed, expected)
+    assert not np.isnan(streamed).any()
+
+
+def test_open_gap_is_forward_filled_past_the_cap():
+    days, values = _random_matrix(100, 0.0)
+    # A dead sensor on hour 3 from day 11 on: its gap never closes
+    values[10:, 3] = np.nan
+    filler = GapFiller(max_hold_days=5)
+    released_days, released = filler.push(days, values)
+    assert len(released_days) == 95
+    np.testing.assert_array_equal(released[10:, 3], values[9, 3])
+    flushed_days, flushed = filler.flush()
+    np.testing.assert_array_equal(flushed_days, days[95:])
+    np.testing.assert_array_equal(flushed[:, 3], values[9, 3])
+
+
+def test_melt_layout():
+    days, values = _random_matrix(2, 0.0)
+    values[1, 23] = np.nan
+    long = melt(days, values, year=2023, station='Sohna')
+    assert list(long.columns) == ['Station', 'Days', 'Hour', 'AQI', 'Datetime', 'Health Risk', 'Color']
+    np.testing.assert_array_equal(long['AQI'], values.ravel())
+    assert long['Datetime'].iloc[25] == pd.Timestamp('2023-01-02 01:00')
+    assert pd.isna(long['Health Risk'].iloc[-1])
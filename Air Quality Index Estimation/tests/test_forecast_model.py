@@ -0,0 +1,76 @@
+"""
+Forecast features against a row-by-row reference, the model cache and the history checks
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from forecast_model import (
+    HISTORY, LAGS, MAX_CACHED_MODELS, ROLLING_WINDOWS, build_features, create_forecast_model,
+    feature_names, hourly_series, predict_next_hours
+)
+
+
+def _readings(hours, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2024-01-01', periods=hours, freq='h')
+    values = 150 + 60 * np.sin(np.arange(hours) * 2 * np.pi / 24) + rng.normal(0, 10, hours)
+    return pd.DataFrame({'Datetime': times, 'AQI': values})
+
+
+def test_hourly_series_fills_gaps():
+    df = pd.DataFrame({
+        'Datetime': pd.to_datetime(['2024-01-01 03:00', '2024-01-01 00:00', '2024-01-01 00:00']),
+        'AQI': [40.0, 10.0, 20.0],
+    })
+    timestamps, values = hourly_series(df)
+    assert len(timestamps) == 4
+    np.testing.assert_allclose(values, [15.0, 23.333333, 31.666667, 40.0], rtol=1e-6)
+
+
+def test_features_match_a_row_by_row_reference():
+    df = _readings(400)
+    timestamps, values = hourly_series(df)
+    origins = np.array([HISTORY - 1, 200, 399])
+    X = build_features(timestamps, values, origins)
+    assert X.shape == (3, len(feature_names()))
+    for row, origin in zip(X, origins):
+        expected = [values[origin - k] for k in range(LAGS)]
+        expected += [values[origin + 1 - w:origin + 1].mean() for w in ROLLING_WINDOWS]
+        when = pd.Timestamp(timestamps[origin])
+        expected += list(np.eye(24)[when.hour]) + list(np.eye(7)[when.dayofweek])
+        np.testing.assert_allclose(row, expected)
+
+
+def test_forecast_and_cache(tmp_path):
+    df = _readings(24 * 30)
+    model, scaler, features = create_forecast_model(df, cache_dir=str(tmp_path))
+    forecast = predict_next_hours(df, model, scaler, features, hours=12)
+    assert len(forecast) == 12
+    assert forecast['Datetime'].iloc[0] == df['Datetime'].iloc[-1] + pd.Timedelta(hours=1)
+    assert (forecast['Predicted_AQI'] >= 0).all()
+    # The daily cycle is learned: errors well under its amplitude
+    truth = 150 + 60 * np.sin(np.arange(24 * 30, 24 * 30 + 12) * 2 * np.pi / 24)
+    assert np.abs(forecast['Predicted_AQI'].to_numpy() - truth).mean() < 20
+
+    cached, cached_scaler, _ = create_forecast_model(df, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cached.coef_, model.coef_)
+    pd.testing.assert_frame_equal(predict_next_hours(df, cached, cached_scaler, features, hours=12), forecast)
+
+    for seed in range(1, MAX_CACHED_MODELS + 3):
+        create_forecast_model(_readings(24 * 10, seed), cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == MAX_CACHED_MODELS
+
+
+def test_history_is_checked(tmp_path):
+    with pytest.raises(ValueError, match='hours of data'):
+        create_forecast_model(_readings(HISTORY), cache_dir=str(tmp_path))
+    df = _readings(24 * 10)
+    model, scaler, features = create_forecast_model(df, cache_dir=str(tmp_path))
+    with pytest.raises(ValueError, match=f'Need at least {HISTORY} hours'):
+        predict_next_hours(df.tail(HISTORY - 1), model, scaler, features)
+    assert len(predict_next_hours(df.tail(HISTORY), model, scaler, features)) == 24
+    with pytest.raises(ValueError, match='at most'):
+        predict_next_hours(df, model, scaler, features, hours=model.horizon + 1)
+    with pytest.raises(ValueError, match='feature set'):
+        predict_next_hours(df, model, scaler, features[:-1])
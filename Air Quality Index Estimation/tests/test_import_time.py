@@ -0,0 +1,17 @@
+"""
+The import-time budgets of benchmarks/check_import_time.py
+
+AQI_IMPORT_BUDGET_SCALE multiplies every budget, for slower machines.
+"""
+import os
+import pytest
+import check_import_time
+
+SCALE = float(os.environ.get('AQI_IMPORT_BUDGET_SCALE', 1))
+
+
+@pytest.mark.parametrize('module', list(check_import_time.BUDGETS))
+def test_import_within_budget(module):
+    budget_ms, forbidden = check_import_time.BUDGETS[module]
+    assert check_import_time.check(module, budget_ms * SCALE, forbidden, repeat=3, top=15), \
+        f"import {module} is over its budget or imports a module it must not (see the output above)"
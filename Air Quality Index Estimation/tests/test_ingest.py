@@ -0,0 +1,175 @@
+"""
+Reading validation, the ring buffer, the append log and the ingestion pipeline
+"""
+import json
+import math
+import socket
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from aggregates import AQICube
+from ingest import AppendLog, IngestionPipeline, ReadingRingBuffer, parse_reading, read_log
+
+
+def _reading(hour, value, station=None):
+    return np.datetime64('2024-05-01T00:00', 'ns') + np.timedelta64(hour, 'h'), float(value), station
+
+
+def _empty_cube():
+    return AQICube.from_arrays(np.array([], dtype='datetime64[ns]'), np.array([], dtype=float))
+
+
+@pytest.mark.parametrize('record, expected', [
+    ({'Datetime': '2024-05-01 10:00', 'AQI': 120}, ('2024-05-01T10:00', 120.0, None)),
+    ('2024-05-01T10:00:00,87.5,Sohna', ('2024-05-01T10:00', 87.5, 'Sohna')),
+    (('2024-05-01 10:00+05:30', '0'), ('2024-05-01T10:00', 0.0, None)),
+])
+def test_parse_reading(record, expected):
+    timestamp, value, station = parse_reading(record)
+    assert timestamp == np.datetime64(expected[0], 'ns')
+    assert (value, station) == expected[1:]
+
+
+@pytest.mark.parametrize('record', [
+    {'AQI': 10},
+    {'Datetime': '2024-05-01', 'AQI': None},
+    '2024-05-01,10,Sohna,extra',
+    'not a time,10',
+    '2024-05-01,abc',
+    '2024-05-01,nan',
+    '2024-05-01,inf',
+    '2024-05-01,-1',
+    ('2024-05-01', 10, ' '),
+    42,
+])
+def test_parse_reading_rejects(record):
+    with pytest.raises(ValueError):
+        parse_reading(record)
+
+
+def test_ring_buffer_keeps_the_newest_in_order():
+    buffer = ReadingRingBuffer(capacity=4)
+    assert buffer.latest() is None
+    for hour in range(10):
+        buffer.append(*_reading(hour, hour))
+    assert len(buffer) == 4
+    timestamps, values, stations = buffer.snapshot()
+    np.testing.assert_array_equal(values, [6, 7, 8, 9])
+    assert timestamps[-1] == _reading(9, 0)[0]
+    assert buffer.latest() == (_reading(9, 0)[0], 9.0)
+
+
+def test_append_log_skips_partial_and_malformed_lines(tmp_path):
+    path = tmp_path / 'ingest.log'
+    log = AppendLog(str(path))
+    log.append([_reading(0, 10), _reading(1, 20, 'Sohna')])
+    with open(path, 'ab') as f:
+        f.write(b'garbage line\n2024-05-01T05:00:00,3')
+    readings = log.read()
+    assert [r[1:] for r in readings] == [(10.0, None), (20.0, 'Sohna')]
+
+    frame = read_log(str(path))
+    assert list(frame.columns) == ['Datetime', 'AQI', 'Station']
+    assert frame['AQI'].tolist() == [10.0, 20.0]
+    assert read_log(str(tmp_path / 'missing.log')).empty
+
+    # Reading up to an offset stops at the last complete line before it
+    first_line = path.read_bytes().index(b'\n') + 1
+    assert len(log.read(first_line)) == 1
+    assert len(log.read(first_line + 5)) == 1
+
+
+def test_follow_reports_batches_with_their_end_offset(tmp_path):
+    path = tmp_path / 'ingest.log'
+    log = AppendLog(str(path))
+    log.append([_reading(0, 10)])
+    batches = []
+    done = threading.Event()
+
+    def callback(readings, offset):
+        batches.append((readings, offset))
+        if sum(len(r) for r, _ in batches) == 3:
+            done.set()
+
+    stop = threading.Event()
+    thread = threading.Thread(target=log.follow, args=(callback, stop, 0.01), daemon=True)
+    thread.start()
+    try:
+        log.append([_reading(1, 20), _reading(2, 30)])
+        assert done.wait(5)
+    finally:
+        stop.set()
+        thread.join(5)
+    values = [r[1] for readings, _ in batches for r in readings]
+    assert values == [10.0, 20.0, 30.0]
+    assert batches[-1][1] == path.stat().st_size
+
+
+def test_attach_cube_replays_every_applied_reading(tmp_path):
+    pipeline = IngestionPipeline(str(tmp_path / 'ingest.log'), _empty_cube(), capacity=5)
+    pipeline.submit([_reading(hour, 100 + hour) for hour in range(20)])
+    pipeline.apply(pipeline.log.read(), offset=(tmp_path / 'ingest.log').stat().st_size)
+    # Logged but not applied yet: the follower applies it to the new cube later
+    pipeline.submit([_reading(30, 500)])
+    assert pipeline.applied == 20
+    assert pipeline.current() == (_reading(19, 0)[0], 119.0)
+
+    rebuilt = _empty_cube()
+    pipeline.attach_cube(rebuilt)
+    assert pipeline.cube is rebuilt
+    assert rebuilt.count == 20
+    assert rebuilt.mean == pytest.approx(np.mean(np.arange(100, 120)))
+
+
+@pytest.fixture
+def ingest_client(tmp_path):
+    import flask
+    server = flask.Flask(__name__)
+    pipeline = IngestionPipeline(str(tmp_path / 'ingest.log'), None)
+    pipeline.register_endpoint(server, 'secret', max_records=10)
+    return pipeline, server.test_client()
+
+
+def test_endpoint_requires_the_token(ingest_client):
+    pipeline, client = ingest_client
+    body = {'Datetime': '2024-05-01 10:00', 'AQI': 50}
+    assert client.post('/ingest', json=body).status_code == 401
+    assert client.post('/ingest', json=body, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.post('/ingest', json=body, headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 202
+    assert response.get_json() == {'accepted': 1}
+    assert len(pipeline.log.read()) == 1
+
+
+def test_endpoint_rejects_bad_and_oversized_requests(ingest_client):
+    pipeline, client = ingest_client
+    headers = {'Authorization': 'Bearer secret'}
+    invalid = client.post('/ingest', json={'Datetime': '2024-05-01', 'AQI': -5}, headers=headers)
+    assert invalid.status_code == 400
+    records = [{'Datetime': '2024-05-01', 'AQI': 1}] * 11
+    assert client.post('/ingest', json=records, headers=headers).status_code == 413
+    assert client.post('/ingest', data='x' * 5000, headers=headers).status_code == 413
+    assert pipeline.log.read() == []
+
+
+def test_socket_requires_the_token(tmp_path):
+    pipeline = IngestionPipeline(str(tmp_path / 'ingest.log'), None)
+    with pytest.raises(ValueError):
+        pipeline.serve_socket('0.0.0.0', 0)
+    server = pipeline.serve_socket('127.0.0.1', 0, token='secret')
+    try:
+        for first_line in (b'Bearer wrong\n', b'Bearer secret\n'):
+            with socket.create_connection(server.server_address, timeout=5) as conn:
+                conn.sendall(first_line + json.dumps({'Datetime': '2024-05-01', 'AQI': 7}).encode() + b'\n')
+                conn.shutdown(socket.SHUT_WR)
+                reply = conn.recv(1024)
+            if first_line == b'Bearer wrong\n':
+                assert reply.startswith(b'error')
+            else:
+                assert reply == b''
+    finally:
+        pipeline.stop()
+    readings = pipeline.log.read()
+    assert len(readings) == 1 and math.isclose(readings[0][1], 7.0)
+    assert pd.Timestamp(readings[0][0]) == pd.Timestamp('2024-05-01')
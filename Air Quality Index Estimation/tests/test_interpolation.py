@@ -0,0 +1,71 @@
+"""
+IDW interpolation against a point-by-point reference, and the grid cache keys
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from interpolation import GridCache, grid_axes, idw, interpolated_grid
+
+
+@pytest.fixture
+def stations():
+    rng = np.random.default_rng(0)
+    n = 12
+    return pd.DataFrame({
+        'lat': 28.2 + rng.random(n) * 0.4,
+        'lon': 76.9 + rng.random(n) * 0.4,
+        'AQI': rng.uniform(30, 400, n),
+    })
+
+
+def _reference(stations, grid_lats, grid_lons, power, k):
+    lat0 = stations['lat'].mean()
+    xs = stations['lon'].to_numpy() * 111 * np.cos(np.radians(lat0))
+    ys = stations['lat'].to_numpy() * 111
+    values = stations['AQI'].to_numpy()
+    out = np.empty((len(grid_lats), len(grid_lons)))
+    for i, lat in enumerate(grid_lats):
+        for j, lon in enumerate(grid_lons):
+            distances = np.hypot(xs - lon * 111 * np.cos(np.radians(lat0)), ys - lat * 111)
+            nearest = np.argsort(distances, kind='stable')[:k or len(values)]
+            weights = 1 / distances[nearest] ** power
+            out[i, j] = (weights * values[nearest]).sum() / weights.sum()
+    return out
+
+
+@pytest.mark.parametrize('k', [None, 1, 3, 12, 50])
+def test_idw_matches_reference(stations, k):
+    grid_lats, grid_lons = grid_axes(stations['lat'], stations['lon'], 0.05)
+    grid = idw(stations['lat'], stations['lon'], stations['AQI'], grid_lats, grid_lons, power=2, k=k, chunk_size=7)
+    assert grid.shape == (len(grid_lats), len(grid_lons))
+    np.testing.assert_allclose(grid.values, _reference(stations, grid_lats, grid_lons, 2, k))
+
+
+def test_idw_edge_cases(stations):
+    lats, lons, values = stations['lat'].to_numpy(), stations['lon'].to_numpy(), stations['AQI'].to_numpy()
+    # A grid point on a station takes its value, whatever k
+    for k in (None, 1, 4):
+        grid = idw(lats, lons, values, lats[:1], lons[:1], k=k)
+        assert grid.values[0, 0] == pytest.approx(values[0])
+    # Stations without a value are left out
+    with_nan = values.copy()
+    with_nan[0] = np.nan
+    grid = idw(lats, lons, with_nan, lats[:1], lons[:1], k=1)
+    assert not np.isnan(grid.values).any()
+    with pytest.raises(ValueError, match='k must be at least 1'):
+        idw(lats, lons, values, lats, lons, k=0)
+    with pytest.raises(ValueError):
+        idw(lats, lons, np.full(len(values), np.nan), lats, lons)
+
+
+def test_cache_is_keyed_on_the_stations_and_parameters(stations):
+    cache = GridCache(maxsize=2)
+    first = interpolated_grid(stations, 0.05, timestamp='2024-01-01 10:00', cache=cache)
+    assert interpolated_grid(stations, 0.05, timestamp='2024-01-01 10:00', cache=cache) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    changed = stations.copy()
+    changed.loc[0, 'AQI'] += 50
+    assert interpolated_grid(changed, 0.05, timestamp='2024-01-01 10:00', cache=cache) is not first
+    assert interpolated_grid(stations, 0.05, timestamp='2024-01-01 10:00', k=1, cache=cache) is not first
+    assert cache.misses == 3
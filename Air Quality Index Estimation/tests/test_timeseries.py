@@ -0,0 +1,75 @@
+"""
+TimeSeriesIndex range queries against boolean masks over the readings
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from timeseries import TimeSeriesIndex
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp('2023-01-01')
+    offsets = pd.to_timedelta(rng.integers(0, 90 * 24 * 60, 3000), unit='min')
+    values = rng.uniform(0, 400, len(offsets))
+    values[::50] = np.nan
+    # Unsorted, as readings may be in a file
+    return pd.DataFrame({'Datetime': start + offsets, 'AQI': values})
+
+
+def _expected(readings, start, end):
+    valid = readings.dropna(subset=['AQI']).sort_values('Datetime', kind='stable')
+    mask = (valid['Datetime'] >= pd.Timestamp(start)) & (valid['Datetime'] <= pd.Timestamp(end))
+    return valid[mask]
+
+
+@pytest.mark.parametrize('start, end, expected_end', [
+    ('2023-01-15 06:00', '2023-02-01 18:30', '2023-02-01 18:30'),
+    # A date without a time includes the whole end day
+    ('2023-02-10', '2023-02-20', '2023-02-20 23:59:59.999999999'),
+    ('2022-01-01', '2022-12-31', '2022-12-31 23:59:59.999999999'),
+])
+def test_window_matches_mask(readings, start, end, expected_end):
+    index = TimeSeriesIndex.from_frame(readings)
+    timestamps, values = index.window(start, end)
+    expected = _expected(readings, start, expected_end)
+    np.testing.assert_array_equal(timestamps, expected['Datetime'].to_numpy())
+    np.testing.assert_array_equal(values, expected['AQI'].to_numpy())
+
+
+def test_open_ends_and_last(readings):
+    index = TimeSeriesIndex.from_frame(readings)
+    assert len(index) == readings['AQI'].notna().sum()
+    timestamps, _ = index.window()
+    assert len(timestamps) == len(index)
+    assert np.all(np.diff(timestamps.view(np.int64)) >= 0)
+
+    timestamps, _ = index.last('24h')
+    assert timestamps[-1] == index.end
+    assert timestamps[0] > index.end - np.timedelta64(24, 'h')
+    assert len(timestamps) == len(_expected(readings, index.end - np.timedelta64(24, 'h') + 1, index.end))
+
+
+def test_append_keeps_order():
+    index = TimeSeriesIndex.from_frame(pd.DataFrame({'Datetime': pd.to_datetime([]), 'AQI': []}))
+    assert index.start is None and len(index.window()[0]) == 0
+    for hour in range(2000):
+        index.append(np.datetime64('2024-01-01T00', 'ns') + np.timedelta64(hour, 'h'), float(hour))
+    # A late reading goes in its place
+    index.append('2024-01-01 05:30', -1.0)
+    assert len(index) == 2001
+    timestamps, values = index.window('2024-01-01 05:00', '2024-01-01 06:00')
+    np.testing.assert_array_equal(values, [5.0, -1.0, 6.0])
+    assert index.end == np.datetime64('2024-01-01T00', 'ns') + np.timedelta64(1999, 'h')
+
+
+def test_by_station():
+    df = pd.DataFrame({
+        'Station': ['a', 'b', 'a', 'b'],
+        'Datetime': pd.to_datetime(['2024-01-02', '2024-01-01', '2024-01-01', '2024-01-03']),
+        'AQI': [1.0, 2.0, 3.0, 4.0],
+    })
+    indexes = TimeSeriesIndex.by_station(df)
+    np.testing.assert_array_equal(indexes['a'].values, [3.0, 1.0])
+    np.testing.assert_array_equal(indexes['b'].values, [2.0, 4.0])
@@ -0,0 +1,105 @@
+"""
+Accept-Encoding negotiation, response compression and typed-array figure encoding
+"""
+import gzip
+import base64
+import numpy as np
+import pytest
+import compression
+from compression import choose_encoding, register_compression
+from figure_cache import encode_typed_arrays
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # choose_encoding only checks that brotli is importable
+    monkeypatch.setattr(compression, 'brotli', object())
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('gzip', 'gzip'),
+    ('deflate, gzip;q=0.5', 'gzip'),
+    ('*', 'gzip'),
+    ('gzip;q=0', None),
+    ('gzip; q=0.0', None),
+    ('gzip;q=0.000', None),
+    ('gzip;q=0, *', None),
+    ('*;q=0', None),
+    ('identity;q=0', None),
+    ('gzip;q=abc', None),
+    ('gzip;q=2', None),
+    ('GZIP;Q=0.8', 'gzip'),
+    ('br', None),
+])
+def test_choose_encoding_with_gzip_only(without_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, br', 'br'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0.1', 'gzip'),
+    ('*', 'br'),
+    ('gzip;q=0.9, *;q=0.9', 'br'),
+    ('br;q=0.0, gzip;q=0', None),
+])
+def test_choose_encoding_with_brotli(with_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_responses_are_compressed(without_brotli):
+    import flask
+    server = flask.Flask(__name__)
+    register_compression(server, min_size=100)
+    payload = {'values': list(range(500))}
+    server.add_url_rule('/big', 'big', lambda: flask.jsonify(payload))
+    server.add_url_rule('/small', 'small', lambda: flask.jsonify({'ok': True}))
+    client = server.test_client()
+
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert flask.json.loads(gzip.decompress(response.data)) == payload
+
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    plain = client.get('/big', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_json() == payload
+
+
+def _decode(spec):
+    array = np.frombuffer(base64.b64decode(spec['bdata']), dtype='<' + spec['dtype'])
+    if 'shape' in spec:
+        array = array.reshape([int(n) for n in spec['shape'].split(',')])
+    return array
+
+
+@pytest.mark.parametrize('values, dtype', [
+    (np.random.default_rng(0).integers(0, 250, 100), 'u1'),
+    (np.random.default_rng(1).integers(-500, 500, 100).astype(float), 'i2'),
+    (np.random.default_rng(2).normal(size=100).astype(np.float32).astype(float), 'f4'),
+    (np.random.default_rng(3).normal(size=100), 'f8'),
+    (np.random.default_rng(4).integers(0, 100, (20, 24)), 'u1'),
+])
+def test_typed_arrays_round_trip_exactly(values, dtype):
+    figure = {'data': [{'type': 'scatter', 'y': values, 'name': 'AQI'}], 'layout': {'title': 'AQI'}}
+    encoded = encode_typed_arrays(figure)
+    spec = encoded['data'][0]['y']
+    assert spec['dtype'] == dtype
+    np.testing.assert_array_equal(_decode(spec), values)
+    assert encoded['data'][0]['name'] == 'AQI'
+    assert encoded['layout'] == figure['layout']
+
+
+def test_short_and_non_numeric_arrays_stay_lists():
+    x = ['2024-01-01'] * 40
+    figure = {'data': [{'x': x, 'y': [1.5, 2.5], 'text': list(range(3))}]}
+    trace = encode_typed_arrays(figure)['data'][0]
+    assert trace == {'x': x, 'y': [1.5, 2.5], 'text': [0, 1, 2]}
@@ -0,0 +1,133 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+def to_ns(value):
+    """Timestamp-like value (str, datetime, numpy.datetime64) as int64 nanoseconds"""
+    return int(pd.Timestamp(value).value)
+
+
+class TimeSeriesIndex:
+    """
+    Readings of one station sorted by time, for fast range queries
+
+    Timestamps are kept as a sorted int64 (nanoseconds) array, so a window
+    is located with two binary searches and returned as slices of the
+    underlying arrays: O(log n + k) and without copying, however long the
+    series is. Readings arriving in time order are appended in amortized
+    O(1).
+    """
+
+    def __init__(self, timestamps, values):
+        self._timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self._values = np.ascontiguousarray(values, dtype=float)
+        self._n = len(self._timestamps)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, time_col='Datetime', value_col='AQI'):
+        """
+        Build the index from readings in any order; NaN readings are dropped
+
+        Parameters:
+        df (pandas.DataFrame): Readings with a datetime column and an AQI column
+        time_col (str): Name of the datetime column
+        value_col (str): Name of the AQI column
+
+        Returns:
+        TimeSeriesIndex
+        """
+        timestamps = df[time_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        timestamps, values = timestamps[valid], values[valid]
+        order = np.argsort(timestamps, kind='stable')
+        return cls(timestamps[order], values[order])
+
+    @classmethod
+    def by_station(cls, df, station_col='Station', time_col='Datetime', value_col='AQI'):
+        """One index per station, as a dict keyed by station name"""
+        return {
+            station: cls.from_frame(group, time_col, value_col)
+            for station, group in df.groupby(station_col, sort=False, observed=True)
+        }
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._n]
+
+    @property
+    def values(self):
+        return self._values[:self._n]
+
+    @property
+    def start(self):
+        return np.datetime64(int(self._timestamps[0]), 'ns') if self._n else None
+
+    @property
+    def end(self):
+        return np.datetime64(int(self._timestamps[self._n - 1]), 'ns') if self._n else None
+
+    def bounds(self, start=None, end=None):
+        """
+        Positions [i, j) of the readings with start <= timestamp <= end
+
+        Parameters:
+        start: First timestamp to include, None for the beginning
+        end: Last timestamp to include, None for the end. A date without a
+            time ('2023-03-31') includes that whole day.
+        """
+        with self._lock:
+            timestamps = self.timestamps
+            i = 0 if start is None else int(np.searchsorted(timestamps, to_ns(start), side='left'))
+            if end is None:
+                j = len(timestamps)
+            else:
+                end_ns = to_ns(end)
+                if isinstance(end, str) and len(end) <= 10:
+                    end_ns += 86400 * 10**9 - 1
+                j = int(np.searchsorted(timestamps, end_ns, side='right'))
+        return i, j
+
+    def window(self, start=None, end=None):
+        """
+        Readings between start and end (both inclusive)
+
+        Returns:
+        tuple: (datetime64[ns] timestamps, float values), views into the index
+        """
+        i, j = self.bounds(start, end)
+        return self._timestamps[i:j].view('datetime64[ns]'), self._values[i:j]
+
+    def last(self, duration):
+        """Readings in the trailing duration ('7D', '24h', pandas.Timedelta) up to the last reading"""
+        if not self._n:
+            return self.window()
+        start = int(self._timestamps[self._n - 1]) - pd.Timedelta(duration).value
+        return self.window(np.datetime64(start + 1, 'ns'))
+
+    def append(self, timestamp, value):
+        """Add one reading; O(1) amortized when it is not older than the last one"""
+        timestamp = to_ns(timestamp)
+        with self._lock:
+            if self._n and timestamp < self._timestamps[self._n - 1]:
+                # Late reading: keep the order with an O(n) insert
+                position = int(np.searchsorted(self.timestamps, timestamp, side='right'))
+                self._timestamps = np.insert(self.timestamps, position, timestamp)
+                self._values = np.insert(self.values, position, value)
+                self._n += 1
+                return
+            if self._n == len(self._timestamps):
+                capacity = max(2 * self._n, 1024)
+                timestamps = np.empty(capacity, dtype=np.int64)
+                values = np.empty(capacity, dtype=float)
+                timestamps[:self._n] = self.timestamps
+                values[:self._n] = self.values
+                self._timestamps, self._values = timestamps, values
+            self._timestamps[self._n] = timestamp
+            self._values[self._n] = value
+            self._n += 1
@@ -0,0 +1,31 @@
+"""
+Production entry point for the AQI dashboard
+
+Serve with a pre-forking WSGI server, e.g.:
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+`server` answers /healthz and /readyz immediately and imports App.py (Dash,
+the data, the cube and the layout) in a background thread; see startup.py.
+
+gunicorn.conf.py preloads this module in the master by default. App.py is
+then imported right away, before the fork, so the data, the cube and the
+layout are built once and shared copy-on-write by every worker (threads do
+not survive the fork). With AQI_PRELOAD=0 each worker imports App.py in the
+background instead: workers listen within milliseconds, which suits
+autoscaling, at the cost of a copy of the data per worker.
+"""
+import os
+import importlib
+from startup import BackgroundApp
+
+
+def load_dashboard():
+    return importlib.import_module('App').server
+
+
+server = BackgroundApp(load_dashboard)
+
+if os.environ.get('AQI_PRELOAD', '0') == '1':
+    server.load()
+else:
+    server.start()
@@ -0,0 +1,165 @@
+"""
+Local load generator for the fraud scoring service
+
+Starts fraud_server.py on a free localhost port (once per --max-delay-ms
+value, 0 meaning no micro-batching wait), replays the transactions of
+credit_card_fraud_100.csv as single-transaction POST /score requests over
+keep-alive connections and reports:
+
+- single-transaction latency: one client, one request at a time (p50/p99)
+- sustained throughput: --concurrency clients for --duration seconds
+  (transactions/sec and p50/p99 latency under load)
+- the mean number of transactions scored per predict_proba call
+
+A first run with --max-batch 1 scores every request on its own, as a
+server without micro-batching would.
+
+Trains the pipeline first when no saved model exists. Run from the project
+directory (no network needed):
+    python benchmarks/loadgen.py --concurrency 64 --duration 10 --max-delay-ms 0 2 5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+import http.client
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from fraud_model import DEFAULT_MODEL_PATH, FEATURES, load_transactions  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('GET', path)
+    payload = json.loads(conn.getresponse().read())
+    conn.close()
+    return payload
+
+
+def start_server(port, model_path, max_delay_ms, max_batch, use_sklearn=False):
+    command = [sys.executable, 'fraud_server.py', '--port', str(port), '--model-path', model_path,
+               '--max-delay-ms', str(max_delay_ms), '--max-batch', str(max_batch)]
+    process = subprocess.Popen(
+        command + (['--sklearn'] if use_sklearn else []),
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            get_json(port, '/healthz')
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("fraud_server.py did not start in time")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def build_requests(data_path):
+    """One raw HTTP request per transaction of the CSV"""
+    df = load_transactions(data_path)
+    requests = []
+    for record in df[FEATURES].to_dict('records'):
+        body = json.dumps(record).encode()
+        requests.append(b'POST /score HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                        b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+    return requests
+
+
+async def client(port, requests, offset, stop_at, latencies, max_requests=None):
+    """Sends requests one after the other on a keep-alive connection, recording latencies"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = offset
+    try:
+        while time.perf_counter() < stop_at and (max_requests is None or i - offset < max_requests):
+            request = requests[i % len(requests)]
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = int(head[9:12])
+            length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            if status != 200:
+                raise RuntimeError(f"POST /score answered {status}")
+            latencies.append(time.perf_counter() - start)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load(port, requests, concurrency, duration, max_requests=None):
+    latencies = []
+    start = time.perf_counter()
+    stop_at = start + duration
+    await asyncio.gather(*(
+        client(port, requests, i * 7, stop_at, latencies, max_requests) for i in range(concurrency)
+    ))
+    return latencies, time.perf_counter() - start
+
+
+def percentile_ms(latencies, q):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(BASE_DIR, 'credit_card_fraud_100.csv'))
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--max-delay-ms', type=float, nargs='+', default=[0, 2],
+                        help='Micro-batching waits to compare; 0 scores each request when the scorer is free')
+    parser.add_argument('--max-batch', type=int, default=512)
+    parser.add_argument('--latency-requests', type=int, default=500,
+                        help='Sequential requests of the single-transaction latency phase')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of the throughput phase')
+    parser.add_argument('--sklearn', action='store_true', help='Serve with sklearn, not the compiled forest')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model_path):
+        subprocess.run([sys.executable, 'fraud_model.py', 'train', '--output', args.model_path],
+                       cwd=BASE_DIR, check=True)
+    requests = build_requests(args.data)
+
+    print(f"{'max batch':>9}{'delay ms':>9}{'single p50':>12}{'single p99':>12}"
+          f"{'tx/sec':>10}{'load p50':>10}{'load p99':>10}{'rows/call':>11}")
+    configs = [(1, 0)] + [(args.max_batch, max_delay_ms) for max_delay_ms in args.max_delay_ms]
+    for max_batch, max_delay_ms in configs:
+        port = free_port()
+        process = start_server(port, args.model_path, max_delay_ms, max_batch, args.sklearn)
+        try:
+            single, _ = asyncio.run(run_load(port, requests, 1, float('inf'), args.latency_requests))
+            before = get_json(port, '/stats')
+            loaded, elapsed = asyncio.run(run_load(port, requests, args.concurrency, args.duration))
+            after = get_json(port, '/stats')
+        finally:
+            stop_server(process)
+        rows_per_call = (after['rows'] - before['rows']) / max(1, after['batches'] - before['batches'])
+        print(f"{max_batch:>9}{max_delay_ms:>9g}"
+              f"{percentile_ms(single, 50):>12.2f}{percentile_ms(single, 99):>12.2f}"
+              f"{len(loaded) / elapsed:>10.0f}{statistics.median(loaded) * 1e3:>10.1f}"
+              f"{percentile_ms(loaded, 99):>10.1f}{rows_per_call:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
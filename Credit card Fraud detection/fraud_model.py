@@ -0,0 +1,238 @@
+"""
+Training, persistence and scoring of the credit-card fraud model
+
+Reproduces credit_card_fraud_detection.ipynb as a reusable pipeline: the
+features Time, V1..V10 and Amount are standardized, the minority class is
+oversampled with SMOTE, and a RandomForestClassifier (or the notebook's
+LogisticRegression) is fitted. Unlike the notebook, the split happens
+before scaling and oversampling, so the held-out metrics do not see
+synthetic copies of test rows.
+
+The fitted scaler and model are saved together as one sklearn Pipeline
+with joblib, with the feature order and the held-out metrics:
+
+    python fraud_model.py train --model random_forest
+    python fraud_model.py score credit_card_fraud_100.csv
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import classification_report, roc_auc_score
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The shared ml_tools package lives at the repository root
+sys.path.append(os.path.dirname(BASE_DIR))
+from ml_tools.forest_inference import FORESTS, compile_pipeline  # noqa: E402
+
+try:
+    from imblearn.over_sampling import SMOTE
+except ImportError:  # imbalanced-learn is optional; the classes are reweighted instead
+    SMOTE = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA = os.path.join(BASE_DIR, 'credit_card_fraud_100.csv')
+DEFAULT_MODEL_PATH = os.environ.get('FRAUD_MODEL_PATH', os.path.join(BASE_DIR, 'models', 'fraud_pipeline.joblib'))
+
+FEATURES = ['Time'] + [f'V{i}' for i in range(1, 11)] + ['Amount']
+TARGET = 'Class'
+
+MODELS = ('random_forest', 'logistic_regression')
+
+# Probability above which a transaction is flagged
+DEFAULT_THRESHOLD = 0.5
+
+
+def load_transactions(path=DEFAULT_DATA):
+    """Read and clean the transactions CSV as the notebook does"""
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    df = df.fillna(df.mode().iloc[0])
+    return df.drop_duplicates().reset_index(drop=True)
+
+
+def make_model(name, random_state=42, balanced=False):
+    class_weight = 'balanced' if balanced else None
+    if name == 'random_forest':
+        return RandomForestClassifier(n_estimators=100, random_state=random_state, class_weight=class_weight)
+    if name == 'logistic_regression':
+        return LogisticRegression(max_iter=1000, class_weight=class_weight)
+    raise ValueError(f"Unknown model: {name}, expected one of {', '.join(MODELS)}")
+
+
+def train_pipeline(df, model='random_forest', test_size=0.3, random_state=42):
+    """
+    Fit the scaler and the model on a training split and evaluate on the rest
+
+    Parameters:
+    df (pandas.DataFrame): Transactions with the FEATURES and TARGET columns
+    model (str): 'random_forest' or 'logistic_regression'
+    test_size (float): Share of the rows held out for the metrics
+    random_state (int): Seed of the split, SMOTE and the forest
+
+    Returns:
+    tuple: (fitted sklearn Pipeline, dict of held-out metrics)
+    """
+    X = df[FEATURES].to_numpy(dtype=float)
+    y = df[TARGET].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    scaler = StandardScaler().fit(X_train)
+    X_fit, y_fit = scaler.transform(X_train), y_train
+    if SMOTE is not None:
+        # Never more neighbours than there are minority rows to interpolate between
+        k_neighbors = max(1, min(5, int(np.bincount(y_train).min()) - 1))
+        X_fit, y_fit = SMOTE(random_state=random_state, k_neighbors=k_neighbors).fit_resample(X_fit, y_fit)
+    else:
+        logger.warning("imbalanced-learn is not installed: using balanced class weights instead of SMOTE")
+    estimator = make_model(model, random_state, balanced=SMOTE is None).fit(X_fit, y_fit)
+
+    # Both steps are already fitted; the pipeline only chains them for scoring
+    pipeline = Pipeline([('scaler', scaler), ('model', estimator)])
+    probabilities = pipeline.predict_proba(X_test)[:, 1]
+    metrics = {
+        'roc_auc': float(roc_auc_score(y_test, probabilities)),
+        'report': classification_report(y_test, probabilities >= DEFAULT_THRESHOLD, output_dict=True, zero_division=0),
+        'train_rows': int(len(y_train)),
+        'test_rows': int(len(y_test)),
+        'oversampling': 'smote' if SMOTE is not None else 'class_weight'
+    }
+    return pipeline, metrics
+
+
+def save_pipeline(pipeline, path=DEFAULT_MODEL_PATH, model='random_forest', metrics=None,
+                  threshold=DEFAULT_THRESHOLD):
+    """Write the pipeline and its metadata to one joblib file, atomically"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    artifact = {
+        'pipeline': pipeline,
+        'features': FEATURES,
+        'model': model,
+        'threshold': threshold,
+        'metrics': metrics or {},
+        'sklearn_version': sklearn.__version__,
+        'created': time.time()
+    }
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+class FraudScorer:
+    """
+    Fraud probabilities of transactions from a persisted pipeline
+
+    Parameters:
+    pipeline (sklearn.pipeline.Pipeline): Fitted scaler and classifier
+    features (list): Feature names in the order the pipeline expects
+    threshold (float): Probability above which a transaction is flagged
+    compiled (bool): Score a random forest with ml_tools.forest_inference,
+        which returns the same probabilities without sklearn's per-tree
+        overhead (about 10 ms per call for 100 trees)
+    """
+
+    def __init__(self, pipeline, features=FEATURES, threshold=DEFAULT_THRESHOLD, compiled=True):
+        self.pipeline = pipeline
+        self.features = list(features)
+        self.threshold = threshold
+        self.model = pipeline
+        if compiled and isinstance(pipeline.steps[-1][1], FORESTS):
+            self.model = compile_pipeline(pipeline)
+        # predict_proba column of the fraud class
+        self._fraud_column = int(np.flatnonzero(pipeline.classes_ == 1)[0])
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH, compiled=True):
+        artifact = joblib.load(path)
+        if artifact.get('sklearn_version') != sklearn.__version__:
+            logger.warning("Model saved with scikit-learn %s, running %s",
+                           artifact.get('sklearn_version'), sklearn.__version__)
+        return cls(artifact['pipeline'], artifact['features'], artifact['threshold'], compiled)
+
+    def to_matrix(self, transactions):
+        """
+        Feature matrix of transactions given as dicts keyed by feature name
+
+        Raises:
+        ValueError: When a transaction lacks a feature or has a non-numeric,
+            NaN or infinite value
+        """
+        try:
+            X = np.array([[float(t[name]) for name in self.features] for t in transactions], dtype=float)
+        except KeyError as exc:
+            raise ValueError(f"Missing feature: {exc.args[0]}") from None
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid feature value: {exc}") from None
+        # Checked per request: a NaN or infinity reaching the model would fail
+        # the whole batch it is scored with
+        finite = np.isfinite(X)
+        if not finite.all():
+            row, column = np.argwhere(~finite)[0]
+            raise ValueError(f"Invalid feature value: {self.features[column]} of transaction {row} "
+                             f"is {X[row, column]}, expected a finite number")
+        return X
+
+    def score(self, X):
+        """Fraud probability of every row of the feature matrix, in one predict_proba call"""
+        return self.model.predict_proba(X)[:, self._fraud_column]
+
+
+def train(args):
+    df = load_transactions(args.data)
+    pipeline, metrics = train_pipeline(df, args.model, args.test_size, args.seed)
+    path = save_pipeline(pipeline, args.output, args.model, metrics)
+    print(f"{args.model}: ROC-AUC {metrics['roc_auc']:.3f} on {metrics['test_rows']} held-out rows "
+          f"({metrics['oversampling']})")
+    print(f"saved to {path}")
+
+
+def score(args):
+    scorer = FraudScorer.load(args.model_path, compiled=not args.sklearn)
+    df = load_transactions(args.data)
+    start = time.perf_counter()
+    probabilities = scorer.score(df[scorer.features].to_numpy(dtype=float))
+    elapsed = time.perf_counter() - start
+    flagged = int((probabilities >= scorer.threshold).sum())
+    print(f"{len(df)} transactions scored in {elapsed * 1e3:.2f} ms, {flagged} flagged")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = commands.add_parser('train', help='Fit and save the pipeline')
+    train_parser.add_argument('--data', default=DEFAULT_DATA)
+    train_parser.add_argument('--model', choices=MODELS, default='random_forest')
+    train_parser.add_argument('--test-size', type=float, default=0.3)
+    train_parser.add_argument('--seed', type=int, default=42)
+    train_parser.add_argument('--output', default=DEFAULT_MODEL_PATH)
+
+    score_parser = commands.add_parser('score', help='Score a CSV with a saved pipeline')
+    score_parser.add_argument('data')
+    score_parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    score_parser.add_argument('--sklearn', action='store_true', help='Score with sklearn, not the compiled forest')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'train':
+        train(args)
+    else:
+        score(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
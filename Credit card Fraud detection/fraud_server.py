@@ -0,0 +1,310 @@
+"""
+Real-time fraud scoring over HTTP
+
+An asyncio HTTP/1.1 server (standard library only, keep-alive) in front of
+the pipeline saved by fraud_model.py. Concurrent requests are not scored
+one by one: they are queued and a micro-batcher scores everything that
+arrives within --max-delay-ms (or until --max-batch rows) in one
+predict_proba call. Every call has a fixed cost (validation, the scaler,
+dispatch to the thread; with sklearn's own forest about 10 ms for 100 trees
+whatever the rows, hence the compiled forest by default), so under load
+this multiplies throughput while adding at most a few milliseconds to a
+lone request.
+
+    python fraud_server.py --port 8700 --max-delay-ms 2
+
+Endpoints:
+- POST /score:  a transaction {"Time": ..., "V1": ..., ..., "Amount": ...}
+                or a list of them; answers {"fraud_probability", "is_fraud"}
+                (a list for a list)
+- GET /healthz: liveness
+- GET /stats:   batches and rows scored, mean batch size and scoring times
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from fraud_model import DEFAULT_MODEL_PATH, FraudScorer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8700
+DEFAULT_MAX_BATCH = 512
+DEFAULT_MAX_DELAY_MS = 2.0
+
+# Request head and body limits
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class MicroBatcher:
+    """
+    Scores concurrently submitted feature rows in shared predict_proba calls
+
+    The first row to arrive opens a batch; the batch is scored when it holds
+    max_batch rows or max_delay seconds after it opened, whichever is first.
+    Scoring runs in a single worker thread, so the event loop keeps accepting
+    requests (and filling the next batch) while a batch is being scored.
+
+    Parameters:
+    scorer (FraudScorer): Scores a feature matrix
+    max_batch (int): Most rows scored in one call
+    max_delay (float): Seconds a batch waits for more rows; 0 scores every
+        request as soon as the scorer is free
+    """
+
+    def __init__(self, scorer, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY_MS / 1e3):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self.score_seconds = 0.0
+        self.max_rows = 0
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scorer')
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    async def score(self, X):
+        """Fraud probabilities of the rows of X, scored with whatever else is queued"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((X, future))
+        return await future
+
+    async def _collect(self):
+        """The next batch: waits for a first request, then for more until full or due"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_delay
+        while size < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            X = batch[0][0] if len(batch) == 1 else np.vstack([rows for rows, _ in batch])
+            start = time.perf_counter()
+            try:
+                probabilities = await loop.run_in_executor(self._executor, self.scorer.score, X)
+            except Exception as exc:
+                logger.exception("Scoring a batch of %d rows failed", len(X))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.score_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.rows += len(X)
+            self.max_rows = max(self.max_rows, len(X))
+
+            offset = 0
+            for rows, future in batch:
+                # The client may have disconnected and cancelled its future
+                if not future.done():
+                    future.set_result(probabilities[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0,
+            'max_batch_rows': self.max_rows,
+            'mean_score_ms': round(self.score_seconds / self.batches * 1e3, 3) if self.batches else 0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'max_batch': self.max_batch,
+            'max_delay_ms': self.max_delay * 1e3
+        }
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ScoringServer:
+    """
+    Minimal HTTP/1.1 server for the scoring endpoints
+
+    Parameters:
+    batcher (MicroBatcher): Scores the submitted transactions
+    """
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.requests = 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break  # closed by the client between requests
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, {'error': 'Request head too large'}, keep_alive=False)
+                    break
+                method, path, headers = self._parse_head(head)
+                length = self._content_length(headers)
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                self.requests += 1
+                try:
+                    status, payload = 200, await self.dispatch(method, path, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {'error': str(exc)}
+                except Exception:
+                    logger.exception("Error handling %s %s", method, path)
+                    status, payload = 500, {'error': 'Internal server error'}
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as exc:
+            await self._send(writer, exc.status, {'error': str(exc)}, keep_alive=False)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line') from None
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        return method, path.split('?', 1)[0], headers
+
+    @staticmethod
+    def _content_length(headers):
+        value = headers.get('content-length', '0')
+        # Digits only: int() would also take a sign, spaces and underscores
+        if not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, 'Invalid Content-Length')
+        return int(value)
+
+    async def dispatch(self, method, path, body):
+        if path == '/score':
+            if method != 'POST':
+                raise HTTPError(405, 'Use POST')
+            return await self.score(body)
+        if path == '/healthz':
+            return {'status': 'ok'}
+        if path == '/stats':
+            return dict(self.batcher.stats(), requests=self.requests)
+        raise HTTPError(404, f'No route {path}')
+
+    async def score(self, body):
+        try:
+            transactions = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, 'Body is not JSON') from None
+        single = isinstance(transactions, dict)
+        if single:
+            transactions = [transactions]
+        if not isinstance(transactions, list) or not transactions:
+            raise HTTPError(400, 'Expected a transaction or a non-empty list of transactions')
+        try:
+            X = self.batcher.scorer.to_matrix(transactions)
+        except (ValueError, TypeError) as exc:
+            raise HTTPError(400, str(exc)) from None
+
+        probabilities = await self.batcher.score(X)
+        threshold = self.batcher.scorer.threshold
+        results = [{'fraud_probability': round(float(p), 6), 'is_fraud': bool(p >= threshold)}
+                   for p in probabilities]
+        return results[0] if single else results
+
+    @staticmethod
+    async def _send(writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                f'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode()
+        writer.write(head + body)
+        await writer.drain()
+
+
+async def serve(scorer, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH,
+                max_delay=DEFAULT_MAX_DELAY_MS / 1e3):
+    batcher = MicroBatcher(scorer, max_batch, max_delay)
+    batcher.start()
+    server = ScoringServer(batcher)
+    listener = await asyncio.start_server(server.handle_connection, host, port,
+                                          limit=MAX_HEADER_BYTES, backlog=1024)
+    logger.info("Scoring on http://%s:%d (max batch %d, max delay %.1f ms)",
+                host, port, max_batch, max_delay * 1e3)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help='Most rows per predict_proba call')
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY_MS,
+                        help='How long a batch waits for more transactions; 0 disables the wait')
+    parser.add_argument('--sklearn', action='store_true', help='Score with sklearn, not the compiled forest')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    scorer = FraudScorer.load(args.model_path, compiled=not args.sklearn)
+    # One warm-up call, so the first request does not pay for lazy initialisation
+    scorer.score(np.zeros((1, len(scorer.features))))
+    try:
+        asyncio.run(serve(scorer, args.host, args.port, args.max_batch, args.max_delay_ms / 1e3))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
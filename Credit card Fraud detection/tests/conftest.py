@@ -0,0 +1,15 @@
+import os
+import sys
+import pytest
+
+# The fraud modules are imported from the project directory, as the scripts are run
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+@pytest.fixture(scope='session')
+def pipeline():
+    """Pipeline fitted on the bundled sample, as fraud_model.py train does"""
+    from fraud_model import load_transactions, train_pipeline
+    fitted, _ = train_pipeline(load_transactions())
+    return fitted
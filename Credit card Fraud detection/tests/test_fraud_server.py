@@ -0,0 +1,148 @@
+"""
+Transaction validation, the micro-batcher and the scoring endpoints
+"""
+import json
+import asyncio
+import numpy as np
+import pytest
+from fraud_model import FEATURES, FraudScorer, load_transactions, save_pipeline
+from fraud_server import MicroBatcher, ScoringServer
+
+
+class EchoScorer:
+    """Returns the first column of every row, so each caller can check it got its own rows"""
+
+    threshold = 0.5
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def score(self, X):
+        self.calls.append(len(X))
+        if self.fail:
+            raise RuntimeError('scoring failed')
+        return X[:, 0].copy()
+
+
+def _transaction(**overrides):
+    transaction = {name: 0.5 for name in FEATURES}
+    transaction.update(overrides)
+    return transaction
+
+
+def test_scorer_matches_the_pipeline(pipeline, tmp_path):
+    df = load_transactions()
+    X = df[FEATURES].to_numpy(dtype=float)
+    expected = pipeline.predict_proba(X)[:, 1]
+    compiled = FraudScorer(pipeline)
+    np.testing.assert_allclose(compiled.score(X), expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(FraudScorer(pipeline, compiled=False).score(X), expected)
+
+    path = save_pipeline(pipeline, str(tmp_path / 'model.joblib'))
+    loaded = FraudScorer.load(path)
+    assert loaded.features == FEATURES
+    np.testing.assert_allclose(loaded.score(X), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('transaction, message', [
+    ({name: 1.0 for name in FEATURES[:-1]}, 'Missing feature: Amount'),
+    (_transaction(V3='abc'), 'Invalid feature value'),
+    (_transaction(V3=None), 'Invalid feature value'),
+    (_transaction(V3=float('nan')), 'V3 of transaction 1'),
+    (_transaction(Amount='inf'), 'Amount of transaction 1'),
+])
+def test_to_matrix_rejects(pipeline, transaction, message):
+    scorer = FraudScorer(pipeline)
+    with pytest.raises(ValueError, match=message):
+        scorer.to_matrix([_transaction(), transaction])
+
+
+def test_to_matrix_orders_the_features(pipeline):
+    transaction = {name: float(i) for i, name in enumerate(reversed(FEATURES))}
+    X = FraudScorer(pipeline).to_matrix([transaction])
+    np.testing.assert_array_equal(X[0], [transaction[name] for name in FEATURES])
+
+
+def test_batcher_returns_each_caller_its_rows():
+    async def run():
+        scorer = EchoScorer()
+        batcher = MicroBatcher(scorer, max_batch=64, max_delay=0.05)
+        batcher.start()
+        try:
+            requests = [np.arange(start, start + size, dtype=float)[:, None].repeat(3, axis=1)
+                        for start, size in zip(range(0, 1000, 10), [1, 3, 7, 2, 5] * 20)]
+            results = await asyncio.gather(*(batcher.score(X) for X in requests))
+        finally:
+            await batcher.stop()
+        return scorer, batcher, requests, results
+
+    scorer, batcher, requests, results = asyncio.run(run())
+    for X, result in zip(requests, results):
+        np.testing.assert_array_equal(result, X[:, 0])
+    # Requests were scored together, and no batch went far over max_batch
+    assert batcher.batches == len(scorer.calls) < len(requests)
+    assert batcher.rows == sum(len(X) for X in requests)
+    assert max(scorer.calls) < 64 + 7
+
+
+def test_batcher_fails_every_caller_of_a_failed_batch():
+    async def run():
+        batcher = MicroBatcher(EchoScorer(fail=True), max_delay=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.score(np.ones((2, 3))) for _ in range(3)),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def _request(port, method, path, body=b'', headers=''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n{headers}'
+                 f'Connection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_server_endpoints(pipeline):
+    async def run():
+        scorer = FraudScorer(pipeline)
+        batcher = MicroBatcher(scorer, max_delay=0.001)
+        batcher.start()
+        listener = await asyncio.start_server(ScoringServer(batcher).handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(
+                _request(port, 'POST', '/score', json.dumps(_transaction()).encode()),
+                _request(port, 'POST', '/score', json.dumps([_transaction(), _transaction(V1=3.0)]).encode()),
+                _request(port, 'POST', '/score', json.dumps(_transaction(V2=float('nan'))).encode()),
+                _request(port, 'POST', '/score', b'not json'),
+                _request(port, 'POST', '/score', b'[]'),
+                _request(port, 'GET', '/score'),
+                _request(port, 'GET', '/healthz'),
+                _request(port, 'GET', '/missing'),
+                _request(port, 'POST', '/score', b'{}', headers='Content-Length: -1\r\n'),
+            )
+        finally:
+            listener.close()
+            await batcher.stop()
+
+    single, several, nan, not_json, empty, get_score, health, missing, bad_length = asyncio.run(run())
+    expected = FraudScorer(pipeline, compiled=False).score(
+        FraudScorer(pipeline).to_matrix([_transaction(), _transaction(V1=3.0)]))
+    assert single[0] == 200
+    assert single[1] == {'fraud_probability': round(float(expected[0]), 6), 'is_fraud': bool(expected[0] >= 0.5)}
+    assert several[0] == 200
+    assert [r['fraud_probability'] for r in several[1]] == [round(float(p), 6) for p in expected]
+    assert [status for status, _ in (nan, not_json, empty)] == [400, 400, 400]
+    assert get_score[0] == 405
+    assert health == (200, {'status': 'ok'})
+    assert missing[0] == 404
+    assert bad_length[0] == 400
@@ -0,0 +1,6 @@
+"""
+Shared inference and training tools for the notebook models
+
+Used by the car price, marketing, player salary and fraud notebooks; import
+from the repository root, e.g. `from ml_tools.forest_inference import CompiledForest`.
+"""
@@ -0,0 +1,426 @@
+"""
+Out-of-core batch scoring of the notebook models
+
+`fit` prepares a task's data as its notebook does (see tasks.py), trains
+its model, or reuses one the notebook saved (bank_marketing_model.pkl), and
+saves a scoring bundle: the frozen preprocessing (input columns, the
+category vocabulary of every encoded column, the encoded column order and
+the fitted scaler; see preprocessing.py) and the model, in one
+uncompressed joblib file.
+
+`score` streams an input file through a bundle without ever holding it in
+memory:
+
+- the main process reads the CSV as blocks of --chunk-rows raw lines (or
+  Parquet record batches, with pyarrow) and hands them to a pool of worker
+  processes, at most two blocks per worker in flight
+- each worker loads the bundle once (joblib mmap_mode='r'), parses its
+  block with the frozen dtypes, encodes and scales it exactly as in
+  training and scores it
+- the main process appends the scores to the output in input order, as
+  each block completes
+
+A random forest is also saved compiled (forest_inference.py), as flat
+node arrays that the workers memory-map rather than copy: they share one
+copy of the model through the page cache. The sklearn forest is only
+unpickled, into each worker, when it scores; sklearn copies every tree's
+arrays on load. The compiled forest is the default when numba is installed.
+Without numba, sklearn scores blocks of more than a few dozen rows faster,
+so it is used instead (--compiled or --sklearn force either).
+
+Memory stays flat whatever the input size. CSV records must be one per
+line (no quoted newlines), as in the notebooks' datasets. Categories unseen
+in training get no dummy column set ('dummies') or code -1 ('codes').
+
+    python -m ml_tools.batch_score fit marketing bank.csv --output marketing.joblib
+    python -m ml_tools.batch_score fit marketing bank.csv --model bank_marketing_model.pkl --output marketing.joblib
+    python -m ml_tools.batch_score score marketing.joblib customers.csv scores.csv --workers 4
+"""
+import io
+import os
+import sys
+import time
+import pickle
+import argparse
+import resource
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import r2_score, roc_auc_score
+from ml_tools.tasks import TASKS, get_task
+from ml_tools.preprocessing import Preprocessor
+from ml_tools.forest_inference import FORESTS, HAVE_NUMBA, VECTORIZED_MAX_ROWS, CompiledForest
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; CSV needs nothing more
+    pq = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Blocks queued per worker: one being scored, one ready to start
+IN_FLIGHT_PER_WORKER = 2
+
+
+class ScoringBundle:
+    """
+    A model with the frozen preprocessing of its training data
+
+    Parameters:
+    task (str): Name of the task in tasks.TASKS
+    preprocessor (preprocessing.Preprocessor): Fitted encoder and scaler
+    model: The fitted model; a random forest is also compiled (forest)
+    read_options (dict): pandas.read_csv arguments of the task's files
+    """
+
+    def __init__(self, task, preprocessor, model, read_options=None):
+        self.task = task
+        self.preprocessor = preprocessor
+        self._model = model
+        self.forest = CompiledForest.from_estimator(model, keep_trees=False) if isinstance(model, FORESTS) else None
+        self.read_options = dict(read_options or {})
+        self.sklearn_version = sklearn.__version__
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.forest is not None:
+            # Kept as pickled bytes (an array, so memory-mapped too): workers scoring
+            # with the compiled forest never unpickle, and so never copy, the sklearn trees
+            state['_model'] = np.frombuffer(pickle.dumps(self._model, pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+        return state
+
+    @property
+    def model(self):
+        """The fitted model, unpickled on first use when the bundle was loaded"""
+        if self.forest is not None and isinstance(self._model, np.ndarray):
+            self._model = pickle.loads(self._model)
+        return self._model
+
+    @classmethod
+    def fit(cls, task, df, model=None, random_state=42):
+        """
+        Freeze the preprocessing of df and train (or adopt) the model
+
+        Parameters:
+        task (tasks.Task): The notebook task
+        df (pandas.DataFrame): Its dataset as Task.read returns it
+        model: A model already fitted on this preprocessing (the notebook's
+            saved model), or None to train task.make_model()
+        random_state (int): Seed of the train/test split
+
+        Returns:
+        tuple: (ScoringBundle, dict of held-out metrics)
+        """
+        X, y = task.features_target(df)
+        # Splitting row positions picks the same rows as splitting the encoded matrix
+        train_rows, test_rows, y_train, y_test = task.split(np.arange(len(X)), y, random_state)
+        preprocessor = Preprocessor(task.encoding, task.categorical_columns(X)).fit(X, train_rows)
+        if model is None:
+            model = task.make_model().fit(preprocessor.transform(X.iloc[train_rows]), y_train)
+        bundle = cls(task.name, preprocessor, model, task.read_options)
+
+        scores = bundle.predict(X.iloc[test_rows])
+        if hasattr(model, 'predict_proba') and len(model.classes_) == 2:
+            metrics = {'roc_auc': float(roc_auc_score(y_test, scores['probability']))}
+        elif hasattr(model, 'predict_proba'):
+            metrics = {'accuracy': float(np.mean(scores['prediction'].to_numpy() == np.asarray(y_test)))}
+        else:
+            metrics = {'r2': float(r2_score(y_test, scores['prediction']))}
+        metrics.update(train_rows=len(train_rows), test_rows=len(test_rows))
+        return bundle, metrics
+
+    @property
+    def columns(self):
+        """Input feature columns, in training order"""
+        return self.preprocessor.input_columns_
+
+    @property
+    def encoded_columns(self):
+        """Model input columns after encoding"""
+        return self.preprocessor.feature_names_
+
+    @property
+    def dtypes(self):
+        """read_csv dtypes: the encoded columns as text, the rest as floats"""
+        categorical = self.preprocessor.vocabularies_
+        return {column: str if column in categorical else np.float64 for column in self.columns}
+
+    def transform(self, frame):
+        """Scaled model input matrix of a raw frame"""
+        return self.preprocessor.transform(frame)
+
+    def scoring_model(self, compiled=True):
+        """The model to score with: the compiled forest of a random forest, see forest_inference.py"""
+        if compiled and self.forest is not None:
+            return self.forest
+        return self.model
+
+    def predict(self, frame, model=None):
+        """
+        Scores of a raw frame
+
+        Returns:
+        pandas.DataFrame: 'prediction', and 'probability' of the positive
+            class for a binary classifier
+        """
+        model = self.model if model is None else model
+        X = self.transform(frame)
+        if not hasattr(model, 'predict_proba'):
+            return pd.DataFrame({'prediction': model.predict(X)}, index=frame.index)
+        proba = model.predict_proba(X)
+        out = pd.DataFrame({'prediction': model.classes_.take(np.argmax(proba, axis=1))}, index=frame.index)
+        if proba.shape[1] == 2:
+            out['probability'] = proba[:, 1]
+        return out
+
+
+def save_bundle(bundle, path):
+    """Write the bundle uncompressed (so it can be memory-mapped), atomically"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_bundle(path, mmap=True):
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+
+def prefer_compiled(chunk_rows):
+    """
+    Whether the compiled forest outscores sklearn on blocks of chunk_rows
+
+    Without numba the compiled forest of a bundle only has the NumPy kernel,
+    which beats sklearn's per-tree loop on small blocks only.
+    """
+    return HAVE_NUMBA or chunk_rows <= VECTORIZED_MAX_ROWS
+
+
+def csv_blocks(path, chunk_rows):
+    """(header line, iterator of blocks of chunk_rows raw lines) of a CSV file"""
+    f = open(path, 'rb')
+    header = f.readline()
+
+    def blocks():
+        with f:
+            while True:
+                lines = list(itertools.islice(f, chunk_rows))
+                if not lines:
+                    return
+                yield b''.join(lines)
+
+    return header, blocks()
+
+
+def parquet_blocks(path, chunk_rows, columns):
+    if pq is None:
+        raise ValueError("Reading Parquet needs pyarrow installed")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+class OutputWriter:
+    """Appends score frames to a CSV, or a Parquet file with pyarrow"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        if self.parquet and pq is None:
+            raise ValueError("Writing Parquet needs pyarrow installed")
+        self._file = None
+        self._writer = None
+
+    def write(self, frame):
+        if self.parquet:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+            return
+        if self._file is None:
+            self._file = open(self.path, 'w', newline='')
+            frame.to_csv(self._file, index=False)
+        else:
+            frame.to_csv(self._file, index=False, header=False)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process, in MB
+
+    Read from VmHWM in /proc, which starts again at exec; ru_maxrss (the
+    fallback off Linux) carries over the peak of the process that exec'd us.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# State of a scoring worker, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(bundle_path, compiled, keep, header, read_options):
+    bundle = load_bundle(bundle_path)
+    _worker.update(bundle=bundle, model=bundle.scoring_model(compiled), keep=keep, header=header,
+                   read_options=read_options)
+
+
+def _score_block(block):
+    """Scores of one block (raw CSV lines or a DataFrame), the seconds spent on it and the worker's peak RSS"""
+    start = time.perf_counter()
+    bundle = _worker['bundle']
+    keep = _worker['keep']
+    if isinstance(block, bytes):
+        frame = pd.read_csv(io.BytesIO(_worker['header'] + block), usecols=bundle.columns + keep,
+                            dtype=bundle.dtypes, **_worker['read_options'])
+    else:
+        frame = block
+    scores = bundle.predict(frame, _worker['model'])
+    if keep:
+        scores = pd.concat([frame[keep].reset_index(drop=True), scores.reset_index(drop=True)], axis=1)
+    return scores, time.perf_counter() - start, peak_rss_mb()
+
+
+def score_file(bundle_path, input_path, output_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=None,
+               keep=(), compiled=None, read_options=None):
+    """
+    Score input_path with the bundle, block by block, into output_path
+
+    Parameters:
+    bundle_path (str): Bundle saved by save_bundle
+    input_path (str): CSV, or Parquet (.parquet) with pyarrow
+    output_path (str): CSV, or Parquet (.parquet) with pyarrow
+    chunk_rows (int): Rows per block
+    workers (int): Scoring processes; 1 scores in this process
+    keep (tuple): Input columns copied to the output (e.g. an id)
+    compiled (bool): Score random forests with the compiled engine; None
+        when it is the faster, see prefer_compiled
+    read_options (dict): pandas.read_csv arguments overriding the task's
+
+    Returns:
+    dict: rows, seconds, workers, the seconds spent scoring and the largest worker's peak RSS (MB)
+    """
+    workers = workers or os.cpu_count() or 1
+    keep = list(keep)
+    if compiled is None:
+        compiled = prefer_compiled(chunk_rows)
+    bundle = load_bundle(bundle_path)
+    read_options = {**bundle.read_options, **(read_options or {})}
+    if input_path.endswith('.parquet'):
+        header, blocks = b'', parquet_blocks(input_path, chunk_rows, bundle.columns + keep)
+    else:
+        header, blocks = csv_blocks(input_path, chunk_rows)
+
+    start = time.perf_counter()
+    rows = 0
+    busy = 0.0
+    worker_mb = 0.0
+    writer = OutputWriter(output_path)
+    init_args = (bundle_path, compiled, keep, header, read_options)
+    try:
+        if workers == 1:
+            _init_worker(*init_args)
+            for block in blocks:
+                scores, seconds, _ = _score_block(block)
+                writer.write(scores)
+                rows += len(scores)
+                busy += seconds
+        else:
+            # spawn rather than fork: the parent may hold threads (numba, BLAS)
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=init_args) as pool:
+                pending = deque()
+                for block in itertools.chain(blocks, [None]):
+                    if block is not None:
+                        pending.append(pool.submit(_score_block, block))
+                    # Write finished blocks in input order; bound the blocks held in memory
+                    while pending and (block is None or len(pending) >= workers * IN_FLIGHT_PER_WORKER):
+                        scores, seconds, peak = pending.popleft().result()
+                        writer.write(scores)
+                        rows += len(scores)
+                        busy += seconds
+                        worker_mb = max(worker_mb, peak)
+    finally:
+        writer.close()
+    return {'rows': rows, 'seconds': time.perf_counter() - start, 'workers': workers, 'busy_seconds': busy,
+            'worker_mb': worker_mb}
+
+
+def fit(args):
+    task = get_task(args.task)
+    options = {'sep': args.sep} if args.sep else {}
+    df = task.read(args.data, **options)
+    model = joblib.load(args.model) if args.model else None
+    bundle, metrics = ScoringBundle.fit(task, df, model)
+    save_bundle(bundle, args.output)
+    summary = ', '.join(f'{k} {v:.4f}' if isinstance(v, float) else f'{k} {v}' for k, v in metrics.items())
+    print(f"{task.name}: {summary}")
+    print(f"{len(bundle.encoded_columns)} model columns; bundle saved to {args.output}")
+
+
+def score(args):
+    read_options = {'sep': args.sep} if args.sep else None
+    stats = score_file(args.bundle, args.input, args.output, args.chunk_rows, args.workers, args.keep,
+                       args.compiled, read_options)
+    rows, seconds, workers = stats['rows'], stats['seconds'], stats['workers']
+    print(f"{rows} rows in {seconds:.2f} s: {rows / seconds:,.0f} rows/sec, "
+          f"{rows / seconds / workers:,.0f} rows/sec per core ({workers} workers), "
+          f"{rows / max(stats['busy_seconds'], 1e-9):,.0f} rows/sec per busy core")
+    print(f"peak RSS: main {peak_rss_mb():.0f} MB, largest worker {stats['worker_mb']:.0f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = commands.add_parser('fit', help="Train a task's model and save its scoring bundle")
+    fit_parser.add_argument('task', choices=list(TASKS))
+    fit_parser.add_argument('data', help="The task's training CSV")
+    fit_parser.add_argument('--output', required=True, help='Bundle path')
+    fit_parser.add_argument('--model', help='A model saved by the notebook, used instead of training one')
+    fit_parser.add_argument('--sep', help="CSV separator, if not the task's")
+
+    score_parser = commands.add_parser('score', help='Score a CSV or Parquet file in chunks')
+    score_parser.add_argument('bundle')
+    score_parser.add_argument('input')
+    score_parser.add_argument('output')
+    score_parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    score_parser.add_argument('--workers', type=int, default=None, help='Default: one per CPU')
+    score_parser.add_argument('--keep', nargs='*', default=[], help='Input columns copied to the output')
+    score_parser.add_argument('--sep', help="CSV separator, if not the task's")
+    engine = score_parser.add_mutually_exclusive_group()
+    engine.add_argument('--compiled', action='store_true', default=None,
+                        help='Score forests compiled (default with numba installed)')
+    engine.add_argument('--sklearn', dest='compiled', action='store_false',
+                        help='Score forests with sklearn (default without numba)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'fit':
+        fit(args)
+    else:
+        score(args)
+
+
+if __name__ == '__main__':
+    # Run the imported module, so saved bundles refer to ml_tools.batch_score and not to __main__
+    from ml_tools import batch_score
+    sys.exit(batch_score.main())
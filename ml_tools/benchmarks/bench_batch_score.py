@@ -0,0 +1,70 @@
+"""
+Throughput and memory of out-of-core batch scoring
+
+Writes synthetic bank-marketing CSVs of each --rows size (kept in --work-dir
+and reused), fits the marketing bundle on a bank.csv-sized sample, then
+runs `python -m ml_tools.batch_score score` on each file for each worker
+count and reports rows/sec, rows/sec per core and the peak RSS of the main
+process and of a worker. The RSS columns should not grow with the input.
+
+Run from the repository root:
+    python ml_tools/benchmarks/bench_batch_score.py --rows 1000000 4000000 --workers 1 2 4
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_DIR)
+
+from ml_tools.benchmarks.synthetic import write_bank_csv  # noqa: E402
+
+RATE = re.compile(r'([\d,]+) rows/sec, ([\d,]+) rows/sec per core')
+RSS = re.compile(r'main (\d+) MB, largest worker (\d+) MB')
+
+
+def run(*args):
+    out = subprocess.run([sys.executable, '-m', 'ml_tools.batch_score', *args], cwd=REPO_DIR,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    return out.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 4_000_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'ml_tools_bench'))
+    parser.add_argument('--sklearn', action='store_true', help='Score with sklearn, not the compiled forest')
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    train_path = os.path.join(args.work_dir, 'bank.csv')
+    if not os.path.exists(train_path):
+        write_bank_csv(train_path, 4521)
+    bundle_path = os.path.join(args.work_dir, 'marketing.joblib')
+    run('fit', 'marketing', train_path, '--output', bundle_path)
+
+    print(f"{'rows':>10}{'MB':>8}{'workers':>9}{'rows/sec':>11}{'per core':>10}{'main MB':>9}{'worker MB':>11}")
+    for rows in args.rows:
+        input_path = os.path.join(args.work_dir, f'bank_{rows}.csv')
+        if not os.path.exists(input_path):
+            write_bank_csv(input_path, rows, seed=1)
+        size_mb = os.path.getsize(input_path) / 1e6
+        for workers in sorted(set(args.workers)):
+            output_path = os.path.join(args.work_dir, 'scores.csv')
+            out = run('score', bundle_path, input_path, output_path, '--workers', str(workers),
+                      '--chunk-rows', str(args.chunk_rows), *(['--sklearn'] if args.sklearn else []))
+            rate, per_core = (int(v.replace(',', '')) for v in RATE.search(out).groups())
+            main_mb, worker_mb = RSS.search(out).groups()
+            print(f"{rows:>10}{size_mb:>8.0f}{workers:>9}{rate:>11}{per_core:>10}{main_mb:>9}{worker_mb:>11}")
+            os.remove(output_path)
+
+
+if __name__ == '__main__':
+    main()
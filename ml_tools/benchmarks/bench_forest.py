@@ -0,0 +1,107 @@
+"""
+Compiled forest inference against scikit-learn
+
+Fits the forests of the notebooks and times predict_proba (predict for the
+regressor) with sklearn and with CompiledForest, for each batch size:
+
+- marketing: RandomForestClassifier(100) on a bank-marketing-sized table
+  (11162 rows, 42 columns after get_dummies); synthetic, as bank.csv is
+  downloaded by the notebook
+- salary:    RandomForestRegressor(100) on a synthetic MLB-salary-sized table
+- fraud:     RandomForestClassifier(100) on credit_card_fraud_100.csv
+
+Query rows are resampled from the training rows with noise, so they follow
+realistic paths through the trees. Every compiled result is checked to be
+identical to sklearn's. Times are the best of --repeat runs.
+
+Run from the repository root:
+    python ml_tools/benchmarks/bench_forest.py --batch-sizes 1 100 100000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification, make_regression
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_DIR)
+
+from ml_tools.forest_inference import CompiledForest, njit  # noqa: E402
+
+FRAUD_CSV = os.path.join(REPO_DIR, 'Credit card Fraud detection', 'credit_card_fraud_100.csv')
+
+
+def marketing_model():
+    X, y = make_classification(11162, 42, n_informative=12, flip_y=0.1, random_state=0)
+    return RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y), X
+
+
+def salary_model():
+    X, y = make_regression(4000, 12, n_informative=8, noise=20, random_state=0)
+    return RandomForestRegressor(n_estimators=100, random_state=42).fit(X, y), X
+
+
+def fraud_model():
+    df = pd.read_csv(FRAUD_CSV)
+    df.columns = df.columns.str.strip()
+    X = df.drop(columns='Class').to_numpy(dtype=float)
+    return RandomForestClassifier(n_estimators=100, random_state=42).fit(X, df['Class']), X
+
+
+MODELS = {'marketing': marketing_model, 'salary': salary_model, 'fraud': fraud_model}
+
+
+def queries(X, n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = X[rng.integers(0, len(X), n)]
+    return rows + rng.normal(0, 0.1, rows.shape) * X.std(axis=0)
+
+
+def best_time(fn, repeat, min_seconds=0.2):
+    """Best seconds per call over `repeat` runs of enough calls to last min_seconds"""
+    start = time.perf_counter()
+    fn()
+    calls = max(1, int(min_seconds / max(time.perf_counter() - start, 1e-6)))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 100000])
+    parser.add_argument('--backends', nargs='+', default=['auto', 'numpy', 'native'] + (['numba'] if njit else []))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"numba {'available' if njit else 'not installed'}")
+    print(f"{'model':<10}{'batch':>8}{'backend':>9}{'ms/call':>11}{'rows/sec':>12}{'speedup':>9}{'identical':>11}")
+    for name in args.models:
+        model, X = MODELS[name]()
+        forest = CompiledForest.from_estimator(model)
+        reference = model.predict_proba if hasattr(model, 'predict_proba') else model.predict
+        print(f"{name}: {forest.n_trees} trees, {forest.n_nodes} nodes, {forest.nbytes / 1e6:.1f} MB flattened")
+        for batch in args.batch_sizes:
+            Q = queries(X, batch)
+            expected = reference(Q)
+            sklearn_seconds = best_time(lambda: reference(Q), args.repeat)
+            print(f"{name:<10}{batch:>8}{'sklearn':>9}{sklearn_seconds * 1e3:>11.3f}"
+                  f"{batch / sklearn_seconds:>12.0f}{1:>9.1f}{'':>11}")
+            for backend in args.backends:
+                compiled = forest.predict_proba if forest.classes_ is not None else forest.predict
+                identical = np.array_equal(compiled(Q, backend), expected)
+                seconds = best_time(lambda: compiled(Q, backend), args.repeat)
+                print(f"{name:<10}{batch:>8}{backend:>9}{seconds * 1e3:>11.3f}"
+                      f"{batch / seconds:>12.0f}{sklearn_seconds / seconds:>9.1f}{str(identical):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Synthetic bank-marketing data in the layout of the UCI bank.csv
+
+The marketing notebook downloads bank.csv at run time, so benchmarks
+generate rows with the same columns, categories, quoting and ';'
+separator instead. The response depends on call duration, the previous
+campaign's outcome, the contact month and the balance, so a forest has
+something to learn. Large files are written in chunks.
+
+    python ml_tools/benchmarks/synthetic.py bank_1m.csv --rows 1000000
+"""
+import os
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+
+CATEGORIES = {
+    'job': ['admin.', 'blue-collar', 'entrepreneur', 'housemaid', 'management', 'retired', 'self-employed',
+            'services', 'student', 'technician', 'unemployed', 'unknown'],
+    'marital': ['divorced', 'married', 'single'],
+    'education': ['primary', 'secondary', 'tertiary', 'unknown'],
+    'default': ['no', 'yes'],
+    'housing': ['no', 'yes'],
+    'loan': ['no', 'yes'],
+    'contact': ['cellular', 'telephone', 'unknown'],
+    'month': ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'],
+    'poutcome': ['failure', 'other', 'success', 'unknown'],
+}
+COLUMNS = ['age', 'job', 'marital', 'education', 'default', 'balance', 'housing', 'loan', 'contact', 'day',
+           'month', 'duration', 'campaign', 'pdays', 'previous', 'poutcome', 'y']
+
+
+def bank_marketing(n, seed=0):
+    """n rows of synthetic bank-marketing data"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({name: rng.choice(values, n) for name, values in CATEGORIES.items()})
+    df['age'] = rng.integers(18, 90, n)
+    df['balance'] = np.round(rng.lognormal(6.5, 1.5, n) - 300).astype(int)
+    df['day'] = rng.integers(1, 32, n)
+    df['duration'] = np.round(rng.exponential(260, n)).astype(int)
+    df['campaign'] = rng.geometric(0.4, n)
+    contacted = rng.random(n) < 0.2
+    df['pdays'] = np.where(contacted, rng.integers(1, 400, n), -1)
+    df['previous'] = np.where(contacted, rng.geometric(0.5, n), 0)
+    df.loc[~contacted, 'poutcome'] = 'unknown'
+
+    logit = (-4.2 + df['duration'] / 250 + 2.0 * (df['poutcome'] == 'success')
+             + 0.6 * df['month'].isin(['mar', 'sep', 'oct', 'dec']) + 0.15 * np.log1p(df['balance'].clip(0))
+             - 0.4 * (df['housing'] == 'yes'))
+    df['y'] = np.where(rng.random(n) < 1 / (1 + np.exp(-logit)), 'yes', 'no')
+    return df[COLUMNS]
+
+
+def write_bank_csv(path, rows, seed=0, chunk_rows=500_000):
+    """Write `rows` synthetic rows to path as bank.csv is laid out; returns the file size"""
+    with open(path, 'w', newline='') as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            chunk = bank_marketing(min(chunk_rows, rows - start), seed + i)
+            chunk.to_csv(f, sep=';', index=False, header=i == 0, quoting=csv.QUOTE_NONNUMERIC)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=4521, help='bank.csv has 4521 rows')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    size = write_bank_csv(args.path, args.rows, args.seed)
+    print(f"{args.rows} rows, {size / 1e6:.1f} MB written to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""
+Parallel cross-validated hyperparameter search for the notebook tasks
+
+Each notebook fits one configuration on one split. `search` keeps that
+split's test rows aside and cross-validates a grid of parameters for the
+task's model (see tasks.py) on its training rows:
+
+- the training rows are encoded once (preprocessing.py) and the float
+  matrix, targets and fold layout are copied into shared memory; worker
+  processes attach to them by name, so a trial pickles only its parameters
+  and fold number, never the data
+- every (candidate, fold) trial of a round runs in the process pool; each
+  fits a StandardScaler on its fold's training rows, then the model
+- with successive halving (the default) the first round trains every
+  candidate on a 1/factor**k sample of each fold's training rows and only
+  the best 1/factor go on to the next round, with factor times the rows,
+  until the last round trains the survivors on all of them
+- each trial's score is cached on disk under the hash of the encoded
+  dataset and the trial's parameters, fold and rows, so a rerun (or a
+  wider grid) only trains what is new
+
+The best candidate is then refitted on all the training rows and scored on
+the held-out rows. Scores: ROC AUC for binary classifiers, accuracy for
+others, R2 for regressors.
+
+    python -m ml_tools.experiments marketing bank.csv --cv 5 --workers 4
+    python -m ml_tools.experiments salary Cleaned_MLB_Salary_Dataset.csv --grid '{"max_depth": [null, 8]}'
+"""
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import sklearn
+from sklearn.model_selection import KFold, StratifiedKFold, ParameterGrid
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, r2_score, roc_auc_score
+from ml_tools.tasks import TASKS, get_task
+from ml_tools.preprocessing import make_encoder
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.experiments_cache')
+
+# Bump when a cached score would no longer mean the same thing
+CACHE_FORMAT = 1
+
+# Parameters searched when no grid is given, around each notebook's fixed choice
+DEFAULT_GRIDS = {
+    'marketing': {'n_estimators': [100, 300], 'max_depth': [None, 12], 'min_samples_leaf': [1, 5],
+                  'max_features': ['sqrt', 0.5]},
+    'salary': {'n_estimators': [100, 300], 'max_depth': [None, 10], 'min_samples_leaf': [1, 5],
+               'max_features': [1.0, 0.5]},
+    'car_price': {'fit_intercept': [True, False], 'positive': [False, True]},
+    'fraud': {'n_estimators': [100, 300], 'max_depth': [None, 8], 'min_samples_leaf': [1, 5],
+              'class_weight': [None, 'balanced']},
+}
+
+# Fewest training rows a halving round may sample per fold
+DEFAULT_MIN_ROWS = 100
+
+
+def get_cache_dir():
+    return os.environ.get('ML_TOOLS_CACHE_DIR') or DEFAULT_CACHE_DIR
+
+
+def score_model(model, X, y, kind):
+    """(metric name, score) of a fitted model; y holds class codes for classifiers"""
+    if kind == 'regressor':
+        return 'r2', float(r2_score(y, model.predict(X)))
+    if len(np.unique(y)) > 2 or len(model.classes_) > 2:
+        return 'accuracy', float(accuracy_score(y, model.predict(X)))
+    if len(model.classes_) < 2 or len(np.unique(y)) < 2:
+        # A sample holding one class only cannot rank; the round drops it
+        return 'roc_auc', float('nan')
+    return 'roc_auc', float(roc_auc_score(y, model.predict_proba(X)[:, 1]))
+
+
+def fit_and_score(task_name, params, X_train, y_train, X_test, y_test):
+    """Scale, fit the task's model with params and score it; returns (metric, score)"""
+    task = get_task(task_name)
+    scaler = StandardScaler().fit(X_train)
+    model = task.make_model().set_params(**params).fit(scaler.transform(X_train), y_train)
+    return score_model(model, scaler.transform(X_test), y_test, task.kind)
+
+
+class TrialCache:
+    """
+    Scores of finished trials, one JSON file per trial under the dataset's hash
+
+    Parameters:
+    directory (str): Cache root directory
+    dataset (str): Hash of the encoded dataset and fold layout
+    """
+
+    def __init__(self, directory, dataset):
+        self.directory = os.path.join(directory, dataset[:24])
+
+    @staticmethod
+    def key(params, fold, rows):
+        text = json.dumps({'params': params, 'fold': fold, 'rows': rows}, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def get(self, params, fold, rows):
+        try:
+            with open(os.path.join(self.directory, self.key(params, fold, rows) + '.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, params, fold, rows, result):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.key(params, fold, rows) + '.json')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(result, params=params, fold=fold, rows=rows), f, default=str)
+        os.replace(tmp_path, path)
+
+
+def dataset_hash(task_name, X, y, fold_of, order):
+    """Identifies the encoded training data, its folds and the library versions"""
+    digest = hashlib.sha256(f'{CACHE_FORMAT}:{task_name}:{sklearn.__version__}:{X.shape}'.encode())
+    for array in (X, y, fold_of, order):
+        digest.update(np.ascontiguousarray(array))
+    return digest.hexdigest()
+
+
+def _share(array):
+    """A shared memory copy of array and the (name, shape, dtype) to attach to it"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+# State of a trial worker, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(task_name, specs):
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype, buffer=blocks[name].buf)
+    # Keep the blocks referenced, or their buffers would be released under the arrays
+    _set_worker(task_name, arrays, blocks)
+
+
+def _set_worker(task_name, arrays, blocks=None):
+    order, fold_of = arrays['order'], arrays['fold_of']
+    n_folds = int(fold_of.max()) + 1
+    # Training rows of each fold in a fixed random order, so a round's sample is their first rows
+    folds = [(order[fold_of[order] != fold], np.flatnonzero(fold_of == fold)) for fold in range(n_folds)]
+    _worker.clear()
+    _worker.update(task=task_name, X=arrays['X'], y=arrays['y'], folds=folds, blocks=blocks)
+
+
+def _run_trial(params, fold, rows):
+    """Score of params on one fold, trained on the first rows of its training rows (None: all)"""
+    start = time.perf_counter()
+    X, y = _worker['X'], _worker['y']
+    train, test = _worker['folds'][fold]
+    train = train[:rows]
+    metric, score = fit_and_score(_worker['task'], params, X[train], y[train], X[test], y[test])
+    return {'metric': metric, 'score': score, 'seconds': time.perf_counter() - start}
+
+
+def halving_rounds(n_candidates, full_rows, factor=3, min_rows=DEFAULT_MIN_ROWS):
+    """
+    Training rows per fold of each successive halving round
+
+    As many rounds as it takes to narrow n_candidates down to one, fewer if
+    the first round would sample fewer than min_rows rows; the last round
+    (None) uses all of them.
+    """
+    n_rounds = 1 + math.ceil(math.log(n_candidates, factor)) if n_candidates > 1 else 1
+    while n_rounds > 1 and full_rows / factor ** (n_rounds - 1) < min_rows:
+        n_rounds -= 1
+    return [int(full_rows / factor ** (n_rounds - 1 - i)) for i in range(n_rounds - 1)] + [None]
+
+
+def prepare(task, df, random_state=42):
+    """
+    The encoded training and held-out rows of a task's dataset
+
+    Returns:
+    tuple: (X_train, y_train, X_test, y_test, classes); float matrices, and
+        class codes with their classes (None for a regressor) as targets
+    """
+    X, y = task.features_target(df)
+    train_rows, test_rows, y_train, y_test = task.split(np.arange(len(X)), y, random_state)
+    # The notebooks encode before splitting, so the vocabularies come from every row
+    encoder = make_encoder(task.encoding, task.categorical_columns(X), sparse=False).fit(X)
+    X_train, X_test = encoder.transform(X.iloc[train_rows]), encoder.transform(X.iloc[test_rows])
+    if task.kind == 'regressor':
+        return X_train, y_train.to_numpy(dtype=float), X_test, y_test.to_numpy(dtype=float), None
+    classes = np.unique(np.concatenate([y_train.to_numpy(), y_test.to_numpy()]))
+    return X_train, np.searchsorted(classes, y_train), X_test, np.searchsorted(classes, y_test), classes
+
+
+def search(task, df, grid=None, cv=5, workers=None, factor=3, halving=True, min_rows=DEFAULT_MIN_ROWS,
+           cache_dir=None, random_state=42, log=print):
+    """
+    Cross-validate a parameter grid for a task's model
+
+    Parameters:
+    task (tasks.Task): The notebook task
+    df (pandas.DataFrame): Its dataset as Task.read returns it
+    grid (dict or list): sklearn ParameterGrid of the model's parameters;
+        None for DEFAULT_GRIDS[task.name]
+    cv (int): Folds
+    workers (int): Trial processes; 1 runs the trials in this process
+    factor (int): Halving factor: the share of candidates dropped, and the
+        growth of the rows, from one round to the next
+    halving (bool): Successive halving; False trains every candidate on all rows
+    min_rows (int): Fewest training rows per fold in the first round
+    cache_dir (str): Trial cache directory, defaults to ML_TOOLS_CACHE_DIR or
+        .experiments_cache; '' disables the cache
+    random_state (int): Seed of the split and of the folds
+    log (callable): Receives progress lines; None for silence
+
+    Returns:
+    dict: metric, rounds, ranked candidates, best_params, best_score,
+        test_score, trials_run, trials_cached, seconds
+    """
+    log = log or (lambda *args: None)
+    workers = workers or os.cpu_count() or 1
+    candidates = list(ParameterGrid(DEFAULT_GRIDS.get(task.name, {}) if grid is None else grid))
+    X, y, X_test, y_test, _ = prepare(task, df, random_state)
+
+    splitter = (StratifiedKFold if task.kind == 'classifier' and task.stratify else KFold)(
+        cv, shuffle=True, random_state=random_state)
+    fold_of = np.empty(len(X), dtype=np.int32)
+    for fold, (_, test) in enumerate(splitter.split(X, y)):
+        fold_of[test] = fold
+    order = np.random.default_rng(random_state).permutation(len(X))
+    arrays = {'X': X, 'y': y, 'fold_of': fold_of, 'order': order}
+    dataset = dataset_hash(task.name, X, y, fold_of, order)
+    cache_dir = get_cache_dir() if cache_dir is None else cache_dir
+    cache = TrialCache(cache_dir, dataset) if cache_dir else None
+
+    full_rows = int(len(X) - np.bincount(fold_of).max())
+    rounds = halving_rounds(len(candidates), full_rows, factor, min_rows) if halving else [None]
+    log(f"{task.name}: {len(candidates)} candidates, {cv} folds, {len(X)} training rows, "
+        f"{len(rounds)} round(s), {workers} workers, dataset {dataset[:12]}")
+
+    start = time.perf_counter()
+    results = {'task': task.name, 'dataset': dataset, 'rounds': [], 'trials_run': 0, 'trials_cached': 0}
+    blocks = []
+    pool = None
+    try:
+        if workers == 1:
+            _set_worker(task.name, arrays)
+        else:
+            specs = {}
+            for name, array in arrays.items():
+                block, specs[name] = _share(array)
+                blocks.append(block)
+            # spawn rather than fork: the parent may hold threads (numba, BLAS)
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(task.name, specs))
+
+        alive = list(range(len(candidates)))
+        for number, rows in enumerate(rounds):
+            round_start = time.perf_counter()
+            scores, metric, run = _run_round(candidates, alive, cv, rows, cache, pool)
+            results['trials_run'] += run
+            results['trials_cached'] += cv * len(alive) - run
+            ranked = sorted(alive, key=lambda i: (-np.nan_to_num(np.mean(scores[i]), nan=-np.inf), i))
+            results['metric'] = metric
+            results['rounds'].append({'rows': rows or full_rows, 'candidates': len(alive), 'trials_run': run,
+                                      'seconds': time.perf_counter() - round_start})
+            log(f"round {number + 1}: {len(alive)} candidates on {rows or full_rows} rows per fold, "
+                f"{run} trials run, {cv * len(alive) - run} cached, "
+                f"{time.perf_counter() - round_start:.1f} s, best {np.mean(scores[ranked[0]]):.4f}")
+            if rows is not None:
+                alive = ranked[:max(1, math.ceil(len(alive) / factor))]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    results['candidates'] = [{'params': candidates[i], 'mean': float(np.mean(scores[i])),
+                              'std': float(np.std(scores[i]))} for i in ranked]
+    best = candidates[ranked[0]]
+    results['best_params'] = best
+    results['best_score'] = results['candidates'][0]['mean']
+    # The notebook's own evaluation: all training rows, scored on the held-out split
+    _, results['test_score'] = fit_and_score(task.name, best, X, y, X_test, y_test)
+    results['seconds'] = time.perf_counter() - start
+    return results
+
+
+def _run_round(candidates, alive, cv, rows, cache, pool):
+    """Fold scores of the alive candidates on rows, the metric and the trials run; cached trials are read"""
+    scores = {i: [None] * cv for i in alive}
+    metric = None
+    trials = []
+    for i in alive:
+        for fold in range(cv):
+            cached = cache.get(candidates[i], fold, rows) if cache is not None else None
+            if cached is None:
+                trials.append((i, fold))
+            else:
+                scores[i][fold], metric = cached['score'], cached['metric']
+
+    if pool is None:
+        finished = (((i, fold), _run_trial(candidates[i], fold, rows)) for i, fold in trials)
+    else:
+        futures = {pool.submit(_run_trial, candidates[i], fold, rows): (i, fold) for i, fold in trials}
+        finished = ((futures[future], future.result()) for future in as_completed(futures))
+    for (i, fold), result in finished:
+        scores[i][fold], metric = result['score'], result['metric']
+        if cache is not None:
+            cache.put(candidates[i], fold, rows, result)
+    return scores, metric, len(trials)
+
+
+def parse_grid(text):
+    """A grid from JSON text or a JSON file"""
+    if text is None:
+        return None
+    if os.path.exists(text):
+        with open(text) as f:
+            return json.load(f)
+    return json.loads(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('task', choices=list(TASKS))
+    parser.add_argument('data', help="The task's CSV")
+    parser.add_argument('--grid', help='Parameter grid as JSON, or a JSON file; default: the task\'s DEFAULT_GRIDS')
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='Default: one per CPU')
+    parser.add_argument('--factor', type=int, default=3, help='Successive halving factor')
+    parser.add_argument('--no-halving', action='store_true', help='Train every candidate on all rows')
+    parser.add_argument('--min-rows', type=int, default=DEFAULT_MIN_ROWS)
+    parser.add_argument('--cache-dir', default=None, help="Default: ML_TOOLS_CACHE_DIR or .experiments_cache; '' for none")
+    parser.add_argument('--sep', help="CSV separator, if not the task's")
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args(argv)
+
+    task = get_task(args.task)
+    df = task.read(args.data, **({'sep': args.sep} if args.sep else {}))
+    results = search(task, df, parse_grid(args.grid), args.cv, args.workers, args.factor, not args.no_halving,
+                     args.min_rows, args.cache_dir)
+
+    print(f"\n{'mean':>8}{'std':>8}  params ({results['metric']}, {args.cv}-fold, last round)")
+    for candidate in results['candidates'][:10]:
+        print(f"{candidate['mean']:>8.4f}{candidate['std']:>8.4f}  {json.dumps(candidate['params'])}")
+    print(f"best {json.dumps(results['best_params'])}: cv {results['best_score']:.4f}, "
+          f"held-out {results['test_score']:.4f}")
+    print(f"{results['trials_run']} trials run, {results['trials_cached']} cached, {results['seconds']:.1f} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    # Run the imported module, so worker processes find its functions under ml_tools.experiments
+    from ml_tools import experiments
+    sys.exit(experiments.main())
@@ -0,0 +1,377 @@
+"""
+Compiled inference for scikit-learn tree ensembles
+
+sklearn's RandomForest predict/predict_proba loops over the trees in
+Python: each tree validates the input, walks it and allocates its own
+output, so a single row costs as much as several hundred (about 10 ms for
+100 trees). CompiledForest flattens every tree of a fitted forest into one
+set of contiguous node arrays
+
+    feature, threshold, left, right, value    (one entry per node, all trees)
+    roots                                     (first node of each tree)
+
+and evaluates all the trees of a batch at once, with one of three kernels:
+
+- 'numba':  a compiled loop over rows and trees, when numba is installed
+- 'numpy':  vectorized traversal of every (tree, row) pair level by level;
+            the fastest pure-NumPy option for small batches
+- 'native': each tree's own compiled apply(), with the leaf values read
+            from the flattened arrays; for large batches without numba
+
+'auto' picks numba when available, else numpy up to VECTORIZED_MAX_ROWS
+rows and native above.
+
+Results are identical to the estimator's predict/predict_proba, not just
+close: rows are compared as float32 as sklearn does (and, like sklearn,
+infinite values or values too large for float32 are rejected), missing
+values follow the splits' missing_go_to_left, and the tree outputs are
+summed in tree order before dividing by the number of trees.
+
+    forest = CompiledForest.from_estimator(model)
+    forest.predict_proba(X)
+    pipeline = compile_pipeline(pipeline)   # same transformers, compiled forest
+"""
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.tree import BaseDecisionTree
+from sklearn.ensemble import (ExtraTreesClassifier, ExtraTreesRegressor, RandomForestClassifier,
+                              RandomForestRegressor)
+from sklearn.base import is_classifier
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the NumPy and native kernels are always available
+    njit = None
+
+BACKENDS = ('auto', 'numba', 'numpy', 'native')
+HAVE_NUMBA = njit is not None
+
+# Ensembles that average their trees (gradient boosting sums scaled trees instead)
+FORESTS = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+
+# Above this many rows the native per-tree kernel beats the vectorized one
+VECTORIZED_MAX_ROWS = 64
+# Rows the numba kernel runs through one tree before the next, and rows walked in lockstep
+NUMBA_BLOCK_ROWS = 512
+NUMBA_GROUP_ROWS = 8
+# (tree, row) pairs traversed together by the vectorized kernel, to bound its memory
+VECTORIZED_MAX_LANES = 1 << 18
+
+
+def float32_thresholds(threshold):
+    """
+    Thresholds rounded down to float32
+
+    sklearn compares the float32 feature value with the float64 threshold;
+    for a float32 x, x <= t holds exactly when x <= the largest float32 not
+    above t, so the kernels can compare in float32 with identical results.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+if njit is not None:
+    @njit(parallel=True, nogil=True, cache=True)
+    def _accumulate_numba(X, roots, depths, records, missing_left, value, out):
+        n_rows = X.shape[0]
+        # Blocks of rows in parallel; each tree walks a whole block while its nodes are in cache
+        for b in prange((n_rows + NUMBA_BLOCK_ROWS - 1) // NUMBA_BLOCK_ROWS):
+            stop = min(n_rows, (b + 1) * NUMBA_BLOCK_ROWS)
+            current = np.empty(NUMBA_GROUP_ROWS, np.int64)
+            for t in range(roots.shape[0]):
+                for first in range(b * NUMBA_BLOCK_ROWS, stop, NUMBA_GROUP_ROWS):
+                    size = min(NUMBA_GROUP_ROWS, stop - first)
+                    current[:size] = roots[t]
+                    # A fixed number of levels for the whole group: rows that reached their
+                    # leaf stay on it, and the walks of the group overlap instead of each
+                    # waiting on its own unpredictable loop exit
+                    for _ in range(depths[t]):
+                        for g in range(size):
+                            node = current[g]
+                            record = 4 * node
+                            x = X[first + g, records[record + 2]]
+                            threshold = np.int32(records[record + 3]).view(np.float32)
+                            child = records[record + 1] if x > threshold else records[record]
+                            if np.isnan(x) and not missing_left[node]:
+                                child = records[record + 1]
+                            current[g] = child
+                    # Summed in tree order from zero, as sklearn accumulates
+                    for g in range(size):
+                        for k in range(value.shape[1]):
+                            out[first + g, k] += value[current[g], k]
+
+
+class CompiledForest:
+    """
+    A fitted tree ensemble flattened into contiguous node arrays
+
+    Nodes of all trees share one index space: tree t occupies the nodes
+    roots[t] to roots[t + 1] - 1, and left/right hold global node indices.
+    Leaves point to themselves, so a traversal that has reached its leaf
+    stays there.
+
+    Parameters:
+    feature (numpy.ndarray): Feature index tested at each node (0 at leaves)
+    threshold (numpy.ndarray): float64 split thresholds; x <= threshold goes left
+    left, right (numpy.ndarray): Child node indices
+    missing_left (numpy.ndarray): Whether missing values go left at each node
+    value (numpy.ndarray): Output of each node, (n_nodes, n_outputs), class
+        probabilities for a classifier
+    roots (numpy.ndarray): Root node of each tree
+    depths (numpy.ndarray): Depth of each tree
+    n_features (int): Number of input features
+    classes (numpy.ndarray): Class labels of a classifier, None for a regressor
+    feature_names (numpy.ndarray): Column names seen in fit, if any
+    trees (list): The sklearn Tree objects, for the 'native' kernel
+
+    Compiled with keep_trees=False, a forest pickles as plain arrays: loaded
+    with joblib's mmap_mode, every process scores from the same pages.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, depths, n_features,
+                 classes=None, feature_names=None, trees=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.depths = np.ascontiguousarray(depths, dtype=np.intp)
+        self.n_features = n_features
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+        self.trees = trees
+        self._prepare()
+
+    def _prepare(self):
+        # Derived arrays of the kernels. They are pickled with the node arrays, so that
+        # a memory-mapped load (joblib mmap_mode) shares them too; only missing ones
+        # are built, e.g. the records of a forest pickled without numba
+        if getattr(self, 'leaf', None) is None:
+            self.leaf = self.left == np.arange(len(self.left))
+        if getattr(self, 'threshold32', None) is None:
+            self.threshold32 = float32_thresholds(self.threshold)
+        if getattr(self, 'children', None) is None:
+            # children[2 * node + go_right]
+            self.children = np.ascontiguousarray(np.stack([self.left, self.right], axis=1).ravel())
+        if getattr(self, 'records', None) is None:
+            self.records = None
+            if njit is not None:
+                # One 16-byte record per node (left, right, feature, threshold) for the numba
+                # kernel: a node visit reads one cache line instead of four
+                records = np.empty((self.n_nodes, 4), dtype=np.int32)
+                records[:, 0] = self.left
+                records[:, 1] = self.right
+                records[:, 2] = self.feature
+                records.view(np.float32)[:, 3] = self.threshold32
+                self.records = records.ravel()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prepare()
+
+    @classmethod
+    def from_estimator(cls, estimator, keep_trees=True):
+        """
+        Flatten a fitted forest or decision tree
+
+        Parameters:
+        estimator: A fitted RandomForest/ExtraTrees classifier or regressor,
+            or a single decision tree
+        keep_trees (bool): Keep the sklearn trees for the 'native' kernel;
+            without them the artifact is only the flat arrays
+
+        Raises:
+        ValueError: For other estimators and for multi-output models
+        """
+        if isinstance(estimator, FORESTS):
+            trees = [tree.tree_ for tree in estimator.estimators_]
+        elif isinstance(estimator, BaseDecisionTree):
+            trees = [estimator.tree_]
+        else:
+            raise ValueError(f"Cannot compile {type(estimator).__name__}: expected a fitted forest or decision tree")
+        if estimator.n_outputs_ != 1:
+            raise ValueError("Multi-output models are not supported")
+
+        sizes = np.array([tree.node_count for tree in trees])
+        depths = [tree.max_depth for tree in trees]
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        feature, threshold, left, right, missing_left, value = [], [], [], [], [], []
+        for tree, root in zip(trees, roots):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, nodes, tree.children_left) + root)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + root)
+            missing_left.append(tree.missing_go_to_left.astype(bool))
+            # Classifier trees store class proportions, regressor trees the mean target
+            value.append(tree.value[:, 0, :])
+
+        classes = estimator.classes_ if is_classifier(estimator) else None
+        if classes is not None:
+            value = [v[:, :len(classes)] for v in value]
+        return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+                   np.concatenate(right), np.concatenate(missing_left), np.concatenate(value), roots, depths,
+                   estimator.n_features_in_, classes, getattr(estimator, 'feature_names_in_', None),
+                   trees if keep_trees else None)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right,
+                                      self.missing_left, self.value, self.roots, self.depths))
+
+    def _validate(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        with np.errstate(over='ignore'):
+            X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has shape {X.shape}, expected (n_samples, {self.n_features})")
+        # Values beyond float32 became +-inf in the cast; sklearn rejects both (NaN is a missing value)
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        return X
+
+    def _backend(self, backend, n_rows):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}, expected one of {', '.join(BACKENDS)}")
+        if backend == 'numba' and njit is None:
+            raise ValueError("The numba backend needs numba installed")
+        if backend == 'native' and self.trees is None:
+            raise ValueError("The native backend needs the trees (compile with keep_trees=True)")
+        if backend != 'auto':
+            return backend
+        if njit is not None:
+            return 'numba'
+        if n_rows <= VECTORIZED_MAX_ROWS or self.trees is None:
+            return 'numpy'
+        return 'native'
+
+    def _apply_vectorized(self, X):
+        """Leaf of every (tree, row) pair, (n_trees * n_rows,) tree-major"""
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        nodes = np.repeat(self.roots, n_rows)
+        offsets = np.tile(np.arange(n_rows) * n_features, self.n_trees)
+        missing = np.isnan(flat).any()
+        active = np.arange(len(nodes))
+        active = active[~self.leaf[nodes]]
+        # One tree level per pass; pairs that reached their leaf drop out
+        while active.size:
+            node = nodes[active]
+            x = flat[offsets[active] + self.feature[node]]
+            go_right = x > self.threshold32[node]
+            if missing:
+                go_right |= np.isnan(x) & ~self.missing_left[node]
+            node = self.children[2 * node + go_right]
+            nodes[active] = node
+            active = active[~self.leaf[node]]
+        return nodes
+
+    def _sum(self, X, backend):
+        """Sum of the tree outputs of every row, (n_rows, n_outputs)"""
+        n_rows = len(X)
+        if backend == 'numba':
+            out = np.zeros((n_rows, self.value.shape[1]))
+            _accumulate_numba(X, self.roots, self.depths, self.records, self.missing_left, self.value, out)
+            return out
+        if backend == 'native':
+            # Each tree's leaf values are a slice of the flat array, as small as the tree
+            ends = np.append(self.roots[1:], self.n_nodes)
+            out = self.value[:ends[0]][self.trees[0].apply(X)]
+            for tree, root, end in zip(self.trees[1:], self.roots[1:], ends[1:]):
+                out += self.value[root:end][tree.apply(X)]
+            return out
+
+        chunk = max(1, VECTORIZED_MAX_LANES // self.n_trees)
+        sums = []
+        for start in range(0, n_rows, chunk):
+            rows = X[start:start + chunk]
+            values = self.value[self._apply_vectorized(rows)].reshape(self.n_trees, len(rows), -1)
+            # cumsum adds the trees one after the other, in sklearn's order
+            sums.append(np.cumsum(values, axis=0)[-1])
+        return np.concatenate(sums) if len(sums) != 1 else sums[0]
+
+    def _mean(self, X, backend):
+        X = self._validate(X)
+        out = self._sum(X, self._backend(backend, len(X)))
+        out /= self.n_trees
+        return out
+
+    def predict_proba(self, X, backend='auto'):
+        """Class probabilities, (n_samples, n_classes), as the classifier's predict_proba"""
+        if self.classes_ is None:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean(X, backend)
+
+    def predict(self, X, backend='auto'):
+        """Predicted classes or values, as the estimator's predict"""
+        out = self._mean(X, backend)
+        if self.classes_ is None:
+            return out[:, 0]
+        return self.classes_.take(np.argmax(out, axis=1), axis=0)
+
+    def apply(self, X, backend='auto'):
+        """Leaf index of every row in every tree, (n_samples, n_trees), as the forest's apply"""
+        X = self._validate(X)
+        if self._backend(backend, len(X)) == 'native':
+            return np.column_stack([tree.apply(X) for tree in self.trees])
+        nodes = self._apply_vectorized(X).reshape(self.n_trees, len(X))
+        return (nodes - self.roots[:, None]).T
+
+
+class CompiledPipeline:
+    """
+    The fitted transformers of a Pipeline followed by its compiled forest
+
+    Parameters:
+    steps (list): (name, fitted transformer) pairs applied in order
+    forest (CompiledForest): The compiled final step
+    """
+
+    def __init__(self, steps, forest):
+        self.steps = list(steps)
+        self.forest = forest
+
+    @property
+    def classes_(self):
+        return self.forest.classes_
+
+    def transform(self, X):
+        for _, step in self.steps:
+            X = step.transform(X)
+        return X
+
+    def predict_proba(self, X, backend='auto'):
+        return self.forest.predict_proba(self.transform(X), backend)
+
+    def predict(self, X, backend='auto'):
+        return self.forest.predict(self.transform(X), backend)
+
+
+def compile_pipeline(model, keep_trees=True):
+    """
+    The model with its forest replaced by a CompiledForest
+
+    Parameters:
+    model: A fitted forest, or a Pipeline whose last step is one
+    keep_trees (bool): See CompiledForest.from_estimator
+
+    Returns:
+    CompiledForest or CompiledPipeline: A new object; the model is not modified
+    """
+    if isinstance(model, Pipeline):
+        return CompiledPipeline(model.steps[:-1], CompiledForest.from_estimator(model.steps[-1][1], keep_trees))
+    return CompiledForest.from_estimator(model, keep_trees)
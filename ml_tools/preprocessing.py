@@ -0,0 +1,261 @@
+"""
+Frozen preprocessing: fit once on the training data, transform any batch
+
+The notebooks derive their encodings from whatever frame is at hand: the
+car price notebook refits one LabelEncoder per column in a loop (keeping
+only the last column's classes), the marketing notebook calls
+pd.get_dummies on the full frame (so a batch missing a category gets
+different columns), and the fraud notebook fits StandardScaler twice. The
+transformers here store what they learn at fit time and reproduce the same
+columns, in the same order, for any later batch:
+
+- CodeEncoder:  integer codes of the sorted categories of each text column,
+                as LabelEncoder (fitted per column)
+- DummyEncoder: one-hot columns as pd.get_dummies(drop_first=True), as a
+                scipy.sparse CSR matrix or a dense array
+- Preprocessor: an encoder and a StandardScaler fitted on the training rows
+
+Category lookups are vectorized hash lookups against the stored vocabulary
+(pandas.Index.get_indexer); missing and unseen categories get code -1, i.e.
+no dummy column set. All of them pickle (with joblib, next to the model).
+
+    preprocessor = Preprocessor('dummies').fit(X, train_rows)
+    preprocessor.transform(batch)
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import StandardScaler
+
+ENCODINGS = ('dummies', 'codes')
+
+
+def text_columns(frame):
+    """The columns the notebooks encode: every text or categorical column"""
+    return list(frame.select_dtypes(include=['object', 'category', 'string']).columns)
+
+
+class CodeEncoder:
+    """
+    Replaces text columns with integer codes of their frozen, sorted categories
+
+    Other columns pass through as floats, in place.
+
+    Parameters:
+    columns (list): Columns to encode; None for every text column at fit time
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_indexes', None)
+        return state
+
+    def fit(self, frame):
+        """Store the input columns and each encoded column's sorted categories"""
+        columns = text_columns(frame) if self.columns is None else [c for c in self.columns if c in frame]
+        self.input_columns_ = list(frame.columns)
+        self.vocabularies_ = {column: np.array(sorted(frame[column].dropna().astype(str).unique()), dtype=object)
+                              for column in columns}
+        self._indexes = None
+        return self
+
+    @property
+    def feature_names_(self):
+        return list(self.input_columns_)
+
+    def codes(self, column, values):
+        """Codes of values (a Series) in column's vocabulary; -1 for missing or unseen ones"""
+        if getattr(self, '_indexes', None) is None:
+            self._indexes = {name: pd.Index(vocabulary) for name, vocabulary in self.vocabularies_.items()}
+        index = self._indexes[column]
+        codes = index.get_indexer(values)
+        # The vocabulary is text: look up values that missed (numbers read as such) again as text
+        retry = np.flatnonzero(codes < 0)
+        retry = retry[values.iloc[retry].notna().to_numpy()]
+        if len(retry):
+            codes[retry] = index.get_indexer(values.iloc[retry].astype(str))
+        return codes
+
+    def transform(self, frame):
+        """
+        Encoded float matrix of frame's input columns
+
+        Returns:
+        numpy.ndarray: One column per input column, in fit order
+        """
+        out = np.empty((len(frame), len(self.input_columns_)))
+        for j, column in enumerate(self.input_columns_):
+            if column in self.vocabularies_:
+                out[:, j] = self.codes(column, frame[column])
+            else:
+                out[:, j] = frame[column].to_numpy(dtype=float)
+        return out
+
+    def fit_transform(self, frame):
+        return self.fit(frame).transform(frame)
+
+    def inverse_codes(self, column, codes):
+        """Categories of codes in column; None where the code is -1"""
+        vocabulary = np.append(self.vocabularies_[column], None)
+        return vocabulary[np.asarray(codes)]
+
+
+class DummyEncoder:
+    """
+    One-hot encodes text columns against frozen categories, as pd.get_dummies
+
+    Output columns are the other input columns first, in input order, then
+    one column per category of each encoded column, named column_category;
+    with drop_first the first (sorted) category of each has none.
+
+    Parameters:
+    columns (list): Columns to encode; None for every text column at fit time
+    drop_first (bool): Drop each column's first category, as drop_first=True
+    sparse (bool): Return a CSR matrix rather than a dense array
+    """
+
+    def __init__(self, columns=None, drop_first=True, sparse=True):
+        self.columns = columns
+        self.drop_first = drop_first
+        self.sparse = sparse
+
+    def fit(self, frame):
+        """Store the vocabularies and the output column layout"""
+        self.codes_ = CodeEncoder(self.columns).fit(frame)
+        vocabularies = self.codes_.vocabularies_
+        self.passthrough_ = [c for c in frame.columns if c not in vocabularies]
+        drop = int(self.drop_first)
+        self.offsets_ = {}
+        names = list(self.passthrough_)
+        for column, vocabulary in vocabularies.items():
+            self.offsets_[column] = len(names)
+            names.extend(f'{column}_{category}' for category in vocabulary[drop:])
+        self.feature_names_ = names
+        return self
+
+    @property
+    def input_columns_(self):
+        return self.codes_.input_columns_
+
+    @property
+    def vocabularies_(self):
+        return self.codes_.vocabularies_
+
+    def transform(self, frame, sparse=None):
+        """
+        Encoded matrix of frame
+
+        Parameters:
+        frame (pandas.DataFrame): Holds at least the fitted input columns
+        sparse (bool): Overrides the encoder's sparse setting
+
+        Returns:
+        scipy.sparse.csr_matrix or numpy.ndarray: len(frame) x len(feature_names_)
+        """
+        sparse = self.sparse if sparse is None else sparse
+        n = len(frame)
+        drop = int(self.drop_first)
+        dense = frame[self.passthrough_].to_numpy(dtype=float)
+
+        width = len(self.feature_names_)
+        if not sparse:
+            out = np.zeros((n, width))
+            out[:, :dense.shape[1]] = dense
+            flat = out.reshape(-1)
+            for column, offset in self.offsets_.items():
+                codes = self.codes_.codes(column, frame[column]) - drop
+                rows = np.flatnonzero(codes >= 0)
+                flat[rows * width + offset + codes[rows]] = 1.0
+            return out
+
+        # Output column of each encoded value, or -1 (missing, unseen or dropped)
+        hot = np.empty((n, len(self.offsets_)), dtype=np.int64)
+        for j, (column, offset) in enumerate(self.offsets_.items()):
+            codes = self.codes_.codes(column, frame[column]) - drop
+            hot[:, j] = np.where(codes >= 0, offset + codes, -1)
+
+        # Row by row the column indices already increase (passthrough, then
+        # each column's block), so the CSR arrays are the masked row-major values
+        indices = np.hstack([np.broadcast_to(np.arange(dense.shape[1]), dense.shape), hot])
+        data = np.hstack([dense, np.ones(hot.shape)])
+        keep = (indices >= 0) & (data != 0)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        return sp.csr_matrix((data[keep], indices[keep], indptr), shape=(n, width))
+
+    def fit_transform(self, frame, sparse=None):
+        return self.fit(frame).transform(frame, sparse)
+
+
+def make_encoder(encoding, columns=None, sparse=False):
+    """An unfitted CodeEncoder or DummyEncoder (drop_first, as the notebooks) for encoding"""
+    if encoding == 'dummies':
+        return DummyEncoder(columns, drop_first=True, sparse=sparse)
+    if encoding == 'codes':
+        return CodeEncoder(columns)
+    raise ValueError(f"Unknown encoding: {encoding}, expected one of {', '.join(ENCODINGS)}")
+
+
+class Preprocessor:
+    """
+    A frozen encoder followed by a StandardScaler fitted on the training rows
+
+    Parameters:
+    encoding (str): 'dummies' (DummyEncoder) or 'codes' (CodeEncoder)
+    columns (list): Columns to encode; None for every text column
+    sparse (bool): Keep 'dummies' output sparse; the scaler then only scales
+        (with_mean=False), since centering would make it dense
+    """
+
+    def __init__(self, encoding='dummies', columns=None, sparse=False):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}, expected one of {', '.join(ENCODINGS)}")
+        if sparse and encoding != 'dummies':
+            raise ValueError("Only the 'dummies' encoding has a sparse output")
+        self.encoding = encoding
+        self.columns = columns
+        self.sparse = sparse
+
+    def fit(self, frame, train_rows=None):
+        """
+        Fit the encoder on frame and the scaler on its training rows
+
+        Parameters:
+        frame (pandas.DataFrame): Raw features; the vocabularies are learned
+            from all of it, as the notebooks encode before splitting
+        train_rows (array): Positions of the rows the scaler is fitted on;
+            None for all
+
+        Returns:
+        Preprocessor: self
+        """
+        self.encoder_ = make_encoder(self.encoding, self.columns, self.sparse).fit(frame)
+        encoded = self.encode(frame if train_rows is None else frame.iloc[train_rows])
+        self.scaler_ = StandardScaler(with_mean=not self.sparse).fit(encoded)
+        return self
+
+    @property
+    def input_columns_(self):
+        return self.encoder_.input_columns_
+
+    @property
+    def vocabularies_(self):
+        return self.encoder_.vocabularies_
+
+    @property
+    def feature_names_(self):
+        return self.encoder_.feature_names_
+
+    def encode(self, frame):
+        """The encoded, unscaled matrix of frame"""
+        return self.encoder_.transform(frame)
+
+    def scale(self, X):
+        return self.scaler_.transform(X)
+
+    def transform(self, frame):
+        """The scaled model input matrix of frame"""
+        return self.scale(self.encode(frame))
@@ -0,0 +1,135 @@
+"""
+The notebook tasks: how each dataset is read, cleaned, encoded and modelled
+
+One Task per notebook, reproducing its steps so tools outside the
+notebooks (batch scoring, experiments) train and score the same way:
+
+- marketing: bank.csv (';'-separated), y mapped yes/no to 1/0,
+             get_dummies(drop_first=True), RandomForestClassifier(100)
+- salary:    Cleaned_MLB_Salary_Dataset.csv without Player Name, Team and
+             Franchise, label-encoded bats/throws/League, RandomForestRegressor(100)
+- car_price: uae_used_cars_10k.csv without missing rows, every text column
+             label-encoded, LinearRegression
+- fraud:     credit_card_fraud_100.csv, stripped names, NaN filled with the
+             column mode, duplicates dropped, RandomForestClassifier(100)
+
+Every task scales its features with a StandardScaler fitted on the training
+split and splits with random_state=42 as its notebook does.
+"""
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from ml_tools.preprocessing import ENCODINGS, text_columns
+
+
+class Task:
+    """
+    A notebook's data preparation and model
+
+    Parameters:
+    name (str): Task name
+    target (str or tuple): Target column, or candidates of which the first present is used
+    kind (str): 'classifier' or 'regressor'
+    make_model (callable): Returns a new, unfitted model
+    read_options (dict): Extra pandas.read_csv arguments
+    drop (tuple): Columns dropped before encoding
+    encoding (str): 'dummies' (one-hot, first category dropped) or 'codes'
+        (integer codes of the sorted categories, as LabelEncoder)
+    categorical (tuple): Columns to encode; None for every text column
+    target_map (dict): Mapping applied to the target, rows outside it are dropped
+    test_size (float): Share of the rows held out
+    stratify (bool): Stratify the split on the target
+    dropna (bool): Drop rows with missing values
+    fill_mode (bool): Fill missing values with the column mode
+    dedupe (bool): Drop duplicate rows
+    """
+
+    def __init__(self, name, target, kind, make_model, read_options=None, drop=(), encoding='dummies',
+                 categorical=None, target_map=None, test_size=0.2, stratify=False, dropna=False,
+                 fill_mode=False, dedupe=False):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}, expected one of {', '.join(ENCODINGS)}")
+        self.name = name
+        self.target = target
+        self.kind = kind
+        self.make_model = make_model
+        self.read_options = read_options or {}
+        self.drop = tuple(drop)
+        self.encoding = encoding
+        self.categorical = categorical
+        self.target_map = target_map
+        self.test_size = test_size
+        self.stratify = stratify
+        self.dropna = dropna
+        self.fill_mode = fill_mode
+        self.dedupe = dedupe
+
+    def read(self, path, **options):
+        """The dataset as the notebook reads and cleans it"""
+        df = pd.read_csv(path, **{**self.read_options, **options})
+        df.columns = df.columns.str.strip()
+        if self.dropna:
+            df = df.dropna()
+        if self.fill_mode:
+            df = df.fillna(df.mode().iloc[0])
+        if self.dedupe:
+            df = df.drop_duplicates().reset_index(drop=True)
+        return df
+
+    def target_column(self, df):
+        candidates = (self.target,) if isinstance(self.target, str) else self.target
+        for column in candidates:
+            if column in df.columns:
+                return column
+        raise KeyError(f"Target column {' or '.join(candidates)} not found")
+
+    def features_target(self, df):
+        """(features DataFrame, target Series) with the notebook's target mapping and dropped columns"""
+        target = self.target_column(df)
+        if self.target_map is not None:
+            df = df[df[target].isin(list(self.target_map))]
+            y = df[target].map(self.target_map)
+        else:
+            y = df[target]
+        X = df.drop(columns=[target] + [c for c in self.drop if c in df.columns])
+        return X, y
+
+    def categorical_columns(self, X):
+        if self.categorical is not None:
+            return [c for c in self.categorical if c in X.columns]
+        return text_columns(X)
+
+    def split(self, X, y, random_state=42):
+        return train_test_split(X, y, test_size=self.test_size, random_state=random_state,
+                                stratify=y if self.stratify else None)
+
+
+TASKS = {
+    'marketing': Task(
+        'marketing', 'y', 'classifier',
+        lambda: RandomForestClassifier(n_estimators=100, random_state=42),
+        read_options={'sep': ';'}, target_map={'yes': 1, 'no': 0}, stratify=True
+    ),
+    'salary': Task(
+        'salary', 'salary', 'regressor',
+        lambda: RandomForestRegressor(n_estimators=100, random_state=42),
+        drop=('Player Name', 'Team', 'Franchise'), encoding='codes', categorical=('bats', 'throws', 'League')
+    ),
+    'car_price': Task(
+        'car_price', ('price', 'Price'), 'regressor', LinearRegression,
+        encoding='codes', dropna=True
+    ),
+    'fraud': Task(
+        'fraud', 'Class', 'classifier',
+        lambda: RandomForestClassifier(n_estimators=100, random_state=42),
+        test_size=0.3, stratify=True, fill_mode=True, dedupe=True
+    ),
+}
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown task: {name}, expected one of {', '.join(TASKS)}") from None
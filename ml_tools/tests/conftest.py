@@ -0,0 +1,5 @@
+import os
+import sys
+
+# ml_tools is imported as a package from the repository root, as the notebooks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,85 @@
+"""
+Scoring bundles and out-of-core scoring against scoring the whole frame in memory
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from ml_tools import batch_score
+from ml_tools.batch_score import ScoringBundle, load_bundle, prefer_compiled, save_bundle, score_file
+from ml_tools.benchmarks.synthetic import write_bank_csv
+from ml_tools.forest_inference import CompiledForest
+from ml_tools.tasks import get_task
+
+
+@pytest.fixture(scope='module')
+def bank(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('bank')
+    train_path, score_path = str(directory / 'train.csv'), str(directory / 'score.csv')
+    write_bank_csv(train_path, 2000, seed=0)
+    write_bank_csv(score_path, 1500, seed=7, chunk_rows=600)
+    task = get_task('marketing')
+    bundle, metrics = ScoringBundle.fit(task, task.read(train_path))
+    bundle_path = save_bundle(bundle, str(directory / 'marketing.joblib'))
+    return task, bundle, metrics, bundle_path, score_path
+
+
+def test_fit_reports_held_out_metrics(bank):
+    _, bundle, metrics, _, _ = bank
+    assert metrics['train_rows'] + metrics['test_rows'] == 2000
+    assert 0.5 < metrics['roc_auc'] <= 1
+    assert isinstance(bundle.forest, CompiledForest)
+
+
+def test_loaded_bundle_scores_as_the_fitted_one(bank):
+    task, bundle, _, bundle_path, score_path = bank
+    X, _ = task.features_target(task.read(score_path))
+    expected = bundle.predict(X)
+    loaded = load_bundle(bundle_path)
+    # Memory-mapped, and the sklearn forest stays pickled until it is used
+    assert isinstance(loaded.forest.value, np.memmap)
+    assert isinstance(loaded._model, np.ndarray)
+    pd.testing.assert_frame_equal(loaded.predict(X, loaded.scoring_model(compiled=True)), expected)
+    pd.testing.assert_frame_equal(loaded.predict(X), expected)
+    assert loaded.encoded_columns == bundle.encoded_columns
+
+
+@pytest.mark.parametrize('compiled, chunk_rows, workers', [
+    (True, 100, 1),
+    (False, 333, 1),
+    (True, 500, 2),
+])
+def test_score_file_matches_in_memory_scores(bank, tmp_path, compiled, chunk_rows, workers):
+    task, bundle, _, bundle_path, score_path = bank
+    output = str(tmp_path / 'scores.csv')
+    stats = score_file(bundle_path, score_path, output, chunk_rows=chunk_rows, workers=workers,
+                       keep=('age',), compiled=compiled)
+    assert stats['rows'] == 1500
+
+    df = task.read(score_path)
+    X, _ = task.features_target(df)
+    expected = bundle.predict(X)
+    scores = pd.read_csv(output)
+    assert list(scores.columns) == ['age', 'prediction', 'probability']
+    np.testing.assert_array_equal(scores['age'], df['age'])
+    np.testing.assert_array_equal(scores['prediction'], expected['prediction'])
+    np.testing.assert_allclose(scores['probability'], expected['probability'], rtol=0, atol=1e-15)
+
+
+def test_unseen_categories_get_no_dummy(bank):
+    task, bundle, _, _, score_path = bank
+    X, _ = task.features_target(task.read(score_path))
+    unseen = X.head(3).copy()
+    unseen['job'] = 'astronaut'
+    columns = bundle.encoded_columns
+    encoded = bundle.preprocessor.encode(unseen)
+    job_columns = [i for i, name in enumerate(columns) if name.startswith('job_')]
+    assert not np.asarray(encoded[:, job_columns]).any()
+    assert len(bundle.predict(unseen)) == 3
+
+
+def test_prefer_compiled(monkeypatch):
+    monkeypatch.setattr(batch_score, 'HAVE_NUMBA', False)
+    assert prefer_compiled(batch_score.VECTORIZED_MAX_ROWS)
+    assert not prefer_compiled(batch_score.DEFAULT_CHUNK_ROWS)
+    monkeypatch.setattr(batch_score, 'HAVE_NUMBA', True)
+    assert prefer_compiled(batch_score.DEFAULT_CHUNK_ROWS)
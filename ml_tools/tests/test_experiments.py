@@ -0,0 +1,93 @@
+"""
+The cross-validated search against sklearn's cross_val_score, the halving schedule and the trial cache
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import KFold, cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from ml_tools.experiments import halving_rounds, parse_grid, prepare, search
+from ml_tools.benchmarks.synthetic import bank_marketing
+from ml_tools.tasks import get_task
+
+
+@pytest.fixture
+def cars():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({
+        'Make': rng.choice(['audi', 'bmw', 'kia', 'toyota'], n),
+        'Year': rng.integers(2005, 2024, n),
+        'Mileage': rng.integers(1000, 250000, n),
+        'Cylinders': rng.choice([4, 6, 8], n).astype(float),
+    })
+    df['Price'] = (30000 + 1500 * (df['Year'] - 2005) - 0.08 * df['Mileage'] + 4000 * df['Cylinders']
+                   + 9000 * (df['Make'] == 'bmw') + rng.normal(0, 3000, n))
+    return df
+
+
+@pytest.mark.parametrize('n_candidates, full_rows, expected', [
+    (1, 1000, [None]),
+    (9, 3000, [333, 1000, None]),
+    (16, 3000, [111, 333, 1000, None]),
+    # Rounds that would sample fewer than min_rows are left out
+    (16, 400, [133, None]),
+    (16, 50, [None]),
+])
+def test_halving_rounds(n_candidates, full_rows, expected):
+    assert halving_rounds(n_candidates, full_rows, factor=3, min_rows=100) == expected
+
+
+def test_scores_match_cross_val_score(cars):
+    task = get_task('car_price')
+    grid = {'fit_intercept': [True, False]}
+    results = search(task, cars, grid=grid, cv=4, workers=1, halving=False, cache_dir='', log=None)
+    assert results['metric'] == 'r2'
+
+    X, y, _, _, _ = prepare(task, cars)
+    folds = KFold(4, shuffle=True, random_state=42)
+    for candidate in results['candidates']:
+        expected = cross_val_score(make_pipeline(StandardScaler(), LinearRegression(**candidate['params'])),
+                                   X, y, cv=folds, scoring='r2')
+        assert candidate['mean'] == pytest.approx(expected.mean(), abs=1e-9)
+        assert candidate['std'] == pytest.approx(expected.std(), abs=1e-9)
+    assert results['best_params'] == {'fit_intercept': True}
+
+
+def test_cached_trials_are_not_run_again(cars, tmp_path):
+    task = get_task('car_price')
+    grid = {'fit_intercept': [True, False], 'positive': [False, True]}
+    first = search(task, cars, grid=grid, cv=3, workers=1, min_rows=50, cache_dir=str(tmp_path), log=None)
+    assert first['trials_run'] > 0 and first['trials_cached'] == 0
+    assert [r['candidates'] for r in first['rounds']] == [4, 2]
+
+    again = search(task, cars, grid=grid, cv=3, workers=1, min_rows=50, cache_dir=str(tmp_path), log=None)
+    assert again['trials_run'] == 0
+    assert again['trials_cached'] == first['trials_run']
+    assert again['candidates'] == first['candidates']
+
+    # A wider grid reuses the first-round trials of the candidates it already had
+    wider = [grid, {'fit_intercept': [True], 'copy_X': [False]}]
+    widened = search(task, cars, grid=wider, cv=3, workers=1, min_rows=50, cache_dir=str(tmp_path), log=None)
+    assert widened['trials_cached'] >= 3 * 4
+
+
+def test_worker_processes_match_a_single_process():
+    task = get_task('marketing')
+    df = bank_marketing(600, seed=1)
+    grid = {'n_estimators': [10], 'max_depth': [3, None], 'min_samples_leaf': [1, 5]}
+    single = search(task, df, grid=grid, cv=3, workers=1, min_rows=50, cache_dir='', log=None)
+    pooled = search(task, df, grid=grid, cv=3, workers=2, min_rows=50, cache_dir='', log=None)
+    assert single['metric'] == 'roc_auc'
+    assert pooled['candidates'] == single['candidates']
+    assert pooled['test_score'] == single['test_score']
+
+
+def test_parse_grid(tmp_path):
+    assert parse_grid(None) is None
+    assert parse_grid('{"max_depth": [null, 8]}') == {'max_depth': [None, 8]}
+    path = tmp_path / 'grid.json'
+    path.write_text('[{"n_estimators": [10]}]')
+    assert parse_grid(str(path)) == [{'n_estimators': [10]}]
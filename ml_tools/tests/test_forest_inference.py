@@ -0,0 +1,114 @@
+"""
+CompiledForest against the fitted sklearn estimators, result for result
+"""
+import pickle
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.linear_model import LogisticRegression
+from ml_tools.forest_inference import HAVE_NUMBA, CompiledForest, CompiledPipeline, compile_pipeline
+
+BACKENDS = ['numpy', 'native'] + (['numba'] if HAVE_NUMBA else [])
+
+
+def _data(n_rows=600, n_features=8, missing=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(0, 0.5, n_rows) > 0).astype(int) + (X[:, 3] > 1)
+    if missing:
+        X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('estimator', [
+    RandomForestClassifier(n_estimators=30, random_state=0),
+    ExtraTreesClassifier(n_estimators=30, max_depth=6, random_state=0),
+    DecisionTreeClassifier(random_state=0),
+])
+def test_classifier_is_exact(estimator, backend):
+    X, y = _data(missing=0.05)
+    estimator.fit(X[:400], y[:400])
+    forest = CompiledForest.from_estimator(estimator)
+    X_test = X[400:]
+    # Both sides of the vectorized/native switch
+    for rows in (X_test[:5], X_test):
+        np.testing.assert_array_equal(forest.predict_proba(rows, backend), estimator.predict_proba(rows))
+        np.testing.assert_array_equal(forest.predict(rows, backend), estimator.predict(rows))
+    np.testing.assert_array_equal(forest.classes_, estimator.classes_)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_regressor_is_exact(backend):
+    X, y = _data()
+    target = X[:, 0] * 3 + y
+    estimator = RandomForestRegressor(n_estimators=20, random_state=0).fit(X[:400], target[:400])
+    forest = CompiledForest.from_estimator(estimator)
+    np.testing.assert_array_equal(forest.predict(X[400:], backend), estimator.predict(X[400:]))
+    with pytest.raises(AttributeError):
+        forest.predict_proba(X[400:])
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'native'])
+def test_apply_matches_the_forest(backend):
+    X, y = _data()
+    estimator = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    np.testing.assert_array_equal(CompiledForest.from_estimator(estimator).apply(X[:100], backend),
+                                  estimator.apply(X[:100]))
+
+
+def test_values_are_compared_as_float32():
+    # Thresholds sit between float32 values; a float64 comparison would send
+    # rows right at a threshold the other way
+    X, y = _data()
+    estimator = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    thresholds = np.concatenate([tree.tree_.threshold[tree.tree_.feature >= 0] for tree in estimator.estimators_])
+    features = np.concatenate([tree.tree_.feature[tree.tree_.feature >= 0] for tree in estimator.estimators_])
+    probe = np.zeros((len(thresholds), X.shape[1]))
+    probe[np.arange(len(thresholds)), features] = thresholds
+    forest = CompiledForest.from_estimator(estimator)
+    for backend in BACKENDS:
+        np.testing.assert_array_equal(forest.predict_proba(probe, backend), estimator.predict_proba(probe))
+
+
+def test_rejects_what_sklearn_rejects():
+    X, y = _data()
+    estimator = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    forest = CompiledForest.from_estimator(estimator)
+    for bad in (np.inf, -np.inf, 1e300):
+        rows = X[:3].copy()
+        rows[1, 2] = bad
+        with pytest.raises(ValueError, match='infinity'):
+            forest.predict_proba(rows)
+        with pytest.raises(ValueError):
+            estimator.predict_proba(rows)
+    with pytest.raises(ValueError, match='shape'):
+        forest.predict_proba(X[:, :3])
+    with pytest.raises(ValueError, match='backend'):
+        forest.predict_proba(X, backend='gpu')
+    with pytest.raises(ValueError):
+        CompiledForest.from_estimator(LogisticRegression().fit(X, y))
+
+
+def test_flat_forest_pickles_without_trees():
+    X, y = _data()
+    estimator = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    forest = pickle.loads(pickle.dumps(CompiledForest.from_estimator(estimator, keep_trees=False)))
+    assert forest.trees is None
+    np.testing.assert_array_equal(forest.predict_proba(X), estimator.predict_proba(X))
+    with pytest.raises(ValueError, match='native'):
+        forest.predict_proba(X, backend='native')
+
+
+def test_compile_pipeline():
+    X, y = _data()
+    pipeline = Pipeline([('scaler', StandardScaler()),
+                         ('model', RandomForestClassifier(n_estimators=10, random_state=0))]).fit(X, y)
+    compiled = compile_pipeline(pipeline)
+    assert isinstance(compiled, CompiledPipeline)
+    np.testing.assert_array_equal(compiled.predict_proba(X), pipeline.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), pipeline.predict(X))
+    assert isinstance(compile_pipeline(pipeline.steps[-1][1]), CompiledForest)
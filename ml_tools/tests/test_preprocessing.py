@@ -0,0 +1,74 @@
+"""
+Frozen encoders against pd.get_dummies and LabelEncoder
+"""
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from ml_tools.preprocessing import CodeEncoder, DummyEncoder, Preprocessor
+from ml_tools.benchmarks.synthetic import bank_marketing
+
+
+@pytest.fixture
+def frame():
+    return bank_marketing(500, seed=3).drop(columns=['y'])
+
+
+@pytest.mark.parametrize('drop_first', [True, False])
+@pytest.mark.parametrize('sparse', [True, False])
+def test_dummies_match_get_dummies(frame, drop_first, sparse):
+    encoder = DummyEncoder(drop_first=drop_first, sparse=sparse).fit(frame)
+    expected = pd.get_dummies(frame, drop_first=drop_first, dtype=float)
+    assert encoder.feature_names_ == list(expected.columns)
+    encoded = encoder.transform(frame)
+    dense = encoded.toarray() if sparse else encoded
+    np.testing.assert_array_equal(dense, expected.to_numpy())
+
+
+def test_dummies_keep_the_fitted_columns(frame):
+    encoder = DummyEncoder(sparse=False).fit(frame)
+    # A batch missing categories, with an unseen and a missing one
+    batch = frame[frame['job'] == 'student'].head(4).copy()
+    batch.loc[batch.index[0], 'job'] = 'astronaut'
+    batch.loc[batch.index[1], 'marital'] = np.nan
+    encoded = pd.DataFrame(encoder.transform(batch), columns=encoder.feature_names_)
+    assert encoded.shape == (4, len(encoder.feature_names_))
+    assert encoded.filter(like='job_').iloc[0].sum() == 0
+    assert encoded.filter(like='marital_').iloc[1].sum() == 0
+    assert (encoded['job_student'].iloc[1:] == 1).all()
+    np.testing.assert_array_equal(encoded['balance'], batch['balance'])
+    sparse = DummyEncoder(sparse=True).fit(frame).transform(batch)
+    np.testing.assert_array_equal(sparse.toarray(), encoded.to_numpy())
+
+
+def test_codes_match_label_encoder(frame):
+    encoder = CodeEncoder().fit(frame)
+    encoded = encoder.transform(frame)
+    for j, column in enumerate(frame.columns):
+        if column in encoder.vocabularies_:
+            np.testing.assert_array_equal(encoded[:, j], LabelEncoder().fit_transform(frame[column]))
+        else:
+            np.testing.assert_array_equal(encoded[:, j], frame[column])
+
+
+def test_codes_of_unseen_missing_and_numeric_values():
+    encoder = CodeEncoder(columns=['grade']).fit(pd.DataFrame({'grade': ['1', '2', 'b', 'a'], 'x': [1, 2, 3, 4]}))
+    codes = encoder.codes('grade', pd.Series([2, 'a', None, 'z'], dtype=object))
+    np.testing.assert_array_equal(codes, [1, 2, -1, -1])
+    assert list(encoder.inverse_codes('grade', codes)) == ['2', 'a', None, None]
+
+
+def test_preprocessor_scales_on_the_training_rows(frame):
+    train_rows = np.arange(0, 500, 2)
+    preprocessor = Preprocessor('dummies').fit(frame, train_rows)
+    dummies = pd.get_dummies(frame, drop_first=True, dtype=float).to_numpy()
+    scaler = StandardScaler().fit(dummies[train_rows])
+    np.testing.assert_allclose(preprocessor.transform(frame), scaler.transform(dummies))
+
+    restored = pickle.loads(pickle.dumps(preprocessor))
+    np.testing.assert_array_equal(restored.transform(frame.tail(7)), preprocessor.transform(frame.tail(7)))
+    with pytest.raises(ValueError):
+        Preprocessor('codes', sparse=True)
+    with pytest.raises(ValueError):
+        Preprocessor('ordinal')